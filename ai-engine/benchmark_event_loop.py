@@ -0,0 +1,108 @@
+"""
+Event-loop responsiveness under a CPU-heavy analysis mix
+
+    python benchmark_event_loop.py [--rounds 4] [--json]
+
+Runs the same mix twice on one event loop while a LoopLagMonitor ticks
+every 5 ms:
+
+    inline     the undecorated functions called directly on the loop
+               (how the services ran before the executor layer)
+    offloaded  the @cpu_bound versions the services call now
+
+The mix per round: Tree-sitter structure analysis of a large file and an
+in-process Python benchmark of a CPU-bound submission, all started at once.
+Lag is how late the monitor's tick ran; an interactive request on the same
+worker waits about that long.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.code_analyzer import CodeAnalyzer
+from services.performance_benchmarker import _exec_submission
+from utils.executors import LoopLagMonitor, executor_stats, shutdown_executors
+
+LARGE_SOURCE = (
+    "def f(xs):\n"
+    "    total = 0\n"
+    "    for i, x in enumerate(xs):\n"
+    "        if x % 2:\n"
+    "            total += x * i\n"
+    "        else:\n"
+    "            total -= x\n"
+    "    return total\n\n"
+) * 4000
+CPU_SUBMISSION = "result = sum(i * i for i in range(1_500_000))"
+
+
+async def _mix(offloaded: bool, rounds: int):
+    structure = CodeAnalyzer._code_structure
+    submission = _exec_submission
+    for _ in range(rounds):
+        if offloaded:
+            await asyncio.gather(
+                structure(LARGE_SOURCE, "python"),
+                submission(CPU_SUBMISSION, "", "rss_delta"),
+                submission(CPU_SUBMISSION, "", "rss_delta")
+            )
+        else:
+            structure.__wrapped__(LARGE_SOURCE, "python")
+            submission.__wrapped__(CPU_SUBMISSION, "", "rss_delta")
+            submission.__wrapped__(CPU_SUBMISSION, "", "rss_delta")
+            await asyncio.sleep(0)
+
+
+async def _measure(offloaded: bool, rounds: int) -> dict:
+    if offloaded:
+        # Start the workers outside the measurement; they stay up afterwards
+        await asyncio.gather(CodeAnalyzer._code_structure("x = 1\n", "python"),
+                             _exec_submission("result = 1", "", "rss_delta"))
+    monitor = LoopLagMonitor(interval=0.005)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    started = time.perf_counter()
+    await _mix(offloaded, rounds)
+    wall_ms = (time.perf_counter() - started) * 1000
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+    return {"wall_ms": round(wall_ms, 1), "lag": monitor.summary()}
+
+
+async def _run(rounds: int) -> dict:
+    report = {
+        "inline": await _measure(False, rounds),
+        "offloaded": await _measure(True, rounds)
+    }
+    report["executors"] = executor_stats()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure event-loop lag under CPU-heavy analysis work")
+    parser.add_argument("--rounds", type=int, default=4, help="Rounds of the analysis mix per mode")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    try:
+        report = asyncio.run(_run(args.rounds))
+    finally:
+        shutdown_executors()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'mode':<10} {'wall ms':>9} {'lag p50':>9} {'lag p99':>9} {'lag max':>9}")
+    for mode in ("inline", "offloaded"):
+        lag = report[mode]["lag"]
+        print(f"{mode:<10} {report[mode]['wall_ms']:>9.1f} {lag['p50_ms']:>9.2f} {lag['p99_ms']:>9.2f} {lag['max_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Overhead of per-line memory profiling on allocation-heavy runs
+
+    python benchmark_memory_profile.py [--sizes 10000 100000 1000000] [--json]
+
+Runs a submission that parses n integers and indexes them in a dict (about
+2n live allocations at its peak) on seeded generated inputs, once in the
+sandbox and once under runners/python_memory_profiler.py.
+
+Per size it reports the plain and profiled wall time, the profiled run's
+peak and snapshot counts, and the time spent in snapshots as a fraction of
+the profiled run. Line tracing makes the profiled run several times slower
+whatever the heap size; snapshots are what grows with the heap, and the
+sampler keeps them within SNAPSHOT_OVERHEAD_BUDGET of the run (plus
+SNAPSHOT_ALLOWANCE). Exits non-zero if a run exceeds that bound.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "runners"))
+
+from python_memory_profiler import SNAPSHOT_ALLOWANCE, SNAPSHOT_OVERHEAD_BUDGET
+from services.performance_benchmarker import PerformanceBenchmarker
+from services.test_case_generators import make_test_case
+
+SUBMISSION = (
+    "lines = test_input.split('\\n')\n"
+    "a = [int(x) for x in lines[1].split()] if len(lines) > 1 else []\n"
+    "index = {}\n"
+    "for i, x in enumerate(a):\n"
+    "    index[x] = i\n"
+    "result = len(index)\n"
+)
+
+
+async def _measure(sizes) -> dict:
+    benchmarker = PerformanceBenchmarker()
+    report = {}
+    for size in sizes:
+        test_case = make_test_case("int_array", size, seed=0)
+        plain = await benchmarker.run_isolated(SUBMISSION, test_case, "python")
+        profiled = await benchmarker.profile_memory(SUBMISSION, test_case)
+        if not plain["passed"] or "memory" not in profiled or profiled["error"]:
+            raise RuntimeError(f"n={size}: {plain.get('error') or profiled.get('error')}")
+        memory = profiled["memory"]
+        wall_ms = profiled["wall_time_ms"]
+        report[size] = {
+            "plain_ms": round(plain["execution_time"], 1),
+            "profiled_ms": round(wall_ms, 1),
+            "peak_kb": round(memory["peak"] / 1024),
+            "snapshots": memory["snapshots"],
+            "skipped_snapshots": memory["skipped_snapshots"],
+            "snapshot_ms": memory["snapshot_overhead_ms"],
+            "snapshot_fraction": round(memory["snapshot_overhead_ms"] / wall_ms, 3) if wall_ms else 0.0,
+            "within_budget": memory["snapshot_overhead_ms"] <= (SNAPSHOT_OVERHEAD_BUDGET * wall_ms
+                                                                + SNAPSHOT_ALLOWANCE * 1000)
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the overhead of the per-line memory profiler")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="Input sizes")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(_measure(args.sizes))
+    bounded = all(row["within_budget"] for row in report.values())
+
+    if args.json:
+        print(json.dumps({"sizes": report, "overhead_budget": SNAPSHOT_OVERHEAD_BUDGET,
+                          "bounded": bounded}, indent=2))
+    else:
+        print(f"{'n':>8} {'plain ms':>9} {'prof ms':>9} {'peak KB':>9} {'snaps':>6} {'skipped':>8} "
+              f"{'snap ms':>9} {'snap %':>7}")
+        for size, row in report.items():
+            print(f"{size:>8} {row['plain_ms']:>9.1f} {row['profiled_ms']:>9.1f} {row['peak_kb']:>9} "
+                  f"{row['snapshots']:>6} {row['skipped_snapshots']:>8} {row['snapshot_ms']:>9.1f} "
+                  f"{row['snapshot_fraction'] * 100:>6.1f}%")
+        print(f"\nsnapshot budget {SNAPSHOT_OVERHEAD_BUDGET:.0%} of the run; within budget: {bounded}")
+    sys.exit(0 if bounded else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Reproducibility of wall-clock timings versus instruction counts
+
+    python benchmark_operation_count.py [--sizes 100 300 1000] [--repeat 5] [--load 2] [--json]
+
+Runs an insertion sort submission on seeded generated inputs, each size
+--repeat times in the sandbox, and counts its bytecode instructions as many
+times under runners/python_op_counter.py. With --load, that many busy
+processes compete for the CPU during the second half of the repeats, the
+way neighbouring jobs do on a shared benchmark host.
+
+Per size it reports the spread of wall time (min, max, coefficient of
+variation) against the distinct instruction counts, which must be exactly
+one, and instructions per millisecond of the quietest run (what
+OPERATIONS_PER_MS approximates). Exits non-zero if any count differs
+between repeats.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.performance_benchmarker import PerformanceBenchmarker, OPERATIONS_PER_MS
+from services.test_case_generators import make_test_case
+
+SUBMISSION = (
+    "lines = test_input.split('\\n')\n"
+    "a = [int(x) for x in lines[1].split()] if len(lines) > 1 else []\n"
+    "for i in range(1, len(a)):\n"
+    "    key = a[i]\n"
+    "    j = i - 1\n"
+    "    while j >= 0 and a[j] > key:\n"
+    "        a[j + 1] = a[j]\n"
+    "        j -= 1\n"
+    "    a[j + 1] = key\n"
+    "result = a[:3]\n"
+)
+
+
+def _spin():
+    while True:
+        pass
+
+
+async def _measure(sizes, repeat: int, load: int) -> dict:
+    benchmarker = PerformanceBenchmarker()
+    report = {}
+    spinners = []
+    try:
+        for size in sizes:
+            test_case = make_test_case("int_array", size, seed=0)
+            times, counts = [], []
+            for run in range(repeat):
+                if load and run == repeat // 2:
+                    spinners = [multiprocessing.Process(target=_spin, daemon=True) for _ in range(load)]
+                    for spinner in spinners:
+                        spinner.start()
+                timed = await benchmarker.run_isolated(SUBMISSION, test_case, "python")
+                counted = await benchmarker.count_operations(SUBMISSION, test_case)
+                if not timed["passed"] or "instructions" not in counted:
+                    raise RuntimeError(f"n={size}: {timed.get('error') or counted.get('error')}")
+                times.append(timed["execution_time"])
+                counts.append(counted["instructions"])
+            for spinner in spinners:
+                spinner.terminate()
+            spinners = []
+            report[size] = {
+                "time_min_ms": round(min(times), 2),
+                "time_max_ms": round(max(times), 2),
+                "time_cv": round(statistics.pstdev(times) / statistics.mean(times), 3),
+                "instructions": counts[0],
+                "distinct_instruction_counts": len(set(counts)),
+                "instructions_per_ms": round(counts[0] / min(times))
+            }
+    finally:
+        for spinner in spinners:
+            spinner.terminate()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the run-to-run spread of wall time and instruction counts")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 300, 1000], help="Input sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per size")
+    parser.add_argument("--load", type=int, default=2, help="Busy processes during the second half of the runs")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(_measure(args.sizes, args.repeat, args.load))
+    reproducible = all(row["distinct_instruction_counts"] == 1 for row in report.values())
+
+    if args.json:
+        print(json.dumps({"sizes": report, "operations_per_ms": OPERATIONS_PER_MS,
+                          "reproducible": reproducible}, indent=2))
+    else:
+        print(f"{'n':>6} {'min ms':>9} {'max ms':>9} {'time cv':>8} {'instructions':>13} {'distinct':>9} {'instr/ms':>9}")
+        for size, row in report.items():
+            print(f"{size:>6} {row['time_min_ms']:>9.2f} {row['time_max_ms']:>9.2f} {row['time_cv']:>8.3f} "
+                  f"{row['instructions']:>13} {row['distinct_instruction_counts']:>9} {row['instructions_per_ms']:>9}")
+        print(f"\nscored as {OPERATIONS_PER_MS} instructions per ms; counts reproducible: {reproducible}")
+    sys.exit(0 if reproducible else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Serialization cost and bytes on the wire for a large visualization response
+
+    python benchmark_serialization.py [--functions 150] [--repeat 20] [--json]
+
+Builds a real flowchart of a generated file with many functions and a real
+execution trace (first window plus a 5000-step page), then measures:
+
+    encoders   serialize time and raw/gzip/brotli bytes per encoder:
+               jsonable_encoder + stdlib json, pydantic's JSON serializer,
+               orjson over a plain dict, FastResponse's JSON encoding and
+               MessagePack when installed
+    endpoint   the whole response through a FastAPI app: encoded with
+               jsonable_encoder into a JSONResponse (how FastAPI releases
+               before the pydantic-v2 serializer rendered every response),
+               returned as a model with response_model (validated against it
+               first), and returned as a FastResponse
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, Field
+from pydantic_core import to_json
+
+from models.algorithm_models import VisualizationData
+from services.trace_store import MAX_WINDOW
+from services.visualization_generator import VisualizationGenerator
+from utils import serialization
+from utils.serialization import FastResponse
+
+TRACED_SOURCE = (
+    "def bubble(a):\n"
+    "    n = len(a)\n"
+    "    for i in range(n):\n"
+    "        for j in range(n - 1 - i):\n"
+    "            if a[j] > a[j + 1]:\n"
+    "                a[j], a[j + 1] = a[j + 1], a[j]\n"
+    "    return a\n"
+    "print(bubble(list(range(120, 0, -1))))\n"
+)
+
+
+class VisualizationPayload(BaseModel):
+    """Response model for the baseline endpoint"""
+    flowchart: VisualizationData = Field(..., description="Flowchart of the file")
+    trace: VisualizationData = Field(..., description="Execution trace with its first window")
+    trace_page: dict = Field(..., description="A further page of trace steps")
+
+
+def _flowchart_source(functions: int) -> str:
+    return "".join(
+        f"def f{i}(xs, k):\n"
+        f"    total = 0\n"
+        f"    for x in xs:\n"
+        f"        if x % k == {i % 7}:\n"
+        f"            total += x\n"
+        f"        elif x > k:\n"
+        f"            while x > k:\n"
+        f"                x //= 2\n"
+        f"        else:\n"
+        f"            continue\n"
+        f"    try:\n"
+        f"        return total // k\n"
+        f"    except ZeroDivisionError:\n"
+        f"        return 0\n\n"
+        for i in range(functions)
+    )
+
+
+async def _payload(functions: int) -> VisualizationPayload:
+    generator = VisualizationGenerator()
+    flowchart = await generator.create_flow_diagram(_flowchart_source(functions), "python")
+    trace = await generator.create_execution_trace(TRACED_SOURCE, "python")
+    page = await generator.get_trace_window(trace.data["trace_id"], 0, MAX_WINDOW)
+    return VisualizationPayload(flowchart=flowchart, trace=trace, trace_page=page)
+
+
+def _stdlib(content) -> bytes:
+    # What JSONResponse renders after FastAPI's jsonable_encoder
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _timed(func, content, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = func(content)
+        best = min(best, time.perf_counter() - started)
+    return body, round(best * 1000, 2)
+
+
+def _wire_sizes(body: bytes) -> dict:
+    sizes = {"raw": len(body), "gzip": len(gzip.compress(body, compresslevel=serialization.GZIP_LEVEL))}
+    if serialization.brotli is not None:
+        sizes["br"] = len(serialization.compress(body, "br"))
+    return sizes
+
+
+def _encoders(payload: VisualizationPayload, repeat: int) -> dict:
+    plain = payload.model_dump()
+    encoders = {"stdlib": _stdlib, "pydantic": to_json, "orjson": lambda _: serialization.dumps_json(plain),
+                "fast": serialization.dumps_json}
+    if serialization.msgpack is not None:
+        encoders["msgpack"] = serialization.dumps_msgpack
+    report = {}
+    for name, encoder in encoders.items():
+        body, ms = _timed(encoder, payload, repeat)
+        report[name] = {"serialize_ms": ms, **_wire_sizes(body)}
+    return report
+
+
+async def _request(app: FastAPI, path: str, accept_encoding: str, accept: str = "application/json") -> dict:
+    """One GET through the ASGI app; returns its timing, status and body size"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "server": ("bench", 80), "client": ("bench", 1),
+        "headers": [(b"accept", accept.encode()), (b"accept-encoding", accept_encoding.encode())]
+    }
+    received = {"body": b"", "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            received["status"] = message["status"]
+            received["headers"] = message["headers"]
+        elif message["type"] == "http.response.body":
+            received["body"] += message.get("body", b"")
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    elapsed = time.perf_counter() - started
+    headers = dict(received["headers"])
+    return {"ms": elapsed * 1000, "status": received["status"], "bytes": len(received["body"]),
+            "encoding": headers.get(b"content-encoding", b"identity").decode()}
+
+
+async def _endpoints(payload: VisualizationPayload, repeat: int) -> dict:
+    app = FastAPI()
+
+    @app.get("/model", response_model=VisualizationPayload)
+    async def as_model():
+        return payload
+
+    @app.get("/fast", response_model=VisualizationPayload)
+    async def as_fast_response():
+        return FastResponse(payload)
+
+    @app.get("/encoder")
+    async def as_encoded_dict():
+        # The path FastAPI took for responses before its pydantic-v2 fast path
+        return JSONResponse(jsonable_encoder(payload))
+
+    report = {}
+    for name, path in (("jsonable_encoder", "/encoder"), ("response_model", "/model"),
+                       ("fast_response", "/fast")):
+        for accept_encoding in ("identity", "gzip, br"):
+            runs = [await _request(app, path, accept_encoding) for _ in range(repeat)]
+            assert all(run["status"] == 200 for run in runs), runs[0]
+            report[f"{name} ({accept_encoding})"] = {
+                "request_ms": round(min(run["ms"] for run in runs), 2),
+                "bytes": runs[-1]["bytes"],
+                "encoding": runs[-1]["encoding"]
+            }
+    return report
+
+
+async def _run(functions: int, repeat: int) -> dict:
+    payload = await _payload(functions)
+    return {
+        "flowchart_nodes": len(payload.flowchart.data["nodes"]),
+        "trace_steps": len(payload.trace_page["steps"]),
+        "optional": {"orjson": serialization.orjson is not None, "msgpack": serialization.msgpack is not None,
+                     "brotli": serialization.brotli is not None},
+        "encoders": _encoders(payload, repeat),
+        "endpoint": await _endpoints(payload, repeat)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure response serialization time and size")
+    parser.add_argument("--functions", type=int, default=150, help="Functions in the flowcharted file")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per measurement (best is reported)")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(_run(args.functions, args.repeat))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['flowchart_nodes']} flowchart nodes, {report['trace_steps']} trace steps in the page")
+    print(f"{'encoder':<10} {'ms':>8} {'raw':>10} {'gzip':>10} {'br':>10}")
+    for name, row in report["encoders"].items():
+        print(f"{name:<10} {row['serialize_ms']:>8.2f} {row['raw']:>10} {row['gzip']:>10} {row.get('br', '-'):>10}")
+    print(f"\n{'endpoint':<34} {'ms':>8} {'bytes':>10}  encoding")
+    for name, row in report["endpoint"].items():
+        print(f"{name:<34} {row['request_ms']:>8.2f} {row['bytes']:>10}  {row['encoding']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Import-time and time-to-ready benchmark for the AI engine
+
+    python benchmark_startup.py [--runs 5] [--json]
+
+Every measurement runs in a fresh interpreter:
+
+    eager      the old startup path: client libraries and every Tree-sitter
+               grammar loaded up front, services initialized one by one
+    lazy       import main, then initialize all services concurrently;
+               parsers are built on first use
+    preloaded  a worker forked from a master that ran main.preload()
+               (what gunicorn.conf.py does); only its own startup is timed
+
+Services that cannot start on this host (missing package or API key) are
+reported with their error; the time they took still counts.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ("eager", "lazy", "preloaded")
+EAGER_MODULES = ("openai", "anthropic")
+
+
+async def _initialize_sequentially(services):
+    results = {}
+    for name, service in services.items():
+        started = time.perf_counter()
+        try:
+            await service.initialize()
+            results[name] = {"ready_ms": round((time.perf_counter() - started) * 1000, 1)}
+        except Exception as e:
+            results[name] = {"ready_ms": round((time.perf_counter() - started) * 1000, 1), "error": str(e)}
+    return results
+
+
+def _child(mode: str) -> dict:
+    """One startup in this interpreter; returns import and ready times (ms)"""
+    started = time.perf_counter()
+    if mode == "eager":
+        import importlib
+        for module in EAGER_MODULES:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                pass
+        from utils.parsers import SUPPORTED_LANGUAGES, get_parser
+        for language in SUPPORTED_LANGUAGES:
+            get_parser(language)
+        import main
+        imported = time.perf_counter()
+        services = asyncio.run(_initialize_sequentially(main.STARTUP_SERVICES))
+        return _result(started, imported, services)
+
+    import main
+    if mode == "lazy":
+        imported = time.perf_counter()
+        services = asyncio.run(main.initialize_services())
+        result = _result(started, imported, services)
+        parse_started = time.perf_counter()
+        main.get_parser("python").parse(b"x = 1\n")
+        result["first_parse_ms"] = round((time.perf_counter() - parse_started) * 1000, 1)
+        return result
+
+    main.preload()
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_end)
+        worker_started = time.perf_counter()
+        services = asyncio.run(main.initialize_services())
+        with os.fdopen(write_end, "w") as pipe:
+            pipe.write(json.dumps(_result(worker_started, worker_started, services)))
+        os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end) as pipe:
+        result = json.loads(pipe.read())
+    os.waitpid(pid, 0)
+    return result
+
+
+def _result(started: float, imported: float, services: dict) -> dict:
+    return {
+        "import_ms": round((imported - started) * 1000, 1),
+        "ready_ms": round((time.perf_counter() - started) * 1000, 1),
+        "services": services
+    }
+
+
+def _measure(mode: str, logs_dir: str) -> dict:
+    env = {
+        **os.environ,
+        "LOGS_DIR": logs_dir,
+        # Client construction only needs a key to be set; nothing is sent
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "benchmark"),
+        "ANTHROPIC_API_KEY": os.getenv("ANTHROPIC_API_KEY", "benchmark")
+    }
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", mode, "--output", output.name],
+            cwd=os.path.dirname(os.path.abspath(__file__)), env=env, check=True,
+            stdout=subprocess.DEVNULL
+        )
+        return json.load(output)
+
+
+def _summary(runs: list) -> dict:
+    summary = {
+        "import_ms": statistics.median(run["import_ms"] for run in runs),
+        "ready_ms": statistics.median(run["ready_ms"] for run in runs),
+        "services": {
+            name: {
+                "ready_ms": statistics.median(run["services"][name]["ready_ms"] for run in runs),
+                **({"error": runs[-1]["services"][name]["error"]} if "error" in runs[-1]["services"][name] else {})
+            }
+            for name in runs[-1]["services"]
+        }
+    }
+    if "first_parse_ms" in runs[-1]:
+        summary["first_parse_ms"] = statistics.median(run["first_parse_ms"] for run in runs)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and time to ready of the AI engine")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per mode (median is reported)")
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated subset of: " + ", ".join(MODES))
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = _child(args.child)
+        with open(args.output, "w") as f:
+            json.dump(result, f)
+        return
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    report = {}
+    with tempfile.TemporaryDirectory(prefix="algomaster-startup-") as logs_dir:
+        for mode in modes:
+            # One unmeasured start builds the on-disk indexes and warms the page cache
+            _measure(mode, logs_dir)
+            report[mode] = _summary([_measure(mode, logs_dir) for _ in range(args.runs)])
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'mode':<10} {'import ms':>10} {'ready ms':>10}")
+    for mode, summary in report.items():
+        print(f"{mode:<10} {summary['import_ms']:>10.1f} {summary['ready_ms']:>10.1f}")
+    for mode, summary in report.items():
+        failed = {name: service["error"] for name, service in summary["services"].items() if "error" in service}
+        for name, error in failed.items():
+            print(f"  {mode}: {name} failed to initialize: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Production server: gunicorn master with uvicorn workers
+
+    gunicorn -c gunicorn.conf.py main:app
+
+The app is imported once in the master (preload_app) and main.preload()
+warms client libraries, Tree-sitter parsers and the corpus indexes before
+the workers fork, so every worker starts from the master's copy-on-write
+memory instead of repeating that work.
+"""
+
+import os
+
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('API_PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
+
+
+def on_starting(server):
+    # preload_app has already imported main in this process
+    from main import preload
+    preload()
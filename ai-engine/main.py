@@ -3,23 +3,42 @@ AlgoMaster-Studio-AI AI Engine
 Revolutionary AI-powered algorithm learning platform
 """
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, status, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 import os
 import asyncio
-import uvicorn
+import importlib
+import json
+import time
 from datetime import datetime
 
 from services.code_analyzer import CodeAnalyzer
 from services.ai_explainer import AIExplainer
 from services.performance_benchmarker import PerformanceBenchmarker
 from services.visualization_generator import VisualizationGenerator
-from models.algorithm_models import AlgorithmRequest, AnalysisResponse
+from services.differential_tester import DifferentialTester
+from services.algorithm_library import AlgorithmLibrary
+from services.analysis_warehouse import AnalysisWarehouse, WAREHOUSE_OPTIMIZATION_LEVEL
+from services.similarity_index import SimilarityIndex
+from services.health_monitor import HealthMonitor
+from services.job_queue import JobStore, JobScheduler, TERMINAL as JOB_TERMINAL_STATES
+from services.analysis_session import AnalysisSessionManager
+from services.live_analysis import LiveAnalysisChannel
+from models.algorithm_models import (
+    AlgorithmRequest, AnalysisResponse, StressTestRequest, DifferentialTestRequest, SimilarityRequest,
+    AnalysisSessionRequest
+)
 from utils.security import verify_token
-from utils.logger import setup_logger
+from utils.parsers import SUPPORTED_LANGUAGES, get_parser
+from utils.executors import shutdown_executors
+from utils.llm import set_llm_caller, capture_llm_failures, DEFAULT_PROVIDER
+from utils.circuit_breaker import circuit_breaker
+from utils.serialization import FastResponse
+from utils.logger import setup_logger, log_startup_info
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -27,7 +46,8 @@ app = FastAPI(
     description="Revolutionary AI-powered algorithm analysis and learning platform",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastResponse
 )
 
 # Configure CORS
@@ -47,16 +67,118 @@ logger = setup_logger("ai-engine")
 code_analyzer = CodeAnalyzer()
 ai_explainer = AIExplainer()
 performance_benchmarker = PerformanceBenchmarker()
-visualization_generator = VisualizationGenerator()
+visualization_generator = VisualizationGenerator(performance_benchmarker)
+differential_tester = DifferentialTester(performance_benchmarker)
+algorithm_library = AlgorithmLibrary()
+analysis_warehouse = AnalysisWarehouse()
+similarity_index = SimilarityIndex()
+analysis_sessions = AnalysisSessionManager(ai_explainer, performance_benchmarker)
+job_store = JobStore()
+job_scheduler = JobScheduler(job_store, {
+    "analyze": lambda payload: run_analysis(AlgorithmRequest(**payload))
+})
+health_monitor = HealthMonitor(warm_checks={
+    "algorithm_library": lambda: bool(algorithm_library.documents),
+    "similarity_index": lambda: similarity_index.corpus is not None
+})
+
+# Services with an async initialize(), started concurrently
+STARTUP_SERVICES = {
+    "code_analyzer": code_analyzer,
+    "ai_explainer": ai_explainer,
+    "performance_benchmarker": performance_benchmarker,
+    "visualization_generator": visualization_generator,
+    "algorithm_library": algorithm_library,
+    "similarity_index": similarity_index
+}
+
+MAX_JOB_WAIT = 60       # longest long-poll on GET /jobs/{job_id}, seconds
+LLM_DEADLINE = float(os.getenv("ANALYSIS_LLM_DEADLINE_SECONDS", "25"))
+SUGGESTIONS_DEADLINE = float(os.getenv("ANALYSIS_SUGGESTIONS_DEADLINE_SECONDS", "40"))
+# LLM-dependent sections must be done this many seconds after an analysis starts;
+# suggestions start after the complexity analysis, so they get longer
+LLM_SECTION_DEADLINES = {
+    "complexity_analysis": LLM_DEADLINE,
+    "ai_explanation": LLM_DEADLINE,
+    "optimization_suggestions": SUGGESTIONS_DEADLINE
+}
+JOB_EVENT_INTERVAL = 15  # seconds between keep-alive comments on a job event stream
+
+# Imported by the services on initialize(); preloading imports them once in the master
+PRELOAD_MODULES = ("openai", "anthropic")
+
+async def initialize_services() -> Dict[str, Dict[str, Any]]:
+    """Initialize every startup service concurrently; time to ready (ms) or the error per service"""
+    async def start(name: str, service) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            await service.initialize()
+            return {"ready_ms": round((time.perf_counter() - started) * 1000, 1)}
+        except Exception as e:
+            return {"ready_ms": round((time.perf_counter() - started) * 1000, 1), "error": str(e)}
+    
+    results = await asyncio.gather(*(start(name, service) for name, service in STARTUP_SERVICES.items()))
+    return dict(zip(STARTUP_SERVICES, results))
+
+def preload():
+    """
+    Warm state shared with forked workers (gunicorn preload_app, see gunicorn.conf.py)
+    
+    Runs once in the master: imports the client libraries, builds every
+    Tree-sitter parser, and brings the on-disk corpus indexes up to date so
+    workers only map them instead of each rebuilding them.
+    """
+    started = time.perf_counter()
+    for module in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            logger.warning(f"⚠️ Not preloading {module}: {e}")
+    for language in SUPPORTED_LANGUAGES:
+        get_parser(language)
+    
+    async def warm_indexes():
+        # Throwaway instances: the module-level services are initialized in each worker
+        await asyncio.gather(AlgorithmLibrary().initialize(), SimilarityIndex().initialize())
+    
+    asyncio.run(warm_indexes())
+    logger.info(f"📦 Preloaded modules, parsers and indexes in {(time.perf_counter() - started) * 1000:.0f}ms")
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize AI engine services on startup"""
-    logger.info("🚀 AlgoMaster-Studio-AI AI Engine starting up...")
-    await code_analyzer.initialize()
-    await ai_explainer.initialize()
+    log_startup_info()
+    health_monitor.start()
+    started = time.perf_counter()
+    results = await initialize_services()
+    health_monitor.mark_initialized(results)
+    failed = {name: result["error"] for name, result in results.items() if "error" in result}
+    if failed:
+        raise RuntimeError(f"Services failed to initialize: {failed}")
+    job_scheduler.start()
+    timings = ", ".join(f"{name} {result['ready_ms']:.0f}ms" for name, result in results.items())
+    logger.info(f"⏱️ Services initialized in {(time.perf_counter() - started) * 1000:.0f}ms ({timings})")
     logger.info("✅ AI Engine ready for revolutionary algorithm learning!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Hand unfinished jobs back to the queue, stop background sampling and CPU workers"""
+    await job_scheduler.stop()
+    await health_monitor.stop()
+    shutdown_executors()
+
+@app.get("/health/live")
+async def health_live():
+    """Liveness probe: the event loop is still turning"""
+    alive, report = health_monitor.liveness()
+    return JSONResponse(report, status_code=status.HTTP_200_OK if alive else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness probe: 503 while starting, overloaded or with cold caches, so load balancers shed traffic"""
+    ready, report = health_monitor.readiness()
+    return JSONResponse(report, status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE)
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -74,6 +196,86 @@ async def root():
         ]
     }
 
+async def run_analysis(request: AlgorithmRequest) -> AnalysisResponse:
+    """
+    Full analysis of one submission (shared by the synchronous endpoint and analysis jobs)
+    
+    An LLM-dependent section whose provider circuit is open, whose LLM request
+    fails or which misses its deadline is served from its non-LLM part and
+    listed in skipped_sections, so the rest of the analysis still returns.
+    """
+    # Bundled corpus solutions are usually precomputed; only missing parts run live
+    stored = analysis_warehouse.lookup(request.code, request.language)
+    if (request.test_cases or request.optimization_level != WAREHOUSE_OPTIMIZATION_LEVEL
+            or request.profile or request.memory_profile or request.score_metric != "time"):
+        stored.pop("benchmark_results", None)
+    if stored:
+        logger.info(f"🏭 Serving {len(stored)} precomputed components for: {request.algorithm_name}")
+    
+    started = time.monotonic()
+    skipped: Dict[str, str] = {}
+    
+    async def component(name: str, compute, fallback=None):
+        if name in stored:
+            return stored[name]
+        if fallback is None:
+            return await compute()
+        if not circuit_breaker(DEFAULT_PROVIDER).available():
+            skipped[name] = f"{DEFAULT_PROVIDER} circuit open"
+            return await fallback()
+        with capture_llm_failures() as failures:
+            try:
+                result = await asyncio.wait_for(compute(), max(0.0, started + LLM_SECTION_DEADLINES[name] - time.monotonic()))
+            except asyncio.TimeoutError:
+                skipped[name] = f"deadline of {LLM_SECTION_DEADLINES[name]:.0f}s exceeded"
+                return await fallback()
+        # The services turn LLM errors into error or empty results; the captured failure tells them apart
+        if failures or (isinstance(result, dict) and "error" in result):
+            skipped[name] = str(failures[0]) if failures else result["error"]
+            return await fallback()
+        return result
+    
+    # Comprehensive AI analysis
+    analysis_tasks = await asyncio.gather(
+        component("complexity_analysis", lambda: code_analyzer.analyze_complexity(request.code, request.language),
+                  lambda: code_analyzer.static_complexity(request.code, request.language)),
+        component("quality_assessment", lambda: code_analyzer.assess_quality(request.code, request.language)),
+        component("ai_explanation", lambda: ai_explainer.generate_explanation(request.code, request.language),
+                  lambda: ai_explainer.static_explanation(request.code, request.language)),
+        component("benchmark_results", lambda: performance_benchmarker.benchmark_algorithm(
+            request.code, request.test_cases, request.language, request.optimization_level,
+            request.profile, request.score_metric, request.memory_profile
+        )),
+        component("visualization", lambda: visualization_generator.create_flow_diagram(request.code, request.language))
+    )
+    
+    complexity_analysis, quality_assessment, ai_explanation, benchmark_results, visualization = analysis_tasks
+    
+    # Generate optimization suggestions
+    async def no_suggestions():
+        return []
+    
+    optimization_suggestions = await component("optimization_suggestions", lambda: ai_explainer.suggest_optimizations(
+        request.code, complexity_analysis, quality_assessment
+    ), no_suggestions)
+    
+    if skipped:
+        logger.warning(f"⚠️ Degraded analysis for {request.algorithm_name}, skipped: {skipped}")
+    
+    return AnalysisResponse(
+        algorithm_name=request.algorithm_name,
+        language=request.language,
+        complexity_analysis=complexity_analysis,
+        quality_assessment=quality_assessment,
+        ai_explanation=ai_explanation,
+        optimization_suggestions=optimization_suggestions,
+        benchmark_results=benchmark_results,
+        visualization=visualization,
+        analysis_timestamp=datetime.now().isoformat(),
+        degraded=bool(skipped),
+        skipped_sections=skipped
+    )
+
 @app.post("/analyze/algorithm", response_model=AnalysisResponse)
 async def analyze_algorithm(
     request: AlgorithmRequest,
@@ -88,51 +290,180 @@ async def analyze_algorithm(
     - Optimization suggestions
     - Visual explanations
     - Performance benchmarking
+    
+    Holds the connection for the whole analysis; POST /jobs/analyze returns at once instead.
     """
     try:
         # Verify authentication
         user_id = await verify_token(credentials.credentials)
+        set_llm_caller(user_id)
         
         logger.info(f"🔍 Analyzing algorithm: {request.algorithm_name} for user: {user_id}")
         
-        # Comprehensive AI analysis
-        analysis_tasks = await asyncio.gather(
-            code_analyzer.analyze_complexity(request.code, request.language),
-            code_analyzer.assess_quality(request.code, request.language),
-            ai_explainer.generate_explanation(request.code, request.language),
-            performance_benchmarker.benchmark_algorithm(request.code, request.test_cases),
-            visualization_generator.create_flow_diagram(request.code, request.language)
+        response = await run_analysis(request)
+        
+        logger.info(f"✅ Analysis complete for: {request.algorithm_name}")
+        # Built from validated models just now; response_model stays for the schema only
+        return FastResponse(response)
+        
+    except Exception as e:
+        logger.error(f"❌ Analysis failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"AI analysis failed: {str(e)}"
         )
+
+@app.post("/analyze/session")
+async def analyze_session(
+    request: AnalysisSessionRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """
+    Incremental analysis of an edited buffer
+    
+    Send the full code after each edit with the session_id from the first
+    response; only functions and stages the edit touched are recomputed.
+    """
+    try:
+        user_id = await verify_token(credentials.credentials)
+        set_llm_caller(user_id)
         
-        complexity_analysis, quality_assessment, ai_explanation, benchmark_results, visualization = analysis_tasks
+        return FastResponse(await analysis_sessions.analyze(
+            user_id, request.code, request.language, session_id=request.session_id,
+            stages=request.stages, test_cases=request.test_cases,
+            optimization_level=request.optimization_level
+        ))
         
-        # Generate optimization suggestions
-        optimization_suggestions = await ai_explainer.suggest_optimizations(
-            request.code, complexity_analysis, quality_assessment
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Session analysis failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Session analysis failed: {str(e)}"
         )
+
+@app.delete("/analyze/session/{session_id}")
+async def close_analysis_session(
+    session_id: str,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Drop a session's tree and cached stage results"""
+    user_id = await verify_token(credentials.credentials)
+    if not analysis_sessions.close(user_id, session_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+    return {"closed": session_id}
+
+@app.websocket("/ws/analyze")
+async def live_analysis(websocket: WebSocket, token: str = ""):
+    """
+    Analyze-as-you-type: stream edits, receive static results at once and
+    expensive stages once the editor is idle (see services/live_analysis.py)
+    
+    Browsers cannot set headers on a WebSocket, so the token is a query parameter.
+    """
+    try:
+        user_id = await verify_token(token)
+    except Exception:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    set_llm_caller(user_id)  # inherited by the channel's analysis tasks
+    channel = LiveAnalysisChannel(analysis_sessions, user_id, websocket.send_json)
+    logger.info(f"🔌 Live analysis connected for user: {user_id}")
+    try:
+        await channel.open()
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                message = json.loads(raw)
+                if not isinstance(message, dict):
+                    raise ValueError("messages must be JSON objects")
+                await channel.handle(message)
+            except (ValueError, TypeError) as e:
+                await channel.send({"type": "error", "error": str(e)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await channel.close()
+
+@app.post("/jobs/analyze", status_code=status.HTTP_202_ACCEPTED)
+async def submit_analysis_job(
+    request: AlgorithmRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Queue an analysis and return its job id at once; a user's identical submissions share one job"""
+    try:
+        user_id = await verify_token(credentials.credentials)
         
-        response = AnalysisResponse(
-            algorithm_name=request.algorithm_name,
-            language=request.language,
-            complexity_analysis=complexity_analysis,
-            quality_assessment=quality_assessment,
-            ai_explanation=ai_explanation,
-            optimization_suggestions=optimization_suggestions,
-            benchmark_results=benchmark_results,
-            visualization=visualization,
-            analysis_timestamp=datetime.now().isoformat()
+        job, deduplicated = job_scheduler.submit("analyze", request.model_dump(), user_id)
+        logger.info(
+            f"🗂️ Analysis job {job['job_id']} {'reused' if deduplicated else 'queued'} "
+            f"for: {request.algorithm_name} (user: {user_id})"
         )
         
-        logger.info(f"✅ Analysis complete for: {request.algorithm_name}")
-        return response
+        return {
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "deduplicated": deduplicated,
+            "status_url": f"/jobs/{job['job_id']}",
+            "events_url": f"/jobs/{job['job_id']}/events",
+            "submitted_at": datetime.now().isoformat()
+        }
         
     except Exception as e:
-        logger.error(f"❌ Analysis failed: {str(e)}")
+        logger.error(f"❌ Job submission failed: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"AI analysis failed: {str(e)}"
+            detail=f"Job submission failed: {str(e)}"
         )
 
+@app.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    wait: float = 0,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Job status and, once it succeeded, its result; wait > 0 long-polls up to that many seconds"""
+    user_id = await verify_token(credentials.credentials)
+    # Someone else's job answers like a missing one
+    if not job_store.owned_by(job_id, user_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown job: {job_id}")
+    job = await job_scheduler.wait(job_id, min(max(wait, 0), MAX_JOB_WAIT))
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown job: {job_id}")
+    return FastResponse(job)
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(
+    job_id: str,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Server-sent events: the job's status on every change, ending with the finished job"""
+    user_id = await verify_token(credentials.credentials)
+    if not job_store.owned_by(job_id, user_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown job: {job_id}")
+    
+    async def stream():
+        last_status = None
+        while True:
+            job = await job_scheduler.wait(job_id, JOB_EVENT_INTERVAL, changed_from=last_status)
+            if job is None:
+                return
+            finished = job["status"] in JOB_TERMINAL_STATES
+            if finished or job["status"] != last_status:
+                event = {**job} if finished else {key: value for key, value in job.items() if key != "result"}
+                yield f"event: {job['status']}\ndata: {json.dumps(event)}\n\n"
+                last_status = job["status"]
+            else:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": waiting\n\n"
+            if finished:
+                return
+    
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
 @app.post("/generate/solution")
 async def generate_solution(
     problem_description: str,
@@ -143,6 +474,7 @@ async def generate_solution(
     """Generate AI-powered algorithm solutions"""
     try:
         user_id = await verify_token(credentials.credentials)
+        set_llm_caller(user_id)
         
         logger.info(f"🎯 Generating solution in {target_language} for user: {user_id}")
         
@@ -165,11 +497,105 @@ async def generate_solution(
             detail=f"Solution generation failed: {str(e)}"
         )
 
+@app.post("/benchmark/stress")
+async def stress_benchmark(
+    request: StressTestRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Benchmark an algorithm on reproducible generated inputs of growing size"""
+    try:
+        user_id = await verify_token(credentials.credentials)
+        
+        logger.info(f"🏋️ Stress benchmark in {request.language} for user: {user_id}")
+        
+        results = await performance_benchmarker.stress_test(
+            request.code, request.language, request.generator, request.sizes,
+            request.seed, request.optimization_level, request.value_range
+        )
+        
+        return {
+            "stress_test": results,
+            "completed_at": datetime.now().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"❌ Stress benchmark failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Stress benchmark failed: {str(e)}"
+        )
+
+@app.post("/benchmark/differential")
+async def differential_benchmark(
+    request: DifferentialTestRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Compare a submission's output and speed against a reference solution"""
+    try:
+        user_id = await verify_token(credentials.credentials)
+        
+        logger.info(f"⚖️ Differential test in {request.language} for user: {user_id}")
+        
+        results = await differential_tester.run(
+            request.code, request.language,
+            reference_code=request.reference_code,
+            reference_language=request.reference_language,
+            reference_path=request.reference_path,
+            reference_entry=request.reference_entry,
+            generator=request.generator,
+            sizes=request.sizes,
+            seed=request.seed,
+            repeats=request.repeats,
+            optimization_level=request.optimization_level,
+            value_range=request.value_range
+        )
+        
+        return {
+            "differential_test": results,
+            "completed_at": datetime.now().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"❌ Differential test failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Differential test failed: {str(e)}"
+        )
+
+@app.post("/similar")
+async def find_similar(
+    request: SimilarityRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Nearest corpus solutions and earlier submissions by token-fingerprint similarity"""
+    try:
+        user_id = await verify_token(credentials.credentials)
+        
+        logger.info(f"🧬 Similarity search in {request.language} for user: {user_id}")
+        
+        results = await similarity_index.search_and_record(
+            request.code, request.language, user_id,
+            k=request.k, min_similarity=request.min_similarity, record=request.record
+        )
+        
+        return {
+            "similar": results,
+            "searched_at": datetime.now().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"❌ Similarity search failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Similarity search failed: {str(e)}"
+        )
+
 @app.post("/visualize/algorithm")
 async def create_visualization(
     code: str,
     language: str,
     visualization_type: str = "flowchart",
+    test_input: str = "",
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     """Create interactive algorithm visualizations"""
@@ -181,18 +607,22 @@ async def create_visualization(
         if visualization_type == "flowchart":
             visualization = await visualization_generator.create_flow_diagram(code, language)
         elif visualization_type == "execution":
-            visualization = await visualization_generator.create_execution_trace(code, language)
+            visualization = await visualization_generator.create_execution_trace(code, language, test_input)
         elif visualization_type == "complexity":
             visualization = await visualization_generator.create_complexity_graph(code, language)
+        elif visualization_type in ("tree_traversal", "sorting_animation", "graph_algorithm", "dynamic_programming"):
+            visualization = await visualization_generator.create_custom_visualization(
+                code, language, visualization_type, {"test_input": test_input}
+            )
         else:
             raise ValueError(f"Unsupported visualization type: {visualization_type}")
         
-        return {
+        return FastResponse({
             "visualization_type": visualization_type,
             "language": language,
             "visualization": visualization,
             "created_at": datetime.now().isoformat()
-        }
+        })
         
     except Exception as e:
         logger.error(f"❌ Visualization creation failed: {str(e)}")
@@ -201,14 +631,77 @@ async def create_visualization(
             detail=f"Visualization creation failed: {str(e)}"
         )
 
+@app.get("/visualize/trace/{trace_id}")
+async def get_trace_window(
+    trace_id: str,
+    start: int = 0,
+    count: int = 200,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Fetch a window of steps from a stored execution trace"""
+    try:
+        await verify_token(credentials.credentials)
+        return FastResponse(await visualization_generator.get_trace_window(trace_id, start, count))
+        
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Trace not found: {trace_id}")
+    except Exception as e:
+        logger.error(f"❌ Trace window failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Trace window failed: {str(e)}"
+        )
+
+@app.get("/visualize/trace/{trace_id}/seek")
+async def seek_trace(
+    trace_id: str,
+    step: int,
+    breakpoints: Optional[str] = None,
+    direction: str = "forward",
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Jump to a step, or to the next/previous hit of comma-separated breakpoint lines"""
+    try:
+        await verify_token(credentials.credentials)
+        
+        lines = [int(line) for line in breakpoints.split(",") if line.strip()] if breakpoints else None
+        state = await visualization_generator.seek_trace(trace_id, step, lines, direction)
+        
+        return FastResponse({
+            "trace_id": trace_id,
+            "found": state is not None,
+            "state": state
+        })
+        
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Trace not found: {trace_id}")
+    except Exception as e:
+        logger.error(f"❌ Trace seek failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Trace seek failed: {str(e)}"
+        )
+
 @app.get("/algorithms/library")
-async def get_algorithm_library():
-    """Get comprehensive algorithm library with AI insights"""
+async def get_algorithm_library(
+    q: str = "",
+    category: Optional[str] = None,
+    language: Optional[str] = None,
+    complexity: Optional[str] = None,
+    company: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 20
+):
+    """Search and browse the bundled algorithm solutions"""
     try:
-        library = await code_analyzer.get_algorithm_library()
+        await algorithm_library.refresh()
+        results = algorithm_library.search(q, category, language, complexity, company, page, page_size)
+        facets = algorithm_library.facets()
         return {
-            "total_algorithms": len(library),
-            "categories": library,
+            "total_algorithms": len(algorithm_library.documents),
+            "categories": facets["category"],
+            "facets": facets,
+            **results,
             "ai_recommendations": await ai_explainer.get_learning_recommendations(),
             "fetched_at": datetime.now().isoformat()
         }
@@ -220,6 +713,8 @@ async def get_algorithm_library():
         )
 
 if __name__ == "__main__":
+    import uvicorn
+    
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
@@ -3,9 +3,12 @@ Pydantic models for AlgoMaster-Studio-AI AI Engine
 """
 
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Literal, Optional
 from datetime import datetime
 
+# Build profiles of services/artifact_cache.BUILD_PROFILES
+OptimizationLevel = Literal["O0", "O2"]
+
 class AlgorithmRequest(BaseModel):
     """Request model for algorithm analysis"""
     algorithm_name: str = Field(..., description="Name of the algorithm")
@@ -13,6 +16,10 @@ class AlgorithmRequest(BaseModel):
     language: str = Field(..., description="Programming language (python, cpp, java, javascript)")
     test_cases: Optional[List[Dict[str, Any]]] = Field(default=[], description="Test cases for benchmarking")
     analysis_type: str = Field(default="comprehensive", description="Type of analysis requested")
+    optimization_level: OptimizationLevel = Field(default="O2", description="Build profile for compiled languages (O0, O2)")
+    profile: bool = Field(default=False, description="Attach a line-level profile of the slowest test case to benchmark_details (Python only)")
+    score_metric: str = Field(default="time", description="Speed measure for performance_score: time (wall clock) or operations (bytecode instructions, Python only)")
+    memory_profile: bool = Field(default=False, description="Attach a per-line memory profile of the test case with the highest peak memory to benchmark_details (Python only)")
 
 class ComplexityAnalysis(BaseModel):
     """Complexity analysis results"""
@@ -51,11 +58,60 @@ class BenchmarkResults(BaseModel):
     """Performance benchmark results"""
     execution_time: float = Field(..., description="Average execution time (ms)")
     memory_usage: float = Field(..., description="Peak memory usage (MB)")
+    peak_memory_bytes: int = Field(default=0, description="Peak memory of the measured run (bytes)")
+    memory_method: Optional[str] = Field(default=None, description="How memory was measured (cgroup, rusage, tracemalloc, ...)")
     test_cases_passed: int = Field(..., description="Number of test cases passed")
     total_test_cases: int = Field(..., description="Total number of test cases")
     performance_score: float = Field(..., description="Performance score (0-10)")
+    operation_count: Optional[float] = Field(default=None, description="Average bytecode instructions executed per test case (operations metric, Python only)")
+    score_metric: str = Field(default="time", description="Speed measure performance_score was computed from (time, operations)")
+    compile_time: float = Field(default=0.0, description="Compilation time (ms), not included in execution_time")
+    optimization_level: Optional[str] = Field(default=None, description="Build profile for compiled languages (O0, O2)")
+    artifact_cache_hit: bool = Field(default=False, description="Whether the compiled artifact came from cache")
     benchmark_details: List[Dict[str, Any]] = Field(..., description="Detailed benchmark results")
 
+class StressTestRequest(BaseModel):
+    """Request for a large-input stress benchmark"""
+    code: str = Field(..., description="Algorithm code to stress test")
+    language: str = Field(default="python", description="Programming language (python, cpp, java, javascript)")
+    generator: Optional[str] = Field(default=None, description="Input generator (int_array, sorted_array, string, matrix, graph, tree); detected when omitted")
+    sizes: Optional[List[int]] = Field(default=None, description="Input sizes to run, up to 10^6")
+    seed: int = Field(default=0, description="Generator seed; identical seeds reproduce identical inputs")
+    optimization_level: OptimizationLevel = Field(default="O2", description="Build profile for compiled languages (O0, O2)")
+    value_range: Optional[List[int]] = Field(default=None, description="[low, high] for generated integers; defaults to the generator's range")
+
+class DifferentialTestRequest(BaseModel):
+    """Request to check a submission against a reference solution"""
+    code: str = Field(..., description="Submission code")
+    language: str = Field(default="python", description="Submission language (python, cpp, java, javascript)")
+    reference_code: Optional[str] = Field(default=None, description="Reference solution reading the same generated input format")
+    reference_language: Optional[str] = Field(default=None, description="Reference language; defaults to the submission language")
+    reference_path: Optional[str] = Field(default=None, description="Reference from the algorithms/ corpus, e.g. cpp/Arrays/MaxSumContiguousSubArray.cpp")
+    reference_entry: Optional[str] = Field(default=None, description="Solution method to call in a corpus reference; the last one by default")
+    generator: Optional[str] = Field(default=None, description="Input generator; detected from the submission when omitted")
+    sizes: Optional[List[int]] = Field(default=None, description="Input sizes to compare")
+    seed: int = Field(default=0, description="Generator seed")
+    repeats: int = Field(default=5, description="Timed runs per size for the significance test")
+    optimization_level: OptimizationLevel = Field(default="O2", description="Build profile for compiled languages (O0, O2)")
+    value_range: Optional[List[int]] = Field(default=None, description="[low, high] for generated integers; narrow it for references that overflow on the default range")
+
+class SimilarityRequest(BaseModel):
+    """Request for the corpus files and submissions most similar to some code"""
+    code: str = Field(..., description="Code to match")
+    language: str = Field(default="python", description="Programming language (python, cpp, java, javascript)")
+    k: int = Field(default=10, description="Matches to return per source (corpus, submissions), up to 100")
+    min_similarity: float = Field(default=0.3, description="Minimum estimated Jaccard similarity of token fingerprints (0-1)")
+    record: bool = Field(default=True, description="Add the code to the submission index after searching")
+
+class AnalysisSessionRequest(BaseModel):
+    """Next version of the code in an incremental analysis session"""
+    code: str = Field(..., description="Full current source of the buffer")
+    language: str = Field(default="python", description="Programming language (python, cpp, java, javascript)")
+    session_id: Optional[str] = Field(default=None, description="Session to continue; a new one is started when omitted")
+    stages: Optional[List[str]] = Field(default=None, description="Stages to run (metrics, cfg, explanation, benchmark); all by default")
+    test_cases: List[Dict[str, Any]] = Field(default=[], description="Test cases for the benchmark stage")
+    optimization_level: OptimizationLevel = Field(default="O2", description="Build profile for compiled languages (O0, O2)")
+
 class VisualizationData(BaseModel):
     """Algorithm visualization data"""
     visualization_type: str = Field(..., description="Type of visualization")
@@ -74,6 +130,8 @@ class AnalysisResponse(BaseModel):
     benchmark_results: BenchmarkResults = Field(..., description="Performance benchmark results")
     visualization: VisualizationData = Field(..., description="Algorithm visualization")
     analysis_timestamp: str = Field(..., description="Analysis timestamp")
+    degraded: bool = Field(default=False, description="Whether LLM-dependent sections were served without the LLM")
+    skipped_sections: Dict[str, str] = Field(default={}, description="LLM-dependent sections served without the LLM, and why")
 
 class LearningRecommendation(BaseModel):
     """AI-powered learning recommendation"""
@@ -0,0 +1,545 @@
+"""
+Child-process operation recorder for algorithm animations
+
+Usage: python python_animator.py <code-file> <options-json>
+
+The submission is rewritten before it runs so that its containers record
+what happens to them:
+
+    [..], [.. for ..], list(..)   -> tracked list
+    {..}, {.. for ..}, dict(..)   -> tracked dict
+    a[i], a[j] = a[j], a[i]       -> one swap operation
+    x = <container>               -> the container is labelled "x"
+    class Node: ...               -> instances record attribute writes, and
+                                     reads of val/key/value/data as visits
+
+A list whose elements are tracked lists is a table; operations on its rows
+are logged against the table as (row, column). Every operation appends one
+entry to each of a few typed arrays (op, container, index, index2, value),
+and the arrays are emitted base64-encoded with the narrowest integer type
+that fits, so a long run costs a few bytes per operation instead of a dict
+per step. Like python_runner.py this file is launched under utils.sandbox
+and must stay import-free of the ai-engine packages.
+"""
+
+import ast
+import base64
+import builtins
+import io
+import json
+import sys
+from array import array
+
+SAFE_BUILTINS = [
+    'len', 'range', 'enumerate', 'zip', 'map', 'filter',
+    'min', 'max', 'sum', 'abs', 'reversed',
+    'print', 'str', 'int', 'float', 'set', 'tuple',
+    'bool', 'iter', 'next', '__build_class__'
+]
+
+# Operation codes (low 5 bits) and flags describing how to read the columns
+READ, WRITE, SWAP, APPEND, INSERT, DELETE, CLEAR = range(7)
+OP_NAMES = ['read', 'write', 'swap', 'append', 'insert', 'delete', 'clear']
+FLAG_VALUE_REF = 0x20       # value is a container id (nested list, tree node)
+FLAG_VALUE_INTERNED = 0x40  # value indexes the `values` table
+FLAG_KEY_INTERNED = 0x80    # index indexes the `keys` table (dict keys, attributes)
+
+DEFAULT_MAX_OPS = 200000
+MAX_CONTAINERS = 4096
+MAX_SNAPSHOT_ELEMENTS = 100000  # per container, for initial and final states
+MAX_INTERNED = 50000
+MAX_STDOUT_CHARS = 64 * 1024
+INT_LIMIT = 1 << 62
+
+# Attributes whose reads count as visiting a node
+VISIT_ATTRIBUTES = ('val', 'key', 'value', 'data')
+
+
+class _Log:
+    def __init__(self, max_ops: int, record_reads: bool):
+        self.max_ops = max_ops
+        self.record_reads = record_reads
+        self.total_ops = 0
+        self.op = array('B')
+        self.container = array('q')
+        self.index = array('q')
+        self.index2 = array('q')
+        self.value = array('q')
+        self.values, self.value_ids = [], {}
+        self.keys, self.key_ids = [], {}
+        self.containers = []
+
+    def _intern(self, table, ids, text):
+        index = ids.get(text)
+        if index is None:
+            if len(table) >= MAX_INTERNED:
+                return 0
+            index = ids[text] = len(table)
+            table.append(text)
+        return index
+
+    def encode_value(self, value):
+        if type(value) in (int, bool) and -INT_LIMIT < value < INT_LIMIT:
+            return int(value), 0
+        container_id = getattr(value, '_cid', None) if isinstance(value, _TRACKED_TYPES) else None
+        if container_id is not None and container_id >= 0:
+            return container_id, FLAG_VALUE_REF
+        return self._intern(self.values, self.value_ids, _short_repr(value)), FLAG_VALUE_INTERNED
+
+    def encode_key(self, key):
+        if type(key) is int and -INT_LIMIT < key < INT_LIMIT:
+            return key, 0
+        return self._intern(self.keys, self.key_ids, _short_repr(key)), FLAG_KEY_INTERNED
+
+    def record(self, op, container_id, index=-1, index2=-1, value=None, key_flag=0):
+        self.total_ops += 1
+        if len(self.op) >= self.max_ops:
+            return
+        encoded, flag = self.encode_value(value) if value is not None else (0, 0)
+        self.op.append(op | flag | key_flag)
+        self.container.append(container_id)
+        self.index.append(index)
+        self.index2.append(index2)
+        self.value.append(encoded)
+
+    def register(self, kind, contents):
+        if len(self.containers) >= MAX_CONTAINERS:
+            return -1
+        container_id = len(self.containers)
+        self.containers.append({'id': container_id, 'kind': kind, 'label': None, 'initial': None})
+        if contents is not None:
+            self.containers[container_id]['initial'] = self.snapshot(contents)
+        return container_id
+
+    def snapshot(self, contents):
+        if isinstance(contents, dict):
+            items = list(dict.items(contents))[:MAX_SNAPSHOT_ELEMENTS]
+            return [[_plain(key), _plain(value)] for key, value in items]
+        return [_plain(value) for value in list.__iter__(contents)][:MAX_SNAPSHOT_ELEMENTS] \
+            if len(contents) <= MAX_SNAPSHOT_ELEMENTS else None
+
+
+_log: _Log = None
+
+
+def _short_repr(value) -> str:
+    text = repr(value)
+    return text if len(text) <= 60 else text[:57] + '...'
+
+
+def _plain(value):
+    """JSON-friendly element: numbers as is, containers by reference, the rest as repr"""
+    if type(value) in (int, float, bool) or value is None:
+        return value
+    if isinstance(value, _TRACKED_TYPES) and getattr(value, '_cid', -1) >= 0:
+        return {'ref': value._cid}
+    return _short_repr(value)
+
+
+def _position(tracked, index):
+    """Normalise a negative list index for the log"""
+    return index + list.__len__(tracked) if type(index) is int and index < 0 else index
+
+
+class TrackedList(list):
+    """list that records element reads and writes"""
+
+    __slots__ = ('_cid', '_owner')
+
+    def __init__(self, *args):
+        list.__init__(self, *args)
+        self._owner = None
+        self._cid = _log.register('list', self)
+        self._adopt_rows()
+
+    def _adopt_rows(self):
+        """A list of tracked lists is a table; its rows log as (row, column)"""
+        if self._cid < 0 or not list.__len__(self):
+            return
+        if all(isinstance(row, TrackedList) and row._cid >= 0 for row in list.__iter__(self)):
+            _log.containers[self._cid]['kind'] = 'table'
+            for row_index, row in enumerate(list.__iter__(self)):
+                row._owner = (self._cid, row_index)
+
+    def _record(self, op, index=-1, index2=-1, value=None):
+        if self._owner is not None:
+            table, row = self._owner
+            _log.record(op, table, row, index, value)
+        elif self._cid >= 0:
+            _log.record(op, self._cid, index, index2, value)
+
+    def __getitem__(self, index):
+        value = list.__getitem__(self, index)
+        if _log.record_reads and type(index) is int:
+            self._record(READ, _position(self, index))
+        return value
+
+    def __setitem__(self, index, value):
+        list.__setitem__(self, index, value)
+        if type(index) is slice:
+            start, _, step = index.indices(list.__len__(self))
+            for offset, item in enumerate(value if isinstance(value, list) else []):
+                self._record(WRITE, start + offset * step, value=item)
+        else:
+            self._record(WRITE, _position(self, index), value=value)
+
+    def __delitem__(self, index):
+        list.__delitem__(self, index)
+        if type(index) is int:
+            self._record(DELETE, _position(self, index))
+
+    def append(self, value):
+        list.append(self, value)
+        self._record(APPEND, list.__len__(self) - 1, value=value)
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def insert(self, index, value):
+        list.insert(self, index, value)
+        self._record(INSERT, min(_position(self, index), list.__len__(self) - 1), value=value)
+
+    def pop(self, index=-1):
+        position = _position(self, index)
+        value = list.pop(self, index)
+        self._record(DELETE, position)
+        return value
+
+    def remove(self, value):
+        position = list.index(self, value)
+        list.remove(self, value)
+        self._record(DELETE, position)
+
+    def clear(self):
+        list.clear(self)
+        self._record(CLEAR)
+
+    def _rewrite_all(self):
+        for position, value in enumerate(list.__iter__(self)):
+            self._record(WRITE, position, value=value)
+
+    def sort(self, *args, **kwargs):
+        list.sort(self, *args, **kwargs)
+        self._rewrite_all()
+
+    def reverse(self):
+        list.reverse(self)
+        self._rewrite_all()
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
+    def __add__(self, other):
+        return TrackedList(list.__add__(self, other))
+
+    def __mul__(self, count):
+        return TrackedList(list.__mul__(self, count))
+
+    __rmul__ = __mul__
+
+    def copy(self):
+        return TrackedList(self)
+
+
+class TrackedDict(dict):
+    """dict that records key reads and writes"""
+
+    __slots__ = ('_cid',)
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self._cid = _log.register('dict', self)
+
+    def _record(self, op, key=None, value=None):
+        if self._cid < 0:
+            return
+        if key is None:
+            _log.record(op, self._cid, value=value)
+            return
+        index, flag = _log.encode_key(key)
+        _log.record(op, self._cid, index, -1, value, flag)
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if _log.record_reads:
+            self._record(READ, key)
+        return value
+
+    def get(self, key, default=None):
+        if _log.record_reads and dict.__contains__(self, key):
+            self._record(READ, key)
+        return dict.get(self, key, default)
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self._record(WRITE, key, value)
+
+    def setdefault(self, key, default=None):
+        if not dict.__contains__(self, key):
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._record(DELETE, key)
+
+    def pop(self, key, *default):
+        present = dict.__contains__(self, key)
+        value = dict.pop(self, key, *default)
+        if present:
+            self._record(DELETE, key)
+        return value
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        dict.clear(self)
+        self._record(CLEAR)
+
+
+class _TrackedObject:
+    """Marker base for instances of instrumented classes"""
+
+
+_TRACKED_TYPES = (TrackedList, TrackedDict, _TrackedObject)
+
+
+def _track_class(cls):
+    """Make instances log attribute writes (structure) and value reads (visits)"""
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name == '_cid':
+            return
+        container_id = _object_id(self)
+        if container_id >= 0:
+            index, flag = _log.encode_key(name)
+            _log.record(WRITE, container_id, index, -1, value, flag)
+
+    def __getattribute__(self, name):
+        value = object.__getattribute__(self, name)
+        if name in VISIT_ATTRIBUTES:
+            container_id = _object_id(self)
+            if container_id >= 0:
+                index, flag = _log.encode_key(name)
+                _log.record(READ, container_id, index, -1, None, flag)
+        return value
+
+    tracked = type(cls.__name__, (cls, _TrackedObject), {
+        '__setattr__': __setattr__,
+        '__getattribute__': __getattribute__,
+        '__module__': cls.__module__,
+        '__qualname__': cls.__qualname__
+    })
+    return tracked
+
+
+def _object_id(instance) -> int:
+    try:
+        return object.__getattribute__(instance, '_cid')
+    except AttributeError:
+        container_id = _log.register('object', None)
+        if container_id >= 0:
+            _log.containers[container_id]['label'] = type(instance).__name__
+        object.__setattr__(instance, '_cid', container_id)
+        return container_id
+
+
+def _new_list(value):
+    return value if isinstance(value, TrackedList) else TrackedList(value)
+
+
+def _new_dict(value):
+    return value if isinstance(value, TrackedDict) else TrackedDict(value)
+
+
+def _label(value, name):
+    container_id = getattr(value, '_cid', -1) if isinstance(value, (TrackedList, TrackedDict)) else -1
+    if container_id >= 0 and _log.containers[container_id]['label'] is None:
+        _log.containers[container_id]['label'] = name
+    return value
+
+
+def _swap(container, i, j):
+    if isinstance(container, TrackedList):
+        first, second = list.__getitem__(container, i), list.__getitem__(container, j)
+        list.__setitem__(container, i, second)
+        list.__setitem__(container, j, first)
+        if container._owner is not None:
+            container._record(WRITE, _position(container, i), value=second)
+            container._record(WRITE, _position(container, j), value=first)
+        else:
+            container._record(SWAP, _position(container, i), _position(container, j))
+    else:
+        container[i], container[j] = container[j], container[i]
+
+
+def _sorted(values, *args, **kwargs):
+    return TrackedList(builtins.sorted(values, *args, **kwargs))
+
+
+class _Instrumenter(ast.NodeTransformer):
+    """Route container creation, swaps, labels and classes through the trackers"""
+
+    @staticmethod
+    def _call(name, *args):
+        return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=list(args), keywords=[])
+
+    def visit_List(self, node):
+        self.generic_visit(node)
+        return self._call('__new_list__', node) if isinstance(node.ctx, ast.Load) else node
+
+    def visit_ListComp(self, node):
+        self.generic_visit(node)
+        return self._call('__new_list__', node)
+
+    def visit_Dict(self, node):
+        self.generic_visit(node)
+        return self._call('__new_dict__', node)
+
+    def visit_DictComp(self, node):
+        self.generic_visit(node)
+        return self._call('__new_dict__', node)
+
+    def visit_ClassDef(self, node):
+        self.generic_visit(node)
+        node.decorator_list.append(ast.Name(id='__track_class__', ctx=ast.Load()))
+        return node
+
+    def visit_Assign(self, node):
+        self.generic_visit(node)
+        swap = self._swap(node)
+        if swap is not None:
+            return swap
+        if len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            node.value = self._call('__label__', node.value, ast.Constant(node.targets[0].id))
+        return node
+
+    def _swap(self, node):
+        """a[i], a[j] = a[j], a[i]"""
+        if len(node.targets) != 1:
+            return None
+        target, value = node.targets[0], node.value
+        if not (isinstance(target, ast.Tuple) and isinstance(value, ast.Tuple)
+                and len(target.elts) == 2 and len(value.elts) == 2):
+            return None
+        elements = target.elts + value.elts
+        if not all(isinstance(e, ast.Subscript) and not isinstance(e.slice, ast.Slice) for e in elements):
+            return None
+        left_i, left_j, right_j, right_i = elements
+        same = lambda a, b: ast.dump(a) == ast.dump(b)
+        if not (same(left_i.value, left_j.value) and same(left_i.value, right_i.value)
+                and same(left_i.value, right_j.value) and same(left_i.slice, right_i.slice)
+                and same(left_j.slice, right_j.slice)):
+            return None
+        call = self._call('__swap__', _as_load(left_i.value), _as_load(left_i.slice), _as_load(left_j.slice))
+        return ast.copy_location(ast.Expr(value=call), node)
+
+
+def _as_load(expr):
+    """Copy of an expression with every context switched to Load"""
+    return ast.parse(ast.unparse(expr), mode='eval').body
+
+
+def _pack(values: array):
+    """Narrowest signed integer array holding every value, base64-encoded"""
+    low = min(values) if len(values) else 0
+    high = max(values) if len(values) else 0
+    for typecode, bits in (('b', 8), ('h', 16), ('i', 32), ('q', 64)):
+        limit = 1 << (bits - 1)
+        if -limit <= low and high < limit:
+            break
+    packed = array(typecode, values)
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return {'type': f'int{bits}', 'data': base64.b64encode(packed.tobytes()).decode()}
+
+
+class _CappedOutput(io.StringIO):
+    def write(self, text):
+        remaining = MAX_STDOUT_CHARS - self.tell()
+        if remaining > 0:
+            super().write(text[:remaining])
+        return len(text)
+
+
+def main():
+    global _log
+    with open(sys.argv[1]) as f:
+        code = f.read()
+    options = json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}
+    _log = _Log(int(options.get('max_ops', DEFAULT_MAX_OPS)), bool(options.get('record_reads', True)))
+
+    tree = ast.fix_missing_locations(_Instrumenter().visit(ast.parse(code)))
+    safe_builtins = {name: getattr(builtins, name) for name in SAFE_BUILTINS}
+    safe_builtins.update({'list': TrackedList, 'dict': TrackedDict, 'sorted': _sorted})
+    namespace = {
+        '__name__': '__submission__',
+        '__builtins__': safe_builtins,
+        '__new_list__': _new_list,
+        '__new_dict__': _new_dict,
+        '__label__': _label,
+        '__swap__': _swap,
+        '__track_class__': _track_class,
+        'test_input': sys.stdin.read()
+    }
+
+    captured = _CappedOutput()
+    real_stdout, sys.stdout = sys.stdout, captured
+    error = None
+    try:
+        exec(compile(tree, '<submission>', 'exec'), namespace)
+    except Exception as e:
+        error = {'type': type(e).__name__, 'message': str(e)[:500]}
+    finally:
+        sys.stdout = real_stdout
+
+    # Final states of every container reachable from the submission's globals
+    pending = [value for value in namespace.values() if isinstance(value, _TRACKED_TYPES)]
+    seen, budget = set(), MAX_SNAPSHOT_ELEMENTS * 4
+    while pending and budget > 0:
+        value = pending.pop()
+        container_id = _object_id(value) if isinstance(value, _TrackedObject) else value._cid
+        if container_id < 0 or container_id in seen:
+            continue
+        seen.add(container_id)
+        if isinstance(value, _TrackedObject):
+            children = [child for child in vars(value).values() if isinstance(child, _TRACKED_TYPES)]
+            children += [item for child in vars(value).values() if isinstance(child, list)
+                         for item in child if isinstance(item, _TRACKED_TYPES)]
+        else:
+            _log.containers[container_id]['final'] = _log.snapshot(value)
+            budget -= len(value)
+            items = dict.values(value) if isinstance(value, dict) else list.__iter__(value)
+            children = [child for child in items if isinstance(child, _TRACKED_TYPES)]
+        pending.extend(children)
+
+    json.dump({
+        'format': 'oplog-v1',
+        'op_names': OP_NAMES,
+        'flags': {'value_ref': FLAG_VALUE_REF, 'value_interned': FLAG_VALUE_INTERNED,
+                  'key_interned': FLAG_KEY_INTERNED},
+        'total_ops': _log.total_ops,
+        'recorded_ops': len(_log.op),
+        'truncated': _log.total_ops > len(_log.op),
+        'containers': _log.containers,
+        'columns': {
+            'op': _pack(_log.op),
+            'container': _pack(_log.container),
+            'index': _pack(_log.index),
+            'index2': _pack(_log.index2),
+            'value': _pack(_log.value)
+        },
+        'values': _log.values,
+        'keys': _log.keys,
+        'stdout': captured.getvalue(),
+        'error': error
+    }, real_stdout, separators=(',', ':'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,388 @@
+"""
+Child-process memory profiler for Python submissions
+
+Usage: python python_memory_profiler.py <code-file> <time-budget-seconds>
+
+Runs the submission with the benchmark's restricted builtins under
+tracemalloc and reports, per source line, how memory changed while it ran
+(bytes allocated, net change, its highest running total and its share at
+the overall peak) and what the allocations made on it still held at the
+last snapshot, plus a timeline of the submission's live bytes by step.
+Allocations made inside builtins count for the line that called them.
+
+MemorySampler is shared with python_tracer.py, whose execution traces carry
+the same timeline. Accounting is incremental: every line and return event
+charges the change in traced memory since the previous event to the line
+that was running, so the per-step cost does not grow with the heap (the
+tracer measures again when its handler finishes, keeping its recording out
+of the totals). The run's peak and the per-line totals at it are tracked from the
+same stream (the per-line copy is refreshed each time the peak grows by
+AT_PEAK_TOLERANCE).
+
+Snapshots (tracemalloc traces grouped by allocating line) are taken every
+MEMORY_SAMPLE_STEPS steps and whenever live memory grows SNAPSHOT_GROWTH
+past the last one. Their cost is proportional to the live allocations, so
+one is only taken while the snapshots so far plus its predicted cost stay
+within SNAPSHOT_OVERHEAD_BUDGET of the elapsed run time (plus
+SNAPSHOT_ALLOWANCE): a run holding a million objects gets fewer snapshots
+instead of an unbounded slowdown, while the incremental numbers stay exact.
+
+Like python_runner.py this file is launched under utils.sandbox and must
+stay import-free of the ai-engine packages.
+"""
+
+import builtins
+import json
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from operator import itemgetter
+
+SAFE_BUILTINS = [
+    'len', 'range', 'enumerate', 'zip', 'map', 'filter',
+    'min', 'max', 'sum', 'abs', 'sorted', 'reversed',
+    'print', 'str', 'int', 'float', 'list', 'dict', 'set', 'tuple',
+    'bool', 'iter', 'next', '__build_class__'
+]
+
+SUBMISSION_FILENAME = '<submission>'
+
+MEMORY_SAMPLE_STEPS = 1000         # steps between timeline samples and scheduled snapshots
+SNAPSHOT_GROWTH = 1.25             # growth past the last sample that triggers another
+SNAPSHOT_GROWTH_SLACK = 64 * 1024  # bytes; ignores growth of small heaps
+SNAPSHOT_OVERHEAD_BUDGET = 0.25    # snapshot time allowed per second of run time
+SNAPSHOT_ALLOWANCE = 0.05          # seconds of snapshots allowed on top of the budget
+SNAPSHOT_SECONDS_PER_BYTE = 4e-8   # first estimate of snapshot cost; then measured
+AT_PEAK_TOLERANCE = 1.02           # peak growth that refreshes the per-line totals at the peak
+MAX_MEMORY_LINES = 200
+MAX_SOURCE_CHARS = 120
+DEADLINE_CHECK_STEPS = 4096
+
+
+class ProfileBudgetExceeded(Exception):
+    """Raised inside the submission when the time budget runs out"""
+
+
+class _Discard:
+    """Swallows the submission's prints; stdout carries the profile"""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def _delta(values):
+    previous, encoded = 0, []
+    for value in values:
+        encoded.append(value - previous)
+        previous = value
+    return encoded
+
+
+class MemorySampler:
+    """
+    Per-line memory accounting and a sampled timeline
+
+    Engines call pause() at the start of every line and return event, then
+    on_line or ret. Handlers that keep memory of their own (the tracer's
+    recording) call resume() when they finish so it is not charged to the
+    submission; the profiler's own handlers hold nothing and skip the extra
+    measurement.
+    """
+
+    def __init__(self, sample_steps: int = MEMORY_SAMPLE_STEPS, overhead_budget: float = SNAPSHOT_OVERHEAD_BUDGET):
+        self.sample_steps = sample_steps
+        self.overhead_budget = overhead_budget
+        self.line = 0
+        self.step = 0
+        self.line_stack = []
+        self.resumed_at = 0
+        self.current = 0               # submission's live bytes
+        self.peak = 0
+        self.peak_step = 0
+
+        self.growth = {}               # line -> bytes allocated while it ran
+        self.net = {}                  # line -> net change while it ran
+        self.line_peak = {}            # line -> highest running net
+        self.at_peak = {}              # line -> net at the run's peak
+        self.at_peak_total = 0
+
+        self.live_bytes = {}           # allocating line -> bytes held at the last snapshot
+        self.live_blocks = {}
+        self.snapshot_step = None
+        self.snapshots = 0
+        self.skipped = 0
+        self.snapshot_seconds = 0.0
+        self.seconds_per_byte = SNAPSHOT_SECONDS_PER_BYTE
+        self.started = 0.0
+        self.next_sample = sample_steps
+        self.high_water = SNAPSHOT_GROWTH_SLACK
+
+        self.timeline_step, self.timeline_current, self.timeline_top_line = [], [], []
+
+    def start(self):
+        tracemalloc.start()
+        self.started = time.perf_counter()
+        self.resumed_at = tracemalloc.get_traced_memory()[0]
+
+    def pause(self):
+        """Charge the memory change since the last measurement to the line that was running"""
+        traced = tracemalloc.get_traced_memory()[0]
+        delta = traced - self.resumed_at
+        self.resumed_at = traced
+        if not delta:
+            return
+        line = self.line
+        net = self.net.get(line, 0) + delta
+        self.net[line] = net
+        self.current += delta
+        if delta > 0:
+            self.growth[line] = self.growth.get(line, 0) + delta
+            if net > self.line_peak.get(line, 0):
+                self.line_peak[line] = net
+            if self.current > self.peak:
+                self.peak, self.peak_step = self.current, self.step
+                if self.current > self.at_peak_total * AT_PEAK_TOLERANCE:
+                    self.at_peak, self.at_peak_total = dict(self.net), self.current
+
+    def resume(self):
+        self.resumed_at = tracemalloc.get_traced_memory()[0]
+
+    def call(self):
+        self.line_stack.append(self.line)
+
+    def ret(self):
+        if self.line_stack:
+            self.line = self.line_stack.pop()
+
+    def on_line(self, line: int, step: int):
+        self.line = line
+        self.step = step
+        if step >= self.next_sample or self.current > self.high_water:
+            self._sample(step)
+
+    def _sample(self, step: int):
+        self.timeline_step.append(step)
+        self.timeline_current.append(self.current)
+        self.timeline_top_line.append(max(self.net, key=self.net.get) if self.net else 0)
+        if self._affordable():
+            self._snapshot(step)
+        else:
+            self.skipped += 1
+        self.next_sample = step + self.sample_steps
+        self.high_water = self.current * SNAPSHOT_GROWTH + SNAPSHOT_GROWTH_SLACK
+        self.resume()
+
+    def _affordable(self) -> bool:
+        predicted = tracemalloc.get_traced_memory()[0] * self.seconds_per_byte
+        allowed = self.overhead_budget * (time.perf_counter() - self.started) + SNAPSHOT_ALLOWANCE
+        return self.snapshot_seconds + predicted <= allowed
+
+    def _snapshot(self, step: int):
+        started = time.perf_counter()
+        traced = tracemalloc.get_traced_memory()[0]
+        # The raw (domain, size, traceback, nframe) tuples take_snapshot wraps;
+        # tracebacks are shared tuples, so grouping on them directly skips
+        # building a Trace object per live allocation
+        traces = tracemalloc._get_traces()
+        blocks = Counter(map(itemgetter(2), traces))
+        by_traceback = {}
+        for _, size, traceback, _ in traces:
+            by_traceback[traceback] = by_traceback.get(traceback, 0) + size
+        del traces
+        live_bytes, live_blocks = {}, {}
+        for traceback, size in by_traceback.items():
+            if traceback and traceback[0][0] == SUBMISSION_FILENAME and traceback[0][1] > 0:
+                line = traceback[0][1]
+                live_bytes[line] = live_bytes.get(line, 0) + size
+                live_blocks[line] = live_blocks.get(line, 0) + blocks[traceback]
+        self.live_bytes, self.live_blocks, self.snapshot_step = live_bytes, live_blocks, step
+        self.snapshots += 1
+        elapsed = time.perf_counter() - started
+        self.snapshot_seconds += elapsed
+        if traced > SNAPSHOT_GROWTH_SLACK:
+            self.seconds_per_byte = elapsed / traced
+
+    def finish(self, step: int):
+        """Charge the last stretch, take a final sample and stop tracing"""
+        if not tracemalloc.is_tracing():
+            return
+        self.pause()
+        self.step = step
+        self._sample(step)
+        tracemalloc.stop()
+
+    def to_dict(self, source_lines):
+        lines = sorted((line for line in set(self.net) | set(self.live_bytes) if line > 0),
+                       key=lambda line: (-self.line_peak.get(line, 0), -self.growth.get(line, 0), line))
+        return {
+            'sample_steps': self.sample_steps,
+            'step': _delta(self.timeline_step),
+            'current': _delta(self.timeline_current),
+            'top_line': self.timeline_top_line,
+            'peak': self.peak,
+            'peak_step': self.peak_step,
+            'snapshots': self.snapshots,
+            'skipped_snapshots': self.skipped,
+            'snapshot_step': self.snapshot_step,
+            'snapshot_overhead_ms': round(self.snapshot_seconds * 1000, 3),
+            'lines': [
+                {
+                    'line': line,
+                    'growth_bytes': self.growth.get(line, 0),
+                    'net_bytes': self.net.get(line, 0),
+                    'peak_bytes': self.line_peak.get(line, 0),
+                    'at_peak_bytes': self.at_peak.get(line, 0),
+                    'live_bytes': self.live_bytes.get(line, 0),
+                    'live_blocks': self.live_blocks.get(line, 0),
+                    'source': source_lines[line - 1].strip()[:MAX_SOURCE_CHARS] if line <= len(source_lines) else ''
+                }
+                for line in lines[:MAX_MEMORY_LINES]
+            ]
+        }
+
+
+def _is_submission(code) -> bool:
+    return code.co_filename == SUBMISSION_FILENAME
+
+
+class _Steps:
+    """Event handlers driving the sampler"""
+
+    def __init__(self, sampler: MemorySampler, deadline: float):
+        self.sampler = sampler
+        self.deadline = deadline
+        self.total = 0
+
+    def on_line(self, line: int):
+        self.sampler.pause()
+        self.total += 1
+        steps = self.total
+        if steps % DEADLINE_CHECK_STEPS == 0 and time.monotonic() > self.deadline:
+            raise ProfileBudgetExceeded(f"Profiling stopped after {steps} steps (time limit)")
+        self.sampler.on_line(line, steps)
+
+    def on_call(self):
+        # Nothing to charge yet: until its first line the callee runs on the caller's line
+        self.sampler.call()
+
+    def on_return(self):
+        self.sampler.pause()
+        self.sampler.ret()
+
+
+def _run_with_monitoring(compiled, namespace, steps: _Steps):
+    monitoring = sys.monitoring
+    tool = monitoring.PROFILER_ID
+    events = monitoring.events
+    disable = monitoring.DISABLE
+
+    def on_start(code, offset):
+        if not _is_submission(code):
+            return disable
+        steps.on_call()
+
+    def on_return(code, offset, value):
+        if not _is_submission(code):
+            return disable
+        steps.on_return()
+
+    def on_unwind(code, offset, exception):
+        if _is_submission(code):
+            steps.on_return()
+
+    def on_line(code, line):
+        if not _is_submission(code):
+            return disable
+        steps.on_line(line)
+
+    monitoring.use_tool_id(tool, 'algomaster-memory-profiler')
+    try:
+        monitoring.register_callback(tool, events.PY_START, on_start)
+        monitoring.register_callback(tool, events.PY_RESUME, on_start)
+        monitoring.register_callback(tool, events.PY_RETURN, on_return)
+        monitoring.register_callback(tool, events.PY_YIELD, on_return)
+        monitoring.register_callback(tool, events.PY_UNWIND, on_unwind)
+        monitoring.register_callback(tool, events.LINE, on_line)
+        monitoring.set_events(
+            tool,
+            events.PY_START | events.PY_RESUME | events.PY_RETURN | events.PY_YIELD
+            | events.PY_UNWIND | events.LINE
+        )
+        exec(compiled, namespace)
+    finally:
+        monitoring.set_events(tool, events.NO_EVENTS)
+        monitoring.free_tool_id(tool)
+
+
+def _run_with_settrace(compiled, namespace, steps: _Steps):
+    def local_trace(frame, event, arg):
+        if event == 'line':
+            steps.on_line(frame.f_lineno)
+        elif event == 'return':
+            # Fired for normal returns, yields and exception unwinding alike
+            steps.on_return()
+        return local_trace
+
+    def global_trace(frame, event, arg):
+        if not _is_submission(frame.f_code):
+            return None
+        steps.on_call()
+        return local_trace
+
+    sys.settrace(global_trace)
+    try:
+        exec(compiled, namespace)
+    finally:
+        sys.settrace(None)
+
+
+def main():
+    with open(sys.argv[1]) as f:
+        code = f.read()
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 4.0
+
+    namespace = {
+        '__name__': '__submission__',
+        '__builtins__': {name: getattr(builtins, name) for name in SAFE_BUILTINS},
+        'test_input': sys.stdin.read()
+    }
+    compiled = compile(code, SUBMISSION_FILENAME, 'exec')
+
+    engine = 'sys.monitoring' if hasattr(sys, 'monitoring') else 'settrace'
+    sampler = MemorySampler()
+    steps = _Steps(sampler, time.monotonic() + budget)
+    real_stdout, sys.stdout = sys.stdout, _Discard()
+    error = None
+
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        if engine == 'sys.monitoring':
+            _run_with_monitoring(compiled, namespace, steps)
+        else:
+            _run_with_settrace(compiled, namespace, steps)
+    except ProfileBudgetExceeded as e:
+        error = {'type': 'TimeLimit', 'message': str(e), 'step': steps.total}
+    except Exception as e:
+        error = {'type': type(e).__name__, 'message': str(e)[:500], 'step': steps.total}
+    finally:
+        wall_time = time.perf_counter() - started
+        sampler.finish(steps.total)
+        sys.stdout = real_stdout
+
+    json.dump({
+        'format': 'memory-profile-v1',
+        'engine': engine,
+        'total_steps': steps.total,
+        'wall_time_ms': round(wall_time * 1000, 3),
+        'memory': sampler.to_dict(code.splitlines()),
+        'error': error
+    }, real_stdout, separators=(',', ':'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Child-process bytecode instruction counter for Python submissions
+
+Usage: python python_op_counter.py <code-file> <max-instructions>
+
+Runs the submission with the benchmark's restricted builtins and counts the
+bytecode instructions, lines and calls it executes (sys.monitoring
+INSTRUCTION events on Python 3.12+, opcode tracing otherwise). Unlike wall
+time the counts do not depend on the host or its load: the same code and
+input give the same numbers on every run, given the same interpreter
+version and hash seed (the benchmarker pins PYTHONHASHSEED). Work done
+inside builtins such as sorted() counts as the one instruction that calls
+it. A run that exceeds max-instructions is stopped, which is itself
+deterministic. The counts are written to stdout as one JSON document. Like
+python_runner.py this file is launched under utils.sandbox and must stay
+import-free of the ai-engine packages.
+"""
+
+import builtins
+import json
+import sys
+
+SAFE_BUILTINS = [
+    'len', 'range', 'enumerate', 'zip', 'map', 'filter',
+    'min', 'max', 'sum', 'abs', 'sorted', 'reversed',
+    'print', 'str', 'int', 'float', 'list', 'dict', 'set', 'tuple',
+    'bool', 'iter', 'next', '__build_class__'
+]
+
+SUBMISSION_FILENAME = '<submission>'
+
+
+class InstructionBudgetExceeded(Exception):
+    """Raised inside the submission when the instruction budget runs out"""
+
+
+class _Discard:
+    """Swallows the submission's prints; stdout carries the counts"""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class Counter:
+    """Instruction, line and call counts; event handlers are shared by both engines"""
+
+    def __init__(self, max_instructions: int):
+        self.max_instructions = max_instructions
+        self.instructions = 0
+        self.lines = 0
+        self.calls = 0
+
+    def on_instruction(self):
+        self.instructions += 1
+        if self.instructions > self.max_instructions:
+            raise InstructionBudgetExceeded(f"Stopped after {self.max_instructions} instructions")
+
+
+def _is_submission(code) -> bool:
+    return code.co_filename == SUBMISSION_FILENAME
+
+
+def _run_with_monitoring(compiled, namespace, counter: Counter):
+    monitoring = sys.monitoring
+    tool = monitoring.PROFILER_ID
+    events = monitoring.events
+    disable = monitoring.DISABLE
+
+    def on_start(code, offset):
+        if not _is_submission(code):
+            return disable
+        counter.calls += 1
+
+    def on_line(code, line):
+        if not _is_submission(code):
+            return disable
+        counter.lines += 1
+
+    def on_instruction(code, offset):
+        if not _is_submission(code):
+            return disable
+        counter.on_instruction()
+
+    monitoring.use_tool_id(tool, 'algomaster-op-counter')
+    try:
+        monitoring.register_callback(tool, events.PY_START, on_start)
+        monitoring.register_callback(tool, events.LINE, on_line)
+        monitoring.register_callback(tool, events.INSTRUCTION, on_instruction)
+        monitoring.set_events(tool, events.PY_START | events.LINE | events.INSTRUCTION)
+        exec(compiled, namespace)
+    finally:
+        monitoring.set_events(tool, events.NO_EVENTS)
+        monitoring.free_tool_id(tool)
+
+
+def _run_with_settrace(compiled, namespace, counter: Counter):
+    def local_trace(frame, event, arg):
+        if event == 'opcode':
+            counter.on_instruction()
+        elif event == 'line':
+            counter.lines += 1
+        return local_trace
+
+    def global_trace(frame, event, arg):
+        if not _is_submission(frame.f_code):
+            return None
+        frame.f_trace_opcodes = True
+        counter.calls += 1
+        return local_trace
+
+    sys.settrace(global_trace)
+    try:
+        exec(compiled, namespace)
+    finally:
+        sys.settrace(None)
+
+
+def main():
+    with open(sys.argv[1]) as f:
+        code = f.read()
+    max_instructions = int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 8
+
+    namespace = {
+        '__name__': '__submission__',
+        '__builtins__': {name: getattr(builtins, name) for name in SAFE_BUILTINS},
+        'test_input': sys.stdin.read()
+    }
+    compiled = compile(code, SUBMISSION_FILENAME, 'exec')
+
+    counter = Counter(max_instructions)
+    engine = 'sys.monitoring' if hasattr(sys, 'monitoring') else 'settrace'
+    real_stdout, sys.stdout = sys.stdout, _Discard()
+    error = None
+    try:
+        if engine == 'sys.monitoring':
+            _run_with_monitoring(compiled, namespace, counter)
+        else:
+            _run_with_settrace(compiled, namespace, counter)
+    except InstructionBudgetExceeded as e:
+        error = {'type': 'InstructionLimit', 'message': str(e)}
+    except Exception as e:
+        error = {'type': type(e).__name__, 'message': str(e)[:500]}
+    finally:
+        sys.stdout = real_stdout
+
+    json.dump({
+        'engine': engine,
+        'python': '.'.join(map(str, sys.version_info[:3])),
+        'instructions': counter.instructions,
+        'lines': counter.lines,
+        'calls': counter.calls,
+        'truncated': error is not None and error['type'] == 'InstructionLimit',
+        'error': error
+    }, real_stdout, separators=(',', ':'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,370 @@
+"""
+Child-process line profiler for Python submissions
+
+Usage: python python_profiler.py <code-file> <time-budget-seconds>
+
+Runs the submission with the benchmark's restricted builtins and reports
+where its time goes: hit counts and self-time per source line, calls and
+self-time per function, and collapsed stacks ("main;outer:3;inner:9 1234",
+weights in microseconds) that flame graph tools read directly.
+
+Profiling starts exact: every line and call event is timed (sys.monitoring
+on Python 3.12+, sys.settrace otherwise), with the profiler's own time
+excluded. A run that is still going after EXACT_SECONDS or MAX_EXACT_EVENTS
+line events switches to statistical sampling: tracing is turned off and a
+SIGPROF timer records the submission's stack every SAMPLE_INTERVAL of CPU
+time, so the remainder runs at close to full speed. Line hit counts then
+cover the exact phase only (hits_complete is false) and sampled self-time is
+the sampling phase's wall time split by sample share. Samples can only land
+where the interpreter checks for signals (function entry and loop
+back-edges), so sampled time shows on def lines and loop headers more than
+exact time would. Like python_runner.py this file is launched under
+utils.sandbox and must stay import-free of the ai-engine packages.
+"""
+
+import builtins
+import json
+import signal
+import sys
+import time
+
+SAFE_BUILTINS = [
+    'len', 'range', 'enumerate', 'zip', 'map', 'filter',
+    'min', 'max', 'sum', 'abs', 'sorted', 'reversed',
+    'print', 'str', 'int', 'float', 'list', 'dict', 'set', 'tuple',
+    'bool', 'iter', 'next', '__build_class__'
+]
+
+SUBMISSION_FILENAME = '<submission>'
+
+EXACT_SECONDS = 0.25          # wall time profiled exactly before sampling takes over
+MAX_EXACT_EVENTS = 500000     # line events profiled exactly before sampling takes over
+SAMPLE_INTERVAL = 0.001       # seconds of CPU time between stack samples
+CHECK_EVENTS = 1024           # line events between wall-clock checks
+MAX_STACK_DEPTH = 64          # deeper frames are folded into the frame at this depth
+MAX_COLLAPSED_STACKS = 2000
+MAX_SOURCE_CHARS = 120
+
+ROOT = 0  # path id of the empty stack
+
+
+class ProfileBudgetExceeded(Exception):
+    """Raised inside the submission when the time budget runs out"""
+
+
+class _Discard:
+    """Swallows the submission's prints; stdout carries the profile"""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def _is_submission(code) -> bool:
+    return code.co_filename == SUBMISSION_FILENAME
+
+
+def _label(code) -> str:
+    if code.co_name == '<module>':
+        return 'main'
+    return f'{code.co_name}:{code.co_firstlineno}'
+
+
+class Profiler:
+    """
+    Exact-then-sampled line profiler; event handlers are shared by both engines
+
+    Call stacks are interned as a tree of path ids, so a call costs one dict
+    lookup however deep the stack is.
+    """
+
+    def __init__(self, deadline: float, engine: str):
+        self.deadline = deadline
+        self.engine = engine
+        self.exact = True
+        self.events = 0
+        self.line_hits = {}
+        self.line_ns = {}
+        self.line_samples = {}
+        self.calls = {}              # code -> exact-phase calls
+        self.path_ns = {}            # path id -> self time in ns
+        self.path_samples = {}
+        self.paths = [(None, None)]  # path id -> (parent id, code)
+        self.path_depth = [0]
+        self.path_ids = {}
+        self.stack = []              # [code, path id, current line, timer restart ns]
+        self.started = time.perf_counter()
+        self.switched_at = None
+        self.samples = 0
+        self.disable_tracing = None  # set by the engine
+
+    def _path(self, parent: int, code) -> int:
+        if self.path_depth[parent] >= MAX_STACK_DEPTH:
+            return parent
+        key = (parent, code)
+        path = self.path_ids.get(key)
+        if path is None:
+            path = self.path_ids[key] = len(self.paths)
+            self.paths.append(key)
+            self.path_depth.append(self.path_depth[parent] + 1)
+        return path
+
+    def _charge(self, now: int):
+        """Attribute the time since the top frame's last event to its current line"""
+        top = self.stack[-1]
+        elapsed = now - top[3]
+        line = top[2]
+        self.line_ns[line] = self.line_ns.get(line, 0) + elapsed
+        self.path_ns[top[1]] = self.path_ns.get(top[1], 0) + elapsed
+
+    def on_call(self, code):
+        now = time.perf_counter_ns()
+        if self.stack:
+            self._charge(now)
+            parent = self.stack[-1][1]
+        else:
+            parent = ROOT
+        self.calls[code] = self.calls.get(code, 0) + 1
+        self.stack.append([code, self._path(parent, code), code.co_firstlineno, time.perf_counter_ns()])
+
+    def on_return(self):
+        if not self.stack:
+            return
+        self._charge(time.perf_counter_ns())
+        self.stack.pop()
+        if self.stack:
+            self.stack[-1][3] = time.perf_counter_ns()
+
+    def on_line(self, line: int):
+        now = time.perf_counter_ns()
+        if self.stack:
+            self._charge(now)
+            self.stack[-1][2] = line
+        self.line_hits[line] = self.line_hits.get(line, 0) + 1
+        self.events += 1
+        if self.events % CHECK_EVENTS == 0:
+            if time.monotonic() > self.deadline:
+                raise ProfileBudgetExceeded(f"Profiling stopped after {self.events} line events (time limit)")
+            if self.events >= MAX_EXACT_EVENTS or time.perf_counter() - self.started > EXACT_SECONDS:
+                self._start_sampling()
+                if not self.exact:
+                    return
+        if self.stack:
+            self.stack[-1][3] = time.perf_counter_ns()
+
+    def _start_sampling(self):
+        if not hasattr(signal, 'setitimer'):
+            return  # no interval timers on this platform; stay exact
+        self.disable_tracing()
+        self.exact = False
+        self.stack = []
+        self.switched_at = time.perf_counter()
+        signal.signal(signal.SIGPROF, self._on_sample)
+        signal.setitimer(signal.ITIMER_PROF, SAMPLE_INTERVAL, SAMPLE_INTERVAL)
+
+    def stop_sampling(self):
+        if not self.exact:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+    def _on_sample(self, signum, frame):
+        if time.monotonic() > self.deadline:
+            self.stop_sampling()
+            raise ProfileBudgetExceeded(f"Profiling stopped after {self.samples} samples (time limit)")
+        codes, line = [], None
+        while frame is not None:
+            if _is_submission(frame.f_code):
+                if line is None:
+                    line = frame.f_lineno
+                codes.append(frame.f_code)
+            frame = frame.f_back
+        if line is None:
+            return
+        path = ROOT
+        for code in reversed(codes):
+            path = self._path(path, code)
+        self.samples += 1
+        self.line_samples[line] = self.line_samples.get(line, 0) + 1
+        self.path_samples[path] = self.path_samples.get(path, 0) + 1
+
+    def _stack_label(self, path: int):
+        labels = []
+        while path != ROOT:
+            parent, code = self.paths[path]
+            labels.append(_label(code))
+            path = parent
+        return ';'.join(reversed(labels))
+
+    def to_dict(self, source_lines, wall_time: float, error):
+        exact_seconds = (self.switched_at or time.perf_counter()) - self.started
+        sampled_seconds = wall_time - exact_seconds if self.switched_at else 0.0
+        ns_per_sample = sampled_seconds * 1e9 / self.samples if self.samples else 0.0
+
+        line_ns = dict(self.line_ns)
+        for line, samples in self.line_samples.items():
+            line_ns[line] = line_ns.get(line, 0) + samples * ns_per_sample
+        path_ns = dict(self.path_ns)
+        for path, samples in self.path_samples.items():
+            path_ns[path] = path_ns.get(path, 0) + samples * ns_per_sample
+        total_ns = sum(line_ns.values()) or 1
+
+        lines = []
+        for line in sorted(set(self.line_hits) | set(line_ns), key=lambda l: -line_ns.get(l, 0)):
+            text = source_lines[line - 1].strip() if 0 < line <= len(source_lines) else ''
+            lines.append({
+                'line': line,
+                'hits': self.line_hits.get(line, 0),
+                'self_time_ms': round(line_ns.get(line, 0) / 1e6, 3),
+                'percent': round(100 * line_ns.get(line, 0) / total_ns, 2),
+                'samples': self.line_samples.get(line, 0),
+                'source': text[:MAX_SOURCE_CHARS]
+            })
+
+        functions = {}
+        for path, elapsed in path_ns.items():
+            if path == ROOT:
+                continue
+            code = self.paths[path][1]
+            functions[code] = functions.get(code, 0) + elapsed
+        for code in self.calls:
+            functions.setdefault(code, 0)
+
+        stacks = sorted(((self._stack_label(path), elapsed) for path, elapsed in path_ns.items()
+                         if path != ROOT and elapsed >= 1000), key=lambda item: -item[1])
+
+        return {
+            'format': 'line-profile-v1',
+            'engine': self.engine,
+            'mode': 'exact' if self.exact else 'exact+sampled',
+            'wall_time_ms': round(wall_time * 1000, 3),
+            'exact_time_ms': round(exact_seconds * 1000, 3),
+            'sampled_time_ms': round(sampled_seconds * 1000, 3),
+            'line_events': self.events,
+            'samples': self.samples,
+            'sample_interval_ms': SAMPLE_INTERVAL * 1000,
+            'hits_complete': self.exact,
+            'lines': lines,
+            'functions': [
+                {
+                    'function': _label(code),
+                    'line': code.co_firstlineno,
+                    'calls': self.calls.get(code, 0),
+                    'self_time_ms': round(elapsed / 1e6, 3),
+                    'percent': round(100 * elapsed / total_ns, 2)
+                }
+                for code, elapsed in sorted(functions.items(), key=lambda item: -item[1])
+            ],
+            'collapsed': [f'{stack} {round(elapsed / 1000)}' for stack, elapsed in stacks[:MAX_COLLAPSED_STACKS]],
+            'collapsed_truncated': len(stacks) > MAX_COLLAPSED_STACKS,
+            'error': error
+        }
+
+
+def _run_with_monitoring(compiled, namespace, profiler: Profiler):
+    monitoring = sys.monitoring
+    tool = monitoring.PROFILER_ID
+    events = monitoring.events
+    disable = monitoring.DISABLE
+
+    def on_start(code, offset):
+        if not _is_submission(code):
+            return disable
+        profiler.on_call(code)
+
+    def on_return(code, offset, value):
+        if not _is_submission(code):
+            return disable
+        profiler.on_return()
+
+    def on_unwind(code, offset, exception):
+        if _is_submission(code):
+            profiler.on_return()
+
+    def on_line(code, line):
+        if not _is_submission(code):
+            return disable
+        profiler.on_line(line)
+
+    profiler.disable_tracing = lambda: monitoring.set_events(tool, events.NO_EVENTS)
+    monitoring.use_tool_id(tool, 'algomaster-profiler')
+    try:
+        monitoring.register_callback(tool, events.PY_START, on_start)
+        monitoring.register_callback(tool, events.PY_RESUME, on_start)
+        monitoring.register_callback(tool, events.PY_RETURN, on_return)
+        monitoring.register_callback(tool, events.PY_YIELD, on_return)
+        monitoring.register_callback(tool, events.PY_UNWIND, on_unwind)
+        monitoring.register_callback(tool, events.LINE, on_line)
+        monitoring.set_events(
+            tool,
+            events.PY_START | events.PY_RESUME | events.PY_RETURN | events.PY_YIELD
+            | events.PY_UNWIND | events.LINE
+        )
+        exec(compiled, namespace)
+    finally:
+        monitoring.set_events(tool, events.NO_EVENTS)
+        monitoring.free_tool_id(tool)
+
+
+def _run_with_settrace(compiled, namespace, profiler: Profiler):
+    def local_trace(frame, event, arg):
+        if event == 'line':
+            profiler.on_line(frame.f_lineno)
+        elif event == 'return':
+            # Fired for normal returns, yields and exception unwinding alike
+            profiler.on_return()
+        return local_trace
+
+    def global_trace(frame, event, arg):
+        if not _is_submission(frame.f_code):
+            return None
+        profiler.on_call(frame.f_code)
+        return local_trace
+
+    # Clearing the global trace function stops local ones too, even mid-frame
+    profiler.disable_tracing = lambda: sys.settrace(None)
+    sys.settrace(global_trace)
+    try:
+        exec(compiled, namespace)
+    finally:
+        sys.settrace(None)
+
+
+def main():
+    with open(sys.argv[1]) as f:
+        code = f.read()
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 4.0
+
+    namespace = {
+        '__name__': '__submission__',
+        '__builtins__': {name: getattr(builtins, name) for name in SAFE_BUILTINS},
+        'test_input': sys.stdin.read()
+    }
+    compiled = compile(code, SUBMISSION_FILENAME, 'exec')
+
+    engine = 'sys.monitoring' if hasattr(sys, 'monitoring') else 'settrace'
+    profiler = Profiler(time.monotonic() + budget, engine)
+    real_stdout, sys.stdout = sys.stdout, _Discard()
+    error = None
+
+    started = time.perf_counter()
+    try:
+        if engine == 'sys.monitoring':
+            _run_with_monitoring(compiled, namespace, profiler)
+        else:
+            _run_with_settrace(compiled, namespace, profiler)
+    except ProfileBudgetExceeded as e:
+        error = {'type': 'TimeLimit', 'message': str(e)}
+    except Exception as e:
+        error = {'type': type(e).__name__, 'message': str(e)[:500]}
+    finally:
+        profiler.stop_sampling()
+        wall_time = time.perf_counter() - started
+        sys.stdout = real_stdout
+
+    json.dump(profiler.to_dict(code.splitlines(), wall_time, error), real_stdout, separators=(',', ':'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+Child-process runner for Python benchmark submissions
+
+Usage: python python_runner.py <code-file>
+
+Runs the submission with the same restricted builtins as the in-process
+benchmark. The whole of stdin is bound to `test_input`, and the `result`
+variable is printed when the code sets one. The runner is launched under
+utils.sandbox, so it must stay import-free of the ai-engine packages.
+"""
+
+import builtins
+import sys
+
+SAFE_BUILTINS = [
+    'len', 'range', 'enumerate', 'zip', 'map', 'filter',
+    'min', 'max', 'sum', 'abs', 'sorted', 'reversed',
+    'print', 'str', 'int', 'float', 'list', 'dict', 'set', 'tuple',
+    'bool', 'iter', 'next', '__build_class__'
+]
+
+
+def main():
+    with open(sys.argv[1]) as f:
+        code = f.read()
+
+    safe_globals = {
+        '__name__': '__submission__',
+        '__builtins__': {name: getattr(builtins, name) for name in SAFE_BUILTINS},
+        'test_input': sys.stdin.read()
+    }
+    exec(compile(code, '<submission>', 'exec'), safe_globals)
+
+    if 'result' in safe_globals:
+        print(safe_globals['result'])
+
+
+if __name__ == '__main__':
+    main()
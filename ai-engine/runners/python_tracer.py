@@ -0,0 +1,380 @@
+"""
+Child-process execution tracer for Python submissions
+
+Usage: python python_tracer.py <code-file> <time-budget-seconds>
+
+Runs the submission with the benchmark's restricted builtins while recording
+line events, the call stack, variable changes and a memory timeline.
+Uses sys.monitoring on Python 3.12+ and sys.settrace otherwise. The trace is
+written to stdout as one JSON document of columnar arrays; integer columns
+marked "delta" hold differences from the previous entry (the first entry is
+absolute). The submission's own prints are captured into the trace.
+
+Hot lines are sampled: each line is recorded for its first LINE_FULL_HITS
+executions, then every 2nd, 4th, 8th... hit as its count doubles, so a
+100k-iteration loop keeps a few hundred steps per line. Exact per-line hit
+counts are always reported.
+
+Memory is accounted per line by python_memory_profiler.MemorySampler: the
+timeline is sampled every MEMORY_SAMPLE_STEPS steps and the trace reports
+each line's allocation growth and share at the peak. Every handler measures
+traced memory on entry and exit so the recording itself is not charged to
+the submission. Like python_runner.py this file is launched under
+utils.sandbox and must stay import-free of the ai-engine packages; it only
+imports its sibling runner.
+"""
+
+import builtins
+import io
+import json
+import os
+import reprlib
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from python_memory_profiler import MemorySampler
+
+SAFE_BUILTINS = [
+    'len', 'range', 'enumerate', 'zip', 'map', 'filter',
+    'min', 'max', 'sum', 'abs', 'sorted', 'reversed',
+    'print', 'str', 'int', 'float', 'list', 'dict', 'set', 'tuple',
+    'bool', 'iter', 'next', '__build_class__'
+]
+
+SUBMISSION_FILENAME = '<submission>'
+
+LINE_FULL_HITS = 64           # executions of a line recorded before sampling starts
+CALL_FULL_HITS = 64           # same, per function, for call/return events
+MAX_RECORDED_STEPS = 50000    # hard caps keep the JSON trace to a few MB
+MAX_VARIABLE_CHANGES = 50000
+MAX_CALL_EVENTS = 20000
+MAX_DISTINCT_VALUES = 20000
+MAX_STDOUT_CHARS = 64 * 1024
+DEADLINE_CHECK_STEPS = 4096   # steps between wall-clock budget checks
+
+CALL, RETURN = 1, -1
+
+_value_repr = reprlib.Repr()
+_value_repr.maxstring = 60
+_value_repr.maxother = 60
+_value_repr.maxlist = _value_repr.maxtuple = _value_repr.maxset = 16
+_value_repr.maxdict = 8
+_value_repr.maxlevel = 2
+
+
+class TraceBudgetExceeded(Exception):
+    """Raised inside the submission when the time budget runs out"""
+
+
+class _CappedOutput(io.StringIO):
+    def write(self, text):
+        remaining = MAX_STDOUT_CHARS - self.tell()
+        if remaining > 0:
+            super().write(text[:remaining])
+        return len(text)
+
+
+def _is_sampled(hits: int, full_hits: int) -> bool:
+    """Record every hit up to full_hits, then every 2**k-th in each doubling range"""
+    if hits <= full_hits:
+        return True
+    stride = 1 << ((hits // full_hits).bit_length() - 1)
+    return hits % stride == 0
+
+
+def _delta(values):
+    previous, encoded = 0, []
+    for value in values:
+        encoded.append(value - previous)
+        previous = value
+    return encoded
+
+
+def _traceable(value) -> bool:
+    return not (callable(value) or type(value).__name__ == 'module')
+
+
+class Recorder:
+    """Accumulates trace columns; event handlers are shared by both engines"""
+
+    def __init__(self, deadline: float, memory: MemorySampler):
+        self.deadline = deadline
+        self.memory = memory
+        self.total_steps = 0
+        self.depth = 0
+        self.truncated = None
+
+        self.step_index, self.step_line, self.step_depth = [], [], []
+        self.line_hits = {}
+
+        self.var_step, self.var_depth, self.var_name, self.var_value = [], [], [], []
+        self.names, self.name_ids = [], {}
+        self.values, self.value_ids = [], {}
+        self.frame_values = {}
+
+        self.call_step, self.call_depth, self.call_function, self.call_kind = [], [], [], []
+        self.functions, self.function_ids = [], {}
+        self.function_hits = {}
+        self.recorded_frames = set()
+
+    def _intern(self, table, ids, item):
+        index = ids.get(item)
+        if index is None:
+            if len(table) >= MAX_DISTINCT_VALUES:
+                return None
+            index = ids[item] = len(table)
+            table.append(item)
+        return index
+
+    def _truncate(self, reason: str):
+        if self.truncated is None:
+            self.truncated = reason
+
+    def _snapshot_variables(self, frame):
+        """Record locals whose (bounded) repr changed since this frame was last sampled"""
+        if len(self.var_step) >= MAX_VARIABLE_CHANGES:
+            self._truncate('variable_changes')
+            return
+        previous = self.frame_values.setdefault(id(frame), {})
+        for name, value in list(frame.f_locals.items()):
+            if not name.isidentifier() or name.startswith('__') or not _traceable(value):
+                continue
+            try:
+                shown = _value_repr.repr(value)
+            except Exception:
+                shown = f'<{type(value).__name__}>'
+            if previous.get(name) == shown:
+                continue
+            previous[name] = shown
+            name_id = self._intern(self.names, self.name_ids, name)
+            value_id = self._intern(self.values, self.value_ids, shown)
+            if name_id is None or value_id is None:
+                self._truncate('distinct_values')
+                return
+            self.var_step.append(self.total_steps)
+            self.var_depth.append(self.depth)
+            self.var_name.append(name_id)
+            self.var_value.append(value_id)
+
+    def on_line(self, frame, line: int):
+        self.memory.pause()
+        try:
+            self._on_line(frame, line)
+        finally:
+            self.memory.resume()
+
+    def _on_line(self, frame, line: int):
+        self.total_steps += 1
+        steps = self.total_steps
+        if steps % DEADLINE_CHECK_STEPS == 0 and time.monotonic() > self.deadline:
+            self._truncate('time_limit')
+            raise TraceBudgetExceeded(f"Trace stopped after {steps} steps (time limit)")
+        self.memory.on_line(line, steps)
+
+        hits = self.line_hits.get(line, 0) + 1
+        self.line_hits[line] = hits
+        if not _is_sampled(hits, LINE_FULL_HITS):
+            return
+        if len(self.step_index) >= MAX_RECORDED_STEPS:
+            self._truncate('recorded_steps')
+            return
+        self.step_index.append(steps)
+        self.step_line.append(line)
+        self.step_depth.append(self.depth)
+        self._snapshot_variables(frame)
+
+    def on_call(self, frame):
+        self.memory.pause()
+        self.memory.call()
+        self._on_call(frame)
+        self.memory.resume()
+
+    def _on_call(self, frame):
+        self.depth += 1
+        code = frame.f_code
+        hits = self.function_hits.get(code, 0) + 1
+        self.function_hits[code] = hits
+        if not _is_sampled(hits, CALL_FULL_HITS):
+            return
+        if len(self.call_step) >= MAX_CALL_EVENTS:
+            self._truncate('call_events')
+            return
+        self.recorded_frames.add(id(frame))
+        self._record_call(frame, CALL)
+
+    def on_return(self, frame):
+        self.memory.pause()
+        self.memory.ret()
+        self._on_return(frame)
+        self.memory.resume()
+
+    def _on_return(self, frame):
+        if id(frame) in self.recorded_frames:
+            # Final snapshot so assignments on the last executed line show up
+            self._snapshot_variables(frame)
+            self.recorded_frames.discard(id(frame))
+            self._record_call(frame, RETURN)
+        self.frame_values.pop(id(frame), None)
+        self.depth -= 1
+
+    def _record_call(self, frame, kind: int):
+        label = frame.f_code.co_name
+        if label == '<module>':
+            label = 'main'
+        function_id = self._intern(self.functions, self.function_ids, label)
+        self.call_step.append(self.total_steps)
+        self.call_depth.append(self.depth)
+        self.call_function.append(function_id)
+        self.call_kind.append(kind)
+
+    def to_dict(self, engine: str, stdout: str, error, source_lines):
+        recorded = len(self.step_index)
+        return {
+            'format': 'columnar-delta-v1',
+            'engine': engine,
+            'total_steps': self.total_steps,
+            'recorded_steps': recorded,
+            'sampled': recorded < self.total_steps,
+            'truncated': self.truncated,
+            'steps': {
+                'step': _delta(self.step_index),
+                'line': _delta(self.step_line),
+                'depth': _delta(self.step_depth)
+            },
+            'line_hits': {str(line): hits for line, hits in sorted(self.line_hits.items())},
+            'variables': {
+                'names': self.names,
+                'values': self.values,
+                'step': _delta(self.var_step),
+                'depth': self.var_depth,
+                'name': self.var_name,
+                'value': self.var_value
+            },
+            'calls': {
+                'functions': self.functions,
+                'step': _delta(self.call_step),
+                'depth': self.call_depth,
+                'function': self.call_function,
+                'kind': self.call_kind
+            },
+            'memory': self.memory.to_dict(source_lines),
+            'stdout': stdout,
+            'error': error
+        }
+
+
+def _is_submission(code) -> bool:
+    return code.co_filename == SUBMISSION_FILENAME
+
+
+def _run_with_monitoring(compiled, namespace, recorder: Recorder):
+    monitoring = sys.monitoring
+    tool = monitoring.DEBUGGER_ID
+    events = monitoring.events
+    disable = monitoring.DISABLE
+
+    # Callbacks run on top of the monitored frame, so it is one level up
+    def on_start(code, offset):
+        if not _is_submission(code):
+            return disable
+        recorder.on_call(sys._getframe(1))
+
+    def on_return(code, offset, value):
+        if not _is_submission(code):
+            return disable
+        recorder.on_return(sys._getframe(1))
+
+    def on_unwind(code, offset, exception):
+        if _is_submission(code):
+            recorder.on_return(sys._getframe(1))
+
+    def on_line(code, line):
+        if not _is_submission(code):
+            return disable
+        recorder.on_line(sys._getframe(1), line)
+
+    monitoring.use_tool_id(tool, 'algomaster-tracer')
+    try:
+        monitoring.register_callback(tool, events.PY_START, on_start)
+        monitoring.register_callback(tool, events.PY_RESUME, on_start)
+        monitoring.register_callback(tool, events.PY_RETURN, on_return)
+        monitoring.register_callback(tool, events.PY_YIELD, on_return)
+        monitoring.register_callback(tool, events.PY_UNWIND, on_unwind)
+        monitoring.register_callback(tool, events.LINE, on_line)
+        monitoring.set_events(
+            tool,
+            events.PY_START | events.PY_RESUME | events.PY_RETURN | events.PY_YIELD
+            | events.PY_UNWIND | events.LINE
+        )
+        exec(compiled, namespace)
+    finally:
+        monitoring.set_events(tool, events.NO_EVENTS)
+        monitoring.free_tool_id(tool)
+
+
+def _run_with_settrace(compiled, namespace, recorder: Recorder):
+    def local_trace(frame, event, arg):
+        if event == 'line':
+            recorder.on_line(frame, frame.f_lineno)
+        elif event == 'return':
+            # Fired for normal returns, yields and exception unwinding alike
+            recorder.on_return(frame)
+        return local_trace
+
+    def global_trace(frame, event, arg):
+        if not _is_submission(frame.f_code):
+            return None
+        recorder.on_call(frame)
+        return local_trace
+
+    sys.settrace(global_trace)
+    try:
+        exec(compiled, namespace)
+    finally:
+        sys.settrace(None)
+
+
+def main():
+    with open(sys.argv[1]) as f:
+        code = f.read()
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 4.0
+
+    namespace = {
+        '__name__': '__submission__',
+        '__builtins__': {name: getattr(builtins, name) for name in SAFE_BUILTINS},
+        'test_input': sys.stdin.read()
+    }
+    compiled = compile(code, SUBMISSION_FILENAME, 'exec')
+
+    memory = MemorySampler()
+    recorder = Recorder(time.monotonic() + budget, memory)
+    engine = 'sys.monitoring' if hasattr(sys, 'monitoring') else 'settrace'
+    captured = _CappedOutput()
+    real_stdout, sys.stdout = sys.stdout, captured
+    error = None
+
+    memory.start()
+    try:
+        if engine == 'sys.monitoring':
+            _run_with_monitoring(compiled, namespace, recorder)
+        else:
+            _run_with_settrace(compiled, namespace, recorder)
+    except TraceBudgetExceeded as e:
+        error = {'type': 'TimeLimit', 'message': str(e), 'step': recorder.total_steps}
+    except Exception as e:
+        error = {'type': type(e).__name__, 'message': str(e)[:500], 'step': recorder.total_steps}
+    finally:
+        sys.stdout = real_stdout
+        memory.finish(recorder.total_steps)
+
+    stdout = captured.getvalue()
+    if error is None and 'result' in namespace:
+        stdout += f"{namespace['result']}\n"
+
+    json.dump(recorder.to_dict(engine, stdout, error, code.splitlines()), real_stdout, separators=(',', ':'))
+
+
+if __name__ == '__main__':
+    main()
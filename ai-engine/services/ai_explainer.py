@@ -3,9 +3,9 @@ Revolutionary AI-powered explanation and solution generation service
 """
 
 import asyncio
+import importlib
 from typing import Dict, List, Any, Optional
-from openai import AsyncOpenAI
-from anthropic import AsyncAnthropic
+from utils.llm import llm_call
 from utils.logger import setup_logger
 
 logger = setup_logger("ai_explainer")
@@ -20,8 +20,14 @@ class AIExplainer:
     async def initialize(self):
         """Initialize AI clients"""
         try:
-            self.openai_client = AsyncOpenAI()
-            self.anthropic_client = AsyncAnthropic()
+            # Client libraries are imported here, off the event loop, so importing
+            # the service (and main) stays cheap
+            openai, anthropic = await asyncio.gather(
+                asyncio.to_thread(importlib.import_module, "openai"),
+                asyncio.to_thread(importlib.import_module, "anthropic")
+            )
+            self.openai_client = openai.AsyncOpenAI()
+            self.anthropic_client = anthropic.AsyncAnthropic()
             logger.info("🧠 AI Explainer initialized with multiple AI models")
         except Exception as e:
             logger.error(f"❌ Failed to initialize AI explainer: {e}")
@@ -52,33 +58,79 @@ class AIExplainer:
             """
             
             # Use GPT-4 for detailed explanations
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert algorithm educator. Create engaging, comprehensive explanations that help students deeply understand algorithms."},
-                    {"role": "user", "content": explanation_prompt}
-                ],
-                temperature=0.3
-            )
+            async with llm_call():
+                response = await self.openai_client.chat.completions.create(
+                    model="gpt-4",
+                    messages=[
+                        {"role": "system", "content": "You are an expert algorithm educator. Create engaging, comprehensive explanations that help students deeply understand algorithms."},
+                        {"role": "user", "content": explanation_prompt}
+                    ],
+                    temperature=0.3
+                )
             
             explanation = response.choices[0].message.content
             
-            # Generate interactive elements
-            interactive_elements = await self._generate_interactive_elements(code, language)
-            
             return {
-                "explanation": explanation,
-                "difficulty_level": await self._assess_difficulty(code, language),
-                "learning_objectives": await self._extract_learning_objectives(code, language),
-                "interactive_elements": interactive_elements,
-                "prerequisite_concepts": await self._identify_prerequisites(code, language),
-                "follow_up_exercises": await self._suggest_exercises(code, language)
+                **await self.static_explanation(code, language),
+                "explanation": explanation
             }
             
         except Exception as e:
             logger.error(f"❌ Explanation generation failed: {e}")
             return {"error": str(e)}
 
+    async def static_explanation(self, code: str, language: str) -> Dict[str, Any]:
+        """
+        Learning material that needs no LLM, with an empty explanation; served
+        on its own when the LLM is unavailable
+        """
+        # Generate interactive elements
+        interactive_elements = await self._generate_interactive_elements(code, language)
+        
+        return {
+            "explanation": "",
+            "difficulty_level": await self._assess_difficulty(code, language),
+            "learning_objectives": await self._extract_learning_objectives(code, language),
+            "interactive_elements": interactive_elements,
+            "prerequisite_concepts": await self._identify_prerequisites(code, language),
+            "follow_up_exercises": await self._suggest_exercises(code, language)
+        }
+
+    async def explain_function(self, code: str, language: str, function_name: str) -> Dict[str, Any]:
+        """
+        Short explanation of a single function, used when only that function changed
+        """
+        try:
+            function_prompt = f"""
+            Explain what this {language} function `{function_name}` does:
+
+            ```{language}
+            {code}
+            ```
+
+            Cover its purpose, how it works step by step, and its time and space complexity.
+            Keep it under 200 words.
+            """
+
+            async with llm_call():
+                response = await self.openai_client.chat.completions.create(
+                    model="gpt-4",
+                    messages=[
+                        {"role": "system", "content": "You are an expert algorithm educator. Explain code concisely and accurately."},
+                        {"role": "user", "content": function_prompt}
+                    ],
+                    temperature=0.3
+                )
+
+            return {
+                "function": function_name,
+                "explanation": response.choices[0].message.content
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Function explanation failed: {e}")
+            return {"error": str(e)}
+
     async def suggest_optimizations(self, code: str, complexity_analysis: Dict, quality_assessment: Dict) -> List[Dict[str, Any]]:
         """
         Generate AI-powered optimization suggestions
@@ -105,14 +157,15 @@ class AIExplainer:
             5. Trade-offs to consider
             """
             
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert code optimizer. Provide practical, actionable optimization suggestions."},
-                    {"role": "user", "content": optimization_prompt}
-                ],
-                temperature=0.2
-            )
+            async with llm_call():
+                response = await self.openai_client.chat.completions.create(
+                    model="gpt-4",
+                    messages=[
+                        {"role": "system", "content": "You are an expert code optimizer. Provide practical, actionable optimization suggestions."},
+                        {"role": "user", "content": optimization_prompt}
+                    ],
+                    temperature=0.2
+                )
             
             optimizations = await self._parse_optimizations(response.choices[0].message.content)
             
@@ -145,14 +198,15 @@ class AIExplainer:
             Make the solution educational and production-ready!
             """
             
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": f"You are an expert {target_language} developer and algorithm designer. Create clean, efficient, well-documented solutions."},
-                    {"role": "user", "content": solution_prompt}
-                ],
-                temperature=0.3
-            )
+            async with llm_call():
+                response = await self.openai_client.chat.completions.create(
+                    model="gpt-4",
+                    messages=[
+                        {"role": "system", "content": f"You are an expert {target_language} developer and algorithm designer. Create clean, efficient, well-documented solutions."},
+                        {"role": "user", "content": solution_prompt}
+                    ],
+                    temperature=0.3
+                )
             
             solution_content = response.choices[0].message.content
             
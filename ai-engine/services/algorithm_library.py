@@ -0,0 +1,376 @@
+"""
+Searchable library of the bundled algorithms/ corpus
+"""
+
+import asyncio
+import bisect
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Dict, List, Any, Optional, Set, Tuple
+from tree_sitter import Parser
+from services.cfg_builder import LANGUAGE_SPECS
+from services.corpus_harness import ALGORITHMS_ROOT, CORPUS_LANGUAGES, corpus_files
+from utils.parsers import get_language
+from utils.logger import setup_logger
+
+logger = setup_logger("algorithm_library")
+
+INDEX_FORMAT = 1
+RESCAN_INTERVAL = 30  # seconds between stat sweeps of the corpus
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Search weight of a term by where it occurs
+FIELD_WEIGHTS = {'name': 4, 'company': 3, 'category': 2, 'function': 2, 'identifier': 1}
+
+# Metadata fields that can be used as exact-match filters
+FILTER_FIELDS = ('category', 'language', 'detected_complexity', 'companies')
+
+_IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+_WORD = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+')
+_SORT_CALL = re.compile(r'\bsort\s*\(|\bsorted\s*\(|\.sort\s*\(')
+_HALVING = re.compile(r'/=\s*2\b|>>=\s*1\b|\bmid\b|/\s*2\b')
+_STOP_WORDS = {'the', 'and', 'of', 'in', 'a', 'an', 'to', 'is', 'int', 'return', 'vector', 'auto', 'const'}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase search terms; camelCase, snake_case and punctuation all split"""
+    terms = []
+    for word in _IDENTIFIER.findall(text) + re.findall(r'[0-9]+', text):
+        for part in _WORD.findall(word):
+            part = part.lower()
+            if part not in _STOP_WORDS and (len(part) > 1 or part.isdigit()):
+                terms.append(part)
+    return terms
+
+
+def _split_name(stem: str) -> Tuple[str, List[str]]:
+    """'Adobe,Microsoft-AntiDiagonals' -> ('AntiDiagonals', ['Adobe', 'Microsoft'])"""
+    prefix, dash, rest = stem.partition('-')
+    if dash and ',' in prefix:
+        return rest, [company.strip() for company in prefix.split(',') if company.strip()]
+    return stem, []
+
+
+class _MetricsExtractor:
+    """AST metrics and a static complexity estimate for one corpus file"""
+
+    def __init__(self):
+        self.parsers: Dict[str, Parser] = {}
+
+    def parser(self, language: str) -> Parser:
+        # Own parsers: extraction runs on an executor thread, and the shared
+        # ones in utils.parsers belong to the event loop thread
+        if language not in self.parsers:
+            parser = Parser()
+            parser.set_language(get_language(language))
+            self.parsers[language] = parser
+        return self.parsers[language]
+
+    def extract(self, source: bytes, language: str) -> Dict[str, Any]:
+        spec = LANGUAGE_SPECS[language]
+        function_types = set(spec['function'])
+        loop_types = set(spec['loop'] + spec['do'])
+        branch_types = set(spec['if'] + spec['switch'])
+        tree = self.parser(language).parse(source)
+
+        functions, calls = [], set()
+        loops = branches = max_loop_depth = max_depth = 0
+        stack = [(tree.root_node, 0, 0)]
+        while stack:
+            node, depth, loop_depth = stack.pop()
+            max_depth = max(max_depth, depth)
+            if node.type in function_types:
+                name = self._function_name(node)
+                if name:
+                    functions.append(name)
+            elif node.type in loop_types:
+                loops += 1
+                loop_depth += 1
+                max_loop_depth = max(max_loop_depth, loop_depth)
+            elif node.type in branch_types:
+                branches += 1
+            elif node.type in ('call', 'call_expression', 'method_invocation'):
+                callee = node.child_by_field_name('function') or node.child_by_field_name('name')
+                if callee is not None:
+                    calls.add(callee.text.decode('utf8', 'replace').split('::')[-1].split('.')[-1])
+            stack.extend((child, depth + 1, loop_depth) for child in node.children)
+
+        text = source.decode('utf8', 'replace')
+        recursive = any(name in calls for name in functions)
+        return {
+            'functions': functions,
+            'function_count': len(functions),
+            'loop_count': loops,
+            'branch_count': branches,
+            'max_loop_nesting': max_loop_depth,
+            'max_ast_depth': max_depth,
+            'recursive': recursive,
+            'has_syntax_errors': tree.root_node.has_error,
+            'detected_complexity': self._estimate(max_loop_depth, recursive, text)
+        }
+
+    @staticmethod
+    def _function_name(node) -> Optional[str]:
+        name = node.child_by_field_name('name')
+        declarator = node.child_by_field_name('declarator')
+        while name is None and declarator is not None:
+            # C++: function_declarator -> qualified_identifier / identifier
+            inner = declarator.child_by_field_name('declarator')
+            if inner is None or declarator.type in ('qualified_identifier', 'identifier', 'field_identifier'):
+                name = declarator
+                break
+            declarator = inner
+        return name.text.decode('utf8', 'replace').split('::')[-1] if name is not None else None
+
+    @staticmethod
+    def _estimate(loop_nesting: int, recursive: bool, text: str) -> str:
+        """Static estimate from loop nesting, recursion, sorting and halving patterns"""
+        if recursive and loop_nesting == 0:
+            return "O(log n)" if _HALVING.search(text) else "O(2^n)"
+        if loop_nesting == 0:
+            return "O(n log n)" if _SORT_CALL.search(text) else "O(1)"
+        if loop_nesting == 1:
+            if _SORT_CALL.search(text):
+                return "O(n log n)"
+            return "O(log n)" if _HALVING.search(text) else "O(n)"
+        return "O(n²)" if loop_nesting == 2 else f"O(n^{loop_nesting})"
+
+
+class AlgorithmLibrary:
+    """Metadata and inverted index over algorithms/, persisted and refreshed incrementally"""
+
+    def __init__(self, index_path: Optional[str] = None):
+        self.index_path = index_path or os.getenv(
+            "LIBRARY_INDEX_PATH", os.path.join(tempfile.gettempdir(), "algomaster-library-index.json")
+        )
+        self.documents: List[Dict[str, Any]] = []
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.vocabulary: List[str] = []
+        self.filters: Dict[str, Dict[str, Set[int]]] = {}
+        self.last_scan = 0.0
+        self._extractor = _MetricsExtractor()
+        self._lock = asyncio.Lock()
+
+    async def initialize(self):
+        """Load the prebuilt index if there is one, then bring it up to date"""
+        try:
+            await self.refresh(force=True)
+            logger.info(f"📚 Algorithm library indexed: {len(self.documents)} solutions")
+        except Exception as e:
+            logger.error(f"❌ Failed to index algorithm library: {e}")
+            raise
+
+    async def refresh(self, force: bool = False):
+        """Rescan the corpus (at most every RESCAN_INTERVAL seconds unless forced)"""
+        if not force and time.monotonic() - self.last_scan < RESCAN_INTERVAL:
+            return
+        async with self._lock:
+            if not force and time.monotonic() - self.last_scan < RESCAN_INTERVAL:
+                return
+            loop = asyncio.get_running_loop()
+            documents, changed = await loop.run_in_executor(None, self._scan)
+            # Swap the index in on the event loop thread so searches never see a half-built one
+            if changed or not self.postings:
+                self._build_index(documents)
+            if changed:
+                await loop.run_in_executor(None, self._save)
+            self.last_scan = time.monotonic()
+
+    def _load_stored(self) -> Dict[str, Dict[str, Any]]:
+        if self.documents:
+            return {document['path']: document for document in self.documents}
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored.get('format') == INDEX_FORMAT:
+                return {document['path']: document for document in stored['documents']}
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    def _scan(self) -> Tuple[List[Dict[str, Any]], bool]:
+        """Reuse entries whose mtime and size are unchanged; rehash the rest, re-extract on new content"""
+        started = time.perf_counter()
+        stored = self._load_stored()
+        documents, reused, rehashed, extracted = [], 0, 0, 0
+
+        for relative_path in corpus_files():
+            path = os.path.join(ALGORITHMS_ROOT, relative_path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            previous = stored.get(relative_path)
+            if previous and previous['mtime'] == stat.st_mtime and previous['size_bytes'] == stat.st_size:
+                documents.append(previous)
+                reused += 1
+                continue
+
+            with open(path, 'rb') as f:
+                source = f.read()
+            content_hash = hashlib.sha256(source).hexdigest()
+            if previous and previous['content_hash'] == content_hash:
+                document = {**previous, 'mtime': stat.st_mtime, 'size_bytes': stat.st_size}
+                rehashed += 1
+            else:
+                document = self._describe(relative_path, source, content_hash, stat)
+                extracted += 1
+            documents.append(document)
+
+        logger.info(
+            f"🔎 Library scan: {reused} unchanged, {rehashed} touched, {extracted} (re)indexed "
+            f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+        return documents, bool(rehashed or extracted or len(documents) != len(stored))
+
+    def _describe(self, relative_path: str, source: bytes, content_hash: str, stat) -> Dict[str, Any]:
+        language = CORPUS_LANGUAGES[os.path.splitext(relative_path)[1]]
+        parts = relative_path.split(os.sep)
+        category = parts[1] if len(parts) > 2 else "Uncategorized"
+        name, companies = _split_name(os.path.splitext(parts[-1])[0])
+        metrics = self._extractor.extract(source, language)
+
+        terms: Dict[str, int] = {}
+
+        def add(text: str, field: str):
+            for term in tokenize(text):
+                terms[term] = max(terms.get(term, 0), FIELD_WEIGHTS[field])
+
+        text = source.decode('utf8', 'replace')
+        add(text, 'identifier')
+        for function in metrics['functions']:
+            add(function, 'function')
+        add(category, 'category')
+        for company in companies:
+            add(company, 'company')
+        add(name, 'name')
+
+        return {
+            'path': relative_path,
+            'name': name,
+            'category': category,
+            'language': language,
+            'companies': companies,
+            'line_count': text.count('\n') + 1,
+            'size_bytes': stat.st_size,
+            'mtime': stat.st_mtime,
+            'content_hash': content_hash,
+            'detected_complexity': metrics.pop('detected_complexity'),
+            'ast_metrics': metrics,
+            'terms': terms
+        }
+
+    def _build_index(self, documents: List[Dict[str, Any]]):
+        documents.sort(key=lambda document: document['path'])
+        postings: Dict[str, Dict[int, int]] = {}
+        filters: Dict[str, Dict[str, Set[int]]] = {field: {} for field in FILTER_FIELDS}
+        for doc_id, document in enumerate(documents):
+            for term, weight in document['terms'].items():
+                postings.setdefault(term, {})[doc_id] = weight
+            for field in FILTER_FIELDS:
+                values = document[field] if isinstance(document[field], list) else [document[field]]
+                for value in values:
+                    filters[field].setdefault(value.lower(), set()).add(doc_id)
+        self.documents = documents
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+        self.filters = filters
+
+    def _save(self):
+        """Atomic write so a crashed scan never leaves a half-written index"""
+        directory = os.path.dirname(self.index_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix='.library-', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'format': INDEX_FORMAT, 'documents': self.documents}, f, separators=(',', ':'))
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not persist library index: {e}")
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def _term_postings(self, term: str, prefix: bool) -> Dict[int, int]:
+        """Postings for a term; the last query term also matches as a prefix (type-ahead)"""
+        if not prefix:
+            return self.postings.get(term, {})
+        merged: Dict[int, int] = {}
+        start = bisect.bisect_left(self.vocabulary, term)
+        for candidate in self.vocabulary[start:]:
+            if not candidate.startswith(term):
+                break
+            for doc_id, weight in self.postings[candidate].items():
+                # An exact match outranks a completion
+                weight = weight if candidate == term else weight / 2
+                if weight > merged.get(doc_id, 0):
+                    merged[doc_id] = weight
+        return merged
+
+    def search(self, query: str = "", category: Optional[str] = None, language: Optional[str] = None,
+               complexity: Optional[str] = None, company: Optional[str] = None,
+               page: int = 1, page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+        """
+        Filtered, ranked and paginated library listing
+
+        Every query term must match (AND); results rank by the summed field
+        weights of the matching terms, then by name. Without a query the
+        filtered library is listed by category and name.
+        """
+        started = time.perf_counter()
+        page = max(1, page)
+        page_size = min(max(1, page_size), MAX_PAGE_SIZE)
+
+        candidates: Optional[Set[int]] = None
+        for field, value in (('category', category), ('language', language),
+                             ('detected_complexity', complexity), ('companies', company)):
+            if value:
+                matching = self.filters.get(field, {}).get(value.lower(), set())
+                candidates = matching if candidates is None else candidates & matching
+
+        terms = tokenize(query)
+        if terms:
+            term_postings = [self._term_postings(term, prefix=index == len(terms) - 1)
+                             for index, term in enumerate(terms)]
+            term_postings.sort(key=len)
+            scores = dict(term_postings[0])
+            for postings in term_postings[1:]:
+                scores = {doc_id: score + postings[doc_id] for doc_id, score in scores.items() if doc_id in postings}
+            if candidates is not None:
+                scores = {doc_id: score for doc_id, score in scores.items() if doc_id in candidates}
+            ranked = sorted(scores, key=lambda doc_id: (-scores[doc_id], self.documents[doc_id]['name']))
+        else:
+            scores = {}
+            ids = range(len(self.documents)) if candidates is None else candidates
+            ranked = sorted(ids, key=lambda doc_id: (self.documents[doc_id]['category'],
+                                                     self.documents[doc_id]['name']))
+
+        offset = (page - 1) * page_size
+        results = []
+        for doc_id in ranked[offset:offset + page_size]:
+            document = {key: value for key, value in self.documents[doc_id].items() if key != 'terms'}
+            if scores:
+                document['score'] = scores[doc_id]
+            results.append(document)
+
+        return {
+            'query': query,
+            'total_matches': len(ranked),
+            'page': page,
+            'page_size': page_size,
+            'total_pages': (len(ranked) + page_size - 1) // page_size,
+            'results': results,
+            'query_time_ms': round((time.perf_counter() - started) * 1000, 3)
+        }
+
+    def facets(self) -> Dict[str, Dict[str, int]]:
+        """Solution counts per category, language and detected complexity"""
+        counts: Dict[str, Dict[str, int]] = {'category': {}, 'language': {}, 'detected_complexity': {}}
+        for document in self.documents:
+            for field, values in counts.items():
+                values[document[field]] = values.get(document[field], 0) + 1
+        return counts
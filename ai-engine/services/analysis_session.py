@@ -0,0 +1,533 @@
+"""
+Incremental re-analysis of code that is edited between requests
+
+A session keeps the last source, its Tree-sitter tree and a cache of stage
+results. Each new version of the code is diffed against the previous one
+(common prefix/suffix, which covers the single contiguous change an editor
+sends between keystrokes), applied to the old tree with Tree.edit and
+reparsed with the old tree as a base, so Tree-sitter reuses every subtree
+the edit did not touch.
+
+Stages only run again when their input changed:
+
+    metrics        per function, keyed by the function's source
+    anti_patterns  per function, keyed by the function's source
+    cfg            whole file, keyed by the exact source (line numbers matter)
+    explanation    per function (LLM), keyed by the function's source
+    benchmark      whole file, keyed by its tokens without comments or
+                   whitespace, the test cases and the optimization level
+
+Every edit reports the reparse time and, per stage, how many results were
+reused from the cache versus computed.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+from services.cfg_builder import LANGUAGE_SPECS, _function_name, build_cfg
+from utils.parsers import get_parser
+from utils.logger import setup_logger
+
+logger = setup_logger("analysis_session")
+
+SESSION_LIMIT = int(os.getenv("ANALYSIS_SESSION_LIMIT", "500"))      # sessions kept per worker (LRU)
+SESSION_TTL = float(os.getenv("ANALYSIS_SESSION_TTL", "1800"))       # idle seconds before a session expires
+STAGE_CACHE_SIZE = int(os.getenv("ANALYSIS_STAGE_CACHE_SIZE", "256"))  # stage results kept per session beyond the current version
+
+STAGES = ("metrics", "anti_patterns", "cfg", "explanation", "benchmark")
+PER_FUNCTION_STAGES = ("metrics", "anti_patterns", "explanation")
+
+LONG_FUNCTION_LINES = 60   # longer functions are flagged
+MAX_LOOP_NESTING = 2       # loops nested deeper than this are flagged
+
+CALL_TYPES = {
+    'python': ('call',),
+    'cpp': ('call_expression',),
+    'java': ('method_invocation',),
+    'javascript': ('call_expression',)
+}
+
+
+def _digest(*parts: Any) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode('utf8'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+def _common_prefix(a: bytes, b: bytes) -> int:
+    """Length of the common prefix, by bisection over slice comparisons"""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a: bytes, b: bytes, limit: int) -> int:
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:] == b[len(b) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _point(source: bytes, offset: int) -> Tuple[int, int]:
+    """(row, byte column) of a byte offset, as Tree-sitter counts them"""
+    row = source.count(b'\n', 0, offset)
+    return row, offset - (source.rfind(b'\n', 0, offset) + 1)
+
+
+def compute_edit(old: bytes, new: bytes) -> Optional[Dict[str, Any]]:
+    """The single edit turning old into new, in Tree.edit's terms; None if equal"""
+    if old == new:
+        return None
+    start = _common_prefix(old, new)
+    suffix = _common_suffix(old, new, min(len(old), len(new)) - start)
+    old_end, new_end = len(old) - suffix, len(new) - suffix
+    return {
+        'start_byte': start,
+        'old_end_byte': old_end,
+        'new_end_byte': new_end,
+        'start_point': _point(old, start),
+        'old_end_point': _point(old, old_end),
+        'new_end_point': _point(new, new_end)
+    }
+
+
+def function_metrics(node, language: str) -> Dict[str, Any]:
+    """Structural metrics of one function body; nested functions are measured on their own"""
+    spec = LANGUAGE_SPECS[language]
+    calls = CALL_TYPES.get(language, ())
+    branch_types = spec['if'] + spec['case'] + spec['handler']
+    loop_types = spec['loop'] + spec['do']
+    metrics = {'loops': 0, 'branches': 0, 'returns': 0, 'calls': 0, 'max_loop_depth': 0}
+
+    stack = [(child, 0) for child in node.named_children]
+    while stack:
+        current, depth = stack.pop()
+        if current.type in spec['function']:
+            continue
+        if current.type in loop_types:
+            metrics['loops'] += 1
+            depth += 1
+            metrics['max_loop_depth'] = max(metrics['max_loop_depth'], depth)
+        elif current.type in branch_types:
+            metrics['branches'] += 1
+        elif current.type in spec['return']:
+            metrics['returns'] += 1
+        elif current.type in calls:
+            metrics['calls'] += 1
+        stack.extend((child, depth) for child in current.named_children)
+
+    metrics['cyclomatic_complexity'] = 1 + metrics['loops'] + metrics['branches']
+    metrics['lines'] = node.end_point[0] - node.start_point[0] + 1
+    return metrics
+
+
+def _callee(node, source: bytes) -> str:
+    callee = node.child_by_field_name('function') or node.child_by_field_name('name')
+    return source[callee.start_byte:callee.end_byte].decode('utf8', errors='replace') if callee else ""
+
+
+def function_anti_patterns(node, name: str, source: bytes, language: str) -> List[Dict[str, Any]]:
+    """
+    Common performance and robustness mistakes in one function, found on the syntax tree
+
+    Lines are relative to the function's first line so the result stays valid
+    when the function moves.
+    """
+    spec = LANGUAGE_SPECS[language]
+    calls = CALL_TYPES.get(language, ())
+    loop_types = spec['loop'] + spec['do']
+    first_line = node.start_point[0]
+    findings = []
+
+    def report(pattern: str, at, message: str):
+        findings.append({'pattern': pattern, 'line': at.start_point[0] - first_line + 1, 'message': message})
+
+    self_calls = 0
+    stack = [(child, 0) for child in node.named_children]
+    while stack:
+        current, depth = stack.pop()
+        if current.type in spec['function']:
+            continue
+        if current.type in loop_types:
+            depth += 1
+            if depth == MAX_LOOP_NESTING + 1:
+                report('nested_loops', current, f"{depth} nested loops: at least O(n^{depth}) on equal-sized inputs")
+        elif current.type in calls:
+            callee = _callee(current, source)
+            arguments = current.child_by_field_name('arguments')
+            args = source[arguments.start_byte:arguments.end_byte].decode('utf8', errors='replace') if arguments else ""
+            if callee.rsplit('.', 1)[-1] == name:
+                self_calls += 1
+            if depth and callee.rsplit('.', 1)[-1].rsplit('::', 1)[-1] in ('sort', 'sorted'):
+                report('sort_in_loop', current, "Sorting inside a loop; sort once outside or keep the data ordered")
+            if depth and language == 'python' and (
+                    (callee.endswith('.pop') and args.replace(' ', '') == '(0)') or
+                    (callee.endswith('.insert') and args.replace(' ', '').startswith('(0,'))):
+                report('list_front_in_loop', current, "list.pop(0)/insert(0, x) in a loop is O(n) each; use collections.deque")
+        elif current.type in spec['handler']:
+            body = current.child_by_field_name('body') or next(
+                (child for child in current.named_children if child.type in spec['block']), None)
+            statements = [child for child in (body.named_children if body else []) if 'comment' not in child.type]
+            if all(child.type == 'pass_statement' for child in statements):
+                report('swallowed_exception', current, "Exception is caught and ignored")
+        stack.extend((child, depth) for child in current.named_children)
+
+    if self_calls >= 2:
+        decorators = node.parent.type == 'decorated_definition' and b'cache' in source[node.parent.start_byte:node.start_byte]
+        if not decorators:
+            report('exponential_recursion', node,
+                   f"{name} calls itself {self_calls} times per call; memoize overlapping subproblems")
+    lines = node.end_point[0] - node.start_point[0] + 1
+    if lines > LONG_FUNCTION_LINES:
+        report('long_function', node, f"{lines} lines; split into smaller functions")
+    return sorted(findings, key=lambda finding: finding['line'])
+
+
+def token_digest(tree, source: bytes) -> str:
+    """Hash of the leaf tokens without comments, so reformatting keeps the same key"""
+    h = hashlib.blake2b(digest_size=16)
+    cursor = tree.walk()
+    visited_children = False
+    while True:
+        node = cursor.node
+        if not visited_children:
+            if 'comment' in node.type:
+                visited_children = True
+                continue
+            if node.child_count == 0:
+                h.update(source[node.start_byte:node.end_byte])
+                h.update(b'\x00')
+            if cursor.goto_first_child():
+                continue
+            visited_children = True
+        elif cursor.goto_next_sibling():
+            visited_children = False
+        elif not cursor.goto_parent():
+            break
+    return h.hexdigest()
+
+
+class _StageCache:
+    """LRU of stage results keyed by (stage, input digest)"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._entries: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        entry = self._entries.get((stage, key))
+        if entry is not None:
+            self._entries.move_to_end((stage, key))
+        return entry
+
+    def put(self, stage: str, key: str, value: Any):
+        self._entries[(stage, key)] = value
+        self._entries.move_to_end((stage, key))
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+
+class AnalysisSession:
+    """Last parsed version of one editor buffer and the stage results derived from it"""
+
+    def __init__(self, session_id: str, language: str):
+        self.session_id = session_id
+        self.language = language
+        self.source = b""
+        self.tree = None
+        self.functions: Dict[str, Dict[str, Any]] = {}
+        self.cache = _StageCache(STAGE_CACHE_SIZE)
+        self.version = 0
+        self.last_used = time.monotonic()
+        self.totals = {'edits': 0, 'reparse_ms': 0.0, 'reused': 0, 'computed': 0}
+
+    def reparse(self, code: str, language: str) -> Dict[str, Any]:
+        """Parse the new version incrementally; full parse on the first version or a language change"""
+        new = code.encode('utf8')
+        parser = get_parser(language)
+        edit = None
+        started = time.perf_counter()
+        if self.tree is None or language != self.language:
+            tree = parser.parse(new)
+            incremental = False
+        else:
+            edit = compute_edit(self.source, new)
+            if edit is None:
+                tree = self.tree
+            else:
+                self.tree.edit(**edit)
+                tree = parser.parse(new, self.tree)
+            incremental = True
+        reparse_ms = (time.perf_counter() - started) * 1000
+
+        changed_ranges = []
+        if incremental and edit is not None:
+            changed_ranges = [
+                {'start_line': r.start_point[0] + 1, 'end_line': r.end_point[0] + 1}
+                for r in self.tree.changed_ranges(tree)
+            ]
+
+        self.language = language
+        self.source = new
+        self.tree = tree
+        return {
+            'incremental': incremental,
+            'edit': None if edit is None else {
+                'start_byte': edit['start_byte'],
+                'old_end_byte': edit['old_end_byte'],
+                'new_end_byte': edit['new_end_byte'],
+                'start_line': edit['start_point'][0] + 1
+            },
+            'changed_ranges': changed_ranges,
+            'reparse_ms': round(reparse_ms, 3)
+        }
+
+    def diff_functions(self) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, List[str]]]:
+        """Functions of the current tree by key (name#n) and which ones changed since the last version"""
+        spec = LANGUAGE_SPECS[self.language]
+        functions: Dict[str, Dict[str, Any]] = {}
+        seen: Dict[str, int] = {}
+        stack = [self.tree.root_node]
+        found = []
+        while stack:
+            node = stack.pop()
+            if node.type in spec['function']:
+                found.append(node)
+            stack.extend(reversed(node.named_children))
+
+        for node in found:
+            name = _function_name(node, self.source)
+            occurrence = seen.get(name, 0)
+            seen[name] = occurrence + 1
+            text = self.source[node.start_byte:node.end_byte]
+            # Anti-patterns also read the decorators, so their key covers them
+            outer = node.parent if node.parent is not None and node.parent.type == 'decorated_definition' else node
+            functions[f"{name}#{occurrence}"] = {
+                'name': name,
+                'node': node,
+                'digest': _digest(self.language, text),
+                'pattern_digest': _digest(self.language, self.source[outer.start_byte:outer.end_byte]),
+                'start_line': node.start_point[0] + 1,
+                'end_line': node.end_point[0] + 1
+            }
+
+        previous = self.functions
+        changes = {
+            'changed': [key for key in functions if key in previous and previous[key]['digest'] != functions[key]['digest']],
+            'added': [key for key in functions if key not in previous],
+            'removed': [key for key in previous if key not in functions],
+            'unchanged': [key for key in functions if key in previous and previous[key]['digest'] == functions[key]['digest']]
+        }
+        self.functions = {key: {k: v for k, v in info.items() if k != 'node'} for key, info in functions.items()}
+        return functions, changes
+
+
+class AnalysisSessionManager:
+    """Per-user analysis sessions with incremental reparsing and stage result reuse"""
+
+    def __init__(self, ai_explainer=None, benchmarker=None):
+        self.ai_explainer = ai_explainer
+        self.benchmarker = benchmarker
+        self.sessions: "OrderedDict[Tuple[str, str], AnalysisSession]" = OrderedDict()
+
+    def _session(self, user_id: str, session_id: Optional[str], language: str) -> AnalysisSession:
+        self._expire()
+        session_id = session_id or uuid.uuid4().hex
+        key = (user_id, session_id)
+        session = self.sessions.get(key)
+        if session is None:
+            session = AnalysisSession(session_id, language)
+            self.sessions[key] = session
+            while len(self.sessions) > SESSION_LIMIT:
+                self.sessions.popitem(last=False)
+        self.sessions.move_to_end(key)
+        session.last_used = time.monotonic()
+        return session
+
+    def _expire(self):
+        cutoff = time.monotonic() - SESSION_TTL
+        while self.sessions:
+            key, session = next(iter(self.sessions.items()))
+            if session.last_used >= cutoff:
+                break
+            del self.sessions[key]
+
+    def close(self, user_id: str, session_id: str) -> bool:
+        return self.sessions.pop((user_id, session_id), None) is not None
+
+    async def analyze(self, user_id: str, code: str, language: str, session_id: Optional[str] = None,
+                      stages: Optional[List[str]] = None, test_cases: Optional[List[Dict[str, Any]]] = None,
+                      optimization_level: str = "O2") -> Dict[str, Any]:
+        """
+        Analyze the next version of a session's code, recomputing only what the edit invalidated
+        """
+        if language not in LANGUAGE_SPECS:
+            raise ValueError(f"Unsupported language: {language}")
+        stages = list(stages or STAGES)
+        unknown = [stage for stage in stages if stage not in STAGES]
+        if unknown:
+            raise ValueError(f"Unknown stages: {', '.join(unknown)} (expected {', '.join(STAGES)})")
+
+        session = self._session(user_id, session_id, language)
+        # Reparsing and cache lookups do not await, so each call applies its version
+        # atomically; only the invalidated stages run concurrently with other calls
+        started = time.perf_counter()
+        parse = session.reparse(code, language)
+        functions, changes = session.diff_functions()
+        session.version += 1
+
+        reuse = {stage: {'reused': 0, 'computed': 0} for stage in stages}
+        results: Dict[str, Any] = {}
+        pending = {}
+
+        def lookup(stage: str, key: str, compute):
+            # Identical functions share one computation
+            cached = session.cache.get(stage, key)
+            if cached is not None or (stage, key) in pending:
+                reuse[stage]['reused'] += 1
+                return cached
+            reuse[stage]['computed'] += 1
+            pending[(stage, key)] = compute
+            return None
+
+        if "metrics" in stages:
+            results['metrics'] = {}
+            for key, info in functions.items():
+                value = lookup("metrics", info['digest'],
+                               lambda node=info['node']: function_metrics(node, language))
+                results['metrics'][key] = value
+
+        if "anti_patterns" in stages:
+            results['anti_patterns'] = {}
+            for key, info in functions.items():
+                results['anti_patterns'][key] = lookup(
+                    "anti_patterns", info['pattern_digest'],
+                    lambda node=info['node'], name=info['name'], source=session.source:
+                    function_anti_patterns(node, name, source, language)
+                )
+
+        if "cfg" in stages:
+            results['cfg'] = lookup("cfg", _digest(language, session.source),
+                                    lambda tree=session.tree: build_cfg(code, language, tree))
+
+        if "explanation" in stages:
+            results['explanation'] = {}
+            for key, info in functions.items():
+                text = session.source[info['node'].start_byte:info['node'].end_byte].decode('utf8', errors='replace')
+                results['explanation'][key] = lookup(
+                    "explanation", info['digest'],
+                    lambda text=text, name=info['name']: self.ai_explainer.explain_function(text, language, name)
+                )
+
+        if "benchmark" in stages:
+            benchmark_key = _digest(language, token_digest(session.tree, session.source),
+                                    json.dumps(test_cases or [], sort_keys=True), optimization_level)
+            results['benchmark'] = lookup(
+                "benchmark", benchmark_key,
+                lambda: self.benchmarker.benchmark_algorithm(code, test_cases or [], language, optimization_level)
+            )
+
+        # Everything the current version uses stays cached, plus older results up to the limit
+        session.cache.capacity = STAGE_CACHE_SIZE + sum(c['reused'] + c['computed'] for c in reuse.values())
+        await self._compute(session, pending, results, functions)
+
+        reused = sum(counts['reused'] for counts in reuse.values())
+        computed = sum(counts['computed'] for counts in reuse.values())
+        session.totals['edits'] += 1
+        session.totals['reparse_ms'] += parse['reparse_ms']
+        session.totals['reused'] += reused
+        session.totals['computed'] += computed
+
+        # Cached per-function results do not depend on position; place them now
+        for key, info in functions.items():
+            if isinstance(results.get('metrics', {}).get(key), dict):
+                results['metrics'][key] = dict(results['metrics'][key],
+                                               start_line=info['start_line'], end_line=info['end_line'])
+            if isinstance(results.get('anti_patterns', {}).get(key), list):
+                results['anti_patterns'][key] = [
+                    dict(finding, line=finding['line'] + info['start_line'] - 1)
+                    for finding in results['anti_patterns'][key]
+                ]
+
+        logger.info(f"✏️ Session {session.session_id} v{session.version}: reparse {parse['reparse_ms']:.2f}ms, "
+                    f"{reused} reused / {computed} computed")
+
+        return {
+            'session_id': session.session_id,
+            'version': session.version,
+            'language': language,
+            'parse': parse,
+            'functions': changes,
+            'stages': reuse,
+            'results': results,
+            'reuse_ratio': round(reused / (reused + computed), 3) if reused + computed else 1.0,
+            'analysis_ms': round((time.perf_counter() - started) * 1000, 3),
+            'session_totals': {
+                'edits': session.totals['edits'],
+                'avg_reparse_ms': round(session.totals['reparse_ms'] / session.totals['edits'], 3),
+                'reuse_ratio': round(session.totals['reused'] / max(1, session.totals['reused'] + session.totals['computed']), 3)
+            }
+        }
+
+    async def _compute(self, session: AnalysisSession, pending: Dict[Tuple[str, str], Any],
+                       results: Dict[str, Any], functions: Dict[str, Dict[str, Any]]):
+        """
+        Run invalidated stages; failures are returned but never cached
+
+        Synchronous stages (metrics, CFG) finish before the first await, the
+        LLM and sandbox stages then run concurrently.
+        """
+        keys, outcomes, awaiting = [], [], []
+        for key, compute in pending.items():
+            try:
+                value = compute()
+            except Exception as e:
+                value = e
+            keys.append(key)
+            outcomes.append(value)
+            if asyncio.iscoroutine(value):
+                awaiting.append(len(outcomes) - 1)
+
+        if awaiting:
+            finished = await asyncio.gather(*(outcomes[i] for i in awaiting), return_exceptions=True)
+            for i, value in zip(awaiting, finished):
+                outcomes[i] = value
+
+        by_key = {}
+        for (stage, key), outcome in zip(keys, outcomes):
+            if hasattr(outcome, 'model_dump'):
+                outcome = outcome.model_dump()
+            if isinstance(outcome, BaseException):
+                outcome = {'error': str(outcome) or type(outcome).__name__}
+            elif not (isinstance(outcome, dict) and 'error' in outcome):
+                session.cache.put(stage, key, outcome)
+            by_key[(stage, key)] = outcome
+
+        for stage in PER_FUNCTION_STAGES:
+            if stage in results:
+                for name, info in functions.items():
+                    if results[stage][name] is None:
+                        digest = info['pattern_digest'] if stage == "anti_patterns" else info['digest']
+                        results[stage][name] = by_key[(stage, digest)]
+        for stage in ("cfg", "benchmark"):
+            if stage in results and results[stage] is None:
+                results[stage] = next(value for (s, _), value in by_key.items() if s == stage)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'sessions': len(self.sessions), 'limit': SESSION_LIMIT, 'ttl_s': SESSION_TTL}
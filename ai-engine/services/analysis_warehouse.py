@@ -0,0 +1,296 @@
+"""
+Precomputed analyses of the bundled algorithms/ corpus, keyed by content hash
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+from pydantic import BaseModel
+from services.corpus_harness import ALGORITHMS_ROOT, CORPUS_LANGUAGES, corpus_files, input_generators, load_reference
+from services.test_case_generators import make_test_case
+from utils.logger import setup_logger
+
+logger = setup_logger("analysis_warehouse")
+
+# Parts of an AnalysisResponse the warehouse can hold
+COMPONENTS = (
+    'complexity_analysis', 'quality_assessment', 'ai_explanation',
+    'benchmark_results', 'visualization', 'optimization_suggestions'
+)
+
+# Generated benchmark sizes for corpus solutions whose input the harness can read
+WAREHOUSE_BENCHMARK_SIZES = (10, 100, 1000, 10000)
+WAREHOUSE_OPTIMIZATION_LEVEL = "O2"
+DEFAULT_WORKERS = 4
+PROGRESS_EVERY = 25  # files between progress log lines
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    content_key TEXT PRIMARY KEY,
+    language TEXT NOT NULL,
+    path TEXT,
+    status TEXT NOT NULL,
+    errors TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    duration_ms REAL NOT NULL,
+    analyzed_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    content_key TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    files_queued INTEGER NOT NULL,
+    files_done INTEGER NOT NULL DEFAULT 0,
+    files_failed INTEGER NOT NULL DEFAULT 0,
+    files_per_second REAL
+);
+"""
+
+
+def content_key(code: str, language: str) -> str:
+    """Warehouse key: the exact source a learner opens, plus its language"""
+    return hashlib.sha256(f"{language}\0{code}".encode()).hexdigest()
+
+
+def _plain(value: Any) -> Any:
+    return value.model_dump() if isinstance(value, BaseModel) else value
+
+
+def _component_error(name: str, value: Any) -> Optional[str]:
+    """Why a computed component should not be served from the warehouse, if it should not"""
+    if isinstance(value, dict) and 'error' in value:
+        return str(value['error'])
+    if name == 'benchmark_results' and not value.get('test_cases_passed'):
+        details = value.get('benchmark_details') or [{}]
+        return str(details[0].get('error', 'No benchmark test case passed'))
+    if name == 'visualization' and value.get('visualization_type') == 'error':
+        return str(value.get('data', {}).get('error', 'Visualization failed'))
+    return None
+
+
+class AnalysisWarehouse:
+    """SQLite store of zlib-compressed analysis payloads"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv(
+            "ANALYSIS_WAREHOUSE_PATH", os.path.join(tempfile.gettempdir(), "algomaster-warehouse.sqlite3")
+        )
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            # Used only from the event loop thread, but created lazily on first use
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+        return self._connection
+
+    def lookup(self, code: str, language: str) -> Dict[str, Any]:
+        """Stored components for this exact source; empty when it was never analyzed"""
+        row = self.connection.execute(
+            "SELECT payload FROM analyses WHERE content_key = ?", (content_key(code, language),)
+        ).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else {}
+
+    def is_complete(self, key: str) -> bool:
+        row = self.connection.execute("SELECT status FROM analyses WHERE content_key = ?", (key,)).fetchone()
+        return bool(row) and row[0] == 'complete'
+
+    def store(self, key: str, language: str, path: Optional[str], components: Dict[str, Any],
+              errors: Dict[str, str], duration_ms: float):
+        """Keep the successful components; a re-run replaces the row"""
+        payload = zlib.compress(json.dumps(components, separators=(',', ':')).encode(), 6)
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, language, path, 'partial' if errors else 'complete', json.dumps(errors),
+                 payload, duration_ms, datetime.now().isoformat())
+            )
+
+    def file_states(self) -> Dict[str, Tuple[str, float, int]]:
+        return {
+            path: (key, mtime, size)
+            for path, key, mtime, size in self.connection.execute("SELECT path, content_key, mtime, size FROM files")
+        }
+
+    def record_file(self, path: str, key: str, mtime: float, size: int):
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (path, key, mtime, size))
+
+    def start_run(self, files_queued: int) -> int:
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (started_at, files_queued) VALUES (?, ?)", (datetime.now().isoformat(), files_queued)
+            )
+        return cursor.lastrowid
+
+    def update_run(self, run_id: int, files_done: int, files_failed: int, files_per_second: float,
+                   finished: bool = False):
+        with self.connection:
+            self.connection.execute(
+                "UPDATE runs SET files_done = ?, files_failed = ?, files_per_second = ?, finished_at = ? WHERE run_id = ?",
+                (files_done, files_failed, files_per_second, datetime.now().isoformat() if finished else None, run_id)
+            )
+
+    def summary(self) -> Dict[str, Any]:
+        counts = dict(self.connection.execute("SELECT status, COUNT(*) FROM analyses GROUP BY status").fetchall())
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return {'path': self.path, 'analyses': counts, 'size_bytes': size}
+
+
+class WarehouseBuilder:
+    """Batch-analyze the corpus into an AnalysisWarehouse; every finished file is a checkpoint"""
+
+    def __init__(self, warehouse: AnalysisWarehouse, code_analyzer, ai_explainer, benchmarker, visualization_generator):
+        self.warehouse = warehouse
+        self.code_analyzer = code_analyzer
+        self.ai_explainer = ai_explainer
+        self.benchmarker = benchmarker
+        self.visualization_generator = visualization_generator
+
+    def plan(self, category: Optional[str] = None, changed_only: bool = False,
+             force: bool = False, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        Files that still need analysis
+
+        With changed_only, files whose mtime and size match the last run are
+        skipped without reading them. Otherwise every file is hashed, and
+        files whose content already has a complete analysis are skipped
+        (this is what makes an interrupted run resumable).
+        """
+        states = self.warehouse.file_states()
+        queue, skipped = [], {'unchanged': 0, 'already_analyzed': 0}
+        for relative_path in corpus_files(category):
+            path = os.path.join(ALGORITHMS_ROOT, relative_path)
+            stat = os.stat(path)
+            state = states.get(relative_path)
+            if changed_only and not force and state and state[1:] == (stat.st_mtime, stat.st_size) \
+                    and self.warehouse.is_complete(state[0]):
+                skipped['unchanged'] += 1
+                continue
+            with open(path, encoding='utf-8', errors='replace') as f:
+                source = f.read()
+            language = CORPUS_LANGUAGES[os.path.splitext(relative_path)[1]]
+            key = content_key(source, language)
+            if not force and self.warehouse.is_complete(key):
+                self.warehouse.record_file(relative_path, key, stat.st_mtime, stat.st_size)
+                skipped['already_analyzed'] += 1
+                continue
+            queue.append({'path': relative_path, 'source': source, 'language': language, 'key': key,
+                          'mtime': stat.st_mtime, 'size': stat.st_size})
+            if limit and len(queue) >= limit:
+                break
+        return queue, skipped
+
+    async def build(self, category: Optional[str] = None, workers: int = DEFAULT_WORKERS,
+                    changed_only: bool = False, force: bool = False, limit: Optional[int] = None,
+                    components: Tuple[str, ...] = COMPONENTS) -> Dict[str, Any]:
+        """Analyze the planned files with `workers` files in flight; returns throughput and counts"""
+        queue, skipped = self.plan(category, changed_only, force, limit)
+        run_id = self.warehouse.start_run(len(queue))
+        logger.info(f"🏭 Warehouse run {run_id}: {len(queue)} files to analyze, {sum(skipped.values())} skipped")
+
+        slots = asyncio.Semaphore(max(1, workers))
+        started = time.perf_counter()
+        done = failed = 0
+
+        async def process(item: Dict[str, Any]):
+            nonlocal done, failed
+            async with slots:
+                file_started = time.perf_counter()
+                stored, errors = await self._analyze(item['source'], item['language'], item['path'], components)
+                duration_ms = (time.perf_counter() - file_started) * 1000
+            self.warehouse.store(item['key'], item['language'], item['path'], stored, errors, duration_ms)
+            self.warehouse.record_file(item['path'], item['key'], item['mtime'], item['size'])
+            done += 1
+            failed += bool(errors)
+            rate = done / (time.perf_counter() - started)
+            if done % PROGRESS_EVERY == 0 or done == len(queue):
+                self.warehouse.update_run(run_id, done, failed, rate)
+                logger.info(f"📦 {done}/{len(queue)} files ({rate:.2f} files/sec, {failed} partial)")
+
+        await asyncio.gather(*(process(item) for item in queue))
+
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        self.warehouse.update_run(run_id, done, failed, rate, finished=True)
+        return {
+            'run_id': run_id,
+            'files_analyzed': done,
+            'files_partial': failed,
+            'skipped': skipped,
+            'elapsed_seconds': round(elapsed, 2),
+            'files_per_second': round(rate, 3),
+            'warehouse': self.warehouse.summary()
+        }
+
+    async def _analyze(self, source: str, language: str, relative_path: str,
+                       components: Tuple[str, ...]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        async def guarded(name: str, compute):
+            if name not in components:
+                return None
+            try:
+                # None: not applicable to this file, neither stored nor an error
+                return _plain(await compute())
+            except Exception as e:
+                return {'error': str(e)}
+
+        complexity, quality, explanation, benchmark, visualization = await asyncio.gather(
+            guarded('complexity_analysis', lambda: self.code_analyzer.analyze_complexity(source, language)),
+            guarded('quality_assessment', lambda: self.code_analyzer.assess_quality(source, language)),
+            guarded('ai_explanation', lambda: self.ai_explainer.generate_explanation(source, language)),
+            guarded('benchmark_results', lambda: self._benchmark(source, language, relative_path)),
+            guarded('visualization', lambda: self.visualization_generator.create_flow_diagram(source, language))
+        )
+        results = {
+            'complexity_analysis': complexity,
+            'quality_assessment': quality,
+            'ai_explanation': explanation,
+            'benchmark_results': benchmark,
+            'visualization': visualization
+        }
+        if 'optimization_suggestions' in components and complexity is not None and quality is not None:
+            results['optimization_suggestions'] = await guarded(
+                'optimization_suggestions',
+                lambda: self.ai_explainer.suggest_optimizations(source, complexity, quality)
+            )
+
+        stored, errors = {}, {}
+        for name, value in results.items():
+            if value is None:
+                continue
+            error = _component_error(name, value)
+            if error:
+                errors[name] = error[:500]
+            else:
+                stored[name] = value
+        return stored, errors
+
+    async def _benchmark(self, source: str, language: str, relative_path: str):
+        """
+        Corpus solutions have no main(); benchmark them through the corpus harness on generated input
+
+        None when no generator matches the arguments: there is nothing to
+        precompute, and the endpoint benchmarks such files live.
+        """
+        generators = input_generators(source, language)
+        if not generators:
+            return None
+        runnable, _ = load_reference(relative_path)
+        test_cases = [make_test_case(generators[0], size) for size in WAREHOUSE_BENCHMARK_SIZES]
+        return await self.benchmarker.benchmark_algorithm(runnable, test_cases, language, WAREHOUSE_OPTIMIZATION_LEVEL)
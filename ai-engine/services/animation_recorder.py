@@ -0,0 +1,175 @@
+"""
+Operation logs from instrumented runs, for sorting/graph/DP/tree animations
+"""
+
+import base64
+import json
+import os
+import sys
+import tempfile
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Any, Optional
+from services.performance_benchmarker import STRESS_MEMORY_LIMIT_MB, STRESS_TIMEOUT
+from utils.sandbox import run_sandboxed
+from utils.logger import setup_logger
+
+logger = setup_logger("animation_recorder")
+
+ANIMATOR_RUNNER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "runners", "python_animator.py")
+
+ANIMATABLE_LANGUAGES = ('python',)
+
+# Node attributes whose reads the animator logs as visits (see python_animator.py)
+NODE_VALUE_ATTRIBUTES = ('val', 'key', 'value', 'data')
+
+_TYPECODES = {'int8': 'b', 'int16': 'h', 'int32': 'i', 'int64': 'q'}
+
+
+def unpack_column(column: Dict[str, str]) -> array:
+    """Decode a base64 column emitted by the animator"""
+    values = array(_TYPECODES[column['type']])
+    values.frombytes(base64.b64decode(column['data']))
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def pack_column(values: Iterable[int]) -> Dict[str, str]:
+    """Inverse of unpack_column, using the narrowest type that fits"""
+    values = array('q', values)
+    low = min(values) if values else 0
+    high = max(values) if values else 0
+    for name, typecode in _TYPECODES.items():
+        limit = 1 << (array(typecode).itemsize * 8 - 1)
+        if -limit <= low and high < limit:
+            break
+    packed = array(typecode, values)
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return {'type': name, 'data': base64.b64encode(packed.tobytes()).decode()}
+
+
+class OpLog:
+    """Decoded view of an animator document"""
+
+    COLUMNS = ('op', 'container', 'index', 'index2', 'value')
+
+    def __init__(self, document: Dict[str, Any]):
+        self.document = document
+        self.columns = {name: unpack_column(document['columns'][name]) for name in self.COLUMNS}
+        self.codes = {name: code for code, name in enumerate(document['op_names'])}
+        self.flags = document['flags']
+        self.containers = {container['id']: container for container in document['containers']}
+
+    def __len__(self) -> int:
+        return len(self.columns['op'])
+
+    def kind(self, position: int) -> int:
+        return self.columns['op'][position] & 0x1F
+
+    def is_ref(self, position: int) -> bool:
+        return bool(self.columns['op'][position] & self.flags['value_ref'])
+
+    def value(self, position: int):
+        flags = self.columns['op'][position]
+        encoded = self.columns['value'][position]
+        if flags & self.flags['value_interned']:
+            return self.document['values'][encoded]
+        if flags & self.flags['value_ref']:
+            return {'ref': encoded}
+        return encoded
+
+    def key(self, position: int):
+        index = self.columns['index'][position]
+        if self.columns['op'][position] & self.flags['key_interned']:
+            return self.document['keys'][index]
+        return index
+
+    def positions(self, container_ids: Iterable[int], kinds: Optional[Iterable[str]] = None) -> List[int]:
+        """Log positions touching the given containers, optionally only some operation kinds"""
+        wanted = set(container_ids)
+        codes = {self.codes[kind] for kind in kinds} if kinds else None
+        container, op = self.columns['container'], self.columns['op']
+        return [
+            position for position in range(len(op))
+            if container[position] in wanted and (codes is None or op[position] & 0x1F in codes)
+        ]
+
+    def counts(self, kinds: Iterable[str]) -> Counter:
+        """Number of operations of the given kinds per container, in one pass"""
+        codes = {self.codes[kind] for kind in kinds}
+        return Counter(
+            container for container, op in zip(self.columns['container'], self.columns['op'])
+            if op & 0x1F in codes
+        )
+
+    def encode(self, positions: List[int], columns: Iterable[str] = COLUMNS) -> Dict[str, Dict[str, str]]:
+        """Subset of the log, packed the same way as the animator output"""
+        return {name: pack_column(self.columns[name][p] for p in positions) for name in columns}
+
+    def snapshot(self, container_id: int, state: str = 'initial'):
+        """Container contents with nested list references expanded one level (table rows)"""
+        contents = self.containers[container_id].get(state)
+        if contents is None:
+            return None
+        if self.containers[container_id]['kind'] == 'table':
+            return [
+                self.containers.get(row['ref'], {}).get(state) if isinstance(row, dict) else row
+                for row in contents
+            ]
+        return contents
+
+
+class AnimationRecorder:
+    """Run a submission with instrumented containers and collect its operation log"""
+
+    def __init__(self, timeout: float = STRESS_TIMEOUT, memory_limit_mb: int = STRESS_MEMORY_LIMIT_MB):
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+
+    async def record(self, code: str, language: str, test_input: str = "",
+                     options: Optional[Dict[str, Any]] = None) -> OpLog:
+        """
+        Record container operations for one run
+
+        Args:
+            code: Submission source
+            language: Only Python submissions can be instrumented
+            test_input: Bound to `test_input` inside the submission
+            options: max_ops (log capacity) and record_reads (log element reads)
+        """
+        if language not in ANIMATABLE_LANGUAGES:
+            raise ValueError(f"Animations are not supported for {language}")
+
+        options = options or {}
+        runner_options = {
+            'max_ops': options.get('max_ops', 200000),
+            'record_reads': options.get('record_reads', True)
+        }
+        with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+            f.write(code)
+            code_file = f.name
+
+        try:
+            result = await run_sandboxed(
+                [sys.executable, '-I', ANIMATOR_RUNNER, code_file, json.dumps(runner_options)],
+                test_input,
+                timeout=self.timeout,
+                memory_limit_mb=self.memory_limit_mb
+            )
+        finally:
+            os.unlink(code_file)
+
+        if result['timed_out']:
+            raise RuntimeError("Animation recording exceeded the time limit")
+        if result['returncode'] != 0:
+            stderr = result['stderr'].decode(errors='replace').strip()
+            raise RuntimeError(f"Animation recorder failed: {stderr[-500:] or 'exit status ' + str(result['returncode'])}")
+
+        document = json.loads(result['stdout'])
+        logger.info(
+            f"🎬 Recorded {document['total_ops']} operations ({document['recorded_ops']} kept) "
+            f"on {len(document['containers'])} containers"
+        )
+        return OpLog(document)
@@ -0,0 +1,206 @@
+"""
+On-disk cache of compiled benchmark artifacts (C++ binaries, Java class files)
+
+The local backend executes these binaries on the host, so the cache lives in
+a directory only this user can write. An artifact handed out by lookup() or
+store() stays pinned until release(): a shared flock on its .pin file keeps
+eviction by this or any other worker process away while test cases run.
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import weakref
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows; pins then only hold within this process
+    fcntl = None
+
+from utils.logger import setup_logger
+from utils.sandbox import owned_and_private, private_dir
+
+logger = setup_logger("artifact_cache")
+
+# Compiler flags per build profile. Java has no optimization levels at compile
+# time, so the profiles only toggle debug info there.
+BUILD_PROFILES = {
+    'O2': {
+        'cpp': ['-std=c++17', '-O2'],
+        'java': ['-g:none']
+    },
+    'O0': {
+        'cpp': ['-std=c++17', '-O0', '-g'],
+        'java': ['-g']
+    }
+}
+
+COMPILED_LANGUAGES = ('cpp', 'java')
+PIN_FILE = '.pin'
+
+
+class ArtifactCache:
+    """LRU cache of build directories keyed by source hash + compiler flags"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size_mb: Optional[int] = None):
+        self.cache_dir = self._private_cache_dir(cache_dir or os.getenv("ARTIFACT_CACHE_DIR"))
+        self.max_size_bytes = (max_size_mb or int(os.getenv("ARTIFACT_CACHE_MAX_MB", "512"))) * 1024 * 1024
+        # Held and awaited locks are referenced by their users; idle ones are dropped
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        # artifact directory -> [pin file descriptor, users in this process]
+        self._pins: Dict[str, List[int]] = {}
+
+    @staticmethod
+    def _private_cache_dir(configured: Optional[str]) -> str:
+        """The configured directory if only this user can write it, else one under the private sandbox directory"""
+        if not hasattr(os, "getuid"):
+            # Windows temp directories are already per-user
+            path = configured or os.path.join(tempfile.gettempdir(), "algomaster-artifacts")
+            os.makedirs(path, exist_ok=True)
+            return path
+        if configured:
+            os.makedirs(configured, mode=0o700, exist_ok=True)
+            if owned_and_private(configured, directory=True):
+                return configured
+            logger.warning(f"⚠️ Artifact cache {configured} is writable by other users; using a private one")
+        path = os.path.join(private_dir(), "artifacts")
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        if not owned_and_private(path, directory=True):
+            raise RuntimeError(f"Artifact cache {path} is not a private directory of this user")
+        return path
+
+    @staticmethod
+    def build_key(code: str, language: str, flags: List[str], toolchain: str = "") -> str:
+        """Hash of everything that affects the compiled output"""
+        digest = hashlib.sha256()
+        digest.update(toolchain.encode())
+        digest.update(b"\0")
+        digest.update(language.encode())
+        digest.update(b"\0")
+        digest.update(" ".join(flags).encode())
+        digest.update(b"\0")
+        digest.update(code.encode())
+        return digest.hexdigest()
+
+    def lock(self, key: str) -> asyncio.Lock:
+        """Per-key lock so concurrent submissions of the same source compile once"""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Return the artifact directory for key, pinned until release() and marked recently used"""
+        path = os.path.join(self.cache_dir, key)
+        if not os.path.isdir(path) or not self._pin(path):
+            return None
+        now = time.time()
+        os.utime(path, (now, now))
+        return path
+
+    def new_build_dir(self) -> str:
+        """Scratch directory on the cache filesystem so store() can rename atomically"""
+        return tempfile.mkdtemp(prefix=".build-", dir=self.cache_dir)
+
+    def store(self, key: str, build_dir: str) -> str:
+        """Publish a finished build directory under key, pinned until release(), and enforce the size limit"""
+        path = os.path.join(self.cache_dir, key)
+        try:
+            os.rename(build_dir, path)
+        except OSError:
+            # Another worker published the same key first; keep theirs
+            shutil.rmtree(build_dir, ignore_errors=True)
+        if not self._pin(path):
+            raise RuntimeError(f"Artifact {key[:12]} was evicted while it was being stored")
+        self._evict()
+        return path
+
+    def release(self, path: str):
+        """Unpin an artifact directory from lookup() or store(); eviction may remove it once nobody holds it"""
+        pin = self._pins.get(path)
+        if pin is None:
+            return
+        pin[1] -= 1
+        if pin[1] == 0:
+            del self._pins[path]
+            os.close(pin[0])
+
+    def _pin(self, path: str) -> bool:
+        pin = self._pins.get(path)
+        if pin is not None:
+            pin[1] += 1
+            return True
+        try:
+            fd = os.open(os.path.join(path, PIN_FILE), os.O_RDONLY | os.O_CREAT, 0o600)
+        except FileNotFoundError:
+            return False
+        if fcntl is not None:
+            # Waits only while another worker is deleting this artifact
+            fcntl.flock(fd, fcntl.LOCK_SH)
+        try:
+            # Deleted (and maybe rebuilt) while we waited: our lock guards nothing
+            current = os.stat(os.path.join(path, PIN_FILE))
+        except FileNotFoundError:
+            current = None
+        if current is None or not os.path.samestat(current, os.fstat(fd)):
+            os.close(fd)
+            return False
+        self._pins[path] = [fd, 1]
+        return True
+
+    def discard(self, build_dir: str):
+        """Remove a failed build directory"""
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+    def _evict(self):
+        """Drop least recently used unpinned artifacts until the cache fits max_size_bytes"""
+        entries = []
+        total_size = 0
+        for name in os.listdir(self.cache_dir):
+            if name.startswith('.'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            size = self._dir_size(path)
+            total_size += size
+            entries.append((os.path.getmtime(path), size, name, path))
+
+        entries.sort()
+        for _, size, name, path in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            if path in self._pins or not self._remove_unpinned(path):
+                continue
+            total_size -= size
+            logger.info(f"🧹 Evicted cached artifact {name[:12]} ({size / 1024:.0f} KB)")
+
+    @staticmethod
+    def _remove_unpinned(path: str) -> bool:
+        """Delete an artifact unless a worker process has it pinned"""
+        try:
+            fd = os.open(os.path.join(path, PIN_FILE), os.O_RDONLY | os.O_CREAT, 0o600)
+        except FileNotFoundError:
+            return False
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            shutil.rmtree(path, ignore_errors=True)
+            return True
+        except BlockingIOError:
+            return False
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        total = 0
+        for root, _, files in os.walk(path):
+            for file_name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, file_name))
+                except OSError:
+                    pass
+        return total
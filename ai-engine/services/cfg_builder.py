@@ -0,0 +1,757 @@
+"""
+Control-flow graph construction from Tree-sitter syntax trees
+
+Every function (and, for Python and JavaScript, the top-level script) gets
+its own subgraph with an entry and an exit block. Statements are grouped
+into basic blocks joined by typed edges:
+
+    sequential, true, false, case, loop_back, loop_exit, break, continue,
+    return, exception
+
+A finally clause is one block that every exit from its try statement
+(normal completion, exception, return, break, continue) passes through; it
+then resumes each of those exits.
+
+Straight-line chains are merged after construction, so the graph size
+follows the number of branches rather than the number of lines. A layered
+layout (longest-path layers, barycenter ordering) is computed here so the
+client only has to draw.
+"""
+
+from typing import Dict, List, Any, Optional, Tuple
+from utils.parsers import get_parser
+
+# Node types per language. Anything not listed is a simple statement.
+LANGUAGE_SPECS: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    'python': {
+        'function': ('function_definition',),
+        'definition': ('function_definition', 'class_definition', 'decorated_definition'),
+        'block': ('block', 'module'),
+        'if': ('if_statement',),
+        'loop': ('for_statement', 'while_statement'),
+        'do': (),
+        'switch': ('match_statement',),
+        'case': ('case_clause',),
+        'try': ('try_statement',),
+        'handler': ('except_clause', 'except_group_clause'),
+        'finally': ('finally_clause',),
+        'return': ('return_statement',),
+        'throw': ('raise_statement',),
+        'break': ('break_statement',),
+        'continue': ('continue_statement',),
+        'wrapper': ('with_statement',)
+    },
+    'cpp': {
+        'function': ('function_definition',),
+        'definition': ('function_definition',),
+        'block': ('compound_statement', 'translation_unit'),
+        'if': ('if_statement',),
+        'loop': ('for_statement', 'for_range_loop', 'while_statement'),
+        'do': ('do_statement',),
+        'switch': ('switch_statement',),
+        'case': ('case_statement',),
+        'try': ('try_statement',),
+        'handler': ('catch_clause',),
+        'finally': (),
+        'return': ('return_statement',),
+        'throw': ('throw_statement',),
+        'break': ('break_statement',),
+        'continue': ('continue_statement',),
+        'wrapper': ('labeled_statement',)
+    },
+    'java': {
+        'function': ('method_declaration', 'constructor_declaration'),
+        'definition': ('method_declaration', 'constructor_declaration', 'class_declaration'),
+        'block': ('block', 'program', 'constructor_body'),
+        'if': ('if_statement',),
+        'loop': ('for_statement', 'enhanced_for_statement', 'while_statement'),
+        'do': ('do_statement',),
+        'switch': ('switch_expression', 'switch_statement'),
+        'case': ('switch_block_statement_group', 'switch_rule'),
+        'try': ('try_statement', 'try_with_resources_statement'),
+        'handler': ('catch_clause',),
+        'finally': ('finally_clause',),
+        'return': ('return_statement',),
+        'throw': ('throw_statement',),
+        'break': ('break_statement',),
+        'continue': ('continue_statement',),
+        'wrapper': ('labeled_statement', 'synchronized_statement')
+    },
+    'javascript': {
+        'function': ('function_declaration', 'generator_function_declaration', 'function_expression',
+                     'function', 'arrow_function', 'method_definition'),
+        'definition': ('function_declaration', 'generator_function_declaration', 'class_declaration'),
+        'block': ('statement_block', 'program'),
+        'if': ('if_statement',),
+        'loop': ('for_statement', 'for_in_statement', 'while_statement'),
+        'do': ('do_statement',),
+        'switch': ('switch_statement',),
+        'case': ('switch_case', 'switch_default'),
+        'try': ('try_statement',),
+        'handler': ('catch_clause',),
+        'finally': ('finally_clause',),
+        'return': ('return_statement',),
+        'throw': ('throw_statement',),
+        'break': ('break_statement',),
+        'continue': ('continue_statement',),
+        'wrapper': ('labeled_statement',)
+    }
+}
+
+# Languages whose script body runs top to bottom and gets a "main" subgraph
+SCRIPT_LANGUAGES = ('python', 'javascript')
+
+# Cases that never fall through to the next one
+NON_FALLTHROUGH_CASES = ('case_clause', 'switch_rule')
+
+# Children of case nodes that are labels or patterns rather than statements
+CASE_LABEL_TYPES = ('switch_label', 'case_pattern', 'comment')
+CASE_LABEL_FIELDS = ('value', 'pattern', 'guard')
+
+# Edge types that transfer control non-locally; they win when an empty
+# block between two edges is removed
+JUMP_EDGES = ('loop_back', 'break', 'continue', 'return', 'exception')
+
+LABEL_LENGTH = 80
+MAX_BLOCK_LINES = 8  # statements shown per block; the count is always reported
+
+LAYER_SPACING = 100
+NODE_SPACING = 220
+FUNCTION_GAP = 120
+
+
+def _text(node, source: bytes) -> str:
+    return source[node.start_byte:node.end_byte].decode('utf8', errors='replace')
+
+
+def _first_line(node, source: bytes) -> str:
+    line = _text(node, source).split('\n', 1)[0].strip()
+    if line.endswith('{'):
+        line = line[:-1].rstrip()
+    return line[:LABEL_LENGTH]
+
+
+def _header(node, body, source: bytes) -> str:
+    """Source from the start of a compound statement up to its body"""
+    end = body.start_byte if body is not None else node.end_byte
+    header = " ".join(source[node.start_byte:end].decode('utf8', errors='replace').split())
+    return header.rstrip('{:').rstrip()[:LABEL_LENGTH] or _first_line(node, source)
+
+
+def _function_name(node, source: bytes) -> str:
+    name = node.child_by_field_name('name')
+    if name is not None:
+        return _text(name, source)
+    if node.parent is not None and node.parent.type == 'variable_declarator':
+        # const f = (x) => {...}
+        return _text(node.parent.child_by_field_name('name'), source)
+    declarator = node.child_by_field_name('declarator')
+    while declarator is not None:
+        inner = declarator.child_by_field_name('declarator')
+        if inner is None:
+            return _text(declarator, source)
+        declarator = inner
+    return f"anonymous@{node.start_point[0] + 1}"
+
+
+class _FunctionGraph:
+    """Builds the blocks and edges of one function body"""
+
+    def __init__(self, builder: "CFGBuilder", name: str, node):
+        self.builder = builder
+        self.spec = builder.spec
+        self.source = builder.source
+        self.name = name
+        self.index = len(builder.functions)
+        self.entry = builder.new_block('start', name, node.start_point[0] + 1, self)
+        self.exit = builder.new_block('end', f"end {name}", node.end_point[0] + 1, self)
+        self.current: Optional[int] = self.builder.new_block('process', '', node.start_point[0] + 1, self)
+        self.builder.add_edge(self.entry, self.current, 'sequential')
+        # (continue target, break target); continue is None for switches
+        self.jump_targets: List[Tuple[Optional[int], int]] = []
+        # Enclosing try statements with a finally clause, innermost last
+        self.finally_stack: List[Dict[str, Any]] = []
+
+    # Block helpers
+    def _block(self, kind: str, label: str, node) -> int:
+        return self.builder.new_block(kind, label, node.start_point[0] + 1, self)
+
+    def _follow(self, kind: str, label: str, node, edge: str = 'sequential') -> int:
+        """New block entered from the current one (if reachable)"""
+        block = self._block(kind, label, node)
+        if self.current is not None:
+            self.builder.add_edge(self.current, block, edge)
+        self.current = block
+        return block
+
+    def _append(self, node, text: Optional[str] = None):
+        if self.current is None:
+            # Code after a jump is unreachable; it still gets a block
+            self.current = self._block('process', '', node)
+        self.builder.add_statement(self.current, text or _first_line(node, self.source), node)
+
+    def _join(self, ends: List[Optional[int]], node, edge: str = 'sequential') -> Optional[int]:
+        live = [end for end in ends if end is not None]
+        if not live:
+            self.current = None
+            return None
+        join = self._block('process', '', node)
+        for end in live:
+            self.builder.add_edge(end, join, edge)
+        self.current = join
+        return join
+
+    def finish(self):
+        if self.current is not None:
+            self.builder.add_edge(self.current, self.exit, 'sequential')
+
+    # Statement dispatch
+    def statements(self, node):
+        for child in node.named_children:
+            self.statement(child)
+
+    def statement(self, node):
+        kind = node.type
+        spec = self.spec
+        if kind == 'comment':
+            return
+        if kind in spec['block']:
+            self.statements(node)
+        elif kind in spec['definition']:
+            self._append(node)
+        elif kind in spec['if']:
+            self._if(node)
+        elif kind in spec['loop']:
+            self._loop(node)
+        elif kind in spec['do']:
+            self._do(node)
+        elif kind in spec['switch']:
+            self._switch(node)
+        elif kind in spec['try']:
+            self._try(node)
+        elif kind in spec['return'] or kind in spec['throw']:
+            self._append(node)
+            self._jump('return' if kind in spec['return'] else 'exception', self.exit, -1)
+        elif kind in spec['break']:
+            self._append(node)
+            if self.jump_targets:
+                self._jump('break', self.jump_targets[-1][1], len(self.jump_targets) - 1)
+            self.current = None
+        elif kind in spec['continue']:
+            self._append(node)
+            loop_level = next((level for level in range(len(self.jump_targets) - 1, -1, -1)
+                               if self.jump_targets[level][0] is not None), None)
+            if loop_level is not None:
+                self._jump('continue', self.jump_targets[loop_level][0], loop_level)
+            self.current = None
+        elif kind in spec['wrapper']:
+            body = node.child_by_field_name('body') or (node.named_children[-1] if node.named_children else None)
+            self._append(node, _header(node, body, self.source))
+            if body is not None:
+                self.statement(body)
+        else:
+            self._append(node)
+
+    def _jump(self, edge: str, target: int, loop_level: int):
+        """
+        Leave the current block for target; a finally clause in between runs first
+
+        loop_level is the jump_targets index of the loop or switch a
+        break/continue leaves (-1 for return and raise, which leave the function).
+        """
+        context = self.finally_stack[-1] if self.finally_stack else None
+        if context is not None and loop_level < context['loop_level']:
+            self.builder.add_edge(self.current, context['entry'], edge)
+            context['pending'].append((edge, target, loop_level))
+        else:
+            self.builder.add_edge(self.current, target, edge)
+        self.current = None
+
+    def _body_of(self, clause):
+        """Statement or block carried by an else/elif/catch/finally clause"""
+        body = clause.child_by_field_name('body') or clause.child_by_field_name('consequence')
+        if body is not None:
+            return body
+        statements = [child for child in clause.named_children if child.type != 'comment']
+        return statements[-1] if statements else None
+
+    def _if(self, node):
+        condition = node.child_by_field_name('condition')
+        label = f"if {_text(condition, self.source)}" if condition is not None else _first_line(node, self.source)
+        decision = self._follow('decision', label[:LABEL_LENGTH], node)
+
+        ends = []
+        self._follow('process', '', node, 'true')
+        consequence = node.child_by_field_name('consequence')
+        if consequence is not None:
+            self.statement(consequence)
+        ends.append(self.current)
+
+        alternatives = [
+            child for index, child in enumerate(node.children)
+            if node.field_name_for_child(index) == 'alternative'
+        ]
+        false_source = decision
+        for alternative in alternatives:
+            if alternative.type == 'elif_clause':
+                elif_condition = alternative.child_by_field_name('condition')
+                self.current = false_source
+                false_source = self._follow(
+                    'decision', f"elif {_text(elif_condition, self.source)}"[:LABEL_LENGTH], alternative, 'false'
+                )
+                self._follow('process', '', alternative, 'true')
+                self.statement(self._body_of(alternative))
+                ends.append(self.current)
+            else:
+                # else_clause wrapper (Python/C++/JS) or a bare statement (Java)
+                body = self._body_of(alternative) if alternative.type == 'else_clause' else alternative
+                self.current = false_source
+                self._follow('process', '', alternative, 'false')
+                if body is not None:
+                    self.statement(body)
+                ends.append(self.current)
+                false_source = None
+                break
+
+        if false_source is not None:
+            ends.append(false_source)
+            join = self._join(ends, node)
+            # The implicit else is the decision's false edge
+            for edge in self.builder.edges_from(false_source):
+                if edge['target'] == join and edge['type'] == 'sequential':
+                    edge['type'] = 'false'
+        else:
+            self._join(ends, node)
+
+    def _loop(self, node):
+        body = node.child_by_field_name('body')
+        header = self._follow('loop', _header(node, body, self.source), node)
+        after = self._block('process', '', node)
+        else_clause = next(
+            (child for index, child in enumerate(node.children)
+             if node.field_name_for_child(index) == 'alternative'), None
+        )
+
+        self.jump_targets.append((header, after))
+        self._follow('process', '', body or node, 'true')
+        if body is not None:
+            self.statement(body)
+        if self.current is not None:
+            self.builder.add_edge(self.current, header, 'loop_back')
+        self.jump_targets.pop()
+
+        if else_clause is not None:
+            # Python's loop else runs only when the loop was not broken out of
+            self.current = header
+            self._follow('process', '', else_clause, 'loop_exit')
+            self.statement(self._body_of(else_clause))
+            if self.current is not None:
+                self.builder.add_edge(self.current, after, 'sequential')
+        else:
+            self.builder.add_edge(header, after, 'loop_exit')
+        self.current = after
+
+    def _do(self, node):
+        body = node.child_by_field_name('body')
+        condition = node.child_by_field_name('condition')
+        body_entry = self._follow('process', '', node)
+        after = self._block('process', '', node)
+        check = self._block('loop', f"while {_text(condition, self.source)}"[:LABEL_LENGTH] if condition is not None
+                            else _first_line(node, self.source), node)
+
+        self.jump_targets.append((check, after))
+        if body is not None:
+            self.statement(body)
+        if self.current is not None:
+            self.builder.add_edge(self.current, check, 'sequential')
+        self.jump_targets.pop()
+
+        self.builder.add_edge(check, body_entry, 'loop_back')
+        self.builder.add_edge(check, after, 'loop_exit')
+        self.current = after
+
+    def _switch(self, node):
+        subject = node.child_by_field_name('condition') or node.child_by_field_name('value') \
+            or node.child_by_field_name('subject')
+        label = f"switch {_text(subject, self.source)}" if subject is not None else _first_line(node, self.source)
+        decision = self._follow('decision', label[:LABEL_LENGTH], node)
+        after = self._block('process', '', node)
+
+        body = node.child_by_field_name('body') or node
+        cases = [child for child in body.named_children if child.type in self.spec['case']]
+
+        self.jump_targets.append((None, after))
+        has_default = False
+        fallthrough: Optional[int] = None
+        for case in cases:
+            case_label = _first_line(case, self.source).split(':', 1)[0].split('->', 1)[0].strip()
+            if case_label.startswith('default') or case.type == 'switch_default' or case_label == 'case _':
+                has_default = True
+            self.current = decision
+            case_block = self._follow('process', '', case, 'case')
+            self.builder.edges_from(decision)[-1]['label'] = case_label[:LABEL_LENGTH]
+            if fallthrough is not None:
+                self.builder.add_edge(fallthrough, case_block, 'sequential')
+
+            for index, child in enumerate(case.children):
+                if not child.is_named or child.type in CASE_LABEL_TYPES:
+                    continue
+                if case.field_name_for_child(index) in CASE_LABEL_FIELDS:
+                    continue
+                self.statement(child)
+
+            if case.type in NON_FALLTHROUGH_CASES:
+                if self.current is not None:
+                    self.builder.add_edge(self.current, after, 'sequential')
+                fallthrough = None
+            else:
+                fallthrough = self.current
+        self.jump_targets.pop()
+
+        if fallthrough is not None:
+            self.builder.add_edge(fallthrough, after, 'sequential')
+        if not has_default:
+            self.builder.add_edge(decision, after, 'false')
+        self.current = after
+
+    def _try(self, node):
+        body = node.child_by_field_name('body')
+        finally_clause = next((child for child in node.named_children if child.type in self.spec['finally']), None)
+        context = None
+        if finally_clause is not None:
+            # Every way out of the body, handlers and else passes through the finally block
+            context = {'entry': self._block('process', '', finally_clause),
+                       'loop_level': len(self.jump_targets), 'pending': []}
+            self.finally_stack.append(context)
+
+        try_block = self._follow('process', '', node)
+        self.builder.add_statement(try_block, 'try', node)
+        if body is not None:
+            self.statement(body)
+        ends = [self.current]
+
+        handler_blocks = [try_block]
+        for child in node.named_children:
+            if child.type in self.spec['handler']:
+                self.current = try_block
+                handler_blocks.append(self._follow('process', '', child, 'exception'))
+                self._append(child, _header(child, self._body_of(child), self.source))
+                self.statement(self._body_of(child))
+                ends.append(self.current)
+            elif child.type == 'else_clause':
+                # Python try/else runs after the body when nothing was raised
+                self.current = ends[0]
+                if self.current is not None:
+                    self._follow('process', '', child)
+                    self.statement(self._body_of(child))
+                ends[0] = self.current
+
+        if context is None:
+            self._join(ends, node)
+            return
+
+        self.finally_stack.pop()
+        # Unhandled exceptions from the body, and any raised in a handler
+        for block in handler_blocks:
+            self.builder.add_edge(block, context['entry'], 'exception')
+        context['pending'].append(('exception', self.exit, -1))
+        for end in ends:
+            if end is not None:
+                self.builder.add_edge(end, context['entry'], 'sequential')
+
+        self.current = context['entry']
+        self._append(finally_clause, 'finally')
+        self.statement(self._body_of(finally_clause))
+        finally_end = self.current
+        if finally_end is None:
+            return
+        # The finally block resumes whichever jump entered it
+        for edge, target, loop_level in dict.fromkeys(context['pending']):
+            self.current = finally_end
+            self._jump(edge, target, loop_level)
+        self.current = finally_end if any(end is not None for end in ends) else None
+        if self.current is not None:
+            self._follow('process', '', node)
+
+
+class CFGBuilder:
+    """Control-flow graph of a source file"""
+
+    def __init__(self, code: str, language: str, tree=None):
+        if language not in LANGUAGE_SPECS:
+            raise ValueError(f"Unsupported language: {language}")
+        self.language = language
+        self.spec = LANGUAGE_SPECS[language]
+        self.source = code.encode('utf8')
+        self.tree = tree
+        self.blocks: Dict[int, Dict[str, Any]] = {}
+        self.edges: List[Dict[str, Any]] = []
+        self._out: Dict[int, List[Dict[str, Any]]] = {}
+        self.functions: List[Dict[str, Any]] = []
+
+    # Graph primitives
+    def new_block(self, kind: str, label: str, line: int, graph: _FunctionGraph) -> int:
+        block_id = len(self.blocks)
+        self.blocks[block_id] = {
+            'id': block_id, 'kind': kind, 'label': label, 'function': graph.name, 'function_index': graph.index,
+            'start_line': line, 'end_line': line, 'statements': [], 'statement_count': 0
+        }
+        self._out[block_id] = []
+        return block_id
+
+    def add_statement(self, block_id: int, text: str, node):
+        block = self.blocks[block_id]
+        if not block['statement_count']:
+            block['start_line'] = node.start_point[0] + 1
+        block['statement_count'] += 1
+        if len(block['statements']) < MAX_BLOCK_LINES:
+            block['statements'].append(text)
+        block['end_line'] = max(block['end_line'], node.end_point[0] + 1)
+        if block['kind'] == 'process' and text.split(' ', 1)[0] in ('return', 'raise', 'throw'):
+            block['kind'] = 'output'
+
+    def add_edge(self, source: int, target: int, edge_type: str):
+        edge = {'source': source, 'target': target, 'type': edge_type}
+        self.edges.append(edge)
+        self._out[source].append(edge)
+
+    def edges_from(self, block_id: int) -> List[Dict[str, Any]]:
+        return self._out[block_id]
+
+    # Construction
+    def build(self) -> Dict[str, Any]:
+        tree = self.tree or get_parser(self.language).parse(self.source)
+        root = tree.root_node
+
+        if self.language in SCRIPT_LANGUAGES:
+            script = [child for child in root.named_children
+                      if child.type not in self.spec['definition'] and child.type != 'comment']
+            if script:
+                graph = _FunctionGraph(self, 'main', root)
+                for statement in script:
+                    graph.statement(statement)
+                graph.finish()
+                self._record_function(graph, root)
+
+        for node in self._function_nodes(root):
+            body = node.child_by_field_name('body')
+            if body is None or body.type not in self.spec['block']:
+                # Expression-bodied lambdas have no statements to draw
+                continue
+            graph = _FunctionGraph(self, _function_name(node, self.source), node)
+            graph.statement(body)
+            graph.finish()
+            self._record_function(graph, node)
+
+        self._simplify()
+        layout = self._layout()
+        return {
+            'blocks': [dict(block, **layout[block_id]) for block_id, block in self.blocks.items()],
+            'edges': self.edges,
+            'functions': self.functions,
+            'line_count': root.end_point[0] + 1
+        }
+
+    def _record_function(self, graph: _FunctionGraph, node):
+        self.functions.append({
+            'index': graph.index,
+            'name': graph.name,
+            'entry': graph.entry,
+            'exit': graph.exit,
+            'start_line': node.start_point[0] + 1,
+            'end_line': node.end_point[0] + 1
+        })
+
+    def _function_nodes(self, root) -> List[Any]:
+        """All function definitions, nested ones included, in source order"""
+        found, stack = [], [root]
+        while stack:
+            node = stack.pop()
+            if node.type in self.spec['function']:
+                found.append(node)
+            stack.extend(reversed(node.named_children))
+        return found
+
+    # Simplification
+    def _simplify(self):
+        """Drop empty pass-through blocks, then merge straight-line chains"""
+        incoming: Dict[int, List[Dict[str, Any]]] = {block_id: [] for block_id in self.blocks}
+        for edge in self.edges:
+            incoming[edge['target']].append(edge)
+
+        for block_id in list(self.blocks):
+            block = self.blocks[block_id]
+            if block['kind'] != 'process' or block['statement_count']:
+                continue
+            outgoing = self._out[block_id]
+            if len(outgoing) > 1 or (outgoing and outgoing[0]['target'] == block_id):
+                continue
+            if outgoing:
+                successor_edge = outgoing[0]
+                for edge in incoming[block_id]:
+                    edge['target'] = successor_edge['target']
+                    if successor_edge['type'] in JUMP_EDGES and (
+                            edge['type'] == 'sequential' or edge['source'] == edge['target']):
+                        edge['type'] = successor_edge['type']
+                    incoming[successor_edge['target']].append(edge)
+                incoming[successor_edge['target']].remove(successor_edge)
+            elif incoming[block_id]:
+                continue
+            self._remove_block(block_id)
+
+        self._dedupe_edges()
+        incoming = {block_id: [] for block_id in self.blocks}
+        for edge in self.edges:
+            incoming[edge['target']].append(edge)
+
+        for block_id in sorted(self.blocks):
+            if block_id not in self.blocks:
+                continue
+            block = self.blocks[block_id]
+            while block['kind'] == 'process':
+                outgoing = self._out[block_id]
+                if len(outgoing) != 1 or outgoing[0]['type'] != 'sequential':
+                    break
+                successor_id = outgoing[0]['target']
+                successor = self.blocks[successor_id]
+                if (successor_id == block_id or successor['kind'] not in ('process', 'output')
+                        or len(incoming[successor_id]) != 1):
+                    break
+                room = MAX_BLOCK_LINES - len(block['statements'])
+                block['statements'].extend(successor['statements'][:max(room, 0)])
+                block['statement_count'] += successor['statement_count']
+                block['end_line'] = max(block['end_line'], successor['end_line'])
+                block['kind'] = successor['kind']
+                self.edges.remove(outgoing[0])
+                self._out[block_id] = self._out.pop(successor_id)
+                for edge in self._out[block_id]:
+                    edge['source'] = block_id
+                del self.blocks[successor_id]
+                del incoming[successor_id]
+
+        # Renumber so ids are dense and in creation order
+        mapping = {old: new for new, old in enumerate(sorted(self.blocks))}
+        self.blocks = {mapping[old]: dict(block, id=mapping[old]) for old, block in self.blocks.items()}
+        for edge in self.edges:
+            edge['source'], edge['target'] = mapping[edge['source']], mapping[edge['target']]
+        self._out = {block_id: [] for block_id in self.blocks}
+        for edge in self.edges:
+            self._out[edge['source']].append(edge)
+        for function in self.functions:
+            function['entry'], function['exit'] = mapping[function['entry']], mapping[function['exit']]
+
+    def _remove_block(self, block_id: int):
+        self.edges = [edge for edge in self.edges if edge['source'] != block_id]
+        del self.blocks[block_id]
+        del self._out[block_id]
+
+    def _dedupe_edges(self):
+        seen = set()
+        unique = []
+        for edge in self.edges:
+            key = (edge['source'], edge['target'], edge['type'], edge.get('label'))
+            if key not in seen:
+                seen.add(key)
+                unique.append(edge)
+        self.edges = unique
+        self._out = {block_id: [] for block_id in self.blocks}
+        for edge in self.edges:
+            self._out[edge['source']].append(edge)
+
+    # Layout
+    def _layout(self) -> Dict[int, Dict[str, Any]]:
+        """Layer blocks by longest path over forward edges and order each layer by barycenter"""
+        positions: Dict[int, Dict[str, Any]] = {}
+        members_of: Dict[int, List[int]] = {}
+        for block_id, block in self.blocks.items():
+            members_of.setdefault(block['function_index'], []).append(block_id)
+        x_offset = 0
+
+        for function in self.functions:
+            members = members_of.get(function['index'], [])
+            back_edges = self._back_edges(function['entry'], set(members))
+            forward = [edge for edge in self.edges
+                       if edge['source'] in members and id(edge) not in back_edges and edge['source'] != edge['target']]
+
+            layer = {block_id: 0 for block_id in members}
+            indegree = {block_id: 0 for block_id in members}
+            successors: Dict[int, List[int]] = {block_id: [] for block_id in members}
+            predecessors: Dict[int, List[int]] = {block_id: [] for block_id in members}
+            for edge in forward:
+                successors[edge['source']].append(edge['target'])
+                predecessors[edge['target']].append(edge['source'])
+                indegree[edge['target']] += 1
+
+            ready = [block_id for block_id in members if indegree[block_id] == 0]
+            order = []
+            while ready:
+                block_id = ready.pop()
+                order.append(block_id)
+                for target in successors[block_id]:
+                    layer[target] = max(layer[target], layer[block_id] + 1)
+                    indegree[target] -= 1
+                    if indegree[target] == 0:
+                        ready.append(target)
+            # The exit block always sits on the bottom layer
+            layer[function['exit']] = max(layer.values()) if function['exit'] in layer else 0
+
+            layers: Dict[int, List[int]] = {}
+            for block_id in sorted(members):
+                layers.setdefault(layer[block_id], []).append(block_id)
+
+            rank: Dict[int, float] = {}
+            for depth in sorted(layers):
+                row = layers[depth]
+                if depth:
+                    row.sort(key=lambda block_id: (
+                        sum(rank[p] for p in predecessors[block_id] if p in rank) /
+                        max(1, sum(1 for p in predecessors[block_id] if p in rank)), block_id
+                    ))
+                for index, block_id in enumerate(row):
+                    rank[block_id] = index
+
+            width = max(len(row) for row in layers.values())
+            for depth, row in layers.items():
+                shift = (width - len(row)) * NODE_SPACING / 2
+                for index, block_id in enumerate(row):
+                    positions[block_id] = {
+                        'layer': depth,
+                        'position': {'x': x_offset + shift + index * NODE_SPACING, 'y': depth * LAYER_SPACING}
+                    }
+            x_offset += width * NODE_SPACING + FUNCTION_GAP
+
+        for block_id in self.blocks:
+            positions.setdefault(block_id, {'layer': 0, 'position': {'x': x_offset, 'y': 0}})
+        return positions
+
+    def _back_edges(self, entry: int, members: set) -> set:
+        """Edges closing a cycle in a DFS from the entry (loop backs, continues)"""
+        back, state = set(), {}
+        stack = [(entry, iter(self._out.get(entry, [])))]
+        state[entry] = 1
+        while stack:
+            block_id, edges = stack[-1]
+            edge = next(edges, None)
+            if edge is None:
+                state[block_id] = 2
+                stack.pop()
+                continue
+            target = edge['target']
+            if target not in members:
+                continue
+            if state.get(target) == 1:
+                back.add(id(edge))
+            elif target not in state:
+                state[target] = 1
+                stack.append((target, iter(self._out.get(target, []))))
+        return back
+
+
+def build_cfg(code: str, language: str, tree=None) -> Dict[str, Any]:
+    """
+    Control-flow graph with laid-out basic blocks for every function in the file
+
+    tree, when given, must be the parse of code (e.g. an incrementally
+    reparsed tree kept by an analysis session); it saves parsing again.
+    """
+    return CFGBuilder(code, language, tree).build()
@@ -5,13 +5,11 @@ Revolutionary AI-powered code analysis service
 import ast
 import re
 import asyncio
+import importlib
 from typing import Dict, List, Any, Optional
-from openai import AsyncOpenAI
-import tree_sitter_python as tspython
-import tree_sitter_cpp as tscpp
-import tree_sitter_java as tsjava
-import tree_sitter_javascript as tsjs
-from tree_sitter import Language, Parser
+from utils.parsers import SUPPORTED_LANGUAGES, get_parser
+from utils.llm import llm_call
+from utils.executors import cpu_bound
 from utils.logger import setup_logger
 
 logger = setup_logger("code_analyzer")
@@ -21,28 +19,14 @@ class CodeAnalyzer:
     
     def __init__(self):
         self.openai_client = None
-        self.parsers = {}
-        self.languages = {}
         
     async def initialize(self):
-        """Initialize AI services and language parsers"""
+        """Initialize AI services; Tree-sitter parsers are built per language on first use"""
         try:
-            # Initialize OpenAI
-            self.openai_client = AsyncOpenAI()
+            # Initialize OpenAI; the client library is imported here, off the event loop
+            openai = await asyncio.to_thread(importlib.import_module, "openai")
+            self.openai_client = openai.AsyncOpenAI()
             
-            # Initialize Tree-sitter parsers for multiple languages
-            self.languages = {
-                'python': Language(tspython.language(), "python"),
-                'cpp': Language(tscpp.language(), "cpp"), 
-                'java': Language(tsjava.language(), "java"),
-                'javascript': Language(tsjs.language(), "javascript")
-            }
-            
-            for lang_name, language in self.languages.items():
-                parser = Parser()
-                parser.set_language(language)
-                self.parsers[lang_name] = parser
-                
             logger.info("🤖 Code analyzer initialized with multi-language support")
             
         except Exception as e:
@@ -55,7 +39,7 @@ class CodeAnalyzer:
         """
         try:
             # Parse code structure
-            ast_analysis = await self._parse_code_structure(code, language)
+            static_analysis = await self.static_complexity(code, language)
             
             # AI-powered complexity analysis
             complexity_prompt = f"""
@@ -75,29 +59,42 @@ class CodeAnalyzer:
             Format as JSON with detailed explanations.
             """
             
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert algorithm complexity analyzer. Provide precise, detailed complexity analysis."},
-                    {"role": "user", "content": complexity_prompt}
-                ],
-                temperature=0.1
-            )
+            async with llm_call():
+                response = await self.openai_client.chat.completions.create(
+                    model="gpt-4",
+                    messages=[
+                        {"role": "system", "content": "You are an expert algorithm complexity analyzer. Provide precise, detailed complexity analysis."},
+                        {"role": "user", "content": complexity_prompt}
+                    ],
+                    temperature=0.1
+                )
             
             ai_analysis = response.choices[0].message.content
             
             return {
+                **static_analysis,
                 "time_complexity": self._extract_time_complexity(ai_analysis),
                 "space_complexity": self._extract_space_complexity(ai_analysis),
-                "detailed_analysis": ai_analysis,
-                "ast_metrics": ast_analysis,
-                "optimization_score": await self._calculate_optimization_score(code, language)
+                "detailed_analysis": ai_analysis
             }
             
         except Exception as e:
             logger.error(f"❌ Complexity analysis failed: {e}")
             return {"error": str(e)}
 
+    async def static_complexity(self, code: str, language: str) -> Dict[str, Any]:
+        """
+        The part of the complexity analysis that needs no LLM (AST metrics and
+        optimization score); served on its own when the LLM is unavailable
+        """
+        return {
+            "time_complexity": "unknown",
+            "space_complexity": "unknown",
+            "detailed_analysis": "",
+            "ast_metrics": await self._parse_code_structure(code, language),
+            "optimization_score": await self._calculate_optimization_score(code, language)
+        }
+
     async def assess_quality(self, code: str, language: str) -> Dict[str, Any]:
         """
         Comprehensive code quality assessment
@@ -128,87 +125,67 @@ class CodeAnalyzer:
             logger.error(f"❌ Quality assessment failed: {e}")
             return {"error": str(e)}
 
-    async def get_algorithm_library(self) -> Dict[str, List[Dict]]:
-        """
-        Get comprehensive algorithm library with AI insights
-        """
-        try:
-            # Algorithm categories with AI-enhanced metadata
-            library = {
-                "Arrays": [
-                    {"name": "Two Sum", "difficulty": "Easy", "ai_insight": "Fundamental hash table pattern"},
-                    {"name": "Maximum Subarray", "difficulty": "Medium", "ai_insight": "Classic dynamic programming"},
-                    {"name": "3Sum", "difficulty": "Medium", "ai_insight": "Advanced two-pointer technique"}
-                ],
-                "Dynamic Programming": [
-                    {"name": "Fibonacci", "difficulty": "Easy", "ai_insight": "Introduction to memoization"},
-                    {"name": "Longest Common Subsequence", "difficulty": "Medium", "ai_insight": "2D DP table optimization"},
-                    {"name": "Edit Distance", "difficulty": "Hard", "ai_insight": "String manipulation mastery"}
-                ],
-                "Trees": [
-                    {"name": "Binary Tree Traversal", "difficulty": "Easy", "ai_insight": "Recursive thinking foundation"},
-                    {"name": "Lowest Common Ancestor", "difficulty": "Medium", "ai_insight": "Tree navigation expertise"},
-                    {"name": "Serialize Binary Tree", "difficulty": "Hard", "ai_insight": "Data structure serialization"}
-                ],
-                "Graphs": [
-                    {"name": "DFS/BFS", "difficulty": "Medium", "ai_insight": "Graph traversal fundamentals"},
-                    {"name": "Dijkstra's Algorithm", "difficulty": "Hard", "ai_insight": "Shortest path optimization"},
-                    {"name": "Union Find", "difficulty": "Medium", "ai_insight": "Disjoint set operations"}
-                ],
-                "Sorting": [
-                    {"name": "Quick Sort", "difficulty": "Medium", "ai_insight": "Divide and conquer mastery"},
-                    {"name": "Merge Sort", "difficulty": "Medium", "ai_insight": "Stable sorting algorithm"},
-                    {"name": "Heap Sort", "difficulty": "Hard", "ai_insight": "Priority queue utilization"}
-                ]
-            }
-            
-            return library
-            
-        except Exception as e:
-            logger.error(f"❌ Library fetch failed: {e}")
-            return {"error": str(e)}
-
     # Helper methods
     async def _parse_code_structure(self, code: str, language: str) -> Dict[str, Any]:
         """Parse code structure using Tree-sitter"""
         try:
-            if language not in self.parsers:
+            if language not in SUPPORTED_LANGUAGES:
                 return {"error": f"Unsupported language: {language}"}
-                
-            parser = self.parsers[language]
-            tree = parser.parse(bytes(code, "utf8"))
             
-            return {
-                "functions": self._extract_functions(tree, language),
-                "loops": self._count_loops(tree, language),
-                "conditionals": self._count_conditionals(tree, language),
-                "depth": self._calculate_depth(tree.root_node)
-            }
+            # Tree-sitter holds the GIL while parsing, so a thread would still block the loop
+            return await self._code_structure(code, language)
             
         except Exception as e:
             return {"error": str(e)}
 
-    def _extract_functions(self, tree, language: str) -> List[str]:
+    @staticmethod
+    @cpu_bound("process")
+    def _code_structure(code: str, language: str) -> Dict[str, Any]:
+        """Parse and measure in a worker process; only the small summary comes back"""
+        parser = get_parser(language)
+        tree = parser.parse(bytes(code, "utf8"))
+        
+        return {
+            "functions": CodeAnalyzer._extract_functions(tree, language),
+            "loops": CodeAnalyzer._count_loops(tree, language),
+            "conditionals": CodeAnalyzer._count_conditionals(tree, language),
+            "depth": CodeAnalyzer._calculate_depth(tree.root_node)
+        }
+
+    @staticmethod
+    def _extract_functions(tree, language: str) -> List[str]:
         """Extract function names from AST"""
         functions = []
         # Implementation would traverse AST to find function definitions
         return functions
 
-    def _count_loops(self, tree, language: str) -> int:
+    @staticmethod
+    def _count_loops(tree, language: str) -> int:
         """Count loop constructs in code"""
         # Implementation would count for/while loops
         return 0
 
-    def _count_conditionals(self, tree, language: str) -> int:
+    @staticmethod
+    def _count_conditionals(tree, language: str) -> int:
         """Count conditional statements"""
         # Implementation would count if/else/switch statements
         return 0
 
-    def _calculate_depth(self, node) -> int:
+    @staticmethod
+    def _calculate_depth(node) -> int:
         """Calculate maximum nesting depth"""
-        if not node.children:
-            return 1
-        return 1 + max(self._calculate_depth(child) for child in node.children)
+        # Iterative: deeply nested code would exceed the recursion limit
+        cursor = node.walk()
+        depth = max_depth = 1
+        while True:
+            if cursor.goto_first_child():
+                depth += 1
+                max_depth = max(max_depth, depth)
+                continue
+            while not cursor.goto_next_sibling():
+                if not cursor.goto_parent():
+                    return max_depth
+                depth -= 1
 
     def _extract_time_complexity(self, analysis: str) -> str:
         """Extract time complexity from AI analysis"""
@@ -0,0 +1,320 @@
+"""
+Empirical complexity profiles: measured time and memory growth with fitted reference curves
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import re
+import statistics
+from collections import OrderedDict
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from services.corpus_harness import (
+    ALGORITHMS_ROOT, CORPUS_LANGUAGES, build_cpp_harness, build_python_harness,
+    corpus_files, input_generators, load_reference
+)
+from services.performance_benchmarker import PerformanceBenchmarker
+from services.test_case_generators import detect_input_signature, make_test_case
+from utils.logger import setup_logger
+
+logger = setup_logger("complexity_profiler")
+
+# Doubling sizes separate n from n log n from n² better than decades
+PROFILE_SIZES = (1000, 2000, 4000, 8000, 16000, 32000, 64000)
+PROFILE_SEED = 0
+
+# Runs of one profile are sequential; this bounds the runs of all profiles
+# measured at once (a submission and its corpus references) so they disturb
+# each other's timings little
+MAX_PARALLEL_RUNS = int(os.getenv("PROFILE_PARALLEL_RUNS", "2"))
+PROFILE_REPEATS = int(os.getenv("PROFILE_REPEATS", "5"))  # runs per size; the median is kept
+BASELINE_SIZES = (0, 1)  # input sizes tried for the startup baseline, in order
+MAX_CACHED_PROFILES = 128
+MAX_COMPARISON_REFERENCES = 3
+
+# Reference curves, simplest first; ties in fit quality go to the simpler one
+REFERENCE_CURVES: List[Tuple[str, Callable[[float], float]]] = [
+    ("O(1)", lambda n: 0.0),
+    ("O(log n)", lambda n: math.log2(n)),
+    ("O(n)", lambda n: n),
+    ("O(n log n)", lambda n: n * math.log2(n)),
+    ("O(n²)", lambda n: n * n),
+    ("O(n³)", lambda n: n ** 3)
+]
+FIT_TOLERANCE = 1.05  # a simpler curve wins unless the best one has 5% less residual error
+
+# Corpus categories to draw comparison references from, by detected problem shape
+_CATEGORY_PATTERNS = [
+    ("Trees", re.compile(r"TreeNode|\.left\b|->left")),
+    ("Graphs", re.compile(r"\badj\w*|\bgraph\b|\bneighbou?rs?\b", re.IGNORECASE)),
+    ("Dynamic Programming", re.compile(r"\bdp\b|\bmemo\w*|\btabulat", re.IGNORECASE)),
+    ("Binary Search", re.compile(r"\bmid\b|binary.?search", re.IGNORECASE)),
+    ("Two Pointers", re.compile(r"\bleft\b.*\bright\b|\bi\b.*\bj\b.*while", re.DOTALL)),
+    ("Hashing", re.compile(r"unordered_map|HashMap|\bdict\(|\bset\(|\bCounter\b")),
+    ("Strings", re.compile(r"\bstring\b|\bString\b|\bstr\b|\.substr"))
+]
+DEFAULT_CATEGORY = "Arrays"
+
+
+def detect_category(code: str) -> str:
+    """Corpus category (directory under algorithms/<language>/) the submission most resembles"""
+    for category, pattern in _CATEGORY_PATTERNS:
+        if pattern.search(code):
+            return category
+    return DEFAULT_CATEGORY
+
+
+def fit_curve(sizes: List[int], values: List[float], curve: Callable[[float], float]) -> Dict[str, float]:
+    """Least-squares fit of value = intercept + coefficient * curve(n)"""
+    xs = [curve(n) for n in sizes]
+    count = len(xs)
+    mean_x, mean_y = sum(xs) / count, sum(values) / count
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    coefficient = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, values)) / spread if spread else 0.0
+    if coefficient < 0:
+        # A shrinking curve is no better than a constant
+        coefficient = 0.0
+    intercept = mean_y - coefficient * mean_x
+    residual = sum((y - intercept - coefficient * x) ** 2 for x, y in zip(xs, values))
+    total = sum((y - mean_y) ** 2 for y in values)
+    return {
+        'coefficient': coefficient,
+        'intercept': intercept,
+        'residual': residual,
+        'r_squared': 1 - residual / total if total else 1.0
+    }
+
+
+def fit_reference_curves(sizes: List[int], values: List[float]) -> Dict[str, Any]:
+    """Every reference curve fitted to the measurements, and the best one"""
+    fits = []
+    for label, curve in REFERENCE_CURVES:
+        fit = fit_curve(sizes, values, curve)
+        fits.append({
+            'complexity': label,
+            'coefficient': fit['coefficient'],
+            'intercept': fit['intercept'],
+            'r_squared': round(fit['r_squared'], 4),
+            'residual': fit['residual'],
+            'graph_points': [
+                {'input_size': n, 'value': fit['intercept'] + fit['coefficient'] * curve(n)} for n in sizes
+            ]
+        })
+    lowest = min(fit['residual'] for fit in fits)
+    best = next(fit for fit in fits if fit['residual'] <= lowest * FIT_TOLERANCE + 1e-12)
+    for fit in fits:
+        del fit['residual']
+    return {'best_fit': best['complexity'], 'fitted_curves': fits}
+
+
+def runnable_submission(code: str, language: str) -> str:
+    """Wrap an InterviewBit-style Solution (no I/O of its own) in the corpus harness"""
+    try:
+        if language == 'cpp' and 'Solution::' in code and not re.search(r'\bmain\s*\(', code):
+            return build_cpp_harness(code)
+        if language == 'python' and 'class Solution' in code and 'test_input' not in code:
+            return build_python_harness(code)
+    except ValueError:
+        pass
+    return code
+
+
+class ComplexityProfiler:
+    """Measure a program across growing generated inputs and fit reference growth curves"""
+
+    def __init__(self, benchmarker: PerformanceBenchmarker):
+        self.benchmarker = benchmarker
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._slots = asyncio.Semaphore(MAX_PARALLEL_RUNS)
+
+    @staticmethod
+    def profile_key(code: str, language: str, generator: str, sizes: Tuple[int, ...], seed: int) -> str:
+        digest = hashlib.sha256()
+        for part in (language, generator, ",".join(map(str, sizes)), str(seed), str(PROFILE_REPEATS), code):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    async def profile(self, code: str, language: str, generator: Optional[str] = None,
+                      sizes: Optional[List[int]] = None, seed: int = PROFILE_SEED) -> Dict[str, Any]:
+        """
+        Measured runtime and peak memory per input size, with fitted curves
+
+        Runs are sequential: PROFILE_REPEATS rounds of a baseline at n=0
+        (n=1 for programs that reject an empty input) followed by every size,
+        keeping the median per size. The baseline (startup and input parsing)
+        is subtracted before fitting. The first size that fails or times out
+        ends the profile.
+        Results are cached per (code hash, generator, sizes, seed), and
+        concurrent requests for the same profile share one measurement.
+        """
+        generator = generator or detect_input_signature(code, language)
+        sizes = tuple(sorted(sizes or PROFILE_SIZES))
+        key = self.profile_key(code, language, generator, sizes, seed)
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return {**self._cache[key], 'cached': True}
+        if key in self._pending:
+            return {**await asyncio.shield(self._pending[key]), 'cached': False}
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            profile = await self._measure(code, language, generator, sizes, seed)
+            if 'error' not in profile:
+                self._cache[key] = profile
+                while len(self._cache) > MAX_CACHED_PROFILES:
+                    self._cache.popitem(last=False)
+            future.set_result(profile)
+            return {**profile, 'cached': False}
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters, if any, have consumed the exception through their own await
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+
+    async def _measure(self, code: str, language: str, generator: str,
+                       sizes: Tuple[int, ...], seed: int) -> Dict[str, Any]:
+        logger.info(f"📈 Profiling {language} program on {generator} inputs, n={sizes[0]}..{sizes[-1]}")
+        try:
+            build = await self.benchmarker.prepare_build(code, language)
+        except ValueError as e:
+            return {'error': str(e)}
+        try:
+            return await self._measure_build(code, language, generator, sizes, seed, build)
+        finally:
+            self.benchmarker.release_build(build)
+
+    async def _measure_build(self, code: str, language: str, generator: str, sizes: Tuple[int, ...],
+                             seed: int, build: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        async def run(size: int) -> Dict[str, Any]:
+            async with self._slots:
+                return await self.benchmarker.run_isolated(code, make_test_case(generator, size, seed), language, build)
+
+        # Startup and input parsing cost the same on an empty input; programs
+        # that cannot take an empty one get the one-element input instead
+        samples: Dict[int, List[Dict[str, Any]]] = {}
+        for baseline_size in BASELINE_SIZES:
+            result = await run(baseline_size)
+            if result['passed']:
+                samples[baseline_size] = [result]
+                break
+        else:
+            return {'error': f"Baseline run on a {baseline_size}-element input failed: "
+                             f"{result.get('error', '')[:500]}"}
+
+        # Each round runs the baseline and then every size once, so drift in
+        # machine speed spreads over all sizes instead of skewing the last ones
+        samples.update({size: [] for size in sizes})
+        failure: Optional[Tuple[int, Dict[str, Any]]] = None
+        for round_index in range(PROFILE_REPEATS):
+            for size in ((baseline_size,) if round_index else ()) + sizes:
+                if failure is not None and size >= failure[0]:
+                    break
+                result = await run(size)
+                if not result['passed']:
+                    failure = (size, result)
+                    break
+                samples[size].append(result)
+
+        baseline = self._median_run(samples[baseline_size])
+        runs = [{'input_size': size, **self._median_run(samples[size])}
+                for size in sizes if failure is None or size < failure[0]]
+        stopped_at = None
+        if failure is not None:
+            size, result = failure
+            stopped_at = size
+            runs.append({'input_size': size, 'execution_time': result['execution_time'],
+                         'cpu_time': result.get('cpu_time'), 'peak_memory_bytes': result.get('peak_memory_bytes', 0),
+                         'passed': False, 'error': result.get('error', '')[:500]})
+        measured = [run for run in runs if run['passed']]
+        profile = {
+            'language': language,
+            'generator': generator,
+            'seed': seed,
+            'repeats': PROFILE_REPEATS,
+            'baseline': {'input_size': baseline_size,
+                         **{key: baseline[key] for key in ('execution_time', 'cpu_time', 'peak_memory_bytes')}},
+            'runs': runs,
+            'stopped_at': stopped_at
+        }
+        if len(measured) < 3:
+            profile['error'] = "Too few successful runs to fit growth curves"
+            return profile
+
+        measured_sizes = [run['input_size'] for run in measured]
+        # Startup and input parsing show up at n=0 too; only the growth above them is fitted
+        time_key = 'cpu_time' if all(run['cpu_time'] is not None for run in [baseline, *measured]) else 'execution_time'
+        times = [max(run[time_key] - baseline[time_key], 0.0) for run in measured]
+        memory = [float(max(run['peak_memory_bytes'] - baseline['peak_memory_bytes'], 0)) for run in measured]
+        profile['time'] = {
+            'unit': 'ms',
+            'measured': [{'input_size': n, 'value': value} for n, value in zip(measured_sizes, times)],
+            **fit_reference_curves(measured_sizes, times)
+        }
+        profile['memory'] = {
+            'unit': 'bytes',
+            'measured': [{'input_size': n, 'value': value} for n, value in zip(measured_sizes, memory)],
+            **fit_reference_curves(measured_sizes, memory)
+        }
+        return profile
+
+    @staticmethod
+    def _median_run(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        cpu_times = [result.get('cpu_time') for result in results]
+        return {
+            'execution_time': statistics.median(result['execution_time'] for result in results),
+            'cpu_time': statistics.median(cpu_times) if None not in cpu_times else None,
+            'peak_memory_bytes': statistics.median(result.get('peak_memory_bytes', 0) for result in results),
+            'passed': True,
+            'error': ''
+        }
+
+    def comparison_references(self, category: str, generator: str) -> List[str]:
+        """Corpus solutions in a category that read the same generated input"""
+        references = []
+        for relative_path in corpus_files(category):
+            with open(os.path.join(ALGORITHMS_ROOT, relative_path), encoding='utf-8', errors='replace') as f:
+                source = f.read()
+            language = CORPUS_LANGUAGES[os.path.splitext(relative_path)[1]]
+            if generator not in input_generators(source, language):
+                continue
+            try:
+                load_reference(relative_path)
+            except ValueError:
+                continue
+            references.append(relative_path)
+            if len(references) >= MAX_COMPARISON_REFERENCES:
+                break
+        return references
+
+    async def compare_with_corpus(self, code: str, language: str, category: Optional[str] = None,
+                                  generator: Optional[str] = None,
+                                  sizes: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Profile a submission alongside reference implementations from the same corpus category"""
+        generator = generator or detect_input_signature(code, language)
+        category = category or detect_category(code)
+        references = self.comparison_references(category, generator)
+
+        async def profile_reference(relative_path: str) -> Dict[str, Any]:
+            reference_code, reference_language = load_reference(relative_path)
+            return await self.profile(reference_code, reference_language, generator, sizes)
+
+        submission, *reference_profiles = await asyncio.gather(
+            self.profile(runnable_submission(code, language), language, generator, sizes),
+            *(profile_reference(path) for path in references)
+        )
+        return {
+            'category': category,
+            'generator': generator,
+            'submission': submission,
+            'references': [
+                {'path': path, 'algorithm': os.path.splitext(os.path.basename(path))[0], 'profile': profile}
+                for path, profile in zip(references, reference_profiles)
+            ]
+        }
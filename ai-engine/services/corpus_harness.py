@@ -0,0 +1,257 @@
+"""
+Runnable harnesses for solutions in the bundled algorithms/ corpus
+
+Corpus solutions are InterviewBit-style: a `Solution::method` definition (C++)
+or a `class Solution` method (Python) with no main(). The harness wraps one
+so that it reads its arguments from stdin in the test_case_generators format
+and prints the return value as whitespace-separated tokens.
+"""
+
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+ALGORITHMS_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "algorithms")
+
+CORPUS_LANGUAGES = {'.cpp': 'cpp', '.py': 'python'}
+
+# Canonical C++ type -> (reader expression, printer statement for a value `r`)
+_CPP_SCALARS = {
+    'int': 'int', 'long': 'long', 'longlong': 'long long', 'unsignedint': 'unsigned int',
+    'char': 'char', 'bool': 'bool', 'double': 'double'
+}
+
+_CPP_DEFINITION = re.compile(
+    r'^[ \t]*(?P<ret>[A-Za-z_][\w:<>,\s\*&]*?)\s*\bSolution::(?P<name>\w+)\s*\((?P<params>[^)]*)\)',
+    re.MULTILINE
+)
+
+_CPP_RUNTIME = r'''
+static vector<int> read_int_vector() { int n = 0; cin >> n; vector<int> v(max(n, 0)); for (auto &x : v) cin >> x; return v; }
+static vector<long long> read_ll_vector() { int n = 0; cin >> n; vector<long long> v(max(n, 0)); for (auto &x : v) cin >> x; return v; }
+static vector<vector<int> > read_int_matrix() { int r = 0, c = 0; cin >> r >> c; vector<vector<int> > m(max(r, 0), vector<int>(max(c, 0))); for (auto &row : m) for (auto &x : row) cin >> x; return m; }
+static vector<string> read_string_vector() { int n = 0; cin >> n; vector<string> v(max(n, 0)); for (auto &s : v) cin >> s; return v; }
+static string read_string() { int n = 0; string s; cin >> n; if (n > 0) cin >> s; return s; }
+template <typename T> static void print_value(const T &x) { cout << x << "\n"; }
+static void print_value(bool x) { cout << (x ? 1 : 0) << "\n"; }
+template <typename T> static void print_value(const vector<T> &v) { for (size_t i = 0; i < v.size(); i++) cout << (i ? " " : "") << v[i]; cout << "\n"; }
+template <typename T> static void print_value(const vector<vector<T> > &m) { for (auto &row : m) print_value(row); }
+'''
+
+_CPP_READERS = {
+    'vector<int>': 'read_int_vector()',
+    'vector<longlong>': 'read_ll_vector()',
+    'vector<vector<int>>': 'read_int_matrix()',
+    'vector<string>': 'read_string_vector()',
+    'string': 'read_string()'
+}
+
+# Generators whose text format a harness reader consumes in full
+_READER_GENERATORS = {
+    'read_int_vector()': ('int_array', 'sorted_array'),
+    'read_ll_vector()': ('int_array', 'sorted_array'),
+    'read_int_matrix()': ('matrix',),
+    'read_string()': ('string',),
+    'read_list()': ('int_array', 'sorted_array'),
+    'read_matrix()': ('matrix',)
+}
+
+_PYTHON_PARAM_COMMENT = re.compile(r'#\s*@param\s+\w+\s*:\s*(?P<type>.+)')
+
+
+def resolve_corpus_path(relative_path: str) -> str:
+    """Absolute path of a corpus file; rejects paths that escape algorithms/"""
+    path = os.path.realpath(os.path.join(ALGORITHMS_ROOT, relative_path))
+    if os.path.commonpath([path, os.path.realpath(ALGORITHMS_ROOT)]) != os.path.realpath(ALGORITHMS_ROOT):
+        raise ValueError(f"Reference path is outside the algorithms corpus: {relative_path}")
+    if not os.path.isfile(path):
+        raise ValueError(f"Reference solution not found: {relative_path}")
+    return path
+
+
+def _canonical_type(declaration: str) -> str:
+    """'const vector < vector<int> > &' -> 'vector<vector<int>>'"""
+    declaration = re.sub(r'\bconst\b|&', ' ', declaration)
+    return re.sub(r'\s+', '', declaration)
+
+
+def _split_params(params: str) -> List[str]:
+    parts, depth, current = [], 0, ''
+    for char in params:
+        if char == '<':
+            depth += 1
+        elif char == '>':
+            depth -= 1
+        if char == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+        else:
+            current += char
+    if current.strip():
+        parts.append(current)
+    return parts
+
+
+def _param_type(param: str) -> str:
+    """Strip the parameter name off a C++ parameter declaration"""
+    param = param.split('=')[0].strip()
+    match = re.match(r'(?P<type>.*?)(?P<name>\w+)\s*$', param, re.DOTALL)
+    return _canonical_type(match.group('type') if match else param)
+
+
+def _cpp_reader(canonical: str) -> Optional[str]:
+    if canonical in _CPP_READERS:
+        return _CPP_READERS[canonical]
+    if canonical in _CPP_SCALARS:
+        return f'([]() {{ {_CPP_SCALARS[canonical]} x{{}}; cin >> x; return x; }})()'
+    return None
+
+
+def build_cpp_harness(source: str, entry: Optional[str] = None) -> str:
+    """Wrap a corpus C++ solution into a program that reads stdin and prints the result"""
+    definitions = list(_CPP_DEFINITION.finditer(source))
+    if not definitions:
+        raise ValueError("No Solution:: method found in reference solution")
+
+    if entry:
+        matching = [d for d in definitions if d.group('name') == entry]
+        if not matching:
+            raise ValueError(f"Reference solution has no method named {entry}")
+        target = matching[0]
+    else:
+        # Helpers are defined before the method InterviewBit calls
+        target = definitions[-1]
+
+    declarations = []
+    for definition in definitions:
+        declarations.append(
+            f"    static {definition.group('ret').strip()} {definition.group('name')}({definition.group('params')});"
+        )
+
+    arguments, reads = [], []
+    for index, param in enumerate(_split_params(target.group('params'))):
+        canonical = _param_type(param)
+        reader = _cpp_reader(canonical)
+        if reader is None:
+            raise ValueError(f"Unsupported parameter type for harness: {param.strip()}")
+        reads.append(f"    auto arg{index} = {reader};")
+        arguments.append(f"arg{index}")
+
+    return_type = _canonical_type(target.group('ret'))
+    call = f"Solution::{target.group('name')}({', '.join(arguments)})"
+    if return_type == 'void':
+        if not arguments:
+            raise ValueError("void reference method without arguments has no observable output")
+        # In-place algorithms: the first argument is the result
+        invoke = f"    {call};\n    print_value(arg0);"
+    else:
+        if _cpp_reader(return_type) is None:
+            raise ValueError(f"Unsupported return type for harness: {target.group('ret').strip()}")
+        invoke = f"    print_value({call});"
+
+    header = "#include <bits/stdc++.h>\nusing namespace std;\n\nclass Solution {\npublic:\n"
+    return (
+        header + "\n".join(declarations) + "\n};\n\n" + source + "\n" + _CPP_RUNTIME +
+        "\nint main() {\n    ios::sync_with_stdio(false);\n    cin.tie(nullptr);\n" +
+        "\n".join(reads) + "\n" + invoke + "\n    return 0;\n}\n"
+    )
+
+
+def _python_reader(type_comment: str) -> Optional[str]:
+    type_comment = type_comment.strip().lower()
+    if 'list of list' in type_comment:
+        return 'read_matrix()'
+    if 'list of' in type_comment and 'string' in type_comment:
+        return 'read_strings()'
+    if 'list of' in type_comment or 'tuple of' in type_comment:
+        return 'read_list()'
+    if 'string' in type_comment:
+        return 'read_string()'
+    if 'integer' in type_comment or 'long' in type_comment:
+        return 'int(next(tokens))'
+    return None
+
+
+def build_python_harness(source: str, entry: Optional[str] = None) -> str:
+    """Wrap a corpus Python `class Solution` into a test_input/result program"""
+    methods = re.findall(r'^\s+def\s+(\w+)\s*\(self', source, re.MULTILINE)
+    methods = [name for name in methods if not name.startswith('_')]
+    if not methods:
+        raise ValueError("No Solution method found in reference solution")
+    method = entry or methods[0]
+
+    readers = [_python_reader(match.group('type')) for match in _PYTHON_PARAM_COMMENT.finditer(source)]
+    if not readers or None in readers:
+        raise ValueError("Reference solution needs '# @param' type comments for every argument")
+
+    return source + f'''
+
+tokens = iter(test_input.split())
+
+def read_list():
+    return [int(next(tokens)) for _ in range(int(next(tokens)))]
+
+def read_strings():
+    return [next(tokens) for _ in range(int(next(tokens)))]
+
+def read_matrix():
+    rows, cols = int(next(tokens)), int(next(tokens))
+    return [[int(next(tokens)) for _ in range(cols)] for _ in range(rows)]
+
+def read_string():
+    return next(tokens) if int(next(tokens)) > 0 else ""
+
+result = Solution().{method}({', '.join(readers)})
+'''
+
+
+def load_reference(relative_path: str, entry: Optional[str] = None) -> Tuple[str, str]:
+    """(runnable code, language) for a corpus file"""
+    path = resolve_corpus_path(relative_path)
+    language = CORPUS_LANGUAGES.get(os.path.splitext(path)[1])
+    if language is None:
+        raise ValueError(f"Unsupported reference file type: {relative_path}")
+
+    with open(path, encoding='utf-8', errors='replace') as f:
+        source = f.read()
+
+    if language == 'cpp':
+        return build_cpp_harness(source, entry), language
+    return build_python_harness(source, entry), language
+
+
+def corpus_files(category: Optional[str] = None) -> List[str]:
+    """Corpus solutions as paths relative to algorithms/, optionally from one category directory"""
+    paths = []
+    for language_dir in sorted(os.listdir(ALGORITHMS_ROOT)):
+        root = os.path.join(ALGORITHMS_ROOT, language_dir, category) if category else os.path.join(ALGORITHMS_ROOT, language_dir)
+        for current, _, files in os.walk(root):
+            paths.extend(
+                os.path.relpath(os.path.join(current, name), ALGORITHMS_ROOT)
+                for name in files if os.path.splitext(name)[1] in CORPUS_LANGUAGES
+            )
+    return sorted(paths)
+
+
+def input_generators(source: str, language: str, entry: Optional[str] = None) -> Tuple[str, ...]:
+    """Generators whose input the harnessed solution reads as its only argument; () if none"""
+    if language == 'cpp':
+        definitions = [d for d in _CPP_DEFINITION.finditer(source) if not entry or d.group('name') == entry]
+        if not definitions:
+            return ()
+        params = _split_params(definitions[-1].group('params'))
+        readers = [_cpp_reader(_param_type(param)) for param in params]
+    else:
+        readers = [_python_reader(match.group('type')) for match in _PYTHON_PARAM_COMMENT.finditer(source)]
+    if len(readers) != 1:
+        return ()
+    return _READER_GENERATORS.get(readers[0], ())
+
+
+_OUTPUT_TOKEN = re.compile(r"[^\s\[\](),'\"]+")
+_BOOLEAN_TOKENS: Dict[str, str] = {'True': '1', 'False': '0', 'true': '1', 'false': '0'}
+
+
+def canonical_output(output: str) -> List[str]:
+    """Language-neutral token stream: '[1, 2]', '1 2' and '1\\n2' all compare equal"""
+    return [_BOOLEAN_TOKENS.get(token, token) for token in _OUTPUT_TOKEN.findall(output)]
@@ -0,0 +1,320 @@
+"""
+Differential correctness and speed testing against a reference solution
+"""
+
+import asyncio
+import math
+import statistics
+from typing import Dict, List, Any, Optional
+from services.performance_benchmarker import PerformanceBenchmarker
+from services.corpus_harness import canonical_output, load_reference
+from services.test_case_generators import detect_input_signature, generated_input, make_test_case
+from utils.logger import setup_logger
+
+logger = setup_logger("differential_tester")
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+DEFAULT_REPEATS = 5
+SIGNIFICANCE_LEVEL = 0.05
+
+# Shrinking re-runs both programs per candidate input, so it is bounded
+SHRINK_MAX_SIZE = 100000
+SHRINK_MAX_RUNS = 100
+
+# Generators whose inputs are "n, then n items" and can lose arbitrary items
+ELEMENT_SHRINKABLE = ('int_array', 'sorted_array', 'string')
+
+# Shrinking never goes below this many items: an empty input is outside what
+# most references handle (they read past the end or print a sentinel)
+MIN_SHRINK_ITEMS = 1
+
+
+def _continued_fraction(a: float, b: float, x: float) -> float:
+    """Lentz evaluation of the incomplete beta continued fraction"""
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1.0)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, 200):
+        numerator = m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m))
+        d = 1.0 + numerator * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + numerator / c
+        c = c if abs(c) > tiny else tiny
+        result *= d * c
+        numerator = -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))
+        d = 1.0 + numerator * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + numerator / c
+        c = c if abs(c) > tiny else tiny
+        delta = d * c
+        result *= delta
+        if abs(delta - 1.0) < 1e-12:
+            break
+    return result
+
+
+def _regularized_incomplete_beta(a: float, b: float, x: float) -> float:
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    log_front = (math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                 + a * math.log(x) + b * math.log(1.0 - x))
+    if x < (a + 1.0) / (a + b + 2.0):
+        return math.exp(log_front) * _continued_fraction(a, b, x) / a
+    return 1.0 - math.exp(log_front) * _continued_fraction(b, a, 1.0 - x) / b
+
+
+def welch_t_test(sample_a: List[float], sample_b: List[float]) -> float:
+    """Two-sided p-value for a difference in means without assuming equal variances"""
+    if len(sample_a) < 2 or len(sample_b) < 2:
+        return 1.0
+    mean_a, mean_b = statistics.fmean(sample_a), statistics.fmean(sample_b)
+    var_a = statistics.variance(sample_a) / len(sample_a)
+    var_b = statistics.variance(sample_b) / len(sample_b)
+    if var_a + var_b == 0:
+        return 1.0 if mean_a == mean_b else 0.0
+    t_statistic = (mean_a - mean_b) / math.sqrt(var_a + var_b)
+    dof = (var_a + var_b) ** 2 / (
+        (var_a ** 2) / (len(sample_a) - 1) + (var_b ** 2) / (len(sample_b) - 1)
+    )
+    return _regularized_incomplete_beta(dof / 2.0, 0.5, dof / (dof + t_statistic ** 2))
+
+
+class DifferentialTester:
+    """Run a submission and a reference side by side on identical generated inputs"""
+
+    def __init__(self, benchmarker: PerformanceBenchmarker):
+        self.benchmarker = benchmarker
+
+    async def run(
+        self,
+        code: str,
+        language: str,
+        reference_code: Optional[str] = None,
+        reference_language: Optional[str] = None,
+        reference_path: Optional[str] = None,
+        reference_entry: Optional[str] = None,
+        generator: Optional[str] = None,
+        sizes: Optional[List[int]] = None,
+        seed: int = 0,
+        repeats: int = DEFAULT_REPEATS,
+        optimization_level: str = "O2",
+        value_range: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Differential test of a submission against a reference implementation
+
+        For each size the two programs run concurrently on the same seeded
+        input. Outputs are compared as language-neutral token streams; the
+        first mismatch stops the run and that input is shrunk to a minimal
+        one that still fails. Matching sizes report the submission/reference
+        time ratio and a Welch t-test p-value over `repeats` paired runs; both
+        sides run through run_isolated, so they are measured alike.
+        """
+        submission_build = reference_build = None
+        try:
+            if reference_path:
+                reference_code, reference_language = load_reference(reference_path, reference_entry)
+            if not reference_code:
+                raise ValueError("A reference_code or reference_path is required")
+            reference_language = reference_language or language
+            generator = generator or detect_input_signature(code, language)
+            sizes = sorted(sizes or DEFAULT_SIZES)
+            repeats = max(2, repeats)
+
+            logger.info(f"⚖️ Differential test: {language} submission vs {reference_language} reference ({generator})")
+
+            builds = await asyncio.gather(
+                self.benchmarker.prepare_build(code, language, optimization_level),
+                self.benchmarker.prepare_build(reference_code, reference_language, optimization_level),
+                return_exceptions=True
+            )
+            # Keep whichever side did build, so the finally block unpins it
+            submission_build, reference_build = (None if isinstance(build, BaseException) else build
+                                                 for build in builds)
+            for build in builds:
+                if isinstance(build, BaseException):
+                    raise build
+            submission = (code, language, submission_build)
+            reference = (reference_code, reference_language, reference_build)
+
+            size_reports = []
+            for size in sizes:
+                test_case = make_test_case(generator, size, seed, value_range)
+                submission_result, reference_result = await self._run_pair(submission, reference, test_case)
+
+                if not reference_result['passed']:
+                    return {
+                        'status': 'reference_error',
+                        'generator': generator,
+                        'failing_case': test_case,
+                        'reference_error': reference_result.get('error', '')[:2000],
+                        'sizes': size_reports
+                    }
+
+                if not self._agrees(submission_result, reference_result):
+                    logger.info(f"❗ Mismatch at n={size}; shrinking")
+                    shrunk = await self._shrink(submission, reference, test_case,
+                                                submission_result, reference_result)
+                    return {
+                        'status': 'mismatch',
+                        'generator': generator,
+                        'failing_case': test_case,
+                        'minimal_failing_input': shrunk['input'],
+                        'submission_output': shrunk['submission_output'][:2000],
+                        'reference_output': shrunk['reference_output'][:2000],
+                        'submission_error': shrunk['submission_error'][:2000],
+                        'shrink_runs': shrunk['runs'],
+                        'sizes': size_reports
+                    }
+
+                submission_times = [self._cost(submission_result)]
+                reference_times = [self._cost(reference_result)]
+                for _ in range(repeats - 1):
+                    submission_run, reference_run = await self._run_pair(submission, reference, test_case)
+                    submission_times.append(self._cost(submission_run))
+                    reference_times.append(self._cost(reference_run))
+
+                size_reports.append(self._compare_timings(size, submission_times, reference_times))
+
+            ratios = [report['time_ratio'] for report in size_reports if report['time_ratio']]
+            return {
+                'status': 'match',
+                'generator': generator,
+                'seed': seed,
+                'repeats': repeats,
+                'sizes': size_reports,
+                'overall_time_ratio': math.exp(statistics.fmean(math.log(r) for r in ratios)) if ratios else None
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Differential test failed: {e}")
+            return {'status': 'error', 'error': str(e)}
+        finally:
+            self.benchmarker.release_build(submission_build)
+            self.benchmarker.release_build(reference_build)
+
+    async def _run_pair(self, submission, reference, test_case: Dict[str, Any]):
+        code, language, build = submission
+        reference_code, reference_language, reference_build = reference
+        return await asyncio.gather(
+            self.benchmarker.run_isolated(code, test_case, language, build),
+            self.benchmarker.run_isolated(reference_code, test_case, reference_language, reference_build)
+        )
+
+    @staticmethod
+    def _agrees(submission_result: Dict[str, Any], reference_result: Dict[str, Any]) -> bool:
+        return (submission_result['passed']
+                and canonical_output(submission_result.get('output', '')) ==
+                canonical_output(reference_result.get('output', '')))
+
+    @staticmethod
+    def _cost(result: Dict[str, Any]) -> float:
+        """CPU time when the backend reports it (less sensitive to the concurrent run), else wall time"""
+        return result['cpu_time'] if result.get('cpu_time') is not None else result['execution_time']
+
+    @staticmethod
+    def _compare_timings(size: int, submission_times: List[float], reference_times: List[float]) -> Dict[str, Any]:
+        submission_median = statistics.median(submission_times)
+        reference_median = statistics.median(reference_times)
+        ratio = submission_median / reference_median if reference_median else None
+        p_value = welch_t_test(submission_times, reference_times)
+
+        if p_value >= SIGNIFICANCE_LEVEL or ratio is None:
+            verdict = 'no significant difference'
+        elif ratio > 1:
+            verdict = 'slower'
+        else:
+            verdict = 'faster'
+
+        return {
+            'size': size,
+            'submission_median_ms': submission_median,
+            'reference_median_ms': reference_median,
+            'time_ratio': ratio,
+            'p_value': p_value,
+            'verdict': verdict
+        }
+
+    async def _shrink(self, submission, reference, test_case: Dict[str, Any],
+                      submission_result: Dict[str, Any], reference_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Reduce the failing input of test_case while the two programs still disagree"""
+        runs = 0
+        last_failure: Dict[str, Any] = {
+            'input': None,
+            'submission_output': submission_result.get('output', ''),
+            'reference_output': reference_result.get('output', ''),
+            'submission_error': submission_result.get('error', '')
+        }
+
+        async def fails(input_text: str) -> bool:
+            nonlocal runs, last_failure
+            runs += 1
+            candidate = {'input': input_text, 'description': 'shrink candidate'}
+            submission_run, reference_run = await self._run_pair(submission, reference, candidate)
+            if not reference_run['passed'] or self._agrees(submission_run, reference_run):
+                return False
+            # Inputs the reference has no trustworthy answer for are invalid, not counterexamples
+            if not await self._reference_sane(reference, candidate, reference_run):
+                return False
+            last_failure = {
+                'input': input_text,
+                'submission_output': submission_run.get('output', ''),
+                'reference_output': reference_run.get('output', ''),
+                'submission_error': submission_run.get('error', '')
+            }
+            return True
+
+        if test_case['size'] > SHRINK_MAX_SIZE:
+            # Too large to materialize; the spec reproduces it
+            return {**last_failure, 'runs': runs}
+
+        failing_input = generated_input(test_case)
+        last_failure['input'] = failing_input
+        if test_case['generator'] in ELEMENT_SHRINKABLE and await fails(failing_input):
+            await self._shrink_elements(failing_input, test_case['generator'], fails, lambda: runs)
+        return {**last_failure, 'runs': runs}
+
+    async def _reference_sane(self, reference, test_case: Dict[str, Any], reference_result: Dict[str, Any]) -> bool:
+        """
+        Whether the reference's answer to a shrink candidate can be trusted:
+        it printed something, and prints the same again on a second run
+        (references with undefined behaviour on an input often do neither)
+        """
+        expected = canonical_output(reference_result.get('output', ''))
+        if not expected:
+            return False
+        reference_code, reference_language, reference_build = reference
+        again = await self.benchmarker.run_isolated(reference_code, test_case, reference_language, reference_build)
+        return again['passed'] and canonical_output(again.get('output', '')) == expected
+
+    @staticmethod
+    async def _shrink_elements(input_text: str, generator: str, fails, runs_used) -> str:
+        """Delta-debugging removal of chunks of elements, halving the chunk size; fails() records each accepted input"""
+        tokens = input_text.split()
+        if generator == 'string':
+            items = list(tokens[1]) if len(tokens) > 1 else []
+            render = lambda values: f"{len(values)}\n{''.join(values)}\n"
+        else:
+            items = tokens[1:]
+            render = lambda values: f"{len(values)}\n{' '.join(values)}\n"
+
+        chunk = max(1, len(items) // 2)
+        while items and runs_used() < SHRINK_MAX_RUNS:
+            index, removed = 0, False
+            while index < len(items) and runs_used() < SHRINK_MAX_RUNS:
+                candidate = items[:index] + items[index + chunk:]
+                if len(candidate) < MIN_SHRINK_ITEMS:
+                    index += chunk
+                    continue
+                if await fails(render(candidate)):
+                    items, removed = candidate, True
+                else:
+                    index += chunk
+            if not removed:
+                if chunk == 1:
+                    break
+                chunk = max(1, chunk // 2)
+        return render(items)
@@ -0,0 +1,81 @@
+"""
+Sandboxed execution tracing for step-through visualizations
+"""
+
+import json
+import os
+import sys
+import tempfile
+from typing import Dict, List, Any
+from utils.sandbox import run_sandboxed, DEFAULT_MEMORY_LIMIT_MB, DEFAULT_TIMEOUT
+from utils.logger import setup_logger
+
+logger = setup_logger("execution_tracer")
+
+TRACER_RUNNER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "runners", "python_tracer.py")
+
+# The tracer stops itself this long before the sandbox kills it, so a
+# partial trace is still returned for code that runs too long
+TRACE_SHUTDOWN_MARGIN = 0.75  # seconds
+
+TRACEABLE_LANGUAGES = ('python',)
+
+
+def delta_decode(values: List[int]) -> List[int]:
+    """Invert the tracer's delta encoding of an integer column"""
+    decoded, current = [], 0
+    for value in values:
+        current += value
+        decoded.append(current)
+    return decoded
+
+
+class ExecutionTracer:
+    """Run a submission under the line tracer and return its columnar trace"""
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, memory_limit_mb: int = DEFAULT_MEMORY_LIMIT_MB):
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+
+    async def trace(self, code: str, language: str, test_input: str = "") -> Dict[str, Any]:
+        """
+        Trace one run of a submission
+
+        Args:
+            code: Submission source
+            language: Only Python submissions can be traced
+            test_input: Bound to `test_input` inside the submission
+
+        Returns:
+            The tracer's trace document (see runners/python_tracer.py)
+        """
+        if language not in TRACEABLE_LANGUAGES:
+            raise ValueError(f"Execution tracing is not supported for {language}")
+
+        with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+            f.write(code)
+            code_file = f.name
+
+        try:
+            budget = max(self.timeout - TRACE_SHUTDOWN_MARGIN, 0.5)
+            result = await run_sandboxed(
+                [sys.executable, '-I', TRACER_RUNNER, code_file, str(budget)],
+                test_input,
+                timeout=self.timeout,
+                memory_limit_mb=self.memory_limit_mb
+            )
+        finally:
+            os.unlink(code_file)
+
+        if result['timed_out']:
+            raise RuntimeError("Execution trace exceeded the time limit")
+        if result['returncode'] != 0:
+            stderr = result['stderr'].decode(errors='replace').strip()
+            raise RuntimeError(f"Tracer failed: {stderr[-500:] or 'exit status ' + str(result['returncode'])}")
+
+        trace = json.loads(result['stdout'])
+        logger.info(
+            f"🎯 Traced {trace['total_steps']} steps ({trace['recorded_steps']} recorded, "
+            f"{len(result['stdout']) / 1024:.0f} KB) with {trace['engine']}"
+        )
+        return trace
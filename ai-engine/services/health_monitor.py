@@ -0,0 +1,160 @@
+"""
+Liveness and readiness from load measurements sampled in the background
+
+A sampler task wakes every SAMPLE_INTERVAL seconds, records how late it woke
+(event-loop lag) and snapshots sandbox queue depth, in-flight LLM requests,
+host CPU/memory and whether the caches are warm. Probes only read the last
+snapshot, so a load balancer polling them adds no work.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Any, Optional, Tuple
+import psutil
+from utils.llm import llm_in_flight, llm_stats
+from utils.sandbox import sandbox_stats, SANDBOX_CONCURRENCY
+from utils.executors import executor_stats
+from utils.logger import setup_logger
+
+logger = setup_logger("health_monitor")
+
+SAMPLE_INTERVAL = float(os.getenv("HEALTH_SAMPLE_INTERVAL", "0.5"))  # seconds
+LAG_WINDOW = 10  # samples whose worst event-loop lag counts against readiness
+
+# Overload thresholds; above any of them the worker reports not ready
+READY_MAX_LOOP_LAG_MS = float(os.getenv("READY_MAX_LOOP_LAG_MS", "250"))
+READY_MAX_SANDBOX_QUEUE = int(os.getenv("READY_MAX_SANDBOX_QUEUE", str(4 * SANDBOX_CONCURRENCY)))
+READY_MAX_LLM_IN_FLIGHT = int(os.getenv("READY_MAX_LLM_IN_FLIGHT", "32"))
+MEMORY_USAGE_THRESHOLD = float(os.getenv("MEMORY_USAGE_THRESHOLD", "80"))  # percent
+CPU_USAGE_THRESHOLD = float(os.getenv("CPU_USAGE_THRESHOLD", "80"))        # percent, reported only
+
+# A snapshot older than this means the sampler (or the loop) has stalled
+STALE_AFTER = max(5.0, 10 * SAMPLE_INTERVAL)
+
+
+class HealthMonitor:
+    """Background load sampler behind /health/live and /health/ready"""
+
+    def __init__(self, warm_checks: Optional[Dict[str, Callable[[], bool]]] = None):
+        self.warm_checks = warm_checks or {}
+        self.started_at = time.monotonic()
+        self.services: Optional[Dict[str, Dict[str, Any]]] = None
+        self.snapshot: Dict[str, Any] = {'ready': False, 'reasons': ["starting"]}
+        self._lags: "deque[float]" = deque(maxlen=LAG_WINDOW)
+        self._sampled_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start sampling on the running event loop"""
+        if self._task is None or self._task.done():
+            psutil.cpu_percent(None)  # the first reading has no interval to measure over
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def mark_initialized(self, services: Dict[str, Dict[str, Any]]):
+        """Startup results per service (ready_ms, error); readiness waits for them"""
+        self.services = services
+        self._refresh()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        expected = loop.time() + SAMPLE_INTERVAL
+        while True:
+            await asyncio.sleep(SAMPLE_INTERVAL)
+            now = loop.time()
+            self._lags.append(max(0.0, now - expected) * 1000)
+            expected = now + SAMPLE_INTERVAL
+            self._refresh()
+
+    def _refresh(self):
+        try:
+            self.snapshot = self._sample()
+            self._sampled_at = time.monotonic()
+        except Exception as e:
+            logger.warning(f"⚠️ Health sample failed: {e}")
+
+    def _sample(self) -> Dict[str, Any]:
+        sandbox = sandbox_stats()
+        in_flight = llm_in_flight()
+        memory_percent = psutil.virtual_memory().percent
+        cpu_percent = psutil.cpu_percent(None)
+        caches = {name: bool(check()) for name, check in self.warm_checks.items()}
+        lag_ms = self._lags[-1] if self._lags else 0.0
+        max_lag_ms = max(self._lags, default=0.0)
+
+        reasons = []
+        if self.services is None:
+            reasons.append("starting")
+        else:
+            failed = [name for name, result in self.services.items() if 'error' in result]
+            if failed:
+                reasons.append(f"services failed to initialize: {', '.join(failed)}")
+        if max_lag_ms > READY_MAX_LOOP_LAG_MS:
+            reasons.append(f"event loop lag {max_lag_ms:.0f}ms > {READY_MAX_LOOP_LAG_MS:.0f}ms")
+        if sandbox['waiting'] > READY_MAX_SANDBOX_QUEUE:
+            reasons.append(f"sandbox queue {sandbox['waiting']} > {READY_MAX_SANDBOX_QUEUE}")
+        if in_flight > READY_MAX_LLM_IN_FLIGHT:
+            reasons.append(f"LLM requests in flight {in_flight} > {READY_MAX_LLM_IN_FLIGHT}")
+        if memory_percent > MEMORY_USAGE_THRESHOLD:
+            reasons.append(f"memory {memory_percent:.0f}% > {MEMORY_USAGE_THRESHOLD:.0f}%")
+        cold = [name for name, warm in caches.items() if not warm]
+        if cold:
+            reasons.append(f"cold caches: {', '.join(cold)}")
+
+        return {
+            'ready': not reasons,
+            'reasons': reasons,
+            'sampled_at': datetime.now().isoformat(),
+            'event_loop': {'lag_ms': round(lag_ms, 1), 'max_lag_ms': round(max_lag_ms, 1)},
+            'sandbox': sandbox,
+            'llm': {'in_flight': in_flight, **llm_stats()},
+            'executors': executor_stats(),
+            'system': {
+                'cpu_percent': cpu_percent,
+                'cpu_busy': cpu_percent > CPU_USAGE_THRESHOLD,
+                'memory_percent': memory_percent
+            },
+            'caches': caches,
+            'services': self.services,
+            'thresholds': {
+                'max_loop_lag_ms': READY_MAX_LOOP_LAG_MS,
+                'max_sandbox_queue': READY_MAX_SANDBOX_QUEUE,
+                'max_llm_in_flight': READY_MAX_LLM_IN_FLIGHT,
+                'max_memory_percent': MEMORY_USAGE_THRESHOLD
+            }
+        }
+
+    def _sample_age(self) -> Optional[float]:
+        return None if self._sampled_at is None else time.monotonic() - self._sampled_at
+
+    def liveness(self) -> Tuple[bool, Dict[str, Any]]:
+        """Alive while the sampler keeps running; a stalled loop stops it"""
+        age = self._sample_age()
+        sampler_running = self._task is not None and not self._task.done()
+        alive = sampler_running and age is not None and age < STALE_AFTER
+        return alive, {
+            'alive': alive,
+            'uptime_s': round(time.monotonic() - self.started_at, 1),
+            'last_sample_age_ms': None if age is None else round(age * 1000, 1)
+        }
+
+    def readiness(self) -> Tuple[bool, Dict[str, Any]]:
+        """Last snapshot; not ready when overloaded, cold, starting or no longer sampled"""
+        age = self._sample_age()
+        snapshot = dict(self.snapshot)
+        if age is None or age >= STALE_AFTER:
+            snapshot['ready'] = False
+            snapshot['reasons'] = snapshot.get('reasons', []) + ["health sampler stalled"]
+        snapshot['sample_age_ms'] = None if age is None else round(age * 1000, 1)
+        return snapshot['ready'], snapshot
@@ -0,0 +1,323 @@
+"""
+Background jobs for long-running analyses, persisted in SQLite
+
+A submitted job is a row in the jobs table. Every worker process runs a
+JobScheduler that claims queued rows with one atomic UPDATE, so any number of
+workers can share one store. A running job holds a lease that its worker
+renews; when a worker dies the lease runs out and the job is claimed again,
+so jobs survive restarts. Identical submissions (same user, kind and payload)
+share one job while it is queued, running or recently succeeded; a job is only
+visible to the user who submitted it.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import time
+import uuid
+import zlib
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Any, Optional, Tuple
+from pydantic import BaseModel
+from utils.llm import set_llm_caller, BATCH
+from utils.logger import setup_logger
+
+logger = setup_logger("job_queue")
+
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))  # jobs run at once per worker process
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_HOURS", "24")) * 3600
+LEASE_SECONDS = 60          # a running job is reclaimed this long after its last heartbeat
+HEARTBEAT_SECONDS = 15
+POLL_INTERVAL = 1.0         # seconds between store checks for jobs submitted by other workers
+PRUNE_INTERVAL = 600
+MAX_ATTEMPTS = 3            # claims (including ones lost to crashes) before a job fails for good
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+TERMINAL = (SUCCEEDED, FAILED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    user_id TEXT,
+    payload BLOB NOT NULL,
+    result BLOB,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_dedup_key ON jobs (dedup_key, status);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created_at);
+"""
+
+_COLUMNS = "job_id, kind, status, payload, result, error, attempts, created_at, started_at, finished_at"
+
+
+def dedup_key(kind: str, payload: Dict[str, Any], user_id: Optional[str] = None) -> str:
+    """Content hash of one user's submission: equal keys get the same job"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(f"{kind}\0{user_id or ''}\0{canonical}".encode()).hexdigest()
+
+
+def _pack(value: Any) -> bytes:
+    plain = value.model_dump() if isinstance(value, BaseModel) else value
+    return zlib.compress(json.dumps(plain, separators=(',', ':')).encode(), 6)
+
+
+def _unpack(blob: Optional[bytes]) -> Any:
+    return json.loads(zlib.decompress(blob)) if blob is not None else None
+
+
+def _timestamp(value: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(value).isoformat() if value is not None else None
+
+
+class JobStore:
+    """SQLite job table shared by every worker process on the host"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv(
+            "JOB_STORE_PATH", os.path.join(tempfile.gettempdir(), "algomaster-jobs.sqlite3")
+        )
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            # Autocommit; writes that must be atomic open their own transaction
+            self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+        return self._connection
+
+    @staticmethod
+    def _job(row) -> Dict[str, Any]:
+        job_id, kind, status, payload, result, error, attempts, created_at, started_at, finished_at = row
+        job = {
+            'job_id': job_id,
+            'kind': kind,
+            'status': status,
+            'attempts': attempts,
+            'created_at': _timestamp(created_at),
+            'started_at': _timestamp(started_at),
+            'finished_at': _timestamp(finished_at)
+        }
+        if status == SUCCEEDED:
+            job['result'] = _unpack(result)
+        if error:
+            job['error'] = error
+        return job
+
+    def submit(self, kind: str, payload: Dict[str, Any], user_id: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """The job for this payload, creating it unless an identical one is live; (job, deduplicated)"""
+        key = dedup_key(kind, payload, user_id)
+        now = time.time()
+        connection = self.connection
+        # IMMEDIATE takes the write lock up front, so two workers cannot both miss and insert
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE dedup_key = ? AND kind = ? "
+                "AND (status IN (?, ?) OR (status = ? AND finished_at > ?)) ORDER BY created_at DESC LIMIT 1",
+                (key, kind, QUEUED, RUNNING, SUCCEEDED, now - JOB_RETENTION_SECONDS)
+            ).fetchone()
+            if row:
+                connection.execute("COMMIT")
+                return self._job(row), True
+            job_id = uuid.uuid4().hex
+            connection.execute(
+                "INSERT INTO jobs (job_id, kind, dedup_key, status, user_id, payload, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, key, QUEUED, user_id, _pack(payload), now)
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return self.get(job_id), False
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self.connection.execute(f"SELECT {_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def status(self, job_id: str) -> Optional[str]:
+        row = self.connection.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def owned_by(self, job_id: str, user_id: Optional[str]) -> bool:
+        """Whether the job exists and was submitted by this user"""
+        row = self.connection.execute(
+            "SELECT 1 FROM jobs WHERE job_id = ? AND user_id IS ?", (job_id, user_id)
+        ).fetchone()
+        return row is not None
+
+    def claim(self, worker: str) -> Optional[Tuple[str, str, Dict[str, Any], int, Optional[str]]]:
+        """Oldest queued job, or a running one whose lease expired; (job_id, kind, payload, attempts, user_id)"""
+        now = time.time()
+        row = self.connection.execute(
+            "UPDATE jobs SET status = ?, worker = ?, lease_until = ?, started_at = ?, attempts = attempts + 1 "
+            "WHERE job_id = (SELECT job_id FROM jobs WHERE status = ? OR (status = ? AND lease_until < ?) "
+            "ORDER BY created_at LIMIT 1) RETURNING job_id, kind, payload, attempts, user_id",
+            (RUNNING, worker, now + LEASE_SECONDS, now, QUEUED, RUNNING, now)
+        ).fetchone()
+        if row is None:
+            return None
+        job_id, kind, payload, attempts, user_id = row
+        return job_id, kind, _unpack(payload), attempts, user_id
+
+    def heartbeat(self, job_id: str, worker: str):
+        self.connection.execute(
+            "UPDATE jobs SET lease_until = ? WHERE job_id = ? AND worker = ? AND status = ?",
+            (time.time() + LEASE_SECONDS, job_id, worker, RUNNING)
+        )
+
+    def finish(self, job_id: str, worker: str, result: Any = None, error: Optional[str] = None):
+        """Record the outcome, unless the lease was lost and another worker took the job over"""
+        self.connection.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL "
+            "WHERE job_id = ? AND worker = ? AND status = ?",
+            (FAILED if error else SUCCEEDED, None if error else _pack(result), error, time.time(), job_id, worker, RUNNING)
+        )
+
+    def release(self, job_id: str, worker: str):
+        """Hand a job back to the queue on shutdown; the interrupted attempt does not count"""
+        self.connection.execute(
+            "UPDATE jobs SET status = ?, worker = NULL, lease_until = NULL, attempts = attempts - 1 "
+            "WHERE job_id = ? AND worker = ? AND status = ?",
+            (QUEUED, job_id, worker, RUNNING)
+        )
+
+    def prune(self) -> int:
+        """Drop finished jobs older than the retention period"""
+        cursor = self.connection.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+            (SUCCEEDED, FAILED, time.time() - JOB_RETENTION_SECONDS)
+        )
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+class JobScheduler:
+    """Claims and runs jobs from a JobStore with bounded concurrency"""
+
+    def __init__(self, store: JobStore, handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]],
+                 concurrency: int = JOB_CONCURRENCY):
+        self.store = store
+        self.handlers = handlers
+        self.concurrency = max(1, concurrency)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._running: Dict[str, asyncio.Task] = {}
+        self._finished = asyncio.Event()  # replaced after every job that ends here
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start claiming jobs on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"🗂️ Job scheduler {self.worker_id} started ({self.concurrency} concurrent jobs)")
+
+    async def stop(self):
+        """Stop claiming and hand running jobs back to the queue for another worker"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        running = list(self._running.items())
+        for _, task in running:
+            task.cancel()
+        await asyncio.gather(*(task for _, task in running), return_exceptions=True)
+        for job_id, _ in running:
+            self.store.release(job_id, self.worker_id)
+
+    def submit(self, kind: str, payload: Dict[str, Any], user_id: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job, deduplicated = self.store.submit(kind, payload, user_id)
+        if not deduplicated:
+            self._wake.set()
+        return job, deduplicated
+
+    async def _run(self):
+        last_prune = 0.0
+        while True:
+            if time.monotonic() - last_prune > PRUNE_INTERVAL:
+                pruned = self.store.prune()
+                if pruned:
+                    logger.info(f"🧹 Pruned {pruned} finished jobs")
+                last_prune = time.monotonic()
+
+            claimed = None
+            if len(self._running) < self.concurrency:
+                claimed = self.store.claim(self.worker_id)
+            if claimed is None:
+                # Woken early by local submissions and finished jobs; others are found by polling
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            job_id = claimed[0]
+            self._running[job_id] = asyncio.get_running_loop().create_task(self._execute(*claimed))
+
+    async def _execute(self, job_id: str, kind: str, payload: Dict[str, Any], attempts: int,
+                       user_id: Optional[str]):
+        # Nobody is waiting on the connection; the job's LLM requests yield to interactive ones
+        set_llm_caller(user_id or "anonymous", BATCH)
+        heartbeat = asyncio.get_running_loop().create_task(self._heartbeat(job_id))
+        started = time.perf_counter()
+        try:
+            if attempts > MAX_ATTEMPTS:
+                raise RuntimeError(f"Abandoned after {MAX_ATTEMPTS} attempts")
+            logger.info(f"▶️ Job {job_id} ({kind}) started, attempt {attempts}")
+            result = await self.handlers[kind](payload)
+            self.store.finish(job_id, self.worker_id, result=result)
+            logger.info(f"✅ Job {job_id} succeeded in {time.perf_counter() - started:.1f}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.store.finish(job_id, self.worker_id, error=str(e) or type(e).__name__)
+            logger.error(f"❌ Job {job_id} failed: {e}")
+        finally:
+            heartbeat.cancel()
+            self._running.pop(job_id, None)
+            finished, self._finished = self._finished, asyncio.Event()
+            finished.set()
+            self._wake.set()
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            self.store.heartbeat(job_id, self.worker_id)
+
+    async def wait(self, job_id: str, timeout: float, changed_from: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        The job once it finishes (or leaves status `changed_from`), or as it is after `timeout` seconds
+
+        Jobs that end in this process wake waiters directly; changes made by
+        other workers are noticed by polling the store every POLL_INTERVAL.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            status = self.store.status(job_id)
+            remaining = deadline - time.monotonic()
+            if (status is None or status in TERMINAL or remaining <= 0
+                    or (changed_from is not None and status != changed_from)):
+                return self.store.get(job_id)
+            try:
+                await asyncio.wait_for(self._finished.wait(), min(remaining, POLL_INTERVAL))
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,183 @@
+"""
+Analyze-as-you-type over a WebSocket
+
+The editor sends the full buffer after every edit. Edits arriving within
+STATIC_DEBOUNCE_MS of each other are coalesced into one analysis of the
+cheap static stages (metrics, anti-patterns, CFG), which reuse the
+incremental session of services/analysis_session and are pushed at once.
+The expensive stages (LLM explanation, sandboxed benchmark) only start once
+the buffer has been unchanged for IDLE_DELAY_MS.
+
+A newer edit cancels whatever is still running for an older version. The
+cancellation reaches the LLM request (its HTTP request is aborted) and the
+sandbox (its process group is killed and the slot returned), so abandoned
+work stops consuming quota and CPU.
+
+Client messages:
+
+    {"type": "edit", "code": "...", "language": "python", "version": 7}
+    {"type": "config", "stages": ["explanation"], "test_cases": [...], "optimization_level": "O2"}
+    {"type": "cancel"}
+    {"type": "ping"}
+
+Server messages: ready, static, stage, cancelled, error, pong.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Any, Optional
+from services.analysis_session import AnalysisSessionManager
+from utils.logger import setup_logger
+
+logger = setup_logger("live_analysis")
+
+STATIC_DEBOUNCE_MS = float(os.getenv("LIVE_STATIC_DEBOUNCE_MS", "25"))
+IDLE_DELAY_MS = float(os.getenv("LIVE_IDLE_DELAY_MS", "1000"))
+MAX_BUFFER_BYTES = int(os.getenv("LIVE_MAX_BUFFER_BYTES", str(512 * 1024)))
+
+STATIC_STAGES = ("metrics", "anti_patterns", "cfg")
+EXPENSIVE_STAGES = ("explanation", "benchmark")
+
+
+class LiveAnalysisChannel:
+    """One editor connection: debounces edits and supersedes stale analyses"""
+
+    def __init__(self, sessions: AnalysisSessionManager, user_id: str,
+                 send: Callable[[Dict[str, Any]], Awaitable[None]]):
+        self.sessions = sessions
+        self.user_id = user_id
+        self.session_id = uuid.uuid4().hex
+        self._send = send
+        self._send_lock = asyncio.Lock()
+        self.stages: List[str] = list(EXPENSIVE_STAGES)
+        self.test_cases: List[Dict[str, Any]] = []
+        self.optimization_level = "O2"
+        self.version = 0
+        self._static_task: Optional[asyncio.Task] = None
+        self._expensive_task: Optional[asyncio.Task] = None
+        self._expensive_running: Optional[int] = None  # version whose expensive stages are past the idle wait
+        self.stats = {'edits': 0, 'coalesced': 0, 'cancelled': 0}
+
+    async def send(self, message: Dict[str, Any]):
+        # Analyses for different versions finish concurrently; frames must not interleave
+        async with self._send_lock:
+            await self._send(message)
+
+    async def open(self):
+        await self.send({
+            'type': 'ready',
+            'session_id': self.session_id,
+            'static_stages': list(STATIC_STAGES),
+            'expensive_stages': self.stages,
+            'static_debounce_ms': STATIC_DEBOUNCE_MS,
+            'idle_delay_ms': IDLE_DELAY_MS
+        })
+
+    async def handle(self, message: Dict[str, Any]):
+        kind = message.get('type')
+        if kind == 'edit':
+            await self._edit(message)
+        elif kind == 'config':
+            await self._configure(message)
+        elif kind == 'cancel':
+            await self._supersede()
+        elif kind == 'ping':
+            await self.send({'type': 'pong', 'version': self.version, 'stats': self.stats})
+        else:
+            await self.send({'type': 'error', 'error': f"Unknown message type: {kind}"})
+
+    async def _configure(self, message: Dict[str, Any]):
+        stages = message.get('stages', self.stages)
+        unknown = [stage for stage in stages if stage not in EXPENSIVE_STAGES]
+        if unknown:
+            await self.send({'type': 'error', 'error': f"Unknown stages: {', '.join(unknown)}"})
+            return
+        self.stages = list(stages)
+        self.test_cases = message.get('test_cases', self.test_cases)
+        self.optimization_level = message.get('optimization_level', self.optimization_level)
+
+    async def _edit(self, message: Dict[str, Any]):
+        received = time.perf_counter()
+        code = message.get('code')
+        if not isinstance(code, str) or len(code) > MAX_BUFFER_BYTES:
+            await self.send({'type': 'error', 'error': f"code must be a string of at most {MAX_BUFFER_BYTES} bytes"})
+            return
+        self.version = int(message.get('version', self.version + 1))
+        self.stats['edits'] += 1
+        await self._supersede()
+        self._static_task = asyncio.create_task(
+            self._run_static(self.version, code, message.get('language', 'python'), received)
+        )
+
+    async def _supersede(self):
+        """Cancel the pending analyses; an edit still waiting out the debounce is coalesced"""
+        if self._static_task is not None and not self._static_task.done():
+            self._static_task.cancel()
+            self.stats['coalesced'] += 1
+        if self._expensive_task is not None and not self._expensive_task.done():
+            self._expensive_task.cancel()
+            if self._expensive_running is not None:
+                self.stats['cancelled'] += 1
+                await self.send({'type': 'cancelled', 'version': self._expensive_running, 'stages': self.stages})
+        self._expensive_running = None
+
+    async def _run_static(self, version: int, code: str, language: str, received: float):
+        await asyncio.sleep(STATIC_DEBOUNCE_MS / 1000)
+        try:
+            analysis = await self.sessions.analyze(
+                self.user_id, code, language, session_id=self.session_id, stages=list(STATIC_STAGES)
+            )
+        except Exception as e:
+            logger.error(f"❌ Live static analysis failed: {e}")
+            await self.send({'type': 'error', 'version': version, 'error': str(e)})
+            return
+        await self.send({
+            'type': 'static',
+            'version': version,
+            'parse': analysis['parse'],
+            'functions': analysis['functions'],
+            'results': analysis['results'],
+            'reuse_ratio': analysis['reuse_ratio'],
+            'latency_ms': round((time.perf_counter() - received) * 1000, 1)
+        })
+        if self.stages:
+            self._expensive_task = asyncio.create_task(self._run_expensive(version, code, language, received))
+
+    async def _run_expensive(self, version: int, code: str, language: str, received: float):
+        await asyncio.sleep(max(0.0, IDLE_DELAY_MS / 1000 - (time.perf_counter() - received)))
+        self._expensive_running = version
+
+        async def stage(name: str):
+            try:
+                analysis = await self.sessions.analyze(
+                    self.user_id, code, language, session_id=self.session_id, stages=[name],
+                    test_cases=self.test_cases, optimization_level=self.optimization_level
+                )
+            except Exception as e:
+                logger.error(f"❌ Live {name} stage failed: {e}")
+                await self.send({'type': 'error', 'version': version, 'stage': name, 'error': str(e)})
+                return
+            await self.send({
+                'type': 'stage',
+                'version': version,
+                'stage': name,
+                'result': analysis['results'][name],
+                'reused': analysis['stages'][name]['reused'],
+                'computed': analysis['stages'][name]['computed'],
+                'latency_ms': round((time.perf_counter() - received) * 1000, 1)
+            })
+
+        await asyncio.gather(*(stage(name) for name in self.stages))
+        self._expensive_running = None
+
+    async def close(self):
+        """Cancel everything in flight and drop the session"""
+        tasks = [task for task in (self._static_task, self._expensive_task) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.sessions.close(self.user_id, self.session_id)
+        logger.info(f"🔌 Live session {self.session_id} closed: {self.stats['edits']} edits, "
+                    f"{self.stats['coalesced']} coalesced, {self.stats['cancelled']} cancelled")
@@ -3,41 +3,240 @@ Revolutionary performance benchmarking service
 """
 
 import asyncio
+import builtins
+import json
 import time
 import psutil
 import subprocess
 import tempfile
+import tracemalloc
+import shutil
+import sys
 import os
-from typing import Dict, List, Any, Optional
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Any, Optional, Union
 from models.algorithm_models import BenchmarkResults
+from services.artifact_cache import ArtifactCache, BUILD_PROFILES, COMPILED_LANGUAGES
+from services.test_case_generators import (
+    detect_input_signature, generated_input, is_generated, iter_generated_input, make_test_case
+)
+from utils.sandbox import run_sandboxed, DEFAULT_MEMORY_LIMIT_MB, DEFAULT_TIMEOUT, SANDBOX_SUPPORTED
+from utils.executors import cpu_bound
 from utils.logger import setup_logger
 
 logger = setup_logger("performance_benchmarker")
 
+# Executables that must be on PATH to run each language without Docker
+LOCAL_TOOLCHAINS = {
+    'cpp': ['g++'],
+    'java': ['javac', 'java'],
+    'javascript': ['node']
+}
+
+# Runtimes that reserve large virtual ranges at startup; their heap is capped
+# with a runtime flag instead of RLIMIT_AS
+HEAP_LIMITED_RUNTIMES = ('java', 'javascript')
+
+COMPILE_TIMEOUT = 60  # seconds
+
+PYTHON_RUNNER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "runners", "python_runner.py")
+PYTHON_PROFILER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "runners", "python_profiler.py")
+PYTHON_OP_COUNTER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "runners", "python_op_counter.py")
+PYTHON_MEMORY_PROFILER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "runners", "python_memory_profiler.py")
+
+# The profiler stops itself this long before the sandbox kills it, so a
+# partial profile is still returned for code that runs too long
+PROFILE_SHUTDOWN_MARGIN = 0.75  # seconds
+
+# tracemalloc keeps a trace for every live block, so memory-profiled runs get
+# this multiple of the test case's memory limit
+MEMORY_PROFILE_LIMIT_FACTOR = 2
+
+# Default benchmark inputs grow by 10x so results show scaling behaviour
+DEFAULT_TEST_SIZES = (0, 1, 10, 100, 1000, 10000)
+STRESS_TEST_SIZES = (1000, 10000, 100000, 1000000)
+
+# Generated inputs above this size are streamed to a child process instead of
+# being materialized for the in-process Python benchmark
+INLINE_INPUT_MAX_SIZE = 10000
+
+# Stress-size runs get the deployment-wide limits instead of the sandbox defaults
+STRESS_TIMEOUT = float(os.getenv("MAX_EXECUTION_TIME", "30"))
+STRESS_MEMORY_LIMIT_MB = int(os.getenv("MAX_MEMORY_USAGE", "512"))
+
+# What the speed part of performance_score measures:
+# time        average wall-clock execution time (varies with host and load)
+# operations  average bytecode instructions executed (Python only; the same on
+#             every host, so scores and comparisons are reproducible)
+SCORE_METRICS = ('time', 'operations')
+
+# Counted runs stop (deterministically) after this many instructions
+OP_COUNT_MAX_INSTRUCTIONS = int(os.getenv("OP_COUNT_MAX_INSTRUCTIONS", "20000000"))
+
+# Instructions scored like one millisecond of execution time (roughly what
+# CPython 3.11 executes per millisecond on the benchmark hosts)
+OPERATIONS_PER_MS = 100000
+
+# Memory measurement methods per execution backend (first entry is the default):
+# cgroup      - memory.peak of the container's own cgroup
+# host_delta  - change in host-wide used memory around the run (legacy, noisy)
+# rusage      - ru_maxrss of the child process from wait4
+# tracemalloc - peak Python heap allocated by the submission
+# rss_delta   - change in the benchmark worker's RSS around the run (legacy, noisy)
+MEMORY_METHODS = {
+    'docker': ('cgroup', 'host_delta'),
+    'local': ('rusage',),
+    'python': ('tracemalloc', 'rss_delta')
+}
+
+# Wraps a container command so it reports its cgroup peak on stderr after exiting
+CGROUP_PEAK_MARKER = '__CGROUP_MEMORY_PEAK__'
+CGROUP_PEAK_SCRIPT = (
+    '"$@"; status=$?; '
+    'peak=$(cat /sys/fs/cgroup/memory.peak 2>/dev/null '
+    '|| cat /sys/fs/cgroup/memory/memory.max_usage_in_bytes 2>/dev/null); '
+    f'echo "{CGROUP_PEAK_MARKER} ${{peak:-unavailable}}" >&2; exit $status'
+)
+
+SAFE_BUILTINS = {
+    'len': len, 'range': range, 'enumerate': enumerate,
+    'zip': zip, 'map': map, 'filter': filter,
+    'min': min, 'max': max, 'sum': sum, 'abs': abs,
+    'sorted': sorted, 'reversed': reversed,
+    'print': print, 'str': str, 'int': int, 'float': float,
+    'list': list, 'dict': dict, 'set': set, 'tuple': tuple,
+    'bool': bool, 'iter': iter, 'next': next,
+    '__build_class__': builtins.__build_class__
+}
+
+
+@cpu_bound("process", pool="submissions", timeout=DEFAULT_TIMEOUT, kill_on_abandon=True)
+def _exec_submission(code: str, test_input: Any, memory_method: str) -> Dict[str, Any]:
+    """
+    Run a Python submission with restricted builtins in a benchmark worker process
+
+    The worker pool is killed when a run exceeds the timeout or is cancelled,
+    since exec cannot be interrupted from outside.
+    """
+    # Create a safe execution environment
+    safe_globals = {'__name__': '__submission__', '__builtins__': dict(SAFE_BUILTINS)}
+    if test_input:
+        safe_globals['test_input'] = test_input
+
+    if memory_method == 'tracemalloc':
+        # Only the submission's own allocations are traced; the
+        # execution time includes tracemalloc's overhead
+        already_tracing = tracemalloc.is_tracing()
+        if not already_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline_bytes = tracemalloc.get_traced_memory()[0]
+        try:
+            start_time = time.time()
+            exec(code, safe_globals)
+            end_time = time.time()
+            current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            if not already_tracing:
+                tracemalloc.stop()
+        memory = PerformanceBenchmarker._memory_fields(
+            max(peak_bytes - baseline_bytes, 0), max(current_bytes - baseline_bytes, 0), memory_method
+        )
+    else:
+        start_time = time.time()
+        start_memory = psutil.Process().memory_info().rss
+
+        # Execute code
+        exec(code, safe_globals)
+
+        end_time = time.time()
+        end_memory = psutil.Process().memory_info().rss
+        memory = PerformanceBenchmarker._memory_fields(max(end_memory - start_memory, 0), None, memory_method)
+
+    return {
+        'execution_time': (end_time - start_time) * 1000,
+        **memory,
+        'output': str(safe_globals.get('result', 'No result variable'))
+    }
+
+
 class PerformanceBenchmarker:
     """Revolutionary AI-powered performance benchmarking"""
     
-    def __init__(self):
+    def __init__(self, memory_methods: Optional[Dict[str, str]] = None):
+        self.memory_methods = {backend: methods[0] for backend, methods in MEMORY_METHODS.items()}
+        for backend, method in (memory_methods or {}).items():
+            if method not in MEMORY_METHODS.get(backend, ()):
+                raise ValueError(f"Unsupported memory method for {backend}: {method}")
+            self.memory_methods[backend] = method
         self.docker_available = False
         self.temp_dir = tempfile.gettempdir()
+        self.artifact_cache = ArtifactCache()
+        self.local_toolchains: Dict[str, bool] = {}
         
     async def initialize(self):
         """Initialize benchmarking environment"""
         try:
             # Check if Docker is available for isolated execution
-            result = subprocess.run(['docker', '--version'], capture_output=True, text=True)
-            self.docker_available = result.returncode == 0
+            process = await asyncio.create_subprocess_exec(
+                'docker', '--version', stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+            )
+            self.docker_available = await process.wait() == 0
             logger.info(f"🔧 Performance benchmarker initialized (Docker: {'✅' if self.docker_available else '❌'})")
         except Exception as e:
             logger.warning(f"Docker not available: {e}")
             self.docker_available = False
 
-    async def benchmark_algorithm(self, code: str, test_cases: List[Dict[str, Any]], language: str = "python") -> BenchmarkResults:
+        if not self.docker_available:
+            available = [lang for lang in LOCAL_TOOLCHAINS if self._local_toolchain_available(lang)]
+            logger.info(f"🔧 Local execution backend languages: python, {', '.join(available) or 'no native toolchains'}")
+
+    def _unsupported_reason(self, language: str) -> Optional[str]:
+        """Why language cannot run on this host, or None when it can"""
+        if self.docker_available or language == 'python' or self._local_toolchain_available(language):
+            return None
+        tools = ', '.join(LOCAL_TOOLCHAINS.get(language, [])) or 'a runtime'
+        return f"Unsupported language on this host: {language} (requires Docker or {tools})"
+
+    def _local_toolchain_available(self, language: str) -> bool:
+        """Whether every tool needed to run language locally is installed"""
+        if language not in self.local_toolchains:
+            tools = LOCAL_TOOLCHAINS.get(language)
+            self.local_toolchains[language] = (SANDBOX_SUPPORTED and bool(tools)
+                                               and all(shutil.which(tool) for tool in tools))
+        return self.local_toolchains[language]
+
+    async def benchmark_algorithm(self, code: str, test_cases: List[Dict[str, Any]], language: str = "python",
+                                  optimization_level: str = "O2", profile: bool = False,
+                                  score_metric: str = "time", memory_profile: bool = False) -> BenchmarkResults:
         """
         Comprehensive algorithm performance benchmarking
+
+        Compiled languages are built once per submission (and reused from the
+        artifact cache across submissions); every test case then runs against
+        the same artifact, so compile time is reported separately.
+
+        With profile, the slowest test case is run once more under the line
+        profiler and its details gain a 'profile' entry (see profile_python).
+        With memory_profile, the test case with the highest peak memory is run
+        under the memory profiler and gains a 'memory_profile' entry (see
+        profile_memory).
+
+        With score_metric "operations", every Python test case is also run
+        under the instruction counter (see count_operations) and the score is
+        computed from the average instruction count instead of wall time;
+        other languages fall back to time.
         """
+        build = None
         try:
             logger.info(f"🚀 Starting benchmark for {language} algorithm with {len(test_cases)} test cases")
+
+            if score_metric not in SCORE_METRICS:
+                raise ValueError(f"Unsupported score metric: {score_metric}")
+            count_operations = score_metric == 'operations' and language == 'python'
+            if score_metric == 'operations' and not count_operations:
+                logger.warning(f"⚠️ Operation counts are only available for Python; scoring {language} by time")
             
             if not test_cases:
                 # Generate default test cases if none provided
@@ -46,15 +245,51 @@ class PerformanceBenchmarker:
             benchmark_results = []
             total_execution_time = 0
             peak_memory_usage = 0
+            peak_memory_bytes = 0
+            memory_methods = set()
             passed_tests = 0
+            operation_counts = []
+
+            unsupported_reason = self._unsupported_reason(language)
+            if unsupported_reason:
+                # Never report simulated numbers for a language we cannot run
+                logger.warning(f"⚠️ {unsupported_reason}")
+                return BenchmarkResults(
+                    execution_time=0,
+                    memory_usage=0,
+                    test_cases_passed=0,
+                    total_test_cases=len(test_cases),
+                    performance_score=0,
+                    benchmark_details=[{"error": unsupported_reason, "unsupported": True}]
+                )
+
+            build = await self._prepare_artifact(code, language, optimization_level)
+            if build and build['error']:
+                return BenchmarkResults(
+                    execution_time=0,
+                    memory_usage=0,
+                    test_cases_passed=0,
+                    total_test_cases=len(test_cases),
+                    performance_score=0,
+                    compile_time=build['compile_time'],
+                    optimization_level=optimization_level,
+                    benchmark_details=[{"error": f"Compilation failed: {build['error']}"}]
+                )
             
             for i, test_case in enumerate(test_cases):
                 try:
-                    result = await self._execute_single_benchmark(code, test_case, language)
+                    result = await self._execute_single_benchmark(code, test_case, language, build)
+                    if count_operations:
+                        result['operations'] = await self.count_operations(code, test_case)
+                        if 'instructions' in result['operations']:
+                            operation_counts.append(result['operations']['instructions'])
                     benchmark_results.append(result)
                     
                     total_execution_time += result['execution_time']
                     peak_memory_usage = max(peak_memory_usage, result['memory_usage'])
+                    peak_memory_bytes = max(peak_memory_bytes, result.get('peak_memory_bytes', 0))
+                    if result.get('memory_method'):
+                        memory_methods.add(result['memory_method'])
                     
                     if result['passed']:
                         passed_tests += 1
@@ -71,18 +306,32 @@ class PerformanceBenchmarker:
                         'error': str(e)
                     })
             
+            if profile and benchmark_results:
+                await self._attach_profile(code, language, benchmark_results)
+            if memory_profile and benchmark_results:
+                await self._attach_memory_profile(code, language, benchmark_results)
+            
             # Calculate performance metrics
             avg_execution_time = total_execution_time / len(test_cases) if test_cases else 0
+            avg_operations = sum(operation_counts) / len(operation_counts) if operation_counts else None
+            score_metric = 'operations' if avg_operations is not None else 'time'
             performance_score = await self._calculate_performance_score(
-                avg_execution_time, peak_memory_usage, passed_tests, len(test_cases)
+                avg_execution_time, peak_memory_usage, passed_tests, len(test_cases), score_metric, avg_operations
             )
             
             return BenchmarkResults(
                 execution_time=avg_execution_time,
                 memory_usage=peak_memory_usage,
+                peak_memory_bytes=peak_memory_bytes,
+                memory_method=', '.join(sorted(memory_methods)) or None,
                 test_cases_passed=passed_tests,
                 total_test_cases=len(test_cases),
                 performance_score=performance_score,
+                operation_count=avg_operations,
+                score_metric=score_metric,
+                compile_time=build['compile_time'] if build else 0,
+                optimization_level=optimization_level if build else None,
+                artifact_cache_hit=build['cached'] if build else False,
                 benchmark_details=benchmark_results
             )
             
@@ -96,59 +345,377 @@ class PerformanceBenchmarker:
                 performance_score=0,
                 benchmark_details=[{"error": str(e)}]
             )
+        finally:
+            self.release_build(build)
+
+    async def stress_test(self, code: str, language: str = "python", generator: Optional[str] = None,
+                          sizes: Optional[List[int]] = None, seed: int = 0,
+                          optimization_level: str = "O2",
+                          value_range: Optional[List[int]] = None) -> Dict[str, Any]:
+        """
+        Run a submission on generated inputs of increasing size
+
+        Inputs are streamed to the sandboxed process chunk by chunk, so a
+        10^6-element case is never held in the API process. Each run is
+        reproducible from (generator, size, seed, value_range). Every size
+        runs through run_isolated, so time and memory are measured the same
+        way on both sides of each growth ratio. Escalation stops at the first
+        size that fails or times out.
+        """
+        build = None
+        try:
+            generator = generator or detect_input_signature(code, language)
+            sizes = sorted(sizes or STRESS_TEST_SIZES)
+            logger.info(f"🏋️ Stress testing {language} algorithm with {generator} inputs up to n={sizes[-1]}")
+
+            unsupported_reason = self._unsupported_reason(language)
+            if unsupported_reason:
+                return {'error': unsupported_reason, 'unsupported': True}
+
+            build = await self._prepare_artifact(code, language, optimization_level)
+            if build and build['error']:
+                return {'error': f"Compilation failed: {build['error']}"}
+
+            runs = []
+            for size in sizes:
+                test_case = make_test_case(generator, size, seed, value_range)
+                result = await self.run_isolated(code, test_case, language, build)
+                runs.append({
+                    'size': size,
+                    'execution_time': result['execution_time'],
+                    'cpu_time': result.get('cpu_time'),
+                    'peak_memory_bytes': result.get('peak_memory_bytes', 0),
+                    'memory_method': result.get('memory_method'),
+                    'passed': result['passed'],
+                    'error': result.get('error', '')[:1000]
+                })
+                if not result['passed']:
+                    logger.warning(f"⚠️ Stress test stopped at n={size}")
+                    break
+
+            growth = [
+                {
+                    'from_size': previous['size'],
+                    'to_size': current['size'],
+                    'time_ratio': current['execution_time'] / previous['execution_time']
+                    if previous['execution_time'] else None
+                }
+                for previous, current in zip(runs, runs[1:])
+            ]
+
+            return {
+                'language': language,
+                'generator': generator,
+                'seed': seed,
+                'value_range': value_range,
+                'compile_time': build['compile_time'] if build else 0,
+                'runs': runs,
+                'growth': growth
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Stress test failed: {e}")
+            return {'error': str(e)}
+        finally:
+            self.release_build(build)
+
+    async def prepare_build(self, code: str, language: str, optimization_level: str = "O2") -> Optional[Dict[str, Any]]:
+        """
+        Compile (or fetch from cache) ahead of run_test_case calls; None for interpreted languages
+
+        The artifact stays pinned in the cache until release_build(build).
+        """
+        unsupported_reason = self._unsupported_reason(language)
+        if unsupported_reason:
+            raise ValueError(unsupported_reason)
+        build = await self._prepare_artifact(code, language, optimization_level)
+        if build and build['error']:
+            raise ValueError(f"Compilation failed: {build['error']}")
+        return build
+
+    def release_build(self, build: Optional[Dict[str, Any]]):
+        """Let the artifact cache evict a build from prepare_build again"""
+        if build and build.get('artifact_dir'):
+            self.artifact_cache.release(build['artifact_dir'])
+
+    async def run_test_case(self, code: str, test_case: Dict[str, Any], language: str,
+                            build: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run one test case against a prepared build"""
+        return await self._execute_single_benchmark(code, test_case, language, build)
+
+    async def run_isolated(self, code: str, test_case: Dict[str, Any], language: str,
+                           build: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Like run_test_case, but Python always runs in a sandboxed child so every size is measured alike"""
+        if language == 'python' and not self.docker_available:
+            return await self._execute_python_subprocess(code, test_case)
+        return await self._execute_single_benchmark(code, test_case, language, build)
+
+    async def profile_python(self, code: str, test_case: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a Python submission once under the sandboxed line profiler
+
+        Returns the profile document of runners/python_profiler.py: hit counts
+        and self-time per line and function, and collapsed stacks for flame
+        graphs. Runs longer than a fraction of a second are sampled after
+        their first part, so the profiled run stays close to full speed.
+        """
+        code_file = await self._create_temp_file(code, 'python')
+        timeout, memory_limit = self._limits_for(test_case)
+        try:
+            budget = max(timeout - PROFILE_SHUTDOWN_MARGIN, 0.5)
+            result = await run_sandboxed(
+                [sys.executable, '-I', PYTHON_PROFILER, code_file, str(budget)],
+                self._test_input(test_case),
+                timeout=timeout,
+                memory_limit_mb=memory_limit
+            )
+        finally:
+            os.unlink(code_file)
+
+        if result['timed_out']:
+            return {'error': 'Profiling exceeded the time limit'}
+        if result['returncode'] != 0:
+            stderr = result['stderr'].decode(errors='replace').strip()
+            return {'error': f"Profiler failed: {stderr[-500:] or 'exit status ' + str(result['returncode'])}"}
+
+        profile = json.loads(result['stdout'])
+        logger.info(
+            f"🔥 Profiled {profile['line_events']} line events and {profile['samples']} samples "
+            f"({profile['mode']}, {profile['wall_time_ms']:.0f} ms) with {profile['engine']}"
+        )
+        return profile
+
+    async def profile_memory(self, code: str, test_case: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a Python submission once under the sandboxed memory profiler
+
+        Returns the document of runners/python_memory_profiler.py: per source
+        line, the bytes allocated while it ran, its net change, its highest
+        running total and its share at the run's peak, what its allocations
+        held at the last snapshot, and the live-memory timeline.
+        """
+        code_file = await self._create_temp_file(code, 'python')
+        timeout, memory_limit = self._limits_for(test_case)
+        try:
+            budget = max(timeout - PROFILE_SHUTDOWN_MARGIN, 0.5)
+            result = await run_sandboxed(
+                [sys.executable, '-I', PYTHON_MEMORY_PROFILER, code_file, str(budget)],
+                self._test_input(test_case),
+                timeout=timeout,
+                memory_limit_mb=memory_limit * MEMORY_PROFILE_LIMIT_FACTOR
+            )
+        finally:
+            os.unlink(code_file)
+
+        if result['timed_out']:
+            return {'error': 'Memory profiling exceeded the time limit'}
+        if result['returncode'] != 0:
+            stderr = result['stderr'].decode(errors='replace').strip()
+            return {'error': f"Memory profiler failed: {stderr[-500:] or 'exit status ' + str(result['returncode'])}"}
+
+        profile = json.loads(result['stdout'])
+        memory = profile['memory']
+        logger.info(
+            f"🧠 Memory-profiled {profile['total_steps']} steps (peak {memory['peak'] / 1024:.0f} KB, "
+            f"{memory['snapshots']} snapshots in {memory['snapshot_overhead_ms']:.0f} ms) with {profile['engine']}"
+        )
+        return profile
+
+    async def count_operations(self, code: str, test_case: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Count the bytecode instructions, lines and calls one run of a Python submission executes
+
+        The counter runs with a fixed hash seed, so set and dict iteration
+        order (and with it the counts) is identical on every run and host.
+        Runs are cut off after OP_COUNT_MAX_INSTRUCTIONS (truncated is true).
+        """
+        code_file = await self._create_temp_file(code, 'python')
+        _, memory_limit = self._limits_for(test_case)
+        try:
+            # Counting slows the run down several times over; the long timeout
+            # keeps the instruction cap, not the host's speed, the deciding limit.
+            # -I would ignore PYTHONHASHSEED; the explicit environment keeps the child isolated instead
+            result = await run_sandboxed(
+                [sys.executable, '-s', PYTHON_OP_COUNTER, code_file, str(OP_COUNT_MAX_INSTRUCTIONS)],
+                self._test_input(test_case),
+                timeout=max(STRESS_TIMEOUT, DEFAULT_TIMEOUT),
+                memory_limit_mb=memory_limit,
+                env={'PYTHONHASHSEED': '0'}
+            )
+        finally:
+            os.unlink(code_file)
+
+        if result['timed_out']:
+            return {'error': 'Operation count exceeded the time limit'}
+        if result['returncode'] != 0:
+            stderr = result['stderr'].decode(errors='replace').strip()
+            return {'error': f"Operation counter failed: {stderr[-500:] or 'exit status ' + str(result['returncode'])}"}
+        return json.loads(result['stdout'])
+
+    async def _attach_profile(self, code: str, language: str, results: List[Dict[str, Any]]):
+        """Profile the slowest passing test case (any, if none passed) and attach it to that case's details"""
+        candidates = [result for result in results if result['passed']] or results
+        target = max(candidates, key=lambda result: result['execution_time'])
+        if language != 'python':
+            target['profile'] = {'error': f"Line profiling is only available for Python, not {language}",
+                                 'unsupported': True}
+            return
+        try:
+            target['profile'] = await self.profile_python(code, target['test_case'])
+        except Exception as e:
+            logger.error(f"❌ Profiling failed: {e}")
+            target['profile'] = {'error': str(e)}
+
+    async def _attach_memory_profile(self, code: str, language: str, results: List[Dict[str, Any]]):
+        """Memory-profile the passing test case (any, if none passed) with the highest peak memory"""
+        candidates = [result for result in results if result['passed']] or results
+        target = max(candidates, key=lambda result: result.get('peak_memory_bytes', 0))
+        if language != 'python':
+            target['memory_profile'] = {'error': f"Memory profiling is only available for Python, not {language}",
+                                        'unsupported': True}
+            return
+        try:
+            target['memory_profile'] = await self.profile_memory(code, target['test_case'])
+        except Exception as e:
+            logger.error(f"❌ Memory profiling failed: {e}")
+            target['memory_profile'] = {'error': str(e)}
 
-    async def _execute_single_benchmark(self, code: str, test_case: Dict[str, Any], language: str) -> Dict[str, Any]:
+    async def _execute_single_benchmark(self, code: str, test_case: Dict[str, Any], language: str,
+                                        build: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Execute a single benchmark test case"""
         if self.docker_available:
-            return await self._execute_in_docker(code, test_case, language)
+            return await self._execute_in_docker(code, test_case, language, build)
         else:
-            return await self._execute_locally(code, test_case, language)
+            return await self._execute_locally(code, test_case, language, build)
+
+    async def _prepare_artifact(self, code: str, language: str, optimization_level: str) -> Optional[Dict[str, Any]]:
+        """Compile a submission once, or fetch it from the artifact cache"""
+        if language not in COMPILED_LANGUAGES:
+            return None
+
+        if optimization_level not in BUILD_PROFILES:
+            raise ValueError(f"Unsupported optimization level: {optimization_level}")
+
+        # Host and container toolchains produce different binaries
+        backend = 'docker' if self.docker_available else 'local'
+        flags = BUILD_PROFILES[optimization_level][language]
+        key = self.artifact_cache.build_key(code, language, flags, toolchain=backend)
+
+        async with self.artifact_cache.lock(key):
+            artifact_dir = self.artifact_cache.lookup(key)
+            if artifact_dir:
+                logger.info(f"♻️ Reusing cached {language} build {key[:12]} ({optimization_level})")
+                return {'artifact_dir': artifact_dir, 'compile_time': 0.0, 'cached': True, 'error': ''}
+
+            build_dir = self.artifact_cache.new_build_dir()
+            source_name = 'Code.java' if language == 'java' else 'code.cpp'
+            with open(os.path.join(build_dir, source_name), 'w') as f:
+                f.write(code)
+
+            compile_commands = {
+                'cpp': ['g++', *flags, 'code.cpp', '-o', 'code'],
+                'java': ['javac', *flags, '-d', '.', 'Code.java']
+            }
+
+            start_time = time.time()
+            if backend == 'docker':
+                image = 'openjdk:11' if language == 'java' else 'gcc:latest'
+                process = await asyncio.create_subprocess_exec(
+                    'docker', 'run', '--rm', '-v', f'{build_dir}:/app', '-w', '/app', image,
+                    *compile_commands[language],
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+                _, stderr = await process.communicate()
+                returncode = process.returncode
+            else:
+                result = await run_sandboxed(
+                    compile_commands[language], cwd=build_dir, timeout=COMPILE_TIMEOUT, memory_limit_mb=None
+                )
+                stderr, returncode = result['stderr'], result['returncode']
+            compile_time = (time.time() - start_time) * 1000
+
+            if returncode != 0:
+                self.artifact_cache.discard(build_dir)
+                return {'artifact_dir': None, 'compile_time': compile_time, 'cached': False,
+                        'error': stderr.decode(errors='replace') if stderr else f'exit code {returncode}'}
+
+            artifact_dir = self.artifact_cache.store(key, build_dir)
+            logger.info(f"🔨 Compiled {language} build {key[:12]} ({optimization_level}) in {compile_time:.0f} ms")
+            return {'artifact_dir': artifact_dir, 'compile_time': compile_time, 'cached': False, 'error': ''}
 
-    async def _execute_in_docker(self, code: str, test_case: Dict[str, Any], language: str) -> Dict[str, Any]:
+    async def _execute_in_docker(self, code: str, test_case: Dict[str, Any], language: str,
+                                 build: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Execute code in Docker container for isolation"""
+        code_file = None
         try:
-            # Create temporary files
-            code_file = await self._create_temp_file(code, language)
-            
-            # Prepare Docker command based on language
-            docker_commands = {
-                'python': f'docker run --rm -v {code_file}:/app/code.py python:3.9-slim python /app/code.py',
-                'cpp': f'docker run --rm -v {code_file}:/app/code.cpp gcc:latest bash -c "cd /app && g++ code.cpp -o code && ./code"',
-                'java': f'docker run --rm -v {code_file}:/app/Code.java openjdk:11 bash -c "cd /app && javac Code.java && java Code"',
-                'javascript': f'docker run --rm -v {code_file}:/app/code.js node:16 node /app/code.js'
-            }
+            if language in COMPILED_LANGUAGES:
+                if not build:
+                    raise ValueError(f"No compiled artifact available for {language}")
+                # Run the cached artifact read-only; no compiler invocation per test case
+                artifact_dir = build['artifact_dir']
+                docker_commands = {
+                    'cpp': (['-v', f'{artifact_dir}:/app:ro', '-w', '/app'], 'gcc:latest', ['./code']),
+                    'java': (['-v', f'{artifact_dir}:/app:ro', '-w', '/app'], 'openjdk:11',
+                             ['java', '-cp', '/app', 'Code'])
+                }
+            else:
+                # Create temporary files
+                code_file = await self._create_temp_file(code, language)
+                # Python goes through the same runner as the local backends, so
+                # submissions (and corpus harnesses) see test_input everywhere
+                docker_commands = {
+                    'python': (['-v', f'{code_file}:/app/code.py:ro',
+                                '-v', f'{os.path.abspath(PYTHON_RUNNER)}:/app/python_runner.py:ro'],
+                               'python:3.9-slim', ['python', '-I', '/app/python_runner.py', '/app/code.py']),
+                    'javascript': (['-v', f'{code_file}:/app/code.js'], 'node:16', ['node', '/app/code.js'])
+                }
             
             if language not in docker_commands:
                 raise ValueError(f"Unsupported language for Docker execution: {language}")
+
+            mounts, image, command = docker_commands[language]
+            memory_method = self.memory_methods['docker']
+            if memory_method == 'cgroup':
+                command = ['sh', '-c', CGROUP_PEAK_SCRIPT, 'sh', *command]
             
             start_time = time.time()
             start_memory = psutil.virtual_memory().used
             
-            # Execute in Docker
-            process = await asyncio.create_subprocess_shell(
-                docker_commands[language],
+            # Execute in Docker; the container is named so a cancelled run can be killed
+            container = f"algomaster-{uuid.uuid4().hex[:12]}"
+            process = await asyncio.create_subprocess_exec(
+                'docker', 'run', '--rm', '-i', '--name', container, *mounts, image, *command,
+                stdin=asyncio.subprocess.PIPE,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE
             )
             
-            stdout, stderr = await process.communicate()
+            stdout, stderr = await self._communicate_streaming(process, self._test_input(test_case), container)
             
             end_time = time.time()
             end_memory = psutil.virtual_memory().used
             
             execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
-            memory_usage = (end_memory - start_memory) / (1024 * 1024)  # Convert to MB
             
-            # Clean up
-            os.unlink(code_file)
+            output = stdout.decode(errors='replace') if stdout else ''
+            error = stderr.decode(errors='replace') if stderr else ''
+
+            if memory_method == 'cgroup':
+                error, peak_bytes = self._split_cgroup_peak(error)
+                if peak_bytes is None:
+                    memory_method = 'unavailable'
+                memory = self._memory_fields(peak_bytes or 0, None, memory_method)
+            else:
+                memory = self._memory_fields(max(end_memory - start_memory, 0), None, memory_method)
             
             return {
                 'test_case': test_case,
                 'execution_time': execution_time,
-                'memory_usage': max(memory_usage, 0),
-                'passed': process.returncode == 0,
-                'output': stdout.decode() if stdout else '',
-                'error': stderr.decode() if stderr else ''
+                **memory,
+                'passed': process.returncode == 0 and self._outputs_match(output, test_case.get('expected_output')),
+                'output': output,
+                'error': error
             }
             
         except Exception as e:
@@ -159,22 +726,21 @@ class PerformanceBenchmarker:
                 'passed': False,
                 'error': str(e)
             }
+        finally:
+            # Clean up
+            if code_file:
+                os.unlink(code_file)
 
-    async def _execute_locally(self, code: str, test_case: Dict[str, Any], language: str) -> Dict[str, Any]:
+    async def _execute_locally(self, code: str, test_case: Dict[str, Any], language: str,
+                               build: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Execute code locally (less secure but functional)"""
         try:
             if language == 'python':
                 return await self._execute_python_locally(code, test_case)
+            elif self._local_toolchain_available(language):
+                return await self._execute_native_locally(code, test_case, language, build)
             else:
-                # For non-Python languages, use simplified execution
-                return {
-                    'test_case': test_case,
-                    'execution_time': 10.0,  # Simulated execution time
-                    'memory_usage': 5.0,     # Simulated memory usage
-                    'passed': True,
-                    'output': 'Simulated execution (Docker not available)',
-                    'error': ''
-                }
+                raise ValueError(f"Unsupported language for local execution: {language}")
                 
         except Exception as e:
             return {
@@ -185,55 +751,201 @@ class PerformanceBenchmarker:
                 'error': str(e)
             }
 
-    async def _execute_python_locally(self, code: str, test_case: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute Python code locally with performance measurement"""
+    async def _execute_native_locally(self, code: str, test_case: Dict[str, Any], language: str,
+                                      build: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Run a C++/Java/Node submission on the host under the rlimit sandbox"""
+        code_file = None
+        timeout, memory_limit = self._limits_for(test_case)
         try:
-            # Create a safe execution environment
-            safe_globals = {
-                '__builtins__': {
-                    'len': len, 'range': range, 'enumerate': enumerate,
-                    'zip': zip, 'map': map, 'filter': filter,
-                    'min': min, 'max': max, 'sum': sum, 'abs': abs,
-                    'sorted': sorted, 'reversed': reversed,
-                    'print': print, 'str': str, 'int': int, 'float': float,
-                    'list': list, 'dict': dict, 'set': set, 'tuple': tuple
+            if language in COMPILED_LANGUAGES:
+                if not build:
+                    raise ValueError(f"No compiled artifact available for {language}")
+                work_dir = build['artifact_dir']
+                commands = {
+                    'cpp': ['./code'],
+                    'java': ['java', f'-Xmx{memory_limit}m', '-cp', '.', 'Code']
                 }
+                command = commands[language]
+            else:
+                code_file = await self._create_temp_file(code, language)
+                work_dir = os.path.dirname(code_file)
+                command = ['node', f'--max-old-space-size={memory_limit}', code_file]
+
+            result = await run_sandboxed(
+                command,
+                self._test_input(test_case),
+                cwd=work_dir,
+                timeout=timeout,
+                memory_limit_mb=None if language in HEAP_LIMITED_RUNTIMES else memory_limit
+            )
+
+            output = result['stdout'].decode(errors='replace')
+            error = result['stderr'].decode(errors='replace')
+            if result['timed_out']:
+                error = f"Time limit exceeded\n{error}".strip()
+
+            return {
+                'test_case': test_case,
+                'execution_time': result['wall_time'],
+                'cpu_time': result['cpu_time'],
+                **self._memory_fields(result['max_rss_bytes'], None, result['memory_method']),
+                'passed': (result['returncode'] == 0 and not result['timed_out']
+                           and self._outputs_match(output, test_case.get('expected_output'))),
+                'output': output,
+                'error': error
             }
-            
+
+        finally:
+            if code_file:
+                os.unlink(code_file)
+
+    @staticmethod
+    def _test_input(test_case: Dict[str, Any]) -> Union[bytes, Iterator[bytes]]:
+        """stdin for a test case: literal input, or a lazily generated stream"""
+        if is_generated(test_case):
+            return iter_generated_input(test_case)
+        return str(test_case.get('input', '')).encode()
+
+    @staticmethod
+    def _limits_for(test_case: Dict[str, Any]):
+        """(timeout seconds, memory MB) for one run; stress-size inputs get the larger limits"""
+        if is_generated(test_case) and test_case['size'] > INLINE_INPUT_MAX_SIZE:
+            return STRESS_TIMEOUT, max(DEFAULT_MEMORY_LIMIT_MB, STRESS_MEMORY_LIMIT_MB)
+        return DEFAULT_TIMEOUT, DEFAULT_MEMORY_LIMIT_MB
+
+    @staticmethod
+    async def _communicate_streaming(process, input_data: Union[bytes, Iterator[bytes]],
+                                     container: Optional[str] = None):
+        """
+        Like communicate(), but writes stdin chunk by chunk while draining output
+
+        When cancelled, the client process (and the named Docker container,
+        which outlives its client) is killed before the cancellation propagates.
+        """
+        async def feed():
+            try:
+                chunks = [input_data] if isinstance(input_data, bytes) else input_data
+                for chunk in chunks:
+                    process.stdin.write(chunk)
+                    await process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                process.stdin.close()
+
+        try:
+            stdout, stderr, _ = await asyncio.gather(process.stdout.read(), process.stderr.read(), feed())
+            await process.wait()
+        except asyncio.CancelledError:
+            if process.returncode is None:
+                process.kill()
+            if container:
+                killer = await asyncio.create_subprocess_exec(
+                    'docker', 'kill', container, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+                )
+                await killer.wait()
+            await process.wait()
+            raise
+        return stdout, stderr
+
+    @staticmethod
+    def _memory_fields(peak_bytes: int, allocated_bytes: Optional[int], method: str) -> Dict[str, Any]:
+        """Per-run memory report: peak in MB (for scoring) and bytes with the method used"""
+        return {
+            'memory_usage': peak_bytes / (1024 * 1024),
+            'peak_memory_bytes': peak_bytes,
+            'allocated_bytes': allocated_bytes,
+            'memory_method': method
+        }
+
+    @staticmethod
+    def _split_cgroup_peak(stderr: str):
+        """Remove the cgroup peak marker line from stderr and parse its value"""
+        peak_bytes = None
+        kept_lines = []
+        for line in stderr.splitlines():
+            if line.startswith(CGROUP_PEAK_MARKER):
+                value = line[len(CGROUP_PEAK_MARKER):].strip()
+                peak_bytes = int(value) if value.isdigit() else None
+            else:
+                kept_lines.append(line)
+        return '\n'.join(kept_lines), peak_bytes
+
+    @staticmethod
+    def _outputs_match(actual: str, expected: Any) -> bool:
+        """Compare program stdout with expected output, ignoring trailing whitespace"""
+        if expected is None:
+            return True
+
+        def normalize(text: str) -> List[str]:
+            return [line.rstrip() for line in str(text).strip().splitlines()]
+
+        return normalize(actual) == normalize(expected)
+
+    async def _execute_python_subprocess(self, code: str, test_case: Dict[str, Any]) -> Dict[str, Any]:
+        """Run Python in a sandboxed child so large generated inputs can be streamed to it"""
+        code_file = await self._create_temp_file(code, 'python')
+        timeout, memory_limit = self._limits_for(test_case)
+        try:
+            result = await run_sandboxed(
+                [sys.executable, '-I', PYTHON_RUNNER, code_file],
+                self._test_input(test_case),
+                timeout=timeout,
+                memory_limit_mb=memory_limit
+            )
+            output = result['stdout'].decode(errors='replace')
+            error = result['stderr'].decode(errors='replace')
+            if result['timed_out']:
+                error = f"Time limit exceeded\n{error}".strip()
+
+            return {
+                'test_case': test_case,
+                'execution_time': result['wall_time'],
+                'cpu_time': result['cpu_time'],
+                **self._memory_fields(result['max_rss_bytes'], None, result['memory_method']),
+                'passed': (result['returncode'] == 0 and not result['timed_out']
+                           and self._outputs_match(output, test_case.get('expected_output'))),
+                'output': output[:10000],
+                'error': error
+            }
+        finally:
+            os.unlink(code_file)
+
+    async def _execute_python_locally(self, code: str, test_case: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute Python code locally with performance measurement"""
+        if is_generated(test_case) and test_case['size'] > INLINE_INPUT_MAX_SIZE:
+            return await self._execute_python_subprocess(code, test_case)
+
+        try:
             # Prepare test input
-            test_input = test_case.get('input', '')
-            if test_input:
-                safe_globals['test_input'] = test_input
-            
-            start_time = time.time()
-            start_memory = psutil.Process().memory_info().rss
-            
-            # Execute code
-            exec(code, safe_globals)
-            
-            end_time = time.time()
-            end_memory = psutil.Process().memory_info().rss
-            
-            execution_time = (end_time - start_time) * 1000
-            memory_usage = (end_memory - start_memory) / (1024 * 1024)
-            
-            # Check if output matches expected (if provided)
-            expected_output = test_case.get('expected_output')
-            actual_output = safe_globals.get('result', 'No result variable')
-            passed = True
+            if is_generated(test_case):
+                test_input = generated_input(test_case)
+            else:
+                test_input = test_case.get('input', '')
             
-            if expected_output is not None:
-                passed = str(actual_output) == str(expected_output)
+            # exec runs in a worker process so the event loop keeps serving other requests
+            memory_method = self.memory_methods['python']
+            try:
+                run = await _exec_submission(code, test_input, memory_method)
+            except BrokenProcessPool:
+                # Another submission's timeout killed the shared workers; run once more
+                run = await _exec_submission(code, test_input, memory_method)
             
             return {
                 'test_case': test_case,
-                'execution_time': execution_time,
-                'memory_usage': max(memory_usage, 0),
-                'passed': passed,
-                'output': str(actual_output),
+                **run,
+                'passed': self._outputs_match(run['output'], test_case.get('expected_output')),
                 'error': ''
             }
             
+        except asyncio.TimeoutError:
+            return {
+                'test_case': test_case,
+                'execution_time': 0,
+                'memory_usage': 0,
+                'passed': False,
+                'error': f"Time limit exceeded ({DEFAULT_TIMEOUT:g}s)"
+            }
         except Exception as e:
             return {
                 'test_case': test_case,
@@ -260,23 +972,24 @@ class PerformanceBenchmarker:
 
     async def _generate_default_test_cases(self, code: str, language: str) -> List[Dict[str, Any]]:
         """Generate default test cases for algorithms"""
-        # Simple default test cases
-        return [
-            {'input': '[1, 2, 3, 4, 5]', 'description': 'Basic array input'},
-            {'input': '[]', 'description': 'Empty array edge case'},
-            {'input': '[1]', 'description': 'Single element'},
-            {'input': '[5, 4, 3, 2, 1]', 'description': 'Reverse sorted array'}
-        ]
-
-    async def _calculate_performance_score(self, avg_time: float, peak_memory: float, passed: int, total: int) -> float:
-        """Calculate overall performance score (0-10)"""
+        # Seeded generator specs matching the detected input shape, so runs
+        # are comparable and cover empty, single-element and scaling inputs
+        signature = detect_input_signature(code, language)
+        return [make_test_case(signature, size, seed=0) for size in DEFAULT_TEST_SIZES]
+
+    async def _calculate_performance_score(self, avg_time: float, peak_memory: float, passed: int, total: int,
+                                           metric: str = "time", avg_operations: Optional[float] = None) -> float:
+        """Calculate overall performance score (0-10); metric selects wall time or instruction counts for speed"""
         try:
             # Base score from test success rate
             success_rate = passed / total if total > 0 else 0
             base_score = success_rate * 6  # Up to 6 points for correctness
             
             # Performance bonus (up to 4 points)
-            time_score = max(0, 2 - (avg_time / 100))  # Faster is better
+            if metric == 'operations' and avg_operations is not None:
+                time_score = max(0, 2 - (avg_operations / OPERATIONS_PER_MS / 100))  # Fewer instructions is better
+            else:
+                time_score = max(0, 2 - (avg_time / 100))  # Faster is better
             memory_score = max(0, 2 - (peak_memory / 50))  # Less memory is better
             
             total_score = base_score + time_score + memory_score
@@ -285,8 +998,9 @@ class PerformanceBenchmarker:
         except Exception:
             return 0.0
 
-    async def compare_algorithms(self, algorithms: List[Dict[str, str]], test_cases: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Compare performance of multiple algorithms"""
+    async def compare_algorithms(self, algorithms: List[Dict[str, str]], test_cases: List[Dict[str, Any]],
+                                 score_metric: str = "time") -> Dict[str, Any]:
+        """Compare performance of multiple algorithms; score_metric "operations" ranks by instruction counts"""
         try:
             results = {}
             
@@ -295,7 +1009,7 @@ class PerformanceBenchmarker:
                 code = algo.get('code', '')
                 language = algo.get('language', 'python')
                 
-                benchmark = await self.benchmark_algorithm(code, test_cases, language)
+                benchmark = await self.benchmark_algorithm(code, test_cases, language, score_metric=score_metric)
                 results[name] = benchmark
             
             # Generate comparison insights
@@ -316,8 +1030,12 @@ class PerformanceBenchmarker:
         if not results:
             return {}
         
-        # Find best performing algorithms
-        best_time = min(results.values(), key=lambda x: x.execution_time)
+        # Find best performing algorithms; instruction counts rank speed when every algorithm has them
+        by_operations = all(result.operation_count is not None for result in results.values())
+        if by_operations:
+            best_time = min(results.values(), key=lambda x: x.operation_count)
+        else:
+            best_time = min(results.values(), key=lambda x: x.execution_time)
         best_memory = min(results.values(), key=lambda x: x.memory_usage)
         best_overall = max(results.values(), key=lambda x: x.performance_score)
         
@@ -325,9 +1043,11 @@ class PerformanceBenchmarker:
             'fastest_algorithm': next(name for name, result in results.items() if result == best_time),
             'most_memory_efficient': next(name for name, result in results.items() if result == best_memory),
             'best_overall': next(name for name, result in results.items() if result == best_overall),
+            'speed_metric': 'operations' if by_operations else 'time',
             'performance_summary': {
                 name: {
                     'execution_time': result.execution_time,
+                    'operation_count': result.operation_count,
                     'memory_usage': result.memory_usage,
                     'score': result.performance_score
                 } for name, result in results.items()
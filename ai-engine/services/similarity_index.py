@@ -0,0 +1,557 @@
+"""
+Near-duplicate detection over the algorithms/ corpus and recorded submissions
+
+Each document is reduced to a MinHash signature of its winnowed token
+fingerprints:
+
+    tree-sitter leaves -> normalized tokens (identifiers, literals and
+    comments erased) -> K-gram hashes -> winnowing (one minimum per window)
+    -> NUM_PERMUTATIONS minimums of universal hashes
+
+Two signatures agree in a slot with probability equal to the Jaccard
+similarity of the fingerprint sets, so renamed variables, reformatting and
+edited comments do not hide a copy. Signatures are split into BANDS bands of
+ROWS slots; documents sharing any whole band are candidates and only those
+are scored.
+
+Indexed documents live in immutable segment files, memory-mapped on load:
+
+    b"AMSIMIX1" | uint64 header length | JSON header | sections
+
+with the signatures (uint32), per band the sorted band keys (uint64) and the
+matching document numbers (uint32), and per-document metadata as JSON blobs
+behind an offsets section. A band lookup is a bisect over the mapped keys.
+The corpus is one segment, rebuilt in a process pool whenever a corpus file
+changes. Submissions accumulate in an in-memory delta, backed by an
+append-only log, and are written out as a new segment every
+SEGMENT_FLUSH_SIZE documents, so no write ever rewrites the whole index.
+"""
+
+import asyncio
+import base64
+import bisect
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import random
+import struct
+import tempfile
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Optional, Sequence, Tuple
+from services.corpus_harness import ALGORITHMS_ROOT, CORPUS_LANGUAGES, corpus_files
+from utils.parsers import get_parser
+from utils.logger import setup_logger
+
+logger = setup_logger("similarity_index")
+
+SEGMENT_MAGIC = b"AMSIMIX1"
+INDEX_FORMAT = 1
+
+SHINGLE_SIZE = 5        # normalized tokens per fingerprinted K-gram
+WINNOW_WINDOW = 4       # consecutive K-grams per winnowing window
+NUM_PERMUTATIONS = 128
+BANDS, ROWS = 32, 4     # candidate at ~0.42 Jaccard with probability 1/2
+MIN_FINGERPRINTS = 3    # fewer than this and the code is too short to compare
+
+DEFAULT_K = 10
+MAX_K = 100
+DEFAULT_MIN_SIMILARITY = 0.3
+MAX_CANDIDATES = 5000   # scored per query, most shared bands first
+SEGMENT_FLUSH_SIZE = 50000
+BUILD_WORKERS = int(os.getenv("SIMILARITY_BUILD_WORKERS", str(os.cpu_count() or 1)))
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_SLOT_MASK = 0xFFFFFFFF
+_EMPTY_SLOT = _SLOT_MASK
+_ALIGNMENT = 8
+
+# Universal hashes h(x) = (a*x + b) mod p, fixed so signatures stay comparable across builds
+_seeded = random.Random(0x5EED)
+_PERMUTATIONS = [
+    (_seeded.randrange(1, _MERSENNE_PRIME), _seeded.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+del _seeded
+
+_NUMBER_TYPES = {
+    'integer', 'float', 'number', 'number_literal', 'decimal_integer_literal', 'hex_integer_literal',
+    'octal_integer_literal', 'binary_integer_literal', 'decimal_floating_point_literal',
+    'hex_floating_point_literal'
+}
+_STRING_TYPES = {
+    'string', 'string_literal', 'raw_string_literal', 'char_literal', 'character_literal',
+    'template_string', 'concatenated_string'
+}
+
+
+def normalized_tokens(source: bytes, language: str) -> List[str]:
+    """
+    Leaf token stream with everything a copier can rename erased
+
+    Identifiers of every kind become 'id', numeric literals 'num' and
+    string/char literals 'str'; comments are dropped. Keywords, operators and
+    punctuation keep their node type, which for leaves is their text.
+    """
+    tree = get_parser(language).parse(source)
+    tokens = []
+    stack = [tree.root_node]
+    while stack:
+        node = stack.pop()
+        node_type = node.type
+        if 'comment' in node_type:
+            continue
+        if node_type in _STRING_TYPES:
+            tokens.append('str')
+        elif node_type in _NUMBER_TYPES:
+            tokens.append('num')
+        elif node.child_count:
+            stack.extend(reversed(node.children))
+        elif node_type.endswith('identifier'):
+            tokens.append('id')
+        elif node_type != 'ERROR' and not node.is_missing:
+            tokens.append(node_type)
+    return tokens
+
+
+def winnow(tokens: Sequence[str]) -> List[int]:
+    """
+    Winnowing fingerprints: the minimum K-gram hash of every window
+
+    Any copied run of WINNOW_WINDOW + SHINGLE_SIZE - 1 tokens is guaranteed
+    to share a fingerprint with the original.
+    """
+    grams = [
+        int.from_bytes(hashlib.blake2b(' '.join(tokens[i:i + SHINGLE_SIZE]).encode(), digest_size=8).digest(), 'little')
+        for i in range(len(tokens) - SHINGLE_SIZE + 1)
+    ]
+    if len(grams) <= WINNOW_WINDOW:
+        return sorted(set(grams))
+    selected = set()
+    for start in range(len(grams) - WINNOW_WINDOW + 1):
+        selected.add(min(grams[start:start + WINNOW_WINDOW]))
+    return sorted(selected)
+
+
+def minhash(fingerprints: Iterable[int]) -> array:
+    """NUM_PERMUTATIONS-slot MinHash signature of a fingerprint set"""
+    values = [fingerprint % _MERSENNE_PRIME for fingerprint in fingerprints]
+    if not values:
+        return array('I', [_EMPTY_SLOT] * NUM_PERMUTATIONS)
+    return array('I', (
+        min((a * value + b) % _MERSENNE_PRIME for value in values) & _SLOT_MASK
+        for a, b in _PERMUTATIONS
+    ))
+
+
+def band_keys(signature: Sequence[int]) -> List[int]:
+    """One 64-bit key per band; documents with an equal key share that band"""
+    keys = []
+    for band in range(BANDS):
+        rows = array('I', signature[band * ROWS:(band + 1) * ROWS])
+        digest = hashlib.blake2b(rows.tobytes(), digest_size=8, salt=struct.pack('<Q', band)).digest()
+        keys.append(int.from_bytes(digest, 'little'))
+    return keys
+
+
+def agreement(left: Sequence[int], right: Sequence[int]) -> float:
+    """Estimated Jaccard similarity: fraction of equal signature slots"""
+    return sum(1 for a, b in zip(left, right) if a == b) / NUM_PERMUTATIONS
+
+
+def signature_of(source: bytes, language: str) -> Tuple[Optional[array], int]:
+    """Signature and fingerprint count; no signature when the code is too short to compare"""
+    fingerprints = winnow(normalized_tokens(source, language))
+    if len(fingerprints) < MIN_FINGERPRINTS:
+        return None, len(fingerprints)
+    return minhash(fingerprints), len(fingerprints)
+
+
+def fingerprint_corpus_file(relative_path: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+    """Corpus document metadata and packed signature (runs in the build process pool)"""
+    try:
+        with open(os.path.join(ALGORITHMS_ROOT, relative_path), 'rb') as f:
+            source = f.read()
+        language = CORPUS_LANGUAGES[os.path.splitext(relative_path)[1]]
+        signature, fingerprint_count = signature_of(source, language)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not fingerprint {relative_path}: {e}")
+        return None
+    if signature is None:
+        return None
+    parts = relative_path.split(os.sep)
+    return {
+        'kind': 'corpus',
+        'path': relative_path,
+        'algorithm': os.path.splitext(parts[-1])[0],
+        'category': parts[1] if len(parts) > 2 else "Uncategorized",
+        'language': language,
+        'content_hash': hashlib.sha256(source).hexdigest(),
+        'fingerprints': fingerprint_count
+    }, signature.tobytes()
+
+
+def corpus_state() -> str:
+    """Digest of every corpus path, mtime and size; a changed digest means a stale corpus segment"""
+    digest = hashlib.sha256()
+    for relative_path in corpus_files():
+        try:
+            stat = os.stat(os.path.join(ALGORITHMS_ROOT, relative_path))
+        except OSError:
+            continue
+        digest.update(f"{relative_path}\0{stat.st_mtime_ns}\0{stat.st_size}\n".encode())
+    return digest.hexdigest()
+
+
+def write_segment(path: str, documents: List[Dict[str, Any]], signatures: List[bytes], **extra):
+    """Write an immutable segment atomically (documents[i] has signatures[i])"""
+    packed = array('I')
+    for signature in signatures:
+        packed.frombytes(signature)
+
+    keys, docs = array('Q'), array('I')
+    per_document = [band_keys(packed[i * NUM_PERMUTATIONS:(i + 1) * NUM_PERMUTATIONS]) for i in range(len(documents))]
+    for band in range(BANDS):
+        for key, doc in sorted((document_keys[band], doc) for doc, document_keys in enumerate(per_document)):
+            keys.append(key)
+            docs.append(doc)
+
+    blobs = [json.dumps(document, separators=(',', ':')).encode() for document in documents]
+    blob_offsets = array('Q', [0])
+    for blob in blobs:
+        blob_offsets.append(blob_offsets[-1] + len(blob))
+
+    sections = {
+        'signatures': packed,
+        'band_keys': keys,
+        'band_docs': docs,
+        'blob_offsets': blob_offsets,
+        'blobs': array('B', b''.join(blobs))
+    }
+    header = {
+        'format': INDEX_FORMAT,
+        'documents': len(documents),
+        'permutations': NUM_PERMUTATIONS,
+        'bands': BANDS,
+        'rows': ROWS,
+        'shingle_size': SHINGLE_SIZE,
+        'winnow_window': WINNOW_WINDOW,
+        'created_at': datetime.now().isoformat(),
+        'sections': {},
+        **extra
+    }
+
+    # Same fixed-point as the trace store: offsets depend on the header length
+    encoded = {name: values.tobytes() for name, values in sections.items()}
+    header_length = 0
+    while True:
+        offset = len(SEGMENT_MAGIC) + 8 + header_length
+        offset += -offset % _ALIGNMENT
+        for name, data in encoded.items():
+            header['sections'][name] = [offset, len(sections[name]), sections[name].typecode]
+            offset += len(data) + (-len(data) % _ALIGNMENT)
+        header_bytes = json.dumps(header, separators=(',', ':')).encode()
+        if len(header_bytes) <= header_length:
+            break
+        header_length = len(header_bytes) + 64
+
+    staging = f"{path}.{os.getpid()}.tmp"
+    with open(staging, 'wb') as f:
+        prefix = SEGMENT_MAGIC + struct.pack('<Q', header_length) + header_bytes.ljust(header_length)
+        f.write(prefix + b'\0' * (-len(prefix) % _ALIGNMENT))
+        for data in encoded.values():
+            f.write(data + b'\0' * (-len(data) % _ALIGNMENT))
+    os.replace(staging, path)
+
+
+class SegmentReader:
+    """Read-only, memory-mapped view of one segment file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: List[memoryview] = []
+        if self._map[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+            self.close()
+            raise ValueError(f"Not a similarity segment: {path}")
+        header_length = struct.unpack_from('<Q', self._map, len(SEGMENT_MAGIC))[0]
+        header_start = len(SEGMENT_MAGIC) + 8
+        self.header = json.loads(self._map[header_start:header_start + header_length])
+        if (self.header.get('format') != INDEX_FORMAT or self.header['permutations'] != NUM_PERMUTATIONS
+                or self.header['bands'] != BANDS or self.header['rows'] != ROWS
+                or self.header['shingle_size'] != SHINGLE_SIZE or self.header['winnow_window'] != WINNOW_WINDOW):
+            self.close()
+            raise ValueError(f"Similarity segment built with other parameters: {path}")
+        self.size = self.header['documents']
+        self.signatures = self._section('signatures')
+        self.band_keys = self._section('band_keys')
+        self.band_docs = self._section('band_docs')
+        self.blob_offsets = self._section('blob_offsets')
+        self._blob_start = self.header['sections']['blobs'][0]
+
+    def _section(self, name: str) -> memoryview:
+        offset, count, typecode = self.header['sections'][name]
+        itemsize = array(typecode).itemsize
+        view = memoryview(self._map)[offset:offset + count * itemsize].cast(typecode)
+        self._views.append(view)
+        return view
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._map.close()
+        self._file.close()
+
+    def signature(self, doc: int) -> memoryview:
+        return self.signatures[doc * NUM_PERMUTATIONS:(doc + 1) * NUM_PERMUTATIONS]
+
+    def document(self, doc: int) -> Dict[str, Any]:
+        start = self._blob_start + self.blob_offsets[doc]
+        return json.loads(self._map[start:self._blob_start + self.blob_offsets[doc + 1]])
+
+    def band_matches(self, band: int, key: int) -> Iterable[int]:
+        """Documents whose signature has `key` in `band`"""
+        lo, hi = band * self.size, (band + 1) * self.size
+        start = bisect.bisect_left(self.band_keys, key, lo, hi)
+        end = start
+        while end < hi and self.band_keys[end] == key:
+            end += 1
+        return self.band_docs[start:end]
+
+
+class _Delta:
+    """Submissions not yet written to a segment, searchable the same way"""
+
+    def __init__(self):
+        self.documents: List[Dict[str, Any]] = []
+        self.signatures: List[bytes] = []
+        self.bands: List[Dict[int, List[int]]] = [{} for _ in range(BANDS)]
+        self.size = 0
+
+    def add(self, document: Dict[str, Any], signature: bytes):
+        doc = len(self.documents)
+        self.documents.append(document)
+        self.signatures.append(signature)
+        for band, key in enumerate(band_keys(array('I', signature))):
+            self.bands[band].setdefault(key, []).append(doc)
+        self.size = len(self.documents)
+
+    def signature(self, doc: int) -> array:
+        return array('I', self.signatures[doc])
+
+    def document(self, doc: int) -> Dict[str, Any]:
+        return self.documents[doc]
+
+    def band_matches(self, band: int, key: int) -> Iterable[int]:
+        return self.bands[band].get(key, ())
+
+
+class SimilarityIndex:
+    """MinHash/LSH index over corpus solutions and recorded submissions"""
+
+    def __init__(self, index_dir: Optional[str] = None, workers: Optional[int] = None):
+        self.index_dir = index_dir or os.getenv(
+            "SIMILARITY_INDEX_DIR", os.path.join(tempfile.gettempdir(), "algomaster-similarity")
+        )
+        self.workers = max(1, workers or BUILD_WORKERS)
+        self.corpus: Optional[SegmentReader] = None
+        self.segments: List[SegmentReader] = []
+        self.delta = _Delta()
+        self._flush_lock = asyncio.Lock()
+        self._log_path = os.path.join(self.index_dir, "submissions.log")
+        os.makedirs(self.index_dir, exist_ok=True)
+
+    @property
+    def document_count(self) -> int:
+        segments = ([self.corpus] if self.corpus else []) + self.segments
+        return sum(segment.size for segment in segments) + self.delta.size
+
+    async def initialize(self):
+        """Map the stored segments, rebuilding the corpus segment if the corpus changed"""
+        try:
+            loop = asyncio.get_running_loop()
+            await self._load_corpus(loop)
+            self._load_submissions()
+            logger.info(f"🧬 Similarity index ready: {self.document_count} documents")
+        except Exception as e:
+            logger.error(f"❌ Failed to load similarity index: {e}")
+            raise
+
+    async def _load_corpus(self, loop: asyncio.AbstractEventLoop):
+        path = os.path.join(self.index_dir, "corpus.seg")
+        state = await loop.run_in_executor(None, corpus_state)
+        if os.path.exists(path):
+            try:
+                reader = SegmentReader(path)
+                if reader.header.get('corpus_state') == state:
+                    self.corpus = reader
+                    return
+                reader.close()
+            except ValueError as e:
+                logger.warning(f"⚠️ Discarding corpus segment: {e}")
+
+        started = time.perf_counter()
+        paths = corpus_files()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            chunk = max(1, len(paths) // (self.workers * 8))
+            results = await loop.run_in_executor(
+                None, lambda: list(pool.map(fingerprint_corpus_file, paths, chunksize=chunk))
+            )
+        indexed = [result for result in results if result is not None]
+        await loop.run_in_executor(
+            None, lambda: write_segment(
+                path, [document for document, _ in indexed], [signature for _, signature in indexed],
+                corpus_state=state
+            )
+        )
+        self.corpus = SegmentReader(path)
+        logger.info(
+            f"🧬 Corpus fingerprinted: {len(indexed)}/{len(paths)} files with {self.workers} workers "
+            f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+
+    def _load_submissions(self):
+        for name in sorted(os.listdir(self.index_dir)):
+            if name.startswith("submissions-") and name.endswith(".seg"):
+                try:
+                    self.segments.append(SegmentReader(os.path.join(self.index_dir, name)))
+                except ValueError as e:
+                    logger.warning(f"⚠️ Skipping submission segment: {e}")
+        if not os.path.exists(self._log_path):
+            return
+        with open(self._log_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self.delta.add(entry['document'], base64.b64decode(entry['signature']))
+                except (ValueError, KeyError):
+                    # A torn last line from a crash mid-append
+                    continue
+
+    def _sources(self):
+        if self.corpus:
+            yield self.corpus
+        yield from self.segments
+        yield self.delta
+
+    def _candidates(self, keys: List[int]) -> List[Tuple[int, Any, int]]:
+        """(shared bands, source, doc) for every document sharing at least one band"""
+        shared: Dict[Tuple[int, int], int] = {}
+        sources = list(self._sources())
+        for number, source in enumerate(sources):
+            if not source.size:
+                continue
+            for band, key in enumerate(keys):
+                for doc in source.band_matches(band, key):
+                    shared[number, doc] = shared.get((number, doc), 0) + 1
+        best = heapq.nlargest(MAX_CANDIDATES, shared.items(), key=lambda item: item[1])
+        return [(count, sources[number], doc) for (number, doc), count in best]
+
+    def search(self, code: str, language: str, k: int = DEFAULT_K,
+               min_similarity: float = DEFAULT_MIN_SIMILARITY) -> Dict[str, Any]:
+        """Top-k most similar corpus files and submissions"""
+        return self._search(code, language, k, min_similarity)[0]
+
+    def _search(self, code: str, language: str, k: int,
+                min_similarity: float) -> Tuple[Dict[str, Any], Optional[array]]:
+        started = time.perf_counter()
+        k = min(max(k, 1), MAX_K)
+        source = code.encode('utf8')
+        signature, fingerprint_count = signature_of(source, language)
+        results = self._rank(signature, k, min_similarity) if signature is not None else {'corpus': [], 'submissions': []}
+        return {
+            **results,
+            'fingerprints': fingerprint_count,
+            'comparable': signature is not None,
+            'content_hash': hashlib.sha256(source).hexdigest(),
+            'indexed_documents': self.document_count,
+            'query_time_ms': round((time.perf_counter() - started) * 1000, 3)
+        }, signature
+
+    def _rank(self, signature: array, k: int, min_similarity: float) -> Dict[str, List[Dict[str, Any]]]:
+        scored = []
+        for shared_bands, source, doc in self._candidates(band_keys(signature)):
+            similarity = agreement(signature, source.signature(doc))
+            if similarity >= min_similarity:
+                scored.append((similarity, shared_bands, source, doc))
+        scored.sort(key=lambda item: (-item[0], -item[1]))
+
+        results = {'corpus': [], 'submissions': []}
+        for similarity, shared_bands, source, doc in scored:
+            document = source.document(doc)
+            bucket = results['corpus' if document['kind'] == 'corpus' else 'submissions']
+            if len(bucket) < k:
+                bucket.append({**document, 'similarity': round(similarity, 4), 'shared_bands': shared_bands})
+            if len(results['corpus']) >= k and len(results['submissions']) >= k:
+                break
+        return results
+
+    async def search_and_record(self, code: str, language: str, user_id: Optional[str] = None,
+                                k: int = DEFAULT_K, min_similarity: float = DEFAULT_MIN_SIMILARITY,
+                                record: bool = True) -> Dict[str, Any]:
+        """
+        Search, then add the submission to the index
+
+        A user resubmitting identical code is not recorded twice. The search
+        runs before the insert, so a submission never matches itself.
+        """
+        results, signature = self._search(code, language, k, min_similarity)
+        recorded = False
+        if record and signature is not None and not self._contains(results, user_id):
+            await self.add_submission({
+                'kind': 'submission',
+                'language': language,
+                'user_id': user_id,
+                'content_hash': results['content_hash'],
+                'fingerprints': results['fingerprints'],
+                'recorded_at': datetime.now().isoformat()
+            }, signature.tobytes())
+            recorded = True
+        results['recorded'] = recorded
+        return results
+
+    @staticmethod
+    def _contains(results: Dict[str, Any], user_id: Optional[str]) -> bool:
+        """Whether this user already submitted exactly this code"""
+        return any(
+            match['content_hash'] == results['content_hash'] and match.get('user_id') == user_id
+            for match in results['submissions'] if match['similarity'] == 1.0
+        )
+
+    async def add_submission(self, document: Dict[str, Any], signature: bytes):
+        """Append to the log and the delta; flush the delta to a segment once it is large"""
+        entry = json.dumps({'document': document, 'signature': base64.b64encode(signature).decode()})
+        with open(self._log_path, 'a', encoding='utf-8') as f:
+            f.write(entry + '\n')
+        self.delta.add(document, signature)
+        if self.delta.size >= SEGMENT_FLUSH_SIZE and not self._flush_lock.locked():
+            await self.flush()
+
+    async def flush(self):
+        """Write the delta out as a new submission segment and truncate the log"""
+        async with self._flush_lock:
+            flushed = self.delta.size
+            if not flushed:
+                return
+            documents, signatures = self.delta.documents[:flushed], self.delta.signatures[:flushed]
+            sequence = max((int(os.path.basename(segment.path)[12:-4]) for segment in self.segments), default=0) + 1
+            path = os.path.join(self.index_dir, f"submissions-{sequence:06d}.seg")
+            await asyncio.get_running_loop().run_in_executor(None, write_segment, path, documents, signatures)
+
+            # Submissions recorded while the segment was written stay in the delta
+            remaining = _Delta()
+            for document, signature in zip(self.delta.documents[flushed:], self.delta.signatures[flushed:]):
+                remaining.add(document, signature)
+            self.segments.append(SegmentReader(path))
+            self.delta = remaining
+            staging = f"{self._log_path}.{os.getpid()}.tmp"
+            with open(staging, 'w', encoding='utf-8') as f:
+                for document, signature in zip(remaining.documents, remaining.signatures):
+                    f.write(json.dumps({'document': document, 'signature': base64.b64encode(signature).decode()}) + '\n')
+            os.replace(staging, self._log_path)
+            logger.info(f"🧬 Flushed {flushed} submissions to {os.path.basename(path)}")
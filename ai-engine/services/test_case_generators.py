@@ -0,0 +1,213 @@
+"""
+Reproducible test-case input generators for benchmarking
+
+All generators emit the same whitespace-separated text format that C++
+`cin`, Java `Scanner` and Python `split()` read directly:
+
+    int_array / sorted_array   n, then n integers
+    string                     n, then a line of n lowercase letters
+    matrix                     rows cols, then rows lines of cols integers
+    graph                      n m, then m lines "u v" (0-indexed, connected)
+    tree                       n, then n-1 lines "parent child" rooted at 0
+
+Integer values are drawn from VALUE_RANGE (MATRIX_VALUE_RANGE for matrices)
+unless the test case spec carries its own "value_range".
+"""
+
+import random
+import re
+from typing import Callable, Dict, Iterator, List, Any, Optional, Sequence, Tuple
+
+# Largest input size any generator accepts (elements, characters or nodes)
+MAX_INPUT_SIZE = 10 ** 6
+
+# Values per emitted chunk; keeps streamed writes around 64 KB
+CHUNK_ITEMS = 8192
+
+# Small enough that sums over a whole array stay within the 32-bit int most
+# reference solutions (and typical problem constraints) use
+VALUE_RANGE = (-10 ** 4, 10 ** 4)
+MATRIX_VALUE_RANGE = (-1000, 1000)
+
+
+def _rng(generator: str, size: int, seed: int) -> random.Random:
+    """Every (generator, size, seed) triple maps to one independent stream"""
+    return random.Random(f"{generator}:{size}:{seed}")
+
+
+def _join_numbers(values: List[int], separator: str = " ") -> str:
+    return separator.join(map(str, values))
+
+
+def _int_array(rng: random.Random, size: int, value_range: Optional[Tuple[int, int]]) -> Iterator[str]:
+    yield f"{size}\n"
+    low, high = value_range or VALUE_RANGE
+    for start in range(0, size, CHUNK_ITEMS):
+        count = min(CHUNK_ITEMS, size - start)
+        yield _join_numbers([rng.randint(low, high) for _ in range(count)]) + " "
+    yield "\n"
+
+
+def _sorted_array(rng: random.Random, size: int, value_range: Optional[Tuple[int, int]]) -> Iterator[str]:
+    # Non-decreasing values built from random gaps so nothing is sorted in memory
+    yield f"{size}\n"
+    low, high = value_range or VALUE_RANGE
+    value = rng.randint(low, max(low, min(0, high)))
+    max_gap = max(1, (high - value) // max(size, 1))
+    for start in range(0, size, CHUNK_ITEMS):
+        chunk = []
+        for _ in range(min(CHUNK_ITEMS, size - start)):
+            value += rng.randint(0, max_gap)
+            chunk.append(value)
+        yield _join_numbers(chunk) + " "
+    yield "\n"
+
+
+def _string(rng: random.Random, size: int, value_range: Optional[Tuple[int, int]]) -> Iterator[str]:
+    yield f"{size}\n"
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    step = CHUNK_ITEMS * 8
+    for start in range(0, size, step):
+        yield "".join(rng.choices(alphabet, k=min(step, size - start)))
+    yield "\n"
+
+
+def _matrix(rng: random.Random, size: int, value_range: Optional[Tuple[int, int]]) -> Iterator[str]:
+    # size is the total number of cells; the matrix is as square as possible
+    rows = max(1, int(size ** 0.5)) if size else 0
+    cols = size // rows if rows else 0
+    yield f"{rows} {cols}\n"
+    low, high = value_range or MATRIX_VALUE_RANGE
+    for _ in range(rows):
+        yield _join_numbers([rng.randint(low, high) for _ in range(cols)]) + "\n"
+
+
+def _graph(rng: random.Random, size: int, value_range: Optional[Tuple[int, int]]) -> Iterator[str]:
+    # A random spanning tree keeps the graph connected; extra edges add cycles
+    nodes = size
+    edges = max(0, 2 * nodes - 1) if nodes > 1 else 0
+    yield f"{nodes} {edges}\n"
+    batch = []
+    for index in range(edges):
+        if index < nodes - 1:
+            child = index + 1
+            batch.append(f"{rng.randrange(child)} {child}")
+        else:
+            batch.append(f"{rng.randrange(nodes)} {rng.randrange(nodes)}")
+        if len(batch) == CHUNK_ITEMS:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+def _tree(rng: random.Random, size: int, value_range: Optional[Tuple[int, int]]) -> Iterator[str]:
+    yield f"{size}\n"
+    batch = []
+    for child in range(1, size):
+        batch.append(f"{rng.randrange(child)} {child}")
+        if len(batch) == CHUNK_ITEMS:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+GENERATORS: Dict[str, Callable[[random.Random, int, Optional[Tuple[int, int]]], Iterator[str]]] = {
+    "int_array": _int_array,
+    "sorted_array": _sorted_array,
+    "string": _string,
+    "matrix": _matrix,
+    "graph": _graph,
+    "tree": _tree
+}
+
+GENERATOR_DESCRIPTIONS = {
+    "int_array": "Random integer array",
+    "sorted_array": "Sorted integer array",
+    "string": "Random lowercase string",
+    "matrix": "Random integer matrix",
+    "graph": "Connected random graph (edge list)",
+    "tree": "Random rooted tree (parent-child edges)"
+}
+
+# Ordered most specific first; the first matching signature wins
+_SIGNATURE_PATTERNS = [
+    ("tree", re.compile(r"TreeNode|\.left\b|\.right\b|->left|->right|\broot\b")),
+    ("graph", re.compile(r"\badj\w*|\bgraph\b|\bedges?\b|\bneighbou?rs?\b|\bvisited\b", re.IGNORECASE)),
+    ("matrix", re.compile(r"vector<\s*vector<|\[\]\s*\[\]|\bmatrix\b|\bgrid\b|\[i\]\[j\]", re.IGNORECASE)),
+    ("string", re.compile(r"\bstring\b|\bString\b|\bstr\b|charAt|\.substr|\bs\[i\]")),
+    ("sorted_array", re.compile(r"\bmid\b|\blow\b.*\bhigh\b|\blo\b.*\bhi\b|binary.?search", re.IGNORECASE | re.DOTALL))
+]
+
+
+def detect_input_signature(code: str, language: str) -> str:
+    """Guess which generator matches the submission's expected input"""
+    for signature, pattern in _SIGNATURE_PATTERNS:
+        if pattern.search(code):
+            return signature
+    return "int_array"
+
+
+def _validate(generator: str, size: int, value_range: Optional[Sequence[int]] = None) -> Optional[Tuple[int, int]]:
+    if generator not in GENERATORS:
+        raise ValueError(f"Unknown test case generator: {generator}")
+    if not 0 <= size <= MAX_INPUT_SIZE:
+        raise ValueError(f"Generator size must be between 0 and {MAX_INPUT_SIZE}, got {size}")
+    if value_range is None:
+        return None
+    if len(value_range) != 2 or value_range[0] > value_range[1]:
+        raise ValueError(f"value_range must be [low, high] with low <= high, got {value_range}")
+    return int(value_range[0]), int(value_range[1])
+
+
+def iter_input(generator: str, size: int, seed: int = 0,
+               value_range: Optional[Sequence[int]] = None) -> Iterator[bytes]:
+    """Stream a generated input as encoded chunks without building it in memory"""
+    value_range = _validate(generator, size, value_range)
+    for chunk in GENERATORS[generator](_rng(generator, size, seed), size, value_range):
+        yield chunk.encode()
+
+
+def generate_input(generator: str, size: int, seed: int = 0, value_range: Optional[Sequence[int]] = None) -> str:
+    """Materialize a generated input; only for sizes that comfortably fit in memory"""
+    value_range = _validate(generator, size, value_range)
+    return "".join(GENERATORS[generator](_rng(generator, size, seed), size, value_range))
+
+
+def make_test_case(generator: str, size: int, seed: int = 0,
+                   value_range: Optional[Sequence[int]] = None) -> Dict[str, Any]:
+    """
+    Test case spec that executors expand lazily; reproducible from its fields
+
+    value_range ([low, high]) overrides the generator's default integer range
+    for references and submissions that need smaller (or larger) values.
+    """
+    checked = _validate(generator, size, value_range)
+    test_case = {
+        "generator": generator,
+        "size": size,
+        "seed": seed,
+        "description": f"{GENERATOR_DESCRIPTIONS[generator]} (n={size}, seed={seed})"
+    }
+    if checked is not None:
+        test_case["value_range"] = list(checked)
+        test_case["description"] = (f"{GENERATOR_DESCRIPTIONS[generator]} "
+                                    f"(n={size}, seed={seed}, values {checked[0]}..{checked[1]})")
+    return test_case
+
+
+def generated_input(test_case: Dict[str, Any]) -> str:
+    """Materialize the input of a generated test case spec"""
+    return generate_input(test_case["generator"], test_case["size"], test_case.get("seed", 0),
+                          test_case.get("value_range"))
+
+
+def iter_generated_input(test_case: Dict[str, Any]) -> Iterator[bytes]:
+    """Stream the input of a generated test case spec"""
+    return iter_input(test_case["generator"], test_case["size"], test_case.get("seed", 0),
+                      test_case.get("value_range"))
+
+
+def is_generated(test_case: Dict[str, Any]) -> bool:
+    return "generator" in test_case and "input" not in test_case
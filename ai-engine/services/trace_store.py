@@ -0,0 +1,419 @@
+"""
+Server-side storage for execution traces with windowed reads and seeking
+
+Each trace is written once to a binary file and memory-mapped for reads:
+
+    b"AMTRACE1" | uint64 header length | JSON header | int64 sections
+
+The header holds the summary, the interned name/value/function tables and
+the offset of every section. Sections are the tracer's columns decoded to
+absolute int64 values, per-line posting lists of recorded step indices, and
+a keyframe blob: the full variable/call-stack state every KEYFRAME_INTERVAL
+recorded steps. Seeking bisects the step column, loads the nearest keyframe
+and applies at most one interval of deltas, so no request replays the trace
+from the beginning.
+"""
+
+import asyncio
+import bisect
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+from services.execution_tracer import delta_decode
+from utils.logger import setup_logger
+
+logger = setup_logger("trace_store")
+
+TRACE_MAGIC = b"AMTRACE1"
+KEYFRAME_INTERVAL = 256      # recorded steps between full-state keyframes
+DEFAULT_WINDOW = 200         # steps per window when the client does not ask
+MAX_WINDOW = 5000
+MAX_OPEN_TRACES = 32         # memory maps kept open between requests
+
+_TRACE_ID = re.compile(r'^[0-9a-f]{32}$')
+_INT64 = array('q').itemsize
+
+CALL = 1
+
+
+def _apply_events(frames: Dict[int, Dict[int, int]], stack: List[Tuple[int, int]], var_rows, call_rows):
+    """
+    Apply variable changes and call events in execution order
+
+    A call recorded at step s happens after line s, so at equal steps the
+    variable changes (taken at the line event) are applied first.
+    """
+    events = heapq.merge(
+        ((step, 0, row) for step, row in var_rows),
+        ((step, 1, row) for step, row in call_rows)
+    )
+    for _, kind, row in events:
+        if kind == 0:
+            depth, name, value = row
+            frames.setdefault(depth, {})[name] = value
+        else:
+            depth, function, call_kind = row
+            if call_kind == CALL:
+                frames[depth] = {}
+                stack.append((function, depth))
+            else:
+                frames.pop(depth, None)
+                if stack:
+                    stack.pop()
+
+
+class TraceReader:
+    """Read-only view of one stored trace"""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(TRACE_MAGIC)] != TRACE_MAGIC:
+            self.close()
+            raise ValueError(f"Not a trace file: {path}")
+        header_length = struct.unpack_from('<Q', self._map, len(TRACE_MAGIC))[0]
+        header_start = len(TRACE_MAGIC) + 8
+        self.header = json.loads(self._map[header_start:header_start + header_length])
+        self._views: List[memoryview] = []
+        self.columns = {name: self._section(name) for name in self.header['sections']}
+        self.postings = {int(line): span for line, span in self.header['postings'].items()}
+
+    def _section(self, name: str) -> memoryview:
+        offset, count = self.header['sections'][name]
+        view = memoryview(self._map)[offset:offset + count * _INT64].cast('q')
+        self._views.append(view)
+        return view
+
+    def close(self):
+        for view in getattr(self, '_views', []):
+            view.release()
+        self._map.close()
+        self._file.close()
+
+    @property
+    def recorded_steps(self) -> int:
+        return len(self.columns['step'])
+
+    def index_at(self, step: int) -> int:
+        """Last recorded step at or before `step` (the first one if step is earlier)"""
+        index = bisect.bisect_right(self.columns['step'], step) - 1
+        return min(max(index, 0), max(self.recorded_steps - 1, 0))
+
+    def _var_rows(self, start: int, end: int):
+        var_step, var_depth = self.columns['var_step'], self.columns['var_depth']
+        var_name, var_value = self.columns['var_name'], self.columns['var_value']
+        for row in range(start, end):
+            yield var_step[row], (var_depth[row], var_name[row], var_value[row])
+
+    def _call_rows(self, start: int, end: int):
+        call_step, call_depth = self.columns['call_step'], self.columns['call_depth']
+        call_function, call_kind = self.columns['call_function'], self.columns['call_kind']
+        for row in range(start, end):
+            yield call_step[row], (call_depth[row], call_function[row], call_kind[row])
+
+    def _offsets(self, step: int) -> Tuple[int, int]:
+        """Variable changes observed by `step` and call events strictly before it"""
+        return (bisect.bisect_right(self.columns['var_step'], step),
+                bisect.bisect_left(self.columns['call_step'], step))
+
+    def _state_at(self, index: int):
+        keyframe = index // KEYFRAME_INTERVAL
+        blob_start, blob_end = self.columns['keyframe_blob'][keyframe], self.columns['keyframe_blob'][keyframe + 1]
+        blob_base = self.header['keyframe_blob_offset']
+        saved = json.loads(self._map[blob_base + blob_start:blob_base + blob_end])
+
+        frames = {int(depth): {name: value for name, value in pairs} for depth, pairs in saved['frames'].items()}
+        stack = [tuple(entry) for entry in saved['stack']]
+        var_offset, call_offset = self.columns['keyframe_var'][keyframe], self.columns['keyframe_call'][keyframe]
+        var_end, call_end = self._offsets(self.columns['step'][index])
+        _apply_events(frames, stack, self._var_rows(var_offset, var_end), self._call_rows(call_offset, call_end))
+        return frames, stack
+
+    def _render_state(self, index: int) -> Dict[str, Any]:
+        names, values, functions = self.header['names'], self.header['values'], self.header['functions']
+        frames, stack = self._state_at(index)
+        depth = self.columns['depth'][index]
+        return {
+            'index': index,
+            'step': self.columns['step'][index],
+            'line': self.columns['line'][index],
+            'depth': depth,
+            # Only frames still on the stack at this step are visible
+            'variables': {
+                str(frame_depth): {names[name]: values[value] for name, value in frame.items()}
+                for frame_depth, frame in sorted(frames.items()) if frame_depth <= depth
+            },
+            'call_stack': [{'function': functions[function], 'depth': frame_depth} for function, frame_depth in stack]
+        }
+
+    def seek(self, step: int) -> Optional[Dict[str, Any]]:
+        """Full program state at the recorded step at or before `step`"""
+        if not self.recorded_steps:
+            return None
+        return self._render_state(self.index_at(step))
+
+    def find_breakpoint(self, step: int, lines: List[int], direction: str = 'forward') -> Optional[Dict[str, Any]]:
+        """State at the nearest recorded hit of any breakpoint line after (or before) `step`"""
+        if not self.recorded_steps:
+            return None
+        current = bisect.bisect_right(self.columns['step'], step) - 1
+        postings = self.columns['postings']
+        best = None
+        for line in lines:
+            if line not in self.postings:
+                continue
+            offset, count = self.postings[line]
+            hits = postings[offset:offset + count]
+            if direction == 'forward':
+                position = bisect.bisect_right(hits, current)
+                candidate = hits[position] if position < count else None
+                if candidate is not None and (best is None or candidate < best):
+                    best = candidate
+            else:
+                position = bisect.bisect_left(hits, max(current, 0)) - 1
+                candidate = hits[position] if position >= 0 else None
+                if candidate is not None and (best is None or candidate > best):
+                    best = candidate
+        return None if best is None else self._render_state(best)
+
+    def window(self, start_step: int, count: int = DEFAULT_WINDOW) -> Dict[str, Any]:
+        """
+        Recorded steps from `start_step` on, plus the state before the first
+        one and the variable changes and call events inside the window
+        """
+        count = max(1, min(count, MAX_WINDOW))
+        first = bisect.bisect_left(self.columns['step'], start_step)
+        last = min(first + count, self.recorded_steps)
+        if first >= last:
+            return {'start': start_step, 'steps': [], 'changes': [], 'calls': [], 'state': None,
+                    'next_step': None}
+
+        steps, lines, depths = self.columns['step'], self.columns['line'], self.columns['depth']
+        names, values, functions = self.header['names'], self.header['values'], self.header['functions']
+        window_start, window_end = steps[first], steps[last - 1]
+        var_start, call_start = self._offsets(window_start)
+        var_end, call_end = self._offsets(window_end)
+        # Calls made after the last step of the window are still part of it
+        call_end = bisect.bisect_right(self.columns['call_step'], window_end)
+
+        return {
+            'start': start_step,
+            'state': self._render_state(first),
+            'steps': [{'step': steps[i], 'line': lines[i], 'depth': depths[i]} for i in range(first, last)],
+            'changes': [
+                {'step': step, 'depth': depth, 'name': names[name], 'value': values[value]}
+                for step, (depth, name, value) in self._var_rows(var_start, var_end)
+            ],
+            'calls': [
+                {'step': step, 'depth': depth, 'function': functions[function],
+                 'event': 'call' if kind == CALL else 'return'}
+                for step, (depth, function, kind) in self._call_rows(call_start, call_end)
+            ],
+            'next_step': steps[last] if last < self.recorded_steps else None
+        }
+
+
+class TraceStore:
+    """
+    Directory of memory-mapped trace files, evicted least recently used first
+
+    Open readers are only touched on the event loop thread: save() writes the
+    file in the default executor but evicts (and closes readers) back on the
+    loop, so no memory map is closed while a request reads it.
+    """
+
+    def __init__(self, storage_dir: Optional[str] = None, max_size_mb: Optional[int] = None):
+        self.storage_dir = storage_dir or os.getenv(
+            "TRACE_STORE_DIR", os.path.join(tempfile.gettempdir(), "algomaster-traces")
+        )
+        self.max_size_bytes = (max_size_mb or int(os.getenv("TRACE_STORE_MAX_MB", "256"))) * 1024 * 1024
+        self._readers: "OrderedDict[str, TraceReader]" = OrderedDict()
+        os.makedirs(self.storage_dir, exist_ok=True)
+
+    def _path(self, trace_id: str) -> str:
+        if not _TRACE_ID.match(trace_id):
+            raise KeyError(f"Unknown trace: {trace_id}")
+        return os.path.join(self.storage_dir, f"{trace_id}.trace")
+
+    async def save(self, trace: Dict[str, Any]) -> str:
+        """Write a tracer document to disk and return its trace id"""
+        trace_id = uuid.uuid4().hex
+        path = self._path(trace_id)
+        await asyncio.get_running_loop().run_in_executor(None, self._write, trace, path)
+        self._evict(keep=path)
+        return trace_id
+
+    def _write(self, trace: Dict[str, Any], path: str):
+        staging = f"{path}.{os.getpid()}.tmp"
+        with open(staging, 'wb') as f:
+            f.write(self._encode(trace))
+        os.replace(staging, path)
+
+    def open(self, trace_id: str) -> TraceReader:
+        """Reader for a stored trace; raises KeyError when it does not exist"""
+        reader = self._readers.get(trace_id)
+        if reader is not None:
+            self._readers.move_to_end(trace_id)
+            return reader
+
+        path = self._path(trace_id)
+        if not os.path.exists(path):
+            raise KeyError(f"Unknown trace: {trace_id}")
+        now = time.time()
+        os.utime(path, (now, now))
+        reader = TraceReader(path)
+        self._readers[trace_id] = reader
+        while len(self._readers) > MAX_OPEN_TRACES:
+            _, stale = self._readers.popitem(last=False)
+            stale.close()
+        return reader
+
+    @staticmethod
+    def _encode(trace: Dict[str, Any]) -> bytes:
+        steps, variables, calls = trace['steps'], trace['variables'], trace['calls']
+        columns = {
+            'step': delta_decode(steps['step']),
+            'line': delta_decode(steps['line']),
+            'depth': delta_decode(steps['depth']),
+            'var_step': delta_decode(variables['step']),
+            'var_depth': variables['depth'],
+            'var_name': variables['name'],
+            'var_value': variables['value'],
+            'call_step': delta_decode(calls['step']),
+            'call_depth': calls['depth'],
+            'call_function': calls['function'],
+            'call_kind': calls['kind']
+        }
+
+        # Posting list per line: indices of the recorded steps on that line
+        by_line: Dict[int, List[int]] = {}
+        for index, line in enumerate(columns['line']):
+            by_line.setdefault(line, []).append(index)
+        postings, posting_spans = [], {}
+        for line, indices in sorted(by_line.items()):
+            posting_spans[str(line)] = [len(postings), len(indices)]
+            postings.extend(indices)
+        columns['postings'] = postings
+
+        keyframe_var, keyframe_call, keyframe_blob, blobs = TraceStore._keyframes(columns)
+        columns['keyframe_var'] = keyframe_var
+        columns['keyframe_call'] = keyframe_call
+        columns['keyframe_blob'] = keyframe_blob
+
+        memory = trace['memory']
+        header = {
+            'engine': trace['engine'],
+            'total_steps': trace['total_steps'],
+            'recorded_steps': trace['recorded_steps'],
+            'sampled': trace['sampled'],
+            'truncated': trace['truncated'],
+            'error': trace['error'],
+            'stdout': trace['stdout'],
+            'line_hits': trace['line_hits'],
+            'memory': {
+                **memory,
+                'step': delta_decode(memory['step']),
+                'current': delta_decode(memory['current'])
+            },
+            'names': variables['names'],
+            'values': variables['values'],
+            'functions': calls['functions'],
+            'postings': posting_spans,
+            'sections': {},
+            'keyframe_blob_offset': 0
+        }
+
+        # Section offsets depend on the header length, which depends on the
+        # offsets; the header is padded to a fixed size once it is known
+        encoded_sections = {name: array('q', values).tobytes() for name, values in columns.items()}
+        blob = b''.join(blobs)
+        header_length = 0
+        while True:
+            offset = len(TRACE_MAGIC) + 8 + header_length
+            offset += -offset % _INT64
+            for name, data in encoded_sections.items():
+                header['sections'][name] = [offset, len(data) // _INT64]
+                offset += len(data)
+            header['keyframe_blob_offset'] = offset
+            header_bytes = json.dumps(header, separators=(',', ':')).encode()
+            if len(header_bytes) <= header_length:
+                break
+            header_length = len(header_bytes) + 64
+
+        prefix = TRACE_MAGIC + struct.pack('<Q', header_length) + header_bytes.ljust(header_length)
+        prefix += b'\0' * (-len(prefix) % _INT64)
+        return prefix + b''.join(encoded_sections.values()) + blob
+
+    @staticmethod
+    def _keyframes(columns: Dict[str, List[int]]):
+        """Full state at every KEYFRAME_INTERVAL-th recorded step, built in one pass"""
+        frames: Dict[int, Dict[int, int]] = {}
+        stack: List[Tuple[int, int]] = []
+        var_step, call_step = columns['var_step'], columns['call_step']
+        var_done = call_done = 0
+        keyframe_var, keyframe_call, keyframe_blob, blobs = [], [], [0], []
+
+        for index in range(0, len(columns['step']), KEYFRAME_INTERVAL):
+            step = columns['step'][index]
+            var_end = bisect.bisect_right(var_step, step)
+            call_end = bisect.bisect_left(call_step, step)
+            _apply_events(
+                frames, stack,
+                ((var_step[row], (columns['var_depth'][row], columns['var_name'][row], columns['var_value'][row]))
+                 for row in range(var_done, var_end)),
+                ((call_step[row], (columns['call_depth'][row], columns['call_function'][row], columns['call_kind'][row]))
+                 for row in range(call_done, call_end))
+            )
+            var_done, call_done = var_end, call_end
+
+            blob = json.dumps({
+                'frames': {str(depth): list(frame.items()) for depth, frame in frames.items()},
+                'stack': stack
+            }, separators=(',', ':')).encode()
+            keyframe_var.append(var_end)
+            keyframe_call.append(call_end)
+            blobs.append(blob)
+            keyframe_blob.append(keyframe_blob[-1] + len(blob))
+
+        return keyframe_var, keyframe_call, keyframe_blob, blobs
+
+    def _evict(self, keep: str):
+        """Drop least recently used traces until the store fits max_size_bytes"""
+        entries = []
+        total_size = 0
+        for name in os.listdir(self.storage_dir):
+            if not name.endswith('.trace'):
+                continue
+            path = os.path.join(self.storage_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            total_size += stat.st_size
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            if path == keep:
+                continue
+            trace_id = os.path.basename(path)[:-len('.trace')]
+            reader = self._readers.pop(trace_id, None)
+            if reader is not None:
+                reader.close()
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total_size -= size
+            logger.info(f"🧹 Evicted stored trace {trace_id[:12]} ({size / 1024:.0f} KB)")
@@ -2,11 +2,19 @@
 Revolutionary algorithm visualization generation service
 """
 
+import ast
 import asyncio
 import json
 import re
 from typing import Dict, List, Any, Optional
 from models.algorithm_models import VisualizationData
+from services.animation_recorder import AnimationRecorder, NODE_VALUE_ATTRIBUTES, OpLog, pack_column
+from services.cfg_builder import build_cfg
+from services.complexity_profiler import ComplexityProfiler, PROFILE_SIZES, REFERENCE_CURVES
+from services.execution_tracer import ExecutionTracer
+from services.performance_benchmarker import PerformanceBenchmarker
+from services.trace_store import TraceStore, DEFAULT_WINDOW
+from utils.executors import run_in_process
 from utils.logger import setup_logger
 
 logger = setup_logger("visualization_generator")
@@ -14,8 +22,12 @@ logger = setup_logger("visualization_generator")
 class VisualizationGenerator:
     """Revolutionary AI-powered algorithm visualization generator"""
     
-    def __init__(self):
+    def __init__(self, benchmarker: Optional[PerformanceBenchmarker] = None):
         self.visualization_templates = {}
+        self.execution_tracer = ExecutionTracer()
+        self.trace_store = TraceStore()
+        self.animation_recorder = AnimationRecorder()
+        self.complexity_profiler = ComplexityProfiler(benchmarker or PerformanceBenchmarker())
         
     async def initialize(self):
         """Initialize visualization templates and generators"""
@@ -33,41 +45,33 @@ class VisualizationGenerator:
         try:
             logger.info(f"🎨 Creating flowchart for {language} algorithm")
             
-            # Parse code structure
-            flow_elements = await self._parse_code_flow(code, language)
+            # Build the control-flow graph from the syntax tree; Tree-sitter
+            # holds the GIL, so a large file would otherwise stall the loop
+            cfg = await run_in_process(build_cfg, code, language)
             
             # Generate D3.js compatible flowchart data
             flowchart_data = {
                 "nodes": [],
-                "edges": [],
-                "layout": "top-to-bottom",
+                "edges": cfg["edges"],
+                "functions": cfg["functions"],
+                "layout": "layered",
                 "interactive": True
             }
             
-            # Create nodes for each code block
-            node_id = 0
-            for element in flow_elements:
+            # One node per basic block, positioned by the server-side layout
+            for block in cfg["blocks"]:
                 flowchart_data["nodes"].append({
-                    "id": node_id,
-                    "type": element["type"],
-                    "label": element["label"],
-                    "code": element.get("code", ""),
-                    "position": {"x": 0, "y": node_id * 80},
-                    "style": await self._get_node_style(element["type"])
+                    "id": block["id"],
+                    "type": block["kind"],
+                    "label": block["label"] or (block["statements"][0] if block["statements"] else ""),
+                    "code": "\n".join(block["statements"]),
+                    "statement_count": block["statement_count"],
+                    "line_range": [block["start_line"], block["end_line"]],
+                    "function": block["function"],
+                    "layer": block["layer"],
+                    "position": block["position"],
+                    "style": await self._get_node_style(block["kind"])
                 })
-                
-                # Create edges between sequential nodes
-                if node_id > 0:
-                    flowchart_data["edges"].append({
-                        "source": node_id - 1,
-                        "target": node_id,
-                        "type": "sequential"
-                    })
-                
-                node_id += 1
-            
-            # Add conditional branches and loops
-            await self._add_control_flow_edges(flowchart_data, flow_elements)
             
             return VisualizationData(
                 visualization_type="flowchart",
@@ -85,21 +89,32 @@ class VisualizationGenerator:
             logger.error(f"❌ Flowchart creation failed: {e}")
             return await self._create_error_visualization(str(e))
 
-    async def create_execution_trace(self, code: str, language: str) -> VisualizationData:
+    async def create_execution_trace(self, code: str, language: str, test_input: str = "") -> VisualizationData:
         """
         Create interactive execution trace visualization
         """
         try:
             logger.info(f"🎯 Creating execution trace for {language} algorithm")
             
-            # Simulate execution steps
-            execution_steps = await self._simulate_execution(code, language)
+            # Run the code under the sandboxed line tracer
+            trace = await self.execution_tracer.trace(code, language, test_input)
+            
+            # The full trace stays server-side; the response carries the
+            # first window and the client pages or seeks through the rest
+            trace_id = await self.trace_store.save(trace)
             
             trace_data = {
-                "steps": execution_steps,
-                "variables": await self._track_variable_changes(code, language),
-                "call_stack": await self._track_function_calls(code, language),
-                "memory_timeline": await self._track_memory_usage(code, language),
+                "trace_id": trace_id,
+                "engine": trace["engine"],
+                "total_steps": trace["total_steps"],
+                "recorded_steps": trace["recorded_steps"],
+                "sampled": trace["sampled"],
+                "truncated": trace["truncated"],
+                "window": self.trace_store.open(trace_id).window(0, DEFAULT_WINDOW),
+                "line_hits": trace["line_hits"],
+                "memory_timeline": trace["memory"],
+                "output": trace["stdout"],
+                "error": trace["error"],
                 "interactive": True
             }
             
@@ -120,7 +135,23 @@ class VisualizationGenerator:
             logger.error(f"❌ Execution trace creation failed: {e}")
             return await self._create_error_visualization(str(e))
 
-    async def create_complexity_graph(self, code: str, language: str) -> VisualizationData:
+    async def get_trace_window(self, trace_id: str, start_step: int = 0, count: int = DEFAULT_WINDOW) -> Dict[str, Any]:
+        """
+        Page of a stored execution trace starting at start_step
+        """
+        return self.trace_store.open(trace_id).window(start_step, count)
+
+    async def seek_trace(self, trace_id: str, step: int, breakpoints: Optional[List[int]] = None,
+                         direction: str = "forward") -> Optional[Dict[str, Any]]:
+        """
+        Program state at a step, or at the next breakpoint hit from it
+        """
+        reader = self.trace_store.open(trace_id)
+        if breakpoints:
+            return reader.find_breakpoint(step, breakpoints, direction)
+        return reader.seek(step)
+
+    async def create_complexity_graph(self, code: str, language: str, category: Optional[str] = None) -> VisualizationData:
         """
         Create interactive complexity analysis visualization
         """
@@ -130,21 +161,45 @@ class VisualizationGenerator:
             # Analyze complexity patterns
             complexity_data = await self._analyze_complexity_patterns(code, language)
             
-            graph_data = {
-                "time_complexity": {
-                    "best_case": complexity_data.get("time_best", "O(n)"),
-                    "average_case": complexity_data.get("time_avg", "O(n)"),
-                    "worst_case": complexity_data.get("time_worst", "O(n)"),
-                    "graph_points": await self._generate_complexity_points("time", complexity_data)
-                },
-                "space_complexity": {
-                    "complexity": complexity_data.get("space", "O(1)"),
-                    "breakdown": complexity_data.get("space_breakdown", {}),
-                    "graph_points": await self._generate_complexity_points("space", complexity_data)
-                },
-                "comparison": await self._get_complexity_comparison(complexity_data),
-                "interactive": True
-            }
+            # Measured growth of this code and of corpus references for the same category
+            measurements = None
+            try:
+                measurements = await self.complexity_profiler.compare_with_corpus(code, language, category)
+                measurement_error = measurements["submission"].get("error")
+            except Exception as e:
+                measurement_error = str(e)
+            
+            if measurement_error:
+                # Programs that cannot run on generated inputs still get the static estimate
+                logger.warning(f"⚠️ Could not measure growth, showing the static estimate: {measurement_error}")
+                graph_data = self._static_complexity_graph(complexity_data, measurement_error, measurements)
+            else:
+                profile = measurements["submission"]
+                graph_data = {
+                    "time_complexity": {
+                        "best_case": complexity_data.get("time_best", "O(n)"),
+                        "average_case": complexity_data.get("time_avg", "O(n)"),
+                        "worst_case": complexity_data.get("time_worst", "O(n)"),
+                        "measured_complexity": profile["time"]["best_fit"],
+                        "unit": profile["time"]["unit"],
+                        "graph_points": profile["time"]["measured"],
+                        "fitted_curves": profile["time"]["fitted_curves"]
+                    },
+                    "space_complexity": {
+                        "complexity": complexity_data.get("space", "O(1)"),
+                        "breakdown": complexity_data.get("space_breakdown", {}),
+                        "measured_complexity": profile["memory"]["best_fit"],
+                        "unit": profile["memory"]["unit"],
+                        "graph_points": profile["memory"]["measured"],
+                        "fitted_curves": profile["memory"]["fitted_curves"]
+                    },
+                    "measured": True,
+                    "runs": profile["runs"],
+                    "generator": profile["generator"],
+                    "cached": profile["cached"],
+                    "comparison": self._complexity_comparison(measurements),
+                    "interactive": True
+                }
             
             return VisualizationData(
                 visualization_type="complexity_graph",
@@ -260,49 +315,6 @@ class VisualizationGenerator:
             }
         }
 
-    async def _parse_code_flow(self, code: str, language: str) -> List[Dict[str, Any]]:
-        """Parse code to extract flow elements"""
-        flow_elements = []
-        
-        # Simple parsing for demonstration (would be enhanced with AST parsing)
-        lines = code.split('\n')
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line or line.startswith('#') or line.startswith('//'):
-                continue
-                
-            if 'if' in line and line.endswith(':'):
-                flow_elements.append({
-                    "type": "decision",
-                    "label": f"Condition: {line}",
-                    "code": line,
-                    "line_number": i + 1
-                })
-            elif 'for' in line or 'while' in line:
-                flow_elements.append({
-                    "type": "loop",
-                    "label": f"Loop: {line}",
-                    "code": line,
-                    "line_number": i + 1
-                })
-            elif 'return' in line:
-                flow_elements.append({
-                    "type": "output",
-                    "label": f"Return: {line}",
-                    "code": line,
-                    "line_number": i + 1
-                })
-            else:
-                flow_elements.append({
-                    "type": "process",
-                    "label": f"Process: {line[:30]}...",
-                    "code": line,
-                    "line_number": i + 1
-                })
-        
-        return flow_elements
-
     async def _get_node_style(self, node_type: str) -> Dict[str, Any]:
         """Get styling for flowchart nodes"""
         styles = {
@@ -316,52 +328,6 @@ class VisualizationGenerator:
         
         return styles.get(node_type, {"fill": "#CCCCCC", "shape": "rectangle"})
 
-    async def _add_control_flow_edges(self, flowchart_data: Dict[str, Any], flow_elements: List[Dict[str, Any]]):
-        """Add conditional branches and loop edges to flowchart"""
-        # Implementation would analyze control flow and add appropriate edges
-        pass
-
-    async def _simulate_execution(self, code: str, language: str) -> List[Dict[str, Any]]:
-        """Simulate algorithm execution steps"""
-        steps = []
-        
-        # Simplified execution simulation
-        lines = [line.strip() for line in code.split('\n') if line.strip()]
-        
-        for i, line in enumerate(lines):
-            steps.append({
-                "step": i + 1,
-                "line": line,
-                "description": f"Execute: {line}",
-                "variables_changed": [],
-                "memory_state": {},
-                "highlights": [i + 1]
-            })
-        
-        return steps
-
-    async def _track_variable_changes(self, code: str, language: str) -> List[Dict[str, Any]]:
-        """Track variable changes during execution"""
-        return [
-            {"variable": "i", "type": "int", "changes": [0, 1, 2, 3, 4]},
-            {"variable": "result", "type": "list", "changes": [[], [1], [1, 2], [1, 2, 3]]}
-        ]
-
-    async def _track_function_calls(self, code: str, language: str) -> List[Dict[str, Any]]:
-        """Track function call stack"""
-        return [
-            {"function": "main", "line": 1, "depth": 0},
-            {"function": "helper", "line": 5, "depth": 1}
-        ]
-
-    async def _track_memory_usage(self, code: str, language: str) -> List[Dict[str, Any]]:
-        """Track memory usage over time"""
-        return [
-            {"step": 1, "memory": 1.2, "allocations": 1},
-            {"step": 2, "memory": 2.1, "allocations": 2},
-            {"step": 3, "memory": 1.8, "allocations": 1}
-        ]
-
     async def _analyze_complexity_patterns(self, code: str, language: str) -> Dict[str, Any]:
         """Analyze complexity patterns in code"""
         # Simplified complexity analysis
@@ -385,28 +351,64 @@ class VisualizationGenerator:
             "space_breakdown": {"variables": "O(1)", "recursion": "O(1)"}
         }
 
-    async def _generate_complexity_points(self, complexity_type: str, complexity_data: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Generate points for complexity graph"""
-        # Generate sample points for visualization
-        points = []
-        for n in [1, 10, 100, 1000, 10000]:
-            if complexity_type == "time":
-                value = n if "O(n)" in str(complexity_data) else n * n if "O(n²)" in str(complexity_data) else 1
-            else:
-                value = 1  # Constant space for most algorithms
-            
-            points.append({"input_size": n, "value": value})
-        
-        return points
+    def _static_complexity_graph(self, complexity_data: Dict[str, Any], measurement_error: str,
+                                 measurements: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Complexity graph from the static estimate alone, drawn on the profiler's input sizes"""
+        curves = dict(REFERENCE_CURVES)
 
-    async def _get_complexity_comparison(self, complexity_data: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Get complexity comparison with common algorithms"""
-        return [
-            {"algorithm": "Linear Search", "time": "O(n)", "space": "O(1)"},
-            {"algorithm": "Binary Search", "time": "O(log n)", "space": "O(1)"},
-            {"algorithm": "Quick Sort", "time": "O(n log n)", "space": "O(log n)"},
-            {"algorithm": "Current Algorithm", "time": complexity_data.get("time_avg", "O(n)"), "space": complexity_data.get("space", "O(1)")}
-        ]
+        def points(label: str) -> List[Dict[str, Any]]:
+            # Relative growth only (constant is 1); labels without a reference curve (O(2^n)) have no points
+            curve = curves.get(label)
+            return [{"input_size": n, "value": max(curve(n), 1.0)} for n in PROFILE_SIZES] if curve else []
+
+        time_label = complexity_data.get("time_avg", "O(n)")
+        space_label = complexity_data.get("space", "O(1)")
+        return {
+            "time_complexity": {
+                "best_case": complexity_data.get("time_best", "O(n)"),
+                "average_case": time_label,
+                "worst_case": complexity_data.get("time_worst", "O(n)"),
+                "measured_complexity": None,
+                "unit": None,
+                "graph_points": points(time_label)
+            },
+            "space_complexity": {
+                "complexity": space_label,
+                "breakdown": complexity_data.get("space_breakdown", {}),
+                "measured_complexity": None,
+                "unit": None,
+                "graph_points": points(space_label)
+            },
+            "measured": False,
+            "measurement_error": measurement_error,
+            "runs": measurements["submission"].get("runs", []) if measurements else [],
+            "comparison": self._complexity_comparison(measurements) if measurements else None,
+            "interactive": True
+        }
+
+    def _complexity_comparison(self, measurements: Dict[str, Any]) -> Dict[str, Any]:
+        """Measured growth of the submission next to corpus references run on the same inputs"""
+        def row(name: str, profile: Dict[str, Any], path: Optional[str] = None) -> Dict[str, Any]:
+            if "error" in profile:
+                return {"algorithm": name, "path": path, "error": profile["error"]}
+            return {
+                "algorithm": name,
+                "path": path,
+                "language": profile["language"],
+                "time": profile["time"]["best_fit"],
+                "space": profile["memory"]["best_fit"],
+                "time_points": profile["time"]["measured"],
+                "memory_points": profile["memory"]["measured"]
+            }
+        
+        return {
+            "category": measurements["category"],
+            "generator": measurements["generator"],
+            "algorithms": [
+                row(reference["algorithm"], reference["profile"], reference["path"])
+                for reference in measurements["references"]
+            ] + [row("Current Algorithm", measurements["submission"])]
+        }
 
     async def _detect_data_structures(self, code: str, language: str) -> List[Dict[str, Any]]:
         """Detect data structures used in code"""
@@ -452,37 +454,366 @@ class VisualizationGenerator:
 
     # Custom visualization methods
     async def _create_tree_traversal_viz(self, code: str, language: str, options: Dict[str, Any]) -> VisualizationData:
-        """Create tree traversal visualization"""
+        """Create tree traversal visualization from the nodes the code builds and visits"""
+        log = await self.animation_recorder.record(code, language, options.get("test_input", ""), options)
+        
+        nodes, edges = self._object_tree(log)
+        if nodes:
+            node_ids = [node["id"] for node in nodes]
+            traversal_order = self._collapse_repeats(
+                log.columns["container"][position] for position in log.positions(node_ids, ["read"])
+            )
+        else:
+            # No node classes: the tree is an adjacency structure
+            adjacency = self._pick_adjacency(log, options.get("tree"))
+            if adjacency is None:
+                raise ValueError("No tree nodes or adjacency structure found in the recorded run")
+            node_ids, edges = self._adjacency_graph(log, adjacency)
+            nodes = [{"id": node_id} for node_id in node_ids]
+            traversal_order = self._expansion_order(log, adjacency)
+        
         return VisualizationData(
             visualization_type="tree_traversal",
-            data={"nodes": [], "edges": [], "traversal_order": []},
+            data={
+                "nodes": nodes,
+                "edges": edges,
+                "roots": self._assign_depths(nodes, edges),
+                "traversal_order": traversal_order,
+                **self._run_summary(log)
+            },
             interactive_features=["animate_traversal", "highlight_current_node"],
             description="Interactive tree traversal visualization"
         )
 
     async def _create_sorting_animation(self, code: str, language: str, options: Dict[str, Any]) -> VisualizationData:
-        """Create sorting algorithm animation"""
+        """Create sorting algorithm animation from the recorded array operations"""
+        log = await self.animation_recorder.record(code, language, options.get("test_input", ""), options)
+        
+        target = self._pick_container(log, ("list",), options.get("array"), ("write", "swap", "insert", "delete"))
+        if target is None:
+            raise ValueError("No list found in the recorded run")
+        positions = log.positions([target])
+        
         return VisualizationData(
             visualization_type="sorting_animation",
-            data={"array": [5, 2, 8, 1, 9], "steps": []},
+            data={
+                "label": log.containers[target]["label"],
+                "array": log.snapshot(target, "initial"),
+                "final_array": log.snapshot(target, "final"),
+                "steps": {
+                    "count": len(positions),
+                    "op_names": log.document["op_names"],
+                    "flags": log.flags,
+                    "columns": log.encode(positions, ("op", "index", "index2", "value")),
+                    "values": log.document["values"]
+                },
+                **self._run_summary(log)
+            },
             interactive_features=["play_pause", "step_control", "speed_adjustment"],
             description="Interactive sorting algorithm animation"
         )
 
     async def _create_graph_algorithm_viz(self, code: str, language: str, options: Dict[str, Any]) -> VisualizationData:
-        """Create graph algorithm visualization"""
+        """Create graph algorithm visualization from the adjacency structure and the state it drives"""
+        log = await self.animation_recorder.record(code, language, options.get("test_input", ""), options)
+        
+        adjacency = self._pick_adjacency(log, options.get("graph"))
+        if adjacency is None:
+            raise ValueError("No adjacency structure found in the recorded run")
+        nodes, edges = self._adjacency_graph(log, adjacency)
+        
+        # Steps: node expansions (reads of the adjacency structure) interleaved
+        # with every update to the algorithm's own containers (visited, dist, queue)
+        rows = self._row_containers(log, adjacency)
+        state_containers = [
+            container_id for container_id, container in log.containers.items()
+            if container_id != adjacency and container_id not in rows
+            and container["kind"] in ("list", "dict", "table") and container["label"]
+        ]
+        positions = sorted(
+            log.positions([adjacency], ["read"])
+            + log.positions(state_containers, ["write", "swap", "append", "insert", "delete", "clear"])
+        )
+        
         return VisualizationData(
             visualization_type="graph_algorithm",
-            data={"nodes": [], "edges": [], "algorithm_state": {}},
+            data={
+                "nodes": [{"id": node} for node in nodes],
+                "edges": edges,
+                "expansion_order": self._expansion_order(log, adjacency),
+                "algorithm_state": {
+                    log.containers[container_id]["label"]: {
+                        "id": container_id,
+                        "initial": log.snapshot(container_id, "initial"),
+                        "final": log.snapshot(container_id, "final")
+                    }
+                    for container_id in state_containers
+                },
+                "steps": {
+                    "count": len(positions),
+                    "op_names": log.document["op_names"],
+                    "flags": log.flags,
+                    "columns": log.encode(positions),
+                    "values": log.document["values"],
+                    "keys": log.document["keys"]
+                },
+                **self._run_summary(log)
+            },
             interactive_features=["highlight_path", "show_distances", "animate_algorithm"],
             description="Interactive graph algorithm visualization"
         )
 
     async def _create_dp_table_viz(self, code: str, language: str, options: Dict[str, Any]) -> VisualizationData:
-        """Create dynamic programming table visualization"""
+        """Create dynamic programming table visualization from the recorded cell writes and reads"""
+        log = await self.animation_recorder.record(code, language, options.get("test_input", ""), options)
+        
+        target = (self._pick_container(log, ("table",), options.get("table"), ("write",))
+                  or self._pick_container(log, ("list",), options.get("table"), ("write",)))
+        if target is None:
+            raise ValueError("No DP table found in the recorded run")
+        
+        # Each cell write depends on the cells read since the previous write;
+        # row fetches (index2 == -1 on a table) are not cell reads
+        is_table = log.containers[target]["kind"] == "table"
+        read_code = log.codes["read"]
+        writes, offsets, dependency_rows, dependency_cols = [], [0], [], []
+        for position in log.positions([target], ["read", "write"]):
+            row, col = log.columns["index"][position], log.columns["index2"][position]
+            if log.kind(position) == read_code:
+                if not (is_table and col == -1):
+                    dependency_rows.append(row)
+                    dependency_cols.append(col)
+                continue
+            writes.append(position)
+            offsets.append(len(dependency_rows))
+        # Reads after the last write belong to no fill step
+        del dependency_rows[offsets[-1]:], dependency_cols[offsets[-1]:]
+        
+        label = log.containers[target]["label"]
         return VisualizationData(
             visualization_type="dp_table",
-            data={"table": [], "fill_order": [], "recurrence_relation": ""},
+            data={
+                "label": label,
+                "table": log.snapshot(target, "initial"),
+                "final_table": log.snapshot(target, "final"),
+                "fill_order": {
+                    "count": len(writes),
+                    "columns": log.encode(writes, ("op", "index", "index2", "value")),
+                    "flags": log.flags,
+                    "values": log.document["values"]
+                },
+                "dependencies": {
+                    "offsets": pack_column(offsets),
+                    "row": pack_column(dependency_rows),
+                    "col": pack_column(dependency_cols)
+                },
+                "recurrence_relation": self._find_recurrence(code, label),
+                **self._run_summary(log)
+            },
             interactive_features=["animate_fill", "highlight_dependencies", "show_recurrence"],
             description="Interactive dynamic programming table visualization"
-        )
\ No newline at end of file
+        )
+
+    # Animation helpers
+    def _run_summary(self, log: OpLog) -> Dict[str, Any]:
+        """Recording totals and program output shared by every animation"""
+        return {
+            "total_ops": log.document["total_ops"],
+            "recorded_ops": log.document["recorded_ops"],
+            "truncated": log.document["truncated"],
+            "output": log.document["stdout"],
+            "error": log.document["error"]
+        }
+
+    def _pick_container(self, log: OpLog, kinds: tuple, label: Optional[str], ops: tuple) -> Optional[int]:
+        """The container named by the caller, else the busiest one of the given kinds"""
+        candidates = [
+            container_id for container_id, container in log.containers.items()
+            if container["kind"] in kinds and (label is None or container["label"] == label)
+        ]
+        if not candidates:
+            return None
+        counts = log.counts(ops)
+        return max(candidates, key=lambda container_id: (counts[container_id], -container_id))
+
+    @staticmethod
+    def _literal(value):
+        """Node ids arrive as reprs when they are not ints ("'A'", "(0, 1)")"""
+        if isinstance(value, str):
+            try:
+                value = ast.literal_eval(value)
+            except (ValueError, SyntaxError):
+                return value
+        if isinstance(value, list):
+            return tuple(value)
+        return value
+
+    @staticmethod
+    def _collapse_repeats(values) -> List[Any]:
+        collapsed = []
+        for value in values:
+            if not collapsed or collapsed[-1] != value:
+                collapsed.append(value)
+        return collapsed
+
+    def _state(self, log: OpLog, container_id: int):
+        container = log.containers.get(container_id, {})
+        state = container.get("final")
+        return container.get("initial") if state is None else state
+
+    def _row_containers(self, log: OpLog, container_id: int) -> set:
+        state = self._state(log, container_id) or []
+        if log.containers[container_id]["kind"] == "dict":
+            state = [value for _, value in state]
+        return {row["ref"] for row in state if isinstance(row, dict) and "ref" in row}
+
+    def _adjacency_rows(self, log: OpLog, container_id: int) -> Optional[Dict[Any, List[Any]]]:
+        """Neighbour lists of a dict-of-lists, list-of-lists or 0/1 matrix, or None"""
+        container = log.containers[container_id]
+        state = self._state(log, container_id)
+        if not state or container["kind"] not in ("dict", "table"):
+            return None
+        pairs = ([(self._literal(key), value) for key, value in state] if container["kind"] == "dict"
+                 else list(enumerate(state)))
+        
+        rows = {}
+        for node, row in pairs:
+            if isinstance(row, dict) and "ref" in row:
+                inner = log.containers.get(row["ref"])
+                if inner is None:
+                    return None
+                contents = self._state(log, row["ref"]) or []
+                if inner["kind"] == "dict":
+                    neighbours = [(self._literal(key), value) for key, value in contents]
+                else:
+                    neighbours = [self._literal(item) for item in contents]
+            else:
+                neighbours = self._literal(row)
+                if not isinstance(neighbours, (tuple, set, frozenset)):
+                    return None
+                neighbours = list(neighbours)
+            rows[node] = neighbours
+        
+        if container["kind"] == "table":
+            size = len(rows)
+            if all(len(row) == size and all(cell in (0, 1) for cell in row) for row in rows.values()):
+                return {node: [index for index, cell in enumerate(row) if cell] for node, row in rows.items()}
+            # A list-of-lists is only an adjacency list if every entry names a row
+            targets = (item[0] if isinstance(item, tuple) and item else item
+                       for row in rows.values() for item in row)
+            if not all(type(target) is int and 0 <= target < size for target in targets):
+                return None
+        return rows
+
+    def _pick_adjacency(self, log: OpLog, label: Optional[str]) -> Optional[int]:
+        """The adjacency structure named by the caller, else the most read one"""
+        reads = log.counts(["read"])
+        candidates = [
+            container_id for container_id, container in log.containers.items()
+            if (label is None or container["label"] == label) and self._adjacency_rows(log, container_id)
+        ]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda container_id: (reads[container_id], -container_id))
+
+    def _expansion_order(self, log: OpLog, container_id: int) -> List[Any]:
+        """Nodes whose neighbours were read, once the structure stopped changing"""
+        structure = {container_id} | self._row_containers(log, container_id)
+        changes = log.positions(structure, ["write", "swap", "append", "insert", "delete", "clear"])
+        built = changes[-1] if changes else -1
+        return self._collapse_repeats(
+            self._literal(log.key(position)) for position in log.positions([container_id], ["read"])
+            if position > built
+        )
+
+    def _adjacency_graph(self, log: OpLog, container_id: int):
+        """Nodes (first-seen order) and edges of an adjacency structure"""
+        nodes, seen, edges = [], set(), []
+        
+        def add(node):
+            if node not in seen:
+                seen.add(node)
+                nodes.append(node)
+        
+        for node, neighbours in self._adjacency_rows(log, container_id).items():
+            add(node)
+            for neighbour in neighbours:
+                if isinstance(neighbour, tuple) and neighbour:
+                    target, weight = neighbour[0], (neighbour[1] if len(neighbour) > 1 else None)
+                else:
+                    target, weight = neighbour, None
+                add(target)
+                edges.append({"source": node, "target": target, "weight": weight})
+        return nodes, edges
+
+    def _object_tree(self, log: OpLog):
+        """Nodes and edges from instances of the code's own classes, replaying attribute writes"""
+        objects = {container_id for container_id, container in log.containers.items() if container["kind"] == "object"}
+        if not objects:
+            return [], []
+        
+        links, values = {}, {}
+        for position in log.positions(objects, ["write"]):
+            parent, attribute = log.columns["container"][position], self._literal(log.key(position))
+            if log.is_ref(position):
+                links[(parent, attribute)] = log.columns["value"][position]
+            else:
+                links.pop((parent, attribute), None)
+                if attribute in NODE_VALUE_ATTRIBUTES:
+                    values[parent] = log.value(position)
+        
+        edges = []
+        for (parent, attribute), child in links.items():
+            if child in objects:
+                edges.append({"source": parent, "target": child, "label": attribute})
+            elif log.containers.get(child, {}).get("kind") == "list":
+                # children lists: final contents if reachable, else whatever was appended
+                contents = log.containers[child].get("final")
+                if contents is None:
+                    contents = [
+                        log.value(position) for position in log.positions([child], ["append", "insert", "write"])
+                        if log.is_ref(position)
+                    ]
+                edges.extend(
+                    {"source": parent, "target": item["ref"], "label": attribute}
+                    for item in contents if isinstance(item, dict) and item.get("ref") in objects
+                )
+        
+        linked = {edge["source"] for edge in edges} | {edge["target"] for edge in edges}
+        nodes = [
+            {"id": container_id, "class": log.containers[container_id]["label"], "value": values.get(container_id)}
+            for container_id in sorted(objects) if container_id in values or container_id in linked
+        ]
+        return nodes, edges
+
+    def _assign_depths(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> List[Any]:
+        """Set each node's depth from the roots (nodes nobody points to) and return the roots"""
+        children = {}
+        for edge in edges:
+            children.setdefault(edge["source"], []).append(edge["target"])
+        targets = {edge["target"] for edge in edges}
+        node_ids = [node["id"] for node in nodes]
+        roots = [node_id for node_id in node_ids if node_id not in targets] or node_ids[:1]
+        
+        depths = {root: 0 for root in roots}
+        queue = list(roots)
+        for node_id in queue:
+            for child in children.get(node_id, []):
+                if child not in depths:
+                    depths[child] = depths[node_id] + 1
+                    queue.append(child)
+        for node in nodes:
+            node["depth"] = depths.get(node["id"])
+        return roots
+
+    def _find_recurrence(self, code: str, label: Optional[str]) -> str:
+        """Source line of the last cell assignment that reads the table itself"""
+        if not label:
+            return ""
+        assignment = re.compile(rf"^\s*{re.escape(label)}\s*(\[[^\]]*\]\s*)+=(?!=)\s*(.+)$")
+        recurrence = ""
+        for line in code.splitlines():
+            match = assignment.match(line)
+            if match and re.search(rf"\b{re.escape(label)}\s*\[", match.group(2)):
+                recurrence = line.strip()
+        return recurrence
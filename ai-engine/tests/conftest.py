@@ -0,0 +1,12 @@
+"""
+Shared pytest setup: tests import the ai-engine packages the way main.py does
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Services log to files; keep test runs out of the source tree
+os.environ.setdefault("LOGS_DIR", os.path.join(tempfile.gettempdir(), "algomaster-test-logs"))
@@ -0,0 +1,31 @@
+"""
+Stage result reuse across edits in one analysis session
+"""
+
+import asyncio
+
+from services.analysis_session import AnalysisSessionManager
+
+FIB = (
+    "def fib(n):\n"
+    "    return n if n < 2 else fib(n - 1) + fib(n - 2)\n"
+)
+
+
+def _patterns(result, key="fib#0"):
+    return [finding['pattern'] for finding in result['results']['anti_patterns'][key]]
+
+
+async def _edit_decorator():
+    manager = AnalysisSessionManager()
+    plain = await manager.analyze("alice", FIB, "python", session_id="s", stages=["anti_patterns"])
+    cached = await manager.analyze("alice", "from functools import cache\n\n@cache\n" + FIB, "python",
+                                   session_id="s", stages=["anti_patterns"])
+    return plain, cached
+
+
+def test_adding_a_decorator_recomputes_anti_patterns():
+    plain, cached = asyncio.run(_edit_decorator())
+
+    assert 'exponential_recursion' in _patterns(plain)
+    assert 'exponential_recursion' not in _patterns(cached)
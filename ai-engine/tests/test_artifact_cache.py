@@ -0,0 +1,57 @@
+"""
+Artifact cache placement, pinning and eviction
+"""
+
+import os
+
+import pytest
+
+from services.artifact_cache import ArtifactCache
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "getuid"), reason="ownership checks are POSIX-only")
+
+
+def _publish(cache: ArtifactCache, key: str, size: int) -> str:
+    build_dir = cache.new_build_dir()
+    with open(os.path.join(build_dir, 'code'), 'wb') as f:
+        f.write(b'\0' * size)
+    return cache.store(key, build_dir)
+
+
+def test_cache_directory_is_private(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "artifacts"))
+
+    assert os.stat(cache.cache_dir).st_mode & 0o077 == 0
+
+
+def test_shared_cache_directory_is_not_used(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    cache = ArtifactCache(str(shared))
+
+    assert cache.cache_dir != str(shared)
+    assert os.stat(cache.cache_dir).st_mode & 0o077 == 0
+
+
+def test_pinned_artifacts_survive_eviction(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "artifacts"), max_size_mb=1)
+    in_use = _publish(cache, "a" * 64, 600 * 1024)
+    idle = _publish(cache, "b" * 64, 600 * 1024)
+    cache.release(idle)
+    _publish(cache, "c" * 64, 600 * 1024)
+
+    assert os.path.isdir(in_use)
+    assert not os.path.isdir(idle)
+
+
+def test_released_artifacts_can_be_evicted(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "artifacts"), max_size_mb=1)
+    first = _publish(cache, "a" * 64, 600 * 1024)
+    assert cache.lookup("a" * 64) == first
+    cache.release(first)
+    cache.release(first)
+    os.utime(first, (0, 0))
+    _publish(cache, "b" * 64, 600 * 1024)
+
+    assert not os.path.isdir(first)
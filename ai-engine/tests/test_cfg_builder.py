@@ -0,0 +1,69 @@
+"""
+Control-flow graphs of try statements with finally clauses
+"""
+
+from typing import Set, Tuple
+
+from services.cfg_builder import build_cfg
+
+LOOP_WITH_FINALLY = '''def f(items):
+    for x in items:
+        try:
+            if x < 0:
+                continue
+            value = parse(x)
+        except ValueError:
+            return None
+        finally:
+            cleanup()
+        use(value)
+    return 1
+'''
+
+
+def _edges(code: str, language: str) -> Set[Tuple[str, str, str]]:
+    """Edges between blocks named by their label or statements"""
+    cfg = build_cfg(code, language)
+    names = {block['id']: block['label'] or " | ".join(block['statements']) for block in cfg['blocks']}
+    return {(names[edge['source']], edge['type'], names[edge['target']]) for edge in cfg['edges']}
+
+
+def test_jumps_out_of_a_try_pass_through_finally():
+    edges = _edges(LOOP_WITH_FINALLY, 'python')
+    finally_block = 'finally | cleanup()'
+
+    assert ('continue', 'continue', finally_block) in edges
+    assert ('except ValueError | return None', 'return', finally_block) in edges
+    assert ('value = parse(x)', 'sequential', finally_block) in edges
+    assert ('try', 'exception', finally_block) in edges
+    # Nothing leaves the try statement except through the finally block
+    inside = ('try', 'continue', 'except ValueError | return None', 'value = parse(x)')
+    assert all(target in (finally_block, 'if x < 0', 'continue', 'value = parse(x)', 'except ValueError | return None')
+               for source, _, target in edges if source in inside)
+
+
+def test_finally_resumes_each_jump_and_keeps_its_own_block():
+    edges = _edges(LOOP_WITH_FINALLY, 'python')
+    finally_block = 'finally | cleanup()'
+
+    assert (finally_block, 'continue', 'for x in items') in edges
+    assert (finally_block, 'return', 'end f') in edges
+    assert (finally_block, 'exception', 'end f') in edges
+    assert (finally_block, 'sequential', 'use(value)') in edges
+
+
+def test_handler_exceptions_reach_finally():
+    code = 'class C { int h(int x) { try { x = f(x); } catch (Exception e) { throw e; } finally { log(); } return x; } }'
+    edges = _edges(code, 'java')
+
+    assert ('catch (Exception e) | throw e;', 'exception', 'finally | log();') in edges
+    assert ('finally | log();', 'sequential', 'return x;') in edges
+
+
+def test_nested_finally_clauses_run_inside_out():
+    code = 'function g(a) {\n  try {\n    try { return a(); } finally { inner(); }\n  } finally {\n    outer();\n  }\n}\n'
+    returns = {(source, target) for source, kind, target in _edges(code, 'javascript') if kind == 'return'}
+
+    assert returns == {('try | return a();', 'finally | inner();'),
+                       ('finally | inner();', 'finally | outer();'),
+                       ('finally | outer();', 'end g')}
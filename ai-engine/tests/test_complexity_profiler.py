@@ -0,0 +1,89 @@
+"""
+Growth measurement and curve fitting against a benchmarker with scripted timings
+"""
+
+import asyncio
+from typing import Any, Dict
+
+from services.complexity_profiler import ComplexityProfiler, PROFILE_REPEATS
+from services.visualization_generator import VisualizationGenerator
+from services.test_case_generators import generated_input
+
+STARTUP_MS = 15.0
+
+
+class ScriptedBenchmarker:
+    """cpu_time = startup + cost(n), with every second run of a size slowed down by noise"""
+
+    def __init__(self, cost, fail_from: int = None, reject_empty: bool = False):
+        self.cost = cost
+        self.fail_from = fail_from
+        self.reject_empty = reject_empty
+        self.sizes = []
+        self.running = self.max_running = 0
+
+    async def prepare_build(self, code: str, language: str, optimization_level: str = "O2"):
+        return None
+
+    def release_build(self, build):
+        pass
+
+    async def run_isolated(self, code: str, test_case: Dict[str, Any], language: str, build=None) -> Dict[str, Any]:
+        size = len(generated_input(test_case).split()) - 1
+        self.sizes.append(size)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0)
+        self.running -= 1
+        failed = (self.fail_from is not None and size >= self.fail_from) or (self.reject_empty and size == 0)
+        noise = 40.0 if self.sizes.count(size) % 2 == 0 else 0.0
+        cpu_time = STARTUP_MS + self.cost(size) + noise
+        return {'passed': not failed, 'execution_time': cpu_time, 'cpu_time': cpu_time,
+                'peak_memory_bytes': 1000 + size, 'error': 'crashed' if failed else ''}
+
+
+def _profile(benchmarker: ScriptedBenchmarker, sizes=(1000, 2000, 4000, 8000, 16000)) -> Dict[str, Any]:
+    return asyncio.run(ComplexityProfiler(benchmarker).profile("code", "python", "int_array", list(sizes)))
+
+
+def test_startup_is_subtracted_and_noise_is_filtered():
+    benchmarker = ScriptedBenchmarker(lambda n: n / 1000)
+    profile = _profile(benchmarker)
+
+    assert profile['time']['best_fit'] == 'O(n)'
+    assert [point['value'] for point in profile['time']['measured']] == [1.0, 2.0, 4.0, 8.0, 16.0]
+    assert profile['baseline']['input_size'] == 0
+    assert profile['memory']['best_fit'] == 'O(n)'
+
+
+def test_runs_are_sequential_and_repeated():
+    benchmarker = ScriptedBenchmarker(lambda n: n * n / 1e6)
+    profile = _profile(benchmarker)
+
+    assert profile['time']['best_fit'] == 'O(n²)'
+    assert benchmarker.max_running == 1
+    assert len(benchmarker.sizes) == 6 * PROFILE_REPEATS
+
+
+def test_failing_size_ends_the_profile():
+    profile = _profile(ScriptedBenchmarker(lambda n: n / 1000, fail_from=8000))
+
+    assert profile['stopped_at'] == 8000
+    assert [run['passed'] for run in profile['runs']] == [True, True, True, False]
+
+
+def test_programs_rejecting_empty_input_get_a_one_element_baseline():
+    profile = _profile(ScriptedBenchmarker(lambda n: n / 1000, reject_empty=True))
+
+    assert profile['baseline']['input_size'] == 1
+    assert profile['time']['best_fit'] == 'O(n)'
+
+
+def test_complexity_graph_falls_back_to_the_static_estimate():
+    generator = VisualizationGenerator(ScriptedBenchmarker(lambda n: 0.0, fail_from=0, reject_empty=True))
+    graph = asyncio.run(generator.create_complexity_graph("for x in a:\n    total += x\n", "python", "Arrays"))
+
+    assert graph.visualization_type == "complexity_graph"
+    assert graph.data['measured'] is False
+    assert graph.data['time_complexity']['average_case'] == "O(n)"
+    assert graph.data['time_complexity']['graph_points'][0] == {'input_size': 1000, 'value': 1000}
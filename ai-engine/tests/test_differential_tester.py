@@ -0,0 +1,115 @@
+"""
+Differential testing and counterexample shrinking against in-process programs
+
+A fake benchmarker runs Python callables instead of sandboxed processes, so
+these tests need no compiler and finish in milliseconds. It only offers
+run_isolated, prepare_build and release_build: both sides of every
+comparison must be measured the same way.
+"""
+
+import asyncio
+import itertools
+from typing import Any, Callable, Dict, List
+
+from services.differential_tester import DifferentialTester
+from services.test_case_generators import generated_input
+
+
+def _numbers(text: str) -> List[int]:
+    tokens = text.split()
+    return [int(token) for token in tokens[1:1 + int(tokens[0])]] if tokens else []
+
+
+def kadane(text: str) -> str:
+    best = current = None
+    for value in _numbers(text):
+        current = value if current is None else max(value, current + value)
+        best = current if best is None else max(best, current)
+    return f"{best}\n" if best is not None else ""
+
+
+def kadane_starting_at_zero(text: str) -> str:
+    # The classic bug: an all-negative array reports 0
+    best = current = 0
+    for value in _numbers(text):
+        current = max(0, current + value)
+        best = max(best, current)
+    return f"{best}\n"
+
+
+def total(text: str) -> str:
+    return f"{sum(_numbers(text))}\n"
+
+
+def total_without_last(text: str) -> str:
+    return f"{sum(_numbers(text)[:-1])}\n"
+
+
+_noise = itertools.count()
+
+
+def total_undefined_below_three(text: str) -> str:
+    # Stands in for a reference with undefined behaviour on tiny inputs
+    if len(_numbers(text)) < 3:
+        return f"{next(_noise)}\n"
+    return total(text)
+
+
+class FakeBenchmarker:
+    def __init__(self, programs: Dict[str, Callable[[str], str]]):
+        self.programs = programs
+
+    async def prepare_build(self, code: str, language: str, optimization_level: str = "O2"):
+        return None
+
+    def release_build(self, build):
+        pass
+
+    async def run_isolated(self, code: str, test_case: Dict[str, Any], language: str, build=None) -> Dict[str, Any]:
+        text = test_case['input'] if 'input' in test_case else generated_input(test_case)
+        return {'passed': True, 'output': self.programs[code](text), 'error': '',
+                'execution_time': 1.0, 'cpu_time': 1.0}
+
+
+def _differential(programs, code: str, reference: str, **options) -> Dict[str, Any]:
+    tester = DifferentialTester(FakeBenchmarker(programs))
+    return asyncio.run(tester.run(code, 'python', reference_code=reference, generator='int_array',
+                                  repeats=2, **options))
+
+
+def test_matching_programs_report_timings():
+    result = _differential({'a': kadane, 'b': kadane}, 'a', 'b', sizes=[10, 100])
+
+    assert result['status'] == 'match'
+    assert [report['size'] for report in result['sizes']] == [10, 100]
+
+
+def test_mismatch_is_shrunk_from_the_failing_input():
+    programs = {'submission': total_without_last, 'reference': total}
+    result = _differential(programs, 'submission', 'reference', sizes=[40], seed=3)
+
+    assert result['status'] == 'mismatch'
+    minimal = _numbers(result['minimal_failing_input'])
+    original = _numbers(generated_input(result['failing_case']))
+    assert len(minimal) == 1
+    assert set(minimal) <= set(original)
+    assert result['submission_output'] != result['reference_output']
+
+
+def test_all_negative_counterexample_survives_shrinking():
+    programs = {'submission': kadane_starting_at_zero, 'reference': kadane}
+    result = _differential(programs, 'submission', 'reference', sizes=[50], value_range=[-100, -1])
+
+    assert result['status'] == 'mismatch'
+    minimal = _numbers(result['minimal_failing_input'])
+    assert len(minimal) == 1 and minimal[0] < 0
+    assert result['submission_output'].strip() == '0'
+    assert result['reference_output'].strip() == str(minimal[0])
+
+
+def test_shrinker_skips_inputs_the_reference_cannot_answer():
+    programs = {'submission': total_without_last, 'reference': total_undefined_below_three}
+    result = _differential(programs, 'submission', 'reference', sizes=[40], seed=5)
+
+    assert result['status'] == 'mismatch'
+    assert len(_numbers(result['minimal_failing_input'])) == 3
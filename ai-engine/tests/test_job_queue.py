@@ -0,0 +1,39 @@
+"""
+Job store deduplication and ownership against a throwaway SQLite file
+"""
+
+from services.job_queue import JobStore
+
+PAYLOAD = {'code': 'print(1)', 'language': 'python'}
+
+
+def _store(tmp_path) -> JobStore:
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_same_user_shares_one_job(tmp_path):
+    store = _store(tmp_path)
+    first, first_deduplicated = store.submit("analyze", PAYLOAD, "alice")
+    second, second_deduplicated = store.submit("analyze", dict(reversed(list(PAYLOAD.items()))), "alice")
+
+    assert (first_deduplicated, second_deduplicated) == (False, True)
+    assert second['job_id'] == first['job_id']
+
+
+def test_users_never_share_a_job(tmp_path):
+    store = _store(tmp_path)
+    alice, _ = store.submit("analyze", PAYLOAD, "alice")
+    bob, deduplicated = store.submit("analyze", PAYLOAD, "bob")
+
+    assert not deduplicated
+    assert bob['job_id'] != alice['job_id']
+    assert 'user_id' not in alice and 'user_id' not in store.get(alice['job_id'])
+
+
+def test_jobs_are_owned_by_their_submitter(tmp_path):
+    store = _store(tmp_path)
+    job, _ = store.submit("analyze", PAYLOAD, "alice")
+
+    assert store.owned_by(job['job_id'], "alice")
+    assert not store.owned_by(job['job_id'], "bob")
+    assert not store.owned_by("missing", "alice")
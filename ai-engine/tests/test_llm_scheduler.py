@@ -0,0 +1,208 @@
+"""
+Deterministic simulation tests of the LLM request scheduler
+
+Drive utils/llm.LLMScheduler with a simulated clock (seeded arrivals and
+service times, no provider calls) and check its guarantees:
+
+    batch flood   a cohort queues 2000 batch requests at once while
+                  interactive users keep arriving; interactive waits stay
+                  near zero (compared with one FIFO queue) and the batch
+                  still completes
+    starvation    both lanes permanently backlogged; batch gets its weight
+                  share of slots with a bounded gap between its dispatches
+    caller share  within a lane, a user arriving behind another user's 1000
+                  queued requests is served alternately, not after them
+    cost share    callers whose requests cost 4 and 1 get equal cost shares
+    cancellation  cancelled queued requests are never dispatched and a
+                  waiter cancelled through slot() does not leak its slot
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import random
+from typing import Any, Callable, Dict, List, Tuple
+
+import pytest
+
+from utils.llm import LLMScheduler, INTERACTIVE, BATCH, LANE_WEIGHTS
+
+SEEDS = (7, 11, 23)
+
+
+class Simulation:
+    """Discrete-event loop around one scheduler; records every grant in order"""
+
+    def __init__(self, capacity: int, weights: Dict[str, float] = None):
+        self.now = 0.0
+        self.scheduler = LLMScheduler(capacity, weights or LANE_WEIGHTS, clock=lambda: self.now)
+        self._events: List[Tuple[float, int, Callable[[], None]]] = []
+        self._seq = itertools.count()
+        self.grants: List[Dict[str, Any]] = []   # in dispatch order
+        self._service: Dict[int, float] = {}     # ticket id -> service time
+        self._meta: Dict[int, Dict[str, Any]] = {}
+
+    def at(self, when: float, action: Callable[[], None]):
+        heapq.heappush(self._events, (when, next(self._seq), action))
+
+    def arrive(self, when: float, caller: str, lane: str, service: float, cost: float = 1.0, label: str = None):
+        def action():
+            ticket, granted = self.scheduler.submit(caller, lane, cost)
+            self._service[id(ticket)] = service
+            self._meta[id(ticket)] = {'caller': caller, 'lane': lane, 'cost': cost,
+                                      'label': label or lane, 'enqueued_at': self.now}
+            self._start(granted)
+        self.at(when, action)
+
+    def _start(self, granted):
+        for ticket in granted:
+            meta = self._meta[id(ticket)]
+            self.grants.append({**meta, 'granted_at': self.now, 'wait': self.now - meta['enqueued_at']})
+            self.at(self.now + self._service[id(ticket)], lambda ticket=ticket: self._start(self.scheduler.release(ticket)))
+
+    def run(self, until: float = math.inf):
+        while self._events and self._events[0][0] <= until:
+            self.now, _, action = heapq.heappop(self._events)
+            action()
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def _waits(grants: List[Dict[str, Any]], label: str) -> List[float]:
+    return [grant['wait'] for grant in grants if grant['label'] == label]
+
+
+def _flood(rng: random.Random, fifo: bool) -> Simulation:
+    """20 batch users x 100 requests at t=0; 30 interactive users arriving at 1/s for 600 s"""
+    sim = Simulation(capacity=8)
+    for user in range(20):
+        for _ in range(100):
+            caller, lane = ("fifo", BATCH) if fifo else (f"cohort-{user}", BATCH)
+            sim.arrive(0.0, caller, lane, rng.uniform(2, 6), label=BATCH)
+    when = 0.0
+    while when < 600:
+        when += rng.expovariate(1.0)
+        caller, lane = ("fifo", BATCH) if fifo else (f"student-{rng.randrange(30)}", INTERACTIVE)
+        sim.arrive(when, caller, lane, rng.uniform(2, 6), label=INTERACTIVE)
+    sim.run()
+    return sim
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_batch_flood_keeps_interactive_waits_low(seed):
+    fair = _flood(random.Random(seed), fifo=False)
+    fifo = _flood(random.Random(seed), fifo=True)
+    fair_p99 = _percentile(_waits(fair.grants, INTERACTIVE), 0.99)
+    fifo_p99 = _percentile(_waits(fifo.grants, INTERACTIVE), 0.99)
+
+    assert fair_p99 < 6.0, "interactive p99 wait should stay under one request's service time"
+    assert fair_p99 * 20 < fifo_p99, "interactive p99 should be at least 20x better than one FIFO queue"
+    assert len(_waits(fair.grants, BATCH)) == 2000
+    assert fair.scheduler.queued == 0 and fair.scheduler.running == 0
+
+
+def test_backlogged_batch_lane_gets_its_weight_share():
+    sim = Simulation(capacity=4)
+    for user in range(10):
+        for _ in range(1000):
+            sim.arrive(0.0, f"student-{user}", INTERACTIVE, 1.0)
+    for _ in range(1000):
+        sim.arrive(0.0, "cohort", BATCH, 1.0)
+    sim.run(until=250)
+
+    lanes = [grant['lane'] for grant in sim.grants]
+    batch_at = [index for index, lane in enumerate(lanes) if lane == BATCH]
+    share = len(batch_at) / len(lanes)
+    expected = LANE_WEIGHTS[BATCH] / sum(LANE_WEIGHTS.values())
+    max_gap = max(b - a for a, b in zip([-1] + batch_at, batch_at + [len(lanes)]))
+    bound = math.ceil(LANE_WEIGHTS[INTERACTIVE] / LANE_WEIGHTS[BATCH]) + 2
+
+    assert abs(share - expected) < 0.01
+    assert max_gap <= bound
+
+
+def test_callers_in_a_lane_are_served_alternately():
+    sim = Simulation(capacity=2)
+    for _ in range(1000):
+        sim.arrive(0.0, "heavy", INTERACTIVE, 1.0, label="heavy")
+    for index in range(20):
+        sim.arrive(10.0 + index * 0.01, "light", INTERACTIVE, 1.0, label="light")
+    sim.run()
+
+    light = _waits(sim.grants, "light")
+    # While both callers are backlogged the dispatches alternate
+    after = [grant['label'] for grant in sim.grants if grant['granted_at'] >= 10.0][:40]
+    imbalance = max(abs(after[:n].count("heavy") - after[:n].count("light")) for n in range(1, len(after) + 1))
+
+    assert len(light) == 20
+    assert max(light) <= 20.0
+    assert imbalance <= 2
+
+
+def test_callers_get_equal_cost_shares():
+    sim = Simulation(capacity=3)
+    for _ in range(300):
+        sim.arrive(0.0, "long-prompts", BATCH, 1.0, cost=4.0, label="long-prompts")
+    for _ in range(1200):
+        sim.arrive(0.0, "short-prompts", BATCH, 1.0, cost=1.0, label="short-prompts")
+    sim.run(until=150)
+
+    costs: Dict[str, float] = {}
+    for grant in sim.grants:
+        costs[grant['label']] = costs.get(grant['label'], 0.0) + grant['cost']
+    # At most one request per slot apart
+    assert abs(costs["long-prompts"] - costs["short-prompts"]) <= 4.0 * 3
+
+
+def test_cancelled_requests_are_never_dispatched():
+    scheduler = LLMScheduler(capacity=1, clock=lambda: 0.0)
+    first, _ = scheduler.submit("a", INTERACTIVE)
+    tickets = [scheduler.submit("b", BATCH)[0] for _ in range(5)]
+
+    assert all(scheduler.cancel(ticket) for ticket in tickets[:3])
+    granted = []
+    current = first
+    while True:
+        next_granted = scheduler.release(current)
+        if not next_granted:
+            break
+        current = next_granted[0]
+        granted.append(current)
+
+    assert granted == tickets[3:]
+    assert not scheduler.cancel(first), "a granted request cannot be withdrawn"
+
+
+async def _slot_cancellation() -> Dict[str, Any]:
+    scheduler = LLMScheduler(capacity=1)
+    holder_entered = asyncio.Event()
+    release_holder = asyncio.Event()
+
+    async def holder():
+        async with scheduler.slot("a", INTERACTIVE):
+            holder_entered.set()
+            await release_holder.wait()
+
+    async def waiter(entered: List[str], name: str):
+        async with scheduler.slot(name, BATCH):
+            entered.append(name)
+
+    entered: List[str] = []
+    holding = asyncio.create_task(holder())
+    await holder_entered.wait()
+    abandoned = asyncio.create_task(waiter(entered, "abandoned"))
+    kept = asyncio.create_task(waiter(entered, "kept"))
+    await asyncio.sleep(0)
+    abandoned.cancel()
+    release_holder.set()
+    await asyncio.gather(holding, kept)
+    await asyncio.gather(abandoned, return_exceptions=True)
+    return {'entered': entered, 'running': scheduler.running, 'queued': scheduler.queued}
+
+
+def test_cancelled_slot_waiter_leaks_no_slot():
+    assert asyncio.run(_slot_cancellation()) == {'entered': ['kept'], 'running': 0, 'queued': 0}
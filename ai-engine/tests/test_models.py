@@ -0,0 +1,20 @@
+"""
+Request validation in the API models
+"""
+
+from typing import get_args
+
+import pytest
+from pydantic import ValidationError
+
+from models.algorithm_models import AlgorithmRequest, OptimizationLevel
+from services.artifact_cache import BUILD_PROFILES
+
+
+def test_optimization_levels_match_build_profiles():
+    assert set(get_args(OptimizationLevel)) == set(BUILD_PROFILES)
+
+
+def test_unknown_optimization_level_is_rejected():
+    with pytest.raises(ValidationError):
+        AlgorithmRequest(algorithm_name="sum", code="", language="cpp", optimization_level="O3")
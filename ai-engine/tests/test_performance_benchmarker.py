@@ -0,0 +1,29 @@
+"""
+Output checking across the Python execution paths
+"""
+
+import asyncio
+
+import pytest
+
+from services.performance_benchmarker import PerformanceBenchmarker
+from utils.sandbox import SANDBOX_SUPPORTED
+
+SUBMISSION = "values = [int(x) for x in test_input.split()]\nresult = sum(values)\n"
+TEST_CASE = {'input': '1 2 3', 'expected_output': '6\n\n'}
+
+
+def test_in_process_python_ignores_trailing_whitespace():
+    benchmarker = PerformanceBenchmarker()
+    result = asyncio.run(benchmarker._execute_python_locally(SUBMISSION, TEST_CASE))
+
+    assert result['output'].strip() == '6'
+    assert result['passed']
+
+
+@pytest.mark.skipif(not SANDBOX_SUPPORTED, reason="no local sandbox on this platform")
+def test_sandboxed_python_agrees_with_in_process_python():
+    benchmarker = PerformanceBenchmarker()
+    result = asyncio.run(benchmarker._execute_python_subprocess(SUBMISSION, TEST_CASE))
+
+    assert result['passed']
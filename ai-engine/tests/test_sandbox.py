@@ -0,0 +1,38 @@
+"""
+Local sandbox isolation
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+from utils.sandbox import SANDBOX_SUPPORTED, run_sandboxed
+
+pytestmark = pytest.mark.skipif(not SANDBOX_SUPPORTED, reason="no local sandbox on this platform")
+
+PRINT_ENV = "import json, os; print(json.dumps(dict(os.environ)))"
+
+
+def _child_env(monkeypatch, **options):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-secret")
+    result = asyncio.run(run_sandboxed([sys.executable, '-c', PRINT_ENV], memory_limit_mb=None, **options))
+    assert result['returncode'] == 0, result['stderr']
+    return json.loads(result['stdout'])
+
+
+def test_server_environment_is_not_inherited(monkeypatch, tmp_path):
+    env = _child_env(monkeypatch, cwd=str(tmp_path))
+
+    assert "OPENAI_API_KEY" not in env
+    assert env['HOME'] == str(tmp_path)
+    assert env['PATH'] == os.environ['PATH']
+
+
+def test_extra_variables_are_passed_explicitly(monkeypatch):
+    env = _child_env(monkeypatch, env={'PYTHONHASHSEED': '0'})
+
+    assert env['PYTHONHASHSEED'] == '0'
+    assert "OPENAI_API_KEY" not in env
@@ -0,0 +1,41 @@
+"""
+Stored execution traces: windowed reads and eviction
+"""
+
+import asyncio
+
+import pytest
+
+from services.execution_tracer import ExecutionTracer
+from services.trace_store import TraceStore
+from utils.sandbox import SANDBOX_SUPPORTED
+
+pytestmark = pytest.mark.skipif(not SANDBOX_SUPPORTED, reason="the tracer runs in the local sandbox")
+
+PROGRAM = (
+    "total = 0\n"
+    "for i in range(50):\n"
+    "    total += i\n"
+    "print(total)\n"
+)
+
+
+async def _save_twice(store: TraceStore):
+    trace = await ExecutionTracer().trace(PROGRAM, 'python')
+    first = await store.save(trace)
+    reader = store.open(first)
+    window = reader.window(0, 10)
+    store.max_size_bytes = 0
+    second = await store.save(trace)
+    return first, second, window
+
+
+def test_saving_evicts_older_traces_on_the_loop(tmp_path):
+    store = TraceStore(str(tmp_path))
+    first, second, window = asyncio.run(_save_twice(store))
+
+    assert len(window['steps']) == 10
+    assert first not in store._readers
+    with pytest.raises(KeyError):
+        store.open(first)
+    assert store.open(second).recorded_steps > 0
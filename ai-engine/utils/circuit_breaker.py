@@ -0,0 +1,162 @@
+"""
+Circuit breakers for external providers
+
+A breaker watches the outcomes of the last BREAKER_WINDOW calls to one
+provider. When too many of them failed, or took longer than
+BREAKER_SLOW_CALL_SECONDS, it opens: calls are refused at once instead of
+queueing behind a provider that is down or crawling, and callers serve
+what they can without it. After BREAKER_OPEN_SECONDS it lets a few probe
+calls through (half-open); their outcome closes or reopens it.
+
+    closed --(failure or slow rate over threshold)--> open
+    open --(cool-down elapsed)--> half_open
+    half_open --(probes succeed)--> closed
+    half_open --(a probe fails or is slow)--> open
+
+State transitions are counted per breaker for the health snapshot.
+"""
+
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Tuple
+from utils.logger import setup_logger
+
+logger = setup_logger("circuit_breaker")
+
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_SLOW_CALL_SECONDS = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "15"))
+BREAKER_SLOW_CALL_RATE = float(os.getenv("BREAKER_SLOW_CALL_RATE", "0.5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+MIN_CALLS = 5           # outcomes needed before the rates are trusted
+HALF_OPEN_PROBES = 2    # successful probes that close a half-open breaker
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The provider's breaker is open; the call was not attempted"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} circuit open, retry in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Failure- and latency-based breaker for one provider"""
+
+    def __init__(self, name: str, window: int = BREAKER_WINDOW, failure_rate: float = BREAKER_FAILURE_RATE,
+                 slow_call_seconds: float = BREAKER_SLOW_CALL_SECONDS, slow_call_rate: float = BREAKER_SLOW_CALL_RATE,
+                 open_seconds: float = BREAKER_OPEN_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=max(MIN_CALLS, window))  # (failed, slow)
+        self._probes_in_flight = 0
+        self._probes_passed = 0
+        self.transitions: Dict[str, int] = {}
+        self.counts = {'calls': 0, 'failures': 0, 'slow_calls': 0, 'rejected': 0}
+
+    def available(self) -> bool:
+        """Whether a call now would be attempted (without reserving a half-open probe)"""
+        if self.state == OPEN:
+            return self.clock() - self.opened_at >= self.open_seconds
+        if self.state == HALF_OPEN:
+            return self._probes_in_flight < HALF_OPEN_PROBES - self._probes_passed
+        return True
+
+    def check(self):
+        """Raise CircuitOpenError if a call now would be refused; reserves nothing"""
+        if not self.available():
+            self.counts['rejected'] += 1
+            raise CircuitOpenError(self.name, max(0.0, self.opened_at + self.open_seconds - self.clock()))
+
+    def acquire(self) -> bool:
+        """
+        Admit one call or raise CircuitOpenError; every admitted call is then
+        recorded or abandoned with the returned flag (whether it is a probe)
+        """
+        if self.state == OPEN and self.clock() - self.opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+        self.check()
+        if self.state == HALF_OPEN:
+            self._probes_in_flight += 1
+            return True
+        return False
+
+    def record(self, succeeded: bool, seconds: float, probe: bool = False):
+        """Outcome of an admitted call"""
+        slow = seconds >= self.slow_call_seconds
+        self.counts['calls'] += 1
+        self.counts['failures'] += not succeeded
+        self.counts['slow_calls'] += slow
+        if probe:
+            if self.state != HALF_OPEN:
+                return  # the probe round already ended
+            self._probes_in_flight -= 1
+            if not succeeded or slow:
+                self._open()
+            else:
+                self._probes_passed += 1
+                if self._probes_passed >= HALF_OPEN_PROBES:
+                    self._transition(CLOSED)
+            return
+        if self.state != CLOSED:
+            return  # admitted before another call opened the breaker
+        self._outcomes.append((not succeeded, slow))
+        if len(self._outcomes) >= MIN_CALLS:
+            failures = sum(failed for failed, _ in self._outcomes) / len(self._outcomes)
+            slow_calls = sum(slow for _, slow in self._outcomes) / len(self._outcomes)
+            if failures >= self.failure_rate or slow_calls >= self.slow_call_rate:
+                self._open()
+
+    def abandon(self, probe: bool = False):
+        """An admitted call was cancelled by its caller before it said anything about the provider"""
+        if probe and self.state == HALF_OPEN:
+            self._probes_in_flight -= 1
+
+    def _open(self):
+        self.opened_at = self.clock()
+        self._transition(OPEN)
+
+    def _transition(self, state: str):
+        key = f"{self.state}->{state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        if state == OPEN:
+            logger.warning(f"🔌 {self.name} circuit opened ({self.state} -> open) for {self.open_seconds:.0f}s")
+        else:
+            logger.info(f"🔌 {self.name} circuit {self.state} -> {state}")
+        self.state = state
+        self._outcomes.clear()
+        self._probes_in_flight = 0
+        self._probes_passed = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'retry_in_s': round(max(0.0, self.opened_at + self.open_seconds - self.clock()), 1) if self.state == OPEN else 0.0,
+            'transitions': dict(self.transitions),
+            **self.counts
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def circuit_breaker(name: str) -> CircuitBreaker:
+    """The process-wide breaker for a provider, created on first use"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
@@ -0,0 +1,207 @@
+"""
+Executors for CPU-bound work and an event-loop lag monitor
+
+Everything in the services is `async def`, but a coroutine that computes
+for 200 ms blocks every other request on the worker for 200 ms. Work like
+that is marked with @cpu_bound and runs elsewhere:
+
+    thread   a shared thread pool; only helps for code that releases the GIL
+             (hashing, compression, file and socket I/O). Tree-sitter 0.21
+             holds the GIL while parsing, so parsing is not thread work.
+    process  a process pool; for pure-Python or GIL-holding native work.
+             Arguments and results are pickled, so keep both small and
+             decorate module-level functions or static methods only.
+
+Each process pool is named, so untrusted work (executing submissions) can be
+killed on timeout without failing the analysis work queued next to it.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import importlib
+import multiprocessing
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+from utils.logger import setup_logger
+
+logger = setup_logger("executors")
+
+CPU_THREAD_WORKERS = int(os.getenv("CPU_THREAD_WORKERS", str(min(32, (os.cpu_count() or 1) + 4))))
+CPU_PROCESS_WORKERS = int(os.getenv("CPU_PROCESS_WORKERS", str(os.cpu_count() or 1)))
+
+# Forking a process that runs an event loop and worker threads can copy held
+# locks into the child; a fork server starts workers from a clean process
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else None
+)
+
+_thread_pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_process_pools: Dict[str, concurrent.futures.ProcessPoolExecutor] = {}
+_stats = {'thread_calls': 0, 'process_calls': 0, 'process_pool_resets': 0}
+
+
+def thread_pool() -> concurrent.futures.ThreadPoolExecutor:
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = concurrent.futures.ThreadPoolExecutor(CPU_THREAD_WORKERS, thread_name_prefix="cpu")
+    return _thread_pool
+
+
+def process_pool(name: str = "cpu") -> concurrent.futures.ProcessPoolExecutor:
+    """Named process pool, created on first use (never in a preloading master)"""
+    pool = _process_pools.get(name)
+    if pool is not None and pool._broken:
+        # A worker died (killed, out of memory); the pool refuses new work for good
+        pool.shutdown(wait=False, cancel_futures=True)
+        pool = None
+        _stats['process_pool_resets'] += 1
+    if pool is None:
+        pool = concurrent.futures.ProcessPoolExecutor(CPU_PROCESS_WORKERS, mp_context=_MP_CONTEXT)
+        _process_pools[name] = pool
+    return pool
+
+
+def _reset_process_pool(name: str):
+    """Kill a pool's workers; work still queued or running on it fails with BrokenProcessPool"""
+    pool = _process_pools.pop(name, None)
+    if pool is None:
+        return
+    _stats['process_pool_resets'] += 1
+    for process in list((pool._processes or {}).values()):
+        try:
+            process.kill()
+        except (OSError, ValueError):
+            pass
+    pool.shutdown(wait=False, cancel_futures=True)
+    logger.warning(f"⚠️ Process pool '{name}' reset")
+
+
+def _call_in_worker(module: str, qualname: str, args: tuple, kwargs: dict) -> Any:
+    """Resolve a @cpu_bound function by name in the worker and call the undecorated original"""
+    target = importlib.import_module(module)
+    for part in qualname.split('.'):
+        target = getattr(target, part)
+    return target.__wrapped__(*args, **kwargs)
+
+
+async def run_in_thread(func: Callable, *args, **kwargs) -> Any:
+    _stats['thread_calls'] += 1
+    return await asyncio.get_running_loop().run_in_executor(
+        thread_pool(), functools.partial(func, *args, **kwargs)
+    )
+
+
+async def run_in_process(func: Callable, *args, pool: str = "cpu", timeout: Optional[float] = None,
+                         kill_on_abandon: bool = False, **kwargs) -> Any:
+    """
+    Run a @cpu_bound function (or any importable module-level function) in a process pool
+
+    A worker cannot be interrupted, so with kill_on_abandon a timeout or a
+    cancellation kills the pool's workers instead of letting them finish.
+    """
+    _stats['process_calls'] += 1
+    original = getattr(func, '__wrapped__', None)
+    if original is not None:
+        call = (_call_in_worker, func.__module__, func.__qualname__, args, kwargs)
+    else:
+        call = (functools.partial(func, *args, **kwargs),)
+    future = asyncio.get_running_loop().run_in_executor(process_pool(pool), *call)
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        if kill_on_abandon:
+            _reset_process_pool(pool)
+        raise
+
+
+def cpu_bound(kind: str = "process", pool: str = "cpu", timeout: Optional[float] = None,
+              kill_on_abandon: bool = False):
+    """
+    Mark a synchronous function as CPU-bound; calling it returns an awaitable
+    that runs it in the thread or process executor
+
+    The undecorated function stays reachable as __wrapped__ (process workers
+    call that one).
+    """
+    if kind not in ("thread", "process"):
+        raise ValueError(f"Unknown executor kind: {kind}")
+
+    def decorate(func: Callable) -> Callable:
+        if kind == "thread":
+            async def wrapper(*args, **kwargs):
+                return await run_in_thread(func, *args, **kwargs)
+        else:
+            async def wrapper(*args, **kwargs):
+                return await run_in_process(wrapper, *args, pool=pool, timeout=timeout,
+                                            kill_on_abandon=kill_on_abandon, **kwargs)
+        functools.update_wrapper(wrapper, func)
+        wrapper.executor = kind
+        return wrapper
+
+    return decorate
+
+
+def executor_stats() -> Dict[str, Any]:
+    return {
+        'thread_workers': CPU_THREAD_WORKERS,
+        'process_workers': CPU_PROCESS_WORKERS,
+        'process_pools': sorted(_process_pools),
+        **_stats
+    }
+
+
+def shutdown_executors():
+    global _thread_pool
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=False, cancel_futures=True)
+        _thread_pool = None
+    for name in list(_process_pools):
+        _process_pools.pop(name).shutdown(wait=False, cancel_futures=True)
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop runs a callback scheduled every interval
+
+    Lag is the time a ready callback waited because something else held the
+    loop; with everything CPU-bound offloaded it stays near zero.
+    """
+
+    def __init__(self, interval: float = 0.005, window: int = 20000):
+        self.interval = interval
+        self.lags: "deque[float]" = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - expected) * 1000)
+
+    def summary(self) -> Dict[str, float]:
+        """Lag percentiles in ms over the window"""
+        if not self.lags:
+            return {'samples': 0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+        ordered = sorted(self.lags)
+
+        def percentile(q: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+        return {'samples': len(ordered), 'p50_ms': percentile(0.5), 'p99_ms': percentile(0.99),
+                'max_ms': round(ordered[-1], 2)}
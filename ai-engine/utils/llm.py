@@ -0,0 +1,323 @@
+"""
+Scheduling and bookkeeping shared by every outbound LLM request
+
+Provider quota is one pool for all users, so a cohort batch-submitting jobs
+could otherwise hold every request slot while interactive users wait
+minutes. Each request waits in a queue per priority lane and caller, and a
+slot is granted by weighted fair queuing under a global concurrency cap:
+
+    lanes    interactive and batch share slots by LANE_WEIGHTS; a backlogged
+             lane always gets its share, so batch work is slowed, never
+             starved
+    callers  within a lane, every user (or tenant) gets an equal share
+             however many requests they queued
+
+Both levels use start-time fair queuing: a flow's next request is tagged
+max(virtual time, the flow's last finish tag) and finishes cost / weight
+later, and the smallest tag is dispatched first.
+
+The caller and lane come from context: endpoints call set_llm_caller after
+authenticating, background jobs mark themselves as batch, and tasks they
+start inherit it.
+
+Every request also passes its provider's circuit breaker (see
+utils/circuit_breaker): while the provider is failing or slow, requests are
+refused with CircuitOpenError before they queue.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple, Union
+from utils.circuit_breaker import circuit_breaker, breaker_stats
+
+INTERACTIVE, BATCH = "interactive", "batch"
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LANE_WEIGHTS = {
+    INTERACTIVE: float(os.getenv("LLM_INTERACTIVE_WEIGHT", "8")),
+    BATCH: float(os.getenv("LLM_BATCH_WEIGHT", "1"))
+}
+WAIT_WINDOW = 2048  # most recent queue waits per lane kept for percentiles
+DEFAULT_PROVIDER = "openai"
+
+_caller: ContextVar[Tuple[str, str]] = ContextVar("llm_caller", default=("anonymous", INTERACTIVE))
+_failures: ContextVar[Optional[List[Exception]]] = ContextVar("llm_failures", default=None)
+
+
+def set_llm_caller(caller: str, lane: str = INTERACTIVE):
+    """Attribute LLM requests made by the current task (and tasks it starts) to a user or tenant and lane"""
+    if lane not in LANE_WEIGHTS:
+        raise ValueError(f"Unknown LLM lane: {lane}")
+    _caller.set((caller, lane))
+
+
+class _Ticket:
+    """One request waiting for or holding a slot"""
+
+    __slots__ = ('caller', 'lane', 'cost', 'enqueued_at', 'future')
+
+    def __init__(self, caller: str, lane: str, cost: float, enqueued_at: float):
+        self.caller = caller
+        self.lane = lane
+        self.cost = cost
+        self.enqueued_at = enqueued_at
+        self.future: Optional[asyncio.Future] = None
+
+
+class _FairQueue:
+    """
+    Start-time fair queuing over child flows, each a FIFO of tickets or a
+    nested _FairQueue; a ticket's path names one child per level
+    """
+
+    def __init__(self, weight: Callable[[Hashable], float]):
+        self.weight = weight
+        self.virtual_time = 0.0
+        self._children: Dict[Hashable, Union[Deque[_Ticket], "_FairQueue"]] = {}
+        self._finish: Dict[Hashable, float] = {}   # finish tag of each flow's last dispatch
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._entry: Dict[Hashable, int] = {}      # live heap entry of each backlogged flow
+        self._seq = itertools.count()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, path: Tuple[Hashable, ...], ticket: _Ticket):
+        key, rest = path[0], path[1:]
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = _FairQueue(lambda _: 1.0) if rest else deque()
+        was_idle = len(child) == 0
+        if rest:
+            child.push(rest, ticket)
+        else:
+            child.append(ticket)
+        self._size += 1
+        if was_idle:
+            self._backlog(key)
+
+    def pop(self) -> _Ticket:
+        while True:
+            start, seq, key = heapq.heappop(self._heap)  # IndexError when empty
+            if self._entry.get(key) == seq:
+                break
+        del self._entry[key]
+        child = self._children[key]
+        ticket = child.popleft() if isinstance(child, deque) else child.pop()
+        self._size -= 1
+        self.virtual_time = start
+        self._finish[key] = start + ticket.cost / self.weight(key)
+        if len(child):
+            self._backlog(key)
+        else:
+            self._idle(key)
+        return ticket
+
+    def remove(self, path: Tuple[Hashable, ...], ticket: _Ticket) -> bool:
+        """Take a queued ticket out (its request was cancelled); False if it is not queued"""
+        key, rest = path[0], path[1:]
+        child = self._children.get(key)
+        if child is None:
+            return False
+        if rest:
+            if not child.remove(rest, ticket):
+                return False
+        else:
+            try:
+                child.remove(ticket)
+            except ValueError:
+                return False
+        self._size -= 1
+        if not len(child):
+            self._entry.pop(key, None)  # its heap entry goes stale
+            self._idle(key)
+        return True
+
+    def queued(self, key: Hashable) -> int:
+        child = self._children.get(key)
+        return len(child) if child is not None else 0
+
+    def _backlog(self, key: Hashable):
+        seq = next(self._seq)
+        self._entry[key] = seq
+        heapq.heappush(self._heap, (max(self.virtual_time, self._finish.get(key, 0.0)), seq, key))
+
+    def _idle(self, key: Hashable):
+        del self._children[key]
+        # A finish tag at or behind virtual time no longer affects the flow's next start
+        if len(self._finish) > 2 * len(self._children) + 64:
+            self._finish = {flow: tag for flow, tag in self._finish.items()
+                            if tag > self.virtual_time or flow in self._children}
+
+
+class LLMScheduler:
+    """
+    Grants LLM request slots by weighted fair queuing across lanes and callers
+
+    submit/release/cancel are synchronous and return the tickets granted a
+    slot, so the policy can be driven by a simulated clock; slot() is the
+    asyncio front end the services use.
+    """
+
+    def __init__(self, capacity: int = LLM_MAX_CONCURRENCY, weights: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic, window: int = WAIT_WINDOW):
+        self.capacity = max(1, capacity)
+        self.weights = dict(weights or LANE_WEIGHTS)
+        self.clock = clock
+        self.running = 0
+        self._queue = _FairQueue(self.weights.__getitem__)
+        self._running_by_lane = {lane: 0 for lane in self.weights}
+        self._waits = {lane: deque(maxlen=window) for lane in self.weights}
+        self._counts = {lane: {'dispatched': 0, 'cancelled': 0} for lane in self.weights}
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def submit(self, caller: str, lane: str = INTERACTIVE, cost: float = 1.0) -> Tuple[_Ticket, List[_Ticket]]:
+        """Queue a request; returns its ticket and the tickets granted a slot (possibly including it)"""
+        if lane not in self.weights:
+            raise ValueError(f"Unknown LLM lane: {lane}")
+        if cost <= 0:
+            raise ValueError("cost must be positive")
+        ticket = _Ticket(caller, lane, cost, self.clock())
+        self._queue.push((lane, caller), ticket)
+        return ticket, self._dispatch()
+
+    def release(self, ticket: _Ticket) -> List[_Ticket]:
+        """A granted request finished; returns the tickets granted the freed slot"""
+        self.running -= 1
+        self._running_by_lane[ticket.lane] -= 1
+        return self._dispatch()
+
+    def cancel(self, ticket: _Ticket) -> bool:
+        """Withdraw a queued request; False if it was already granted a slot"""
+        if self._queue.remove((ticket.lane, ticket.caller), ticket):
+            self._counts[ticket.lane]['cancelled'] += 1
+            return True
+        return False
+
+    def _dispatch(self) -> List[_Ticket]:
+        granted = []
+        now = self.clock()
+        while self.running < self.capacity and len(self._queue):
+            ticket = self._queue.pop()
+            self.running += 1
+            self._running_by_lane[ticket.lane] += 1
+            self._counts[ticket.lane]['dispatched'] += 1
+            self._waits[ticket.lane].append(now - ticket.enqueued_at)
+            granted.append(ticket)
+        return granted
+
+    @staticmethod
+    def _wake(granted: List[_Ticket]):
+        for ticket in granted:
+            # A waiter cancelled in the meantime releases the slot itself
+            if not ticket.future.done():
+                ticket.future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, caller: str, lane: str = INTERACTIVE, cost: float = 1.0):
+        """Wait for a slot and hold it for the body of the block"""
+        ticket, granted = self.submit(caller, lane, cost)
+        ticket.future = asyncio.get_running_loop().create_future()
+        self._wake(granted)
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if not self.cancel(ticket):
+                self._wake(self.release(ticket))
+            raise
+        try:
+            yield
+        finally:
+            self._wake(self.release(ticket))
+
+    def stats(self) -> Dict[str, Any]:
+        """Occupancy and per-lane queue wait percentiles (ms) over the last WAIT_WINDOW grants"""
+        lanes = {}
+        for lane, waits in self._waits.items():
+            ordered = sorted(waits)
+
+            def percentile(q: float) -> float:
+                return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1) if ordered else 0.0
+
+            lanes[lane] = {
+                'weight': self.weights[lane],
+                'queued': self._queue.queued(lane),
+                'running': self._running_by_lane[lane],
+                **self._counts[lane],
+                'wait_p50_ms': percentile(0.5),
+                'wait_p90_ms': percentile(0.9),
+                'wait_p99_ms': percentile(0.99),
+                'wait_max_ms': round(ordered[-1] * 1000, 1) if ordered else 0.0
+            }
+        return {'capacity': self.capacity, 'running': self.running, 'queued': self.queued, 'lanes': lanes}
+
+
+llm_scheduler = LLMScheduler()
+
+
+@asynccontextmanager
+async def llm_call(cost: float = 1.0, provider: str = DEFAULT_PROVIDER):
+    """
+    Wrap one LLM API request: checks the provider's breaker, waits for a slot
+    granted to the current caller's lane, and reports the outcome and latency
+    to the breaker
+    """
+    caller, lane = _caller.get()
+    breaker = circuit_breaker(provider)
+    try:
+        breaker.check()
+        async with llm_scheduler.slot(caller, lane, cost):
+            probe = breaker.acquire()  # the breaker may have opened while this request queued
+            started = time.monotonic()
+            try:
+                yield
+            except asyncio.CancelledError:
+                # A deadline cutting off a slow call says something about the provider; a superseded request does not
+                elapsed = time.monotonic() - started
+                if elapsed >= breaker.slow_call_seconds:
+                    breaker.record(False, elapsed, probe)
+                else:
+                    breaker.abandon(probe)
+                raise
+            except Exception:
+                breaker.record(False, time.monotonic() - started, probe)
+                raise
+            breaker.record(True, time.monotonic() - started, probe)
+    except Exception as e:
+        failures = _failures.get()
+        if failures is not None:
+            failures.append(e)
+        raise
+
+
+@contextmanager
+def capture_llm_failures():
+    """
+    Collect the exceptions of LLM requests made inside the block, including
+    ones the services catch and turn into empty or error results
+    """
+    failures: List[Exception] = []
+    token = _failures.set(failures)
+    try:
+        yield failures
+    finally:
+        _failures.reset(token)
+
+
+def llm_in_flight() -> int:
+    """LLM requests started and not yet finished, including those queued for a slot"""
+    return llm_scheduler.running + llm_scheduler.queued
+
+
+def llm_stats() -> Dict[str, Any]:
+    return {**llm_scheduler.stats(), 'breakers': breaker_stats()}
@@ -10,9 +10,22 @@ from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
 from typing import Optional, Dict, Any
 import json
 
-# Create logs directory if it doesn't exist
-LOGS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
-os.makedirs(LOGS_DIR, exist_ok=True)
+# Created when the first record is written, not at import: importing a
+# module that logs must not touch the filesystem
+LOGS_DIR = os.getenv("LOGS_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs"))
+
+class _CreateDirectoryOnOpen:
+    """File handler mixin: make the log directory when the file is first opened"""
+    
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+class _RotatingFileHandler(_CreateDirectoryOnOpen, RotatingFileHandler):
+    pass
+
+class _TimedRotatingFileHandler(_CreateDirectoryOnOpen, TimedRotatingFileHandler):
+    pass
 
 class ColoredFormatter(logging.Formatter):
     """Colored log formatter for console output"""
@@ -118,13 +131,14 @@ def setup_logger(
         console_handler.setFormatter(console_formatter)
         logger.addHandler(console_handler)
     
-    # File handlers
+    # File handlers (files are opened on the first record, not here)
     if file_output:
         # General log file (rotating by size)
-        file_handler = RotatingFileHandler(
+        file_handler = _RotatingFileHandler(
             os.path.join(LOGS_DIR, f"{name}.log"),
             maxBytes=10*1024*1024,  # 10 MB
-            backupCount=5
+            backupCount=5,
+            delay=True
         )
         file_handler.setLevel(log_level)
         
@@ -140,21 +154,23 @@ def setup_logger(
         logger.addHandler(file_handler)
         
         # Error log file (errors and critical only)
-        error_handler = RotatingFileHandler(
+        error_handler = _RotatingFileHandler(
             os.path.join(LOGS_DIR, f"{name}_errors.log"),
             maxBytes=5*1024*1024,  # 5 MB
-            backupCount=3
+            backupCount=3,
+            delay=True
         )
         error_handler.setLevel(logging.ERROR)
         error_handler.setFormatter(file_formatter)
         logger.addHandler(error_handler)
         
         # Daily rotating log file
-        daily_handler = TimedRotatingFileHandler(
+        daily_handler = _TimedRotatingFileHandler(
             os.path.join(LOGS_DIR, f"{name}_daily.log"),
             when='midnight',
             interval=1,
-            backupCount=30  # Keep 30 days
+            backupCount=30,  # Keep 30 days
+            delay=True
         )
         daily_handler.setLevel(log_level)
         daily_handler.setFormatter(file_formatter)
@@ -378,10 +394,19 @@ class APILogger:
             }
         )
 
-# Global loggers for easy access
-performance_logger = PerformanceLogger()
-security_logger = SecurityLogger()
-api_logger = APILogger()
+# Global loggers for easy access, created on first use
+_GLOBAL_LOGGERS = {
+    "performance_logger": PerformanceLogger,
+    "security_logger": SecurityLogger,
+    "api_logger": APILogger
+}
+
+def __getattr__(name: str):
+    if name in _GLOBAL_LOGGERS:
+        instance = _GLOBAL_LOGGERS[name]()
+        globals()[name] = instance
+        return instance
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def log_startup_info():
     """Log startup information"""
@@ -420,6 +445,3 @@ def log_performance_warning(logger: logging.Logger, operation: str, duration: fl
                 "event_type": "performance_warning"
             }
         )
-
-# Initialize logging system
-log_startup_info()
\ No newline at end of file
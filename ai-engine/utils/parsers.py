@@ -0,0 +1,51 @@
+"""
+Shared Tree-sitter parsers, created on first use
+"""
+
+import importlib
+import threading
+from typing import Dict
+from tree_sitter import Language, Parser
+
+# Grammar package per supported language
+GRAMMAR_MODULES = {
+    'python': 'tree_sitter_python',
+    'cpp': 'tree_sitter_cpp',
+    'java': 'tree_sitter_java',
+    'javascript': 'tree_sitter_javascript'
+}
+
+SUPPORTED_LANGUAGES = tuple(GRAMMAR_MODULES)
+
+_languages: Dict[str, Language] = {}
+_parsers: Dict[str, Parser] = {}
+_lock = threading.Lock()
+
+
+def get_language(language: str) -> Language:
+    """Tree-sitter Language for a supported language name"""
+    if language not in GRAMMAR_MODULES:
+        raise ValueError(f"Unsupported language: {language}")
+    with _lock:
+        if language not in _languages:
+            grammar = importlib.import_module(GRAMMAR_MODULES[language])
+            _languages[language] = Language(grammar.language(), language)
+        return _languages[language]
+
+
+def get_parser(language: str) -> Parser:
+    """
+    Parser for a supported language, shared process-wide
+
+    Parsers are not safe to use from several threads at once; callers parse
+    on the event loop thread.
+    """
+    if language in _parsers:
+        return _parsers[language]
+    grammar = get_language(language)
+    with _lock:
+        if language not in _parsers:
+            parser = Parser()
+            parser.set_language(grammar)
+            _parsers[language] = parser
+        return _parsers[language]
@@ -0,0 +1,58 @@
+/*
+ * rusage_exec: run a command and report the command's own resource usage.
+ *
+ * Usage: rusage_exec <report-fd> <command> [args...]
+ *
+ * Linux carries the pre-exec high-water RSS across execve, so a process
+ * forked straight from the API worker reports the worker's footprint as its
+ * ru_maxrss. This probe is tiny; the command is forked from it and reaped with
+ * wait4, and "<maxrss> <utime_us> <stime_us>" is written to <report-fd>.
+ * The probe exits with the command's status (or re-raises its signal).
+ */
+#include <signal.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <sys/resource.h>
+#include <sys/types.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+int main(int argc, char **argv)
+{
+    if (argc < 3) {
+        fprintf(stderr, "usage: %s <report-fd> <command> [args...]\n", argv[0]);
+        return 2;
+    }
+
+    int report_fd = atoi(argv[1]);
+    pid_t pid = fork();
+    if (pid < 0) {
+        perror("fork");
+        return 126;
+    }
+    if (pid == 0) {
+        close(report_fd);
+        execvp(argv[2], &argv[2]);
+        perror("execvp");
+        _exit(127);
+    }
+
+    int status = 0;
+    struct rusage usage;
+    if (wait4(pid, &status, 0, &usage) < 0) {
+        perror("wait4");
+        return 126;
+    }
+
+    dprintf(report_fd, "%ld %ld %ld\n",
+            (long)usage.ru_maxrss,
+            (long)(usage.ru_utime.tv_sec * 1000000L + usage.ru_utime.tv_usec),
+            (long)(usage.ru_stime.tv_sec * 1000000L + usage.ru_stime.tv_usec));
+    close(report_fd);
+
+    if (WIFSIGNALED(status)) {
+        signal(WTERMSIG(status), SIG_DFL);
+        kill(getpid(), WTERMSIG(status));
+    }
+    return WIFEXITED(status) ? WEXITSTATUS(status) : 1;
+}
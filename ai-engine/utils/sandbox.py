@@ -0,0 +1,366 @@
+"""
+Resource-limited subprocess sandbox for local code execution
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import signal
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Any, Optional, Union
+
+try:
+    import resource
+except ImportError:  # Windows; see SANDBOX_SUPPORTED
+    resource = None
+
+from utils.security import create_secure_environment
+from utils.logger import setup_logger
+
+logger = setup_logger("sandbox")
+
+_SECURE_ENV = create_secure_environment()
+DEFAULT_TIMEOUT = _SECURE_ENV["max_execution_time"]
+DEFAULT_MEMORY_LIMIT_MB = _SECURE_ENV["max_memory_usage"]
+MAX_CAPTURED_OUTPUT = 16 * 1024 * 1024  # bytes kept per stream
+MAX_FILE_SIZE = 16 * 1024 * 1024        # largest file a sandboxed process may write
+
+# The sandbox reaps children with os.wait4 and kills them by process group,
+# neither of which exists on Windows; there is no local backend there
+SANDBOX_SUPPORTED = hasattr(os, "wait4") and hasattr(os, "killpg")
+
+# Sandboxes are CPU-bound; more at once than cores only slows every one of them
+# down and skews timings, so the rest wait their turn (see sandbox_stats)
+SANDBOX_CONCURRENCY = int(os.getenv("SANDBOX_CONCURRENCY", str(os.cpu_count() or 1)))
+_slots: Optional[asyncio.Semaphore] = None
+_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+_waiting = 0
+_running = 0
+
+RUSAGE_PROBE_SOURCE = os.path.join(os.path.dirname(__file__), "rusage_exec.c")
+_probe_lock = threading.Lock()
+_probe_path: Optional[str] = None
+_probe_checked = False
+_private_lock = threading.Lock()
+_private_path: Optional[str] = None
+
+
+def _child_env(cwd: Optional[str], extra: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """Minimal environment for a sandboxed command; the server's own (API keys, JWT secret) never leaks in"""
+    env = {
+        'PATH': os.environ.get('PATH', os.defpath),
+        'LANG': 'C.UTF-8',
+        'HOME': cwd or tempfile.gettempdir()
+    }
+    env.update(extra or {})
+    return env
+
+
+def owned_and_private(path: str, directory: bool) -> bool:
+    """Whether path is a real file or directory of this user that nobody else can write"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    kind_ok = stat.S_ISDIR(st.st_mode) if directory else stat.S_ISREG(st.st_mode)
+    return kind_ok and st.st_uid == os.getuid() and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def private_dir() -> str:
+    """Per-user 0700 directory for sandbox and build files; a fresh one if the shared name was taken"""
+    global _private_path
+    with _private_lock:
+        if _private_path is None:
+            path = os.path.join(tempfile.gettempdir(), f"algomaster-{os.getuid()}")
+            try:
+                os.mkdir(path, 0o700)
+            except FileExistsError:
+                pass
+            if not owned_and_private(path, directory=True):
+                logger.warning(f"⚠️ {path} is not a private directory of this user; using a fresh one")
+                path = tempfile.mkdtemp(prefix="algomaster-")
+            _private_path = path
+        return _private_path
+
+
+def _rusage_probe() -> Optional[str]:
+    """Compile rusage_exec.c once per source version; None when no C compiler exists"""
+    global _probe_path, _probe_checked
+    with _probe_lock:
+        if _probe_checked:
+            return _probe_path
+        _probe_checked = True
+
+        compiler = shutil.which("cc") or shutil.which("gcc") or shutil.which("g++")
+        if compiler is None or sys.platform == "win32":
+            logger.warning("⚠️ No C compiler for the rusage probe; child peak memory will include launcher RSS")
+            return None
+
+        with open(RUSAGE_PROBE_SOURCE, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:16]
+        # Every sandboxed run execs the probe, so it must not be replaceable
+        # by another local user: it lives in a directory only we can write
+        target = os.path.join(private_dir(), f"rusage-exec-{digest}")
+        if os.path.lexists(target) and not owned_and_private(target, directory=False):
+            logger.warning(f"⚠️ Ignoring rusage probe {target}: not owned by this user or writable by others")
+            os.unlink(target)
+        if not os.path.exists(target):
+            staging = f"{target}.{os.getpid()}"
+            result = subprocess.run(
+                [compiler, "-O2", "-x", "c", RUSAGE_PROBE_SOURCE, "-o", staging],
+                capture_output=True, text=True
+            )
+            if result.returncode != 0:
+                logger.warning(f"⚠️ Failed to build rusage probe: {result.stderr.strip()}")
+                return None
+            os.chmod(staging, 0o700)
+            os.replace(staging, target)
+        _probe_path = target
+        return _probe_path
+
+
+def _limit_resources(cpu_seconds: int, memory_limit_mb: Optional[int]):
+    """Build the preexec hook that applies rlimits inside the child"""
+    def apply():
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (MAX_FILE_SIZE, MAX_FILE_SIZE))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        if memory_limit_mb:
+            limit = memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    return apply
+
+
+def _maxrss_bytes(rusage) -> int:
+    """ru_maxrss is KB on Linux and bytes on macOS"""
+    if sys.platform == "darwin":
+        return rusage.ru_maxrss
+    return rusage.ru_maxrss * 1024
+
+
+def _drain(stream, sink: List[bytes]):
+    """Read a pipe to EOF, keeping at most MAX_CAPTURED_OUTPUT bytes"""
+    kept = 0
+    for chunk in iter(lambda: stream.read(65536), b''):
+        if kept < MAX_CAPTURED_OUTPUT:
+            sink.append(chunk[:MAX_CAPTURED_OUTPUT - kept])
+            kept += len(chunk)
+    stream.close()
+
+
+def _feed(stream, input_data: Union[bytes, Iterable[bytes]]):
+    """Write stdin and close it; the child may exit before reading everything"""
+    try:
+        if isinstance(input_data, bytes):
+            stream.write(input_data)
+        else:
+            # Streamed input is written chunk by chunk and never held in full
+            for chunk in input_data:
+                stream.write(chunk)
+    except (BrokenPipeError, OSError):
+        pass
+    finally:
+        try:
+            stream.close()
+        except OSError:
+            pass
+
+
+class _Cancellation:
+    """Lets the event loop kill a sandboxed process group that a worker thread started"""
+
+    def __init__(self):
+        self.requested = threading.Event()
+        self.pid: Optional[int] = None
+
+    def kill(self):
+        # Either side may come second: the thread checks the flag after publishing the pid
+        pid = self.pid
+        if pid is not None:
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+    def cancel(self):
+        self.requested.set()
+        self.kill()
+
+    def started(self, pid: int):
+        self.pid = pid
+        if self.requested.is_set():
+            self.kill()
+
+
+def _run_blocking(cmd: List[str], input_data: Union[bytes, Iterable[bytes]], cwd: Optional[str], timeout: float,
+                  memory_limit_mb: Optional[int], env: Optional[Dict[str, str]],
+                  cancellation: Optional[_Cancellation] = None) -> Dict[str, Any]:
+    preexec = None
+    if resource is not None:
+        preexec = _limit_resources(max(1, int(timeout + 0.999)), memory_limit_mb)
+
+    probe = _rusage_probe()
+    report_read = report_write = None
+    if probe:
+        report_read, report_write = os.pipe()
+        cmd = [probe, str(report_write), *cmd]
+
+    try:
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            env=_child_env(cwd, env),
+            preexec_fn=preexec,
+            start_new_session=True,
+            pass_fds=(report_write,) if probe else ()
+        )
+    except OSError:
+        if report_read is not None:
+            os.close(report_read)
+        raise
+    finally:
+        if report_write is not None:
+            os.close(report_write)
+    if cancellation is not None:
+        cancellation.started(process.pid)
+    start_time = time.perf_counter()
+
+    stdout_chunks: List[bytes] = []
+    stderr_chunks: List[bytes] = []
+    io_threads = [
+        threading.Thread(target=_feed, args=(process.stdin, input_data), daemon=True),
+        threading.Thread(target=_drain, args=(process.stdout, stdout_chunks), daemon=True),
+        threading.Thread(target=_drain, args=(process.stderr, stderr_chunks), daemon=True)
+    ]
+    for thread in io_threads:
+        thread.start()
+
+    timed_out = threading.Event()
+
+    def kill_on_timeout():
+        timed_out.set()
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    timer = threading.Timer(timeout, kill_on_timeout)
+    timer.start()
+    try:
+        # wait4 reaps the child and returns its own rusage in one call
+        _, status, rusage = os.wait4(process.pid, 0)
+    finally:
+        timer.cancel()
+    wall_time = time.perf_counter() - start_time
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    for thread in io_threads:
+        thread.join()
+
+    max_rss_bytes = _maxrss_bytes(rusage)
+    cpu_time = (rusage.ru_utime + rusage.ru_stime) * 1000
+    memory_method = 'rusage_unisolated'
+    if report_read is not None:
+        with os.fdopen(report_read, 'rb') as report:
+            fields = report.read().split()
+        if len(fields) == 3:
+            max_rss_kb, utime_us, stime_us = (int(field) for field in fields)
+            max_rss_bytes = max_rss_kb if sys.platform == "darwin" else max_rss_kb * 1024
+            cpu_time = (utime_us + stime_us) / 1000
+            memory_method = 'rusage'
+
+    return {
+        'returncode': process.returncode,
+        'stdout': b''.join(stdout_chunks),
+        'stderr': b''.join(stderr_chunks),
+        'wall_time': wall_time * 1000,
+        'cpu_time': cpu_time,
+        'max_rss_bytes': max_rss_bytes,
+        'memory_method': memory_method,
+        'timed_out': timed_out.is_set()
+    }
+
+
+async def run_sandboxed(
+    cmd: List[str],
+    input_data: Union[str, bytes, Iterable[bytes]] = b'',
+    cwd: Optional[str] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    memory_limit_mb: Optional[int] = DEFAULT_MEMORY_LIMIT_MB,
+    env: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Run a command under CPU, address-space and file-size rlimits
+
+    At most SANDBOX_CONCURRENCY commands run at once per event loop; the
+    timeout starts when the command does, not while it waits for a slot.
+    Cancelling the call kills the process group and only returns the slot
+    once the process has been reaped.
+
+    Args:
+        cmd: Command and arguments (no shell)
+        input_data: Bytes fed to the child's stdin, or an iterable of byte
+            chunks that is streamed without being materialized
+        cwd: Working directory for the child
+        timeout: Wall-clock limit in seconds; the process group is killed after it
+        memory_limit_mb: RLIMIT_AS in MB, or None for runtimes that reserve
+            large virtual ranges up front (JVM, V8) and cap their heap themselves
+        env: Extra variables for the child on top of PATH, LANG and HOME (cwd
+            or the temp directory); nothing is inherited from the server
+
+    Returns:
+        Dict with returncode, stdout, stderr (bytes), wall_time and cpu_time (ms),
+        max_rss_bytes (peak RSS of the command itself), memory_method and timed_out
+    """
+    global _waiting, _running
+    if not SANDBOX_SUPPORTED:
+        raise RuntimeError(f"The local sandbox is not supported on {sys.platform}; use the Docker backend")
+    if isinstance(input_data, str):
+        input_data = input_data.encode()
+    loop = asyncio.get_running_loop()
+    slots = _admission(loop)
+    _waiting += 1
+    try:
+        await slots.acquire()
+    finally:
+        _waiting -= 1
+    _running += 1
+    cancellation = _Cancellation()
+    run = loop.run_in_executor(
+        None, _run_blocking, cmd, input_data, cwd, timeout, memory_limit_mb, env, cancellation
+    )
+    try:
+        return await asyncio.shield(run)
+    except asyncio.CancelledError:
+        cancellation.cancel()
+        try:
+            await run
+        except Exception:
+            pass
+        raise
+    finally:
+        _running -= 1
+        slots.release()
+
+
+def _admission(loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+    """The SANDBOX_CONCURRENCY slots of the running event loop"""
+    global _slots, _slots_loop
+    if _slots is None or _slots_loop is not loop:
+        _slots = asyncio.Semaphore(SANDBOX_CONCURRENCY)
+        _slots_loop = loop
+    return _slots
+
+
+def sandbox_stats() -> Dict[str, int]:
+    """Sandboxed processes running now and waiting for a slot"""
+    return {'running': _running, 'waiting': _waiting, 'capacity': SANDBOX_CONCURRENCY}
@@ -3,6 +3,7 @@ Security utilities for AlgoMaster-Studio-AI AI Engine
 """
 
 import os
+import re
 import jwt
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
@@ -140,6 +141,21 @@ def rate_limit_check(user_id: str, endpoint: str) -> bool:
     # For demo, we'll allow all requests
     return True
 
+# Compiled once; every pattern runs in linear time. An opening tag is enough to
+# flag a script, and handlers only start at a word boundary: matching up to
+# "</script>" or from every "on" made the scan quadratic (19 s on 160 KB of
+# unclosed "<script" tags), stalling the event loop.
+SUSPICIOUS_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r"<script\b",                # XSS
+        r"javascript:",              # JavaScript protocol
+        r"\bon\w+\s*=",              # Event handlers
+        r"eval\s*\(",                # eval function
+        r"exec\s*\(",                # exec function
+        r"__\w+__",                  # Python special methods
+    )
+]
+
 class SecurityMiddleware:
     """Security middleware for additional protection"""
     
@@ -167,23 +183,7 @@ class SecurityMiddleware:
     @staticmethod
     def detect_suspicious_patterns(content: str) -> List[str]:
         """Detect suspicious patterns in content"""
-        suspicious_patterns = [
-            r"<script.*?>.*?</script>",  # XSS
-            r"javascript:",              # JavaScript protocol
-            r"on\w+\s*=",               # Event handlers
-            r"eval\s*\(",               # eval function
-            r"exec\s*\(",               # exec function
-            r"__.*__",                  # Python special methods
-        ]
-        
-        detected = []
-        import re
-        
-        for pattern in suspicious_patterns:
-            if re.search(pattern, content, re.IGNORECASE):
-                detected.append(pattern)
-        
-        return detected
+        return [pattern.pattern for pattern in SUSPICIOUS_PATTERNS if pattern.search(content)]
 
 def create_secure_environment() -> Dict[str, Any]:
     """Create a secure execution environment for code analysis"""
@@ -254,5 +254,3 @@ SECURITY_CONFIG = {
         "Strict-Transport-Security": "max-age=31536000; includeSubDomains"
     }
 }
-
-logger.info("🔒 Security utilities initialized with comprehensive protection")
\ No newline at end of file
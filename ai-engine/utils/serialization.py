@@ -0,0 +1,200 @@
+"""
+Fast response serialization with content negotiation and compression
+
+An AnalysisResponse carries six nested models plus free-form dicts (the
+flowchart's nodes with their style dicts, benchmark details, trace windows).
+Returned as a model, FastAPI validates it again against response_model and
+then encodes it through jsonable_encoder and the stdlib json module, which
+together cost more than building it. Endpoints return FastResponse instead:
+
+    JSON         a model through pydantic's serializer, anything else
+                 through orjson (stdlib json without orjson)
+    MessagePack  when the client sends Accept: application/msgpack and
+                 msgpack is installed
+    compression  brotli or gzip per Accept-Encoding, once the body is larger
+                 than RESPONSE_COMPRESSION_MIN_BYTES
+
+The body is rendered when the response is sent, since the choice depends on
+the request's headers.
+"""
+
+import gzip
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+
+from utils.executors import run_in_thread
+
+try:
+    import orjson
+except ImportError:  # stdlib json is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is not offered; clients get JSON
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+
+# zlib and brotli release the GIL; bodies this large are compressed off the loop
+THREAD_COMPRESSION_BYTES = 256 * 1024
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def _default(obj: Any) -> Any:
+    """Types orjson does not know natively"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return jsonable_encoder(obj)
+
+
+def _msgpack_default(obj: Any) -> Any:
+    # MessagePack has no datetime or enum type; the JSON-mode dump maps them to primitives
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return jsonable_encoder(obj)
+
+
+def dumps_json(content: Any) -> bytes:
+    if isinstance(content, BaseModel):
+        # pydantic's own serializer walks a model faster than dumping it for orjson
+        return content.model_dump_json().encode("utf-8")
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def dumps_msgpack(content: Any) -> bytes:
+    if isinstance(content, BaseModel):
+        content = content.model_dump(mode="json")
+    return msgpack.packb(content, default=_msgpack_default, use_bin_type=True)
+
+
+def _quality(header: str) -> Dict[str, float]:
+    """Parse an Accept or Accept-Encoding header into {token: q}"""
+    qualities = {}
+    for item in header.split(","):
+        token, _, params = item.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[token] = q
+    return qualities
+
+
+def negotiate_media_type(accept: str) -> str:
+    if msgpack is None or not accept:
+        return JSON_MEDIA_TYPE
+    qualities = _quality(accept)
+    msgpack_q = max(qualities.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    json_q = max(qualities.get(JSON_MEDIA_TYPE, 0.0), qualities.get("application/*", 0.0),
+                 qualities.get("*/*", 0.0))
+    return MSGPACK_MEDIA_TYPES[0] if msgpack_q > 0 and msgpack_q >= json_q else JSON_MEDIA_TYPE
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    qualities = _quality(accept_encoding)
+    wildcard = qualities.get("*", 0.0)
+    offered = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in offered:
+        q = qualities.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def encode(content: Any, accept: str = "") -> Tuple[bytes, str]:
+    """Uncompressed body and media type for the request's Accept header"""
+    media_type = negotiate_media_type(accept)
+    if media_type == JSON_MEDIA_TYPE:
+        return dumps_json(content), media_type
+    return dumps_msgpack(content), media_type
+
+
+class FastResponse(Response):
+    """
+    JSON or MessagePack response, compressed when the client accepts it
+
+    Returning one from an endpoint skips response_model validation and
+    jsonable_encoder, so only return models and dicts the service built
+    itself. Models are serialized through their dump, not revalidated.
+    """
+
+    media_type = JSON_MEDIA_TYPE
+
+    def __init__(self, content: Any = None, status_code: int = 200,
+                 headers: Optional[Dict[str, str]] = None, media_type: Optional[str] = None,
+                 background: Optional[BackgroundTask] = None):
+        self.content = content
+        super().__init__(None, status_code, headers, media_type, background)
+
+    def render(self, content: Any) -> bytes:
+        # Deferred to __call__, where the request's Accept headers are known
+        return b""
+
+    async def __call__(self, scope, receive, send):
+        if self.status_code >= 200 and self.status_code not in (204, 304):
+            request_headers = {key: value for key, value in scope.get("headers", [])}
+            accept = request_headers.get(b"accept", b"").decode("latin-1")
+            accept_encoding = request_headers.get(b"accept-encoding", b"").decode("latin-1")
+
+            body, media_type = encode(self.content, accept)
+            encoding = None
+            if len(body) >= COMPRESSION_MIN_BYTES and b"content-encoding" not in self._header_names():
+                encoding = negotiate_encoding(accept_encoding)
+            if encoding is not None:
+                if len(body) >= THREAD_COMPRESSION_BYTES:
+                    body = await run_in_thread(compress, body, encoding)
+                else:
+                    body = compress(body, encoding)
+            self._set_body(body, media_type, encoding)
+        await super().__call__(scope, receive, send)
+
+    def _header_names(self) -> List[bytes]:
+        return [name for name, _ in self.raw_headers]
+
+    def _set_body(self, body: bytes, media_type: str, encoding: Optional[str]):
+        self.body = body
+        headers = [(name, value) for name, value in self.raw_headers
+                   if name not in (b"content-length", b"content-type")]
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        headers.append((b"content-type", media_type.encode("latin-1")))
+        headers.append((b"vary", b"Accept, Accept-Encoding"))
+        if encoding is not None:
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+        self.raw_headers = headers